@@ -0,0 +1,33 @@
+"""Per-book mean review sentiment
+
+Revision ID: 0002_review_sentiment
+Revises: 0001_initial
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "0002_review_sentiment"
+down_revision: Union[str, None] = "0001_initial"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("books", sa.Column("average_sentiment", sa.Float(), nullable=True))
+    # Lets the sentiment batch job find its next chunk without a scan
+    op.create_index(
+        "ix_reviews_unscored",
+        "reviews",
+        ["id"],
+        postgresql_where=sa.text("sentiment_score IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reviews_unscored", table_name="reviews")
+    op.drop_column("books", "average_sentiment")
@@ -0,0 +1,25 @@
+"""Composite index for keyset pagination of books
+
+Revision ID: 0003_books_keyset_index
+Revises: 0002_review_sentiment
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0003_books_keyset_index"
+down_revision: Union[str, None] = "0002_review_sentiment"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves ORDER BY created_at DESC, id DESC and the (created_at, id) < cursor
+    # predicate with a backward index scan.
+    op.create_index("ix_books_created_at_id", "books", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_created_at_id", table_name="books")
@@ -0,0 +1,75 @@
+"""Composite and partial indexes for the hot queries
+
+Revision ID: 0004_hot_query_indexes
+Revises: 0003_books_keyset_index
+Create Date: 2026-10-19 00:00:00.000000
+
+- borrows (user_id, book_id) WHERE status = 'active'   unique; borrow/return/review checks
+          (duplicate active borrows of a book by one user are closed first,
+          keeping the newest)
+- borrows (user_id, status, borrowed_at)                list_borrowed_books
+- books   (genre, average_rating)                       recommender
+- books   (created_at, id)                              already added by 0003
+- drops   ix_*_id on primary keys (the PK index already covers them)
+          and ix_borrows_user_id (prefix of the new composite)
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "0004_hot_query_indexes"
+down_revision: Union[str, None] = "0003_books_keyset_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_REDUNDANT_PK_INDEXES = {
+    "ix_users_id": "users",
+    "ix_books_id": "books",
+    "ix_borrows_id": "borrows",
+    "ix_reviews_id": "reviews",
+    "ix_user_preferences_id": "user_preferences",
+}
+
+
+def upgrade() -> None:
+    # The old read-then-write borrow path could record one borrow twice; the
+    # unique index below would refuse to build over such pairs. The copies are
+    # the same loan, so closing all but the newest changes no one's holdings.
+    op.execute(
+        """
+        UPDATE borrows SET status = 'returned', returned_at = CURRENT_TIMESTAMP
+        WHERE status = 'active' AND id NOT IN (
+            SELECT max(id) FROM borrows WHERE status = 'active' GROUP BY user_id, book_id
+        )
+        """
+    )
+    op.create_index(
+        "ux_borrows_active_user_book",
+        "borrows",
+        ["user_id", "book_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'active'"),
+    )
+    op.create_index(
+        "ix_borrows_user_status_borrowed_at",
+        "borrows",
+        ["user_id", "status", "borrowed_at"],
+    )
+    op.drop_index("ix_borrows_user_id", table_name="borrows")
+    op.create_index(
+        "ix_books_genre_average_rating", "books", ["genre", "average_rating"]
+    )
+    for name, table in _REDUNDANT_PK_INDEXES.items():
+        op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    for name, table in _REDUNDANT_PK_INDEXES.items():
+        op.create_index(name, table, ["id"])
+    op.drop_index("ix_books_genre_average_rating", table_name="books")
+    op.create_index("ix_borrows_user_id", "borrows", ["user_id"])
+    op.drop_index("ix_borrows_user_status_borrowed_at", table_name="borrows")
+    op.drop_index("ux_borrows_active_user_book", table_name="borrows")
@@ -0,0 +1,38 @@
+"""Full-text search over books
+
+Revision ID: 0005_books_full_text_search
+Revises: 0004_hot_query_indexes
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0005_books_full_text_search"
+down_revision: Union[str, None] = "0004_hot_query_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy: the model's expression changed in 0008 (AI text moved out).
+BOOKS_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(ai_summary, '')), 'D')"
+)
+
+
+def upgrade() -> None:
+    # Stored generated column: kept current by Postgres on every write, and
+    # not mapped on the ORM model so normal SELECTs never read it.
+    op.execute(
+        "ALTER TABLE books ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({BOOKS_SEARCH_VECTOR_SQL}) STORED"
+    )
+    op.execute("CREATE INDEX ix_books_search_vector ON books USING GIN (search_vector)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_books_search_vector")
+    op.execute("ALTER TABLE books DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,31 @@
+"""Trigram indexes for title/author autocomplete, and its hot-title load
+
+Revision ID: 0006_books_trigram_autocomplete
+Revises: 0005_books_full_text_search
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0006_books_trigram_autocomplete"
+down_revision: Union[str, None] = "0005_books_full_text_search"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # gin_trgm_ops serves ILIKE '%q%' as well as the similarity operators
+    # (%, <%) used for typo tolerance; the btree ix_books_title can do neither.
+    op.execute("CREATE INDEX ix_books_title_trgm ON books USING GIN (title gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_books_author_trgm ON books USING GIN (author gin_trgm_ops)")
+    # Read backwards for ORDER BY review_count DESC, id DESC LIMIT n
+    op.create_index("ix_books_review_count_id", "books", ["review_count", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_review_count_id", table_name="books")
+    op.execute("DROP INDEX IF EXISTS ix_books_author_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_books_title_trgm")
@@ -0,0 +1,58 @@
+"""One active borrow per book, enforced by the database
+
+Revision ID: 0007_borrows_active_book_unique
+Revises: 0006_books_trigram_autocomplete
+Create Date: 2026-10-19 00:00:00.000000
+
+Duplicate active borrows of one book are closed first, keeping the newest,
+and books.status is brought back in line with the borrows that remain.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0007_borrows_active_book_unique"
+down_revision: Union[str, None] = "0006_books_trigram_autocomplete"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The old read-then-write borrow path could hand one copy to two users;
+    # the unique index below would refuse to build over such rows. The newest
+    # borrow keeps the copy, the others are returned.
+    op.execute(
+        """
+        UPDATE borrows SET status = 'returned', returned_at = CURRENT_TIMESTAMP
+        WHERE status = 'active' AND id NOT IN (
+            SELECT max(id) FROM borrows WHERE status = 'active' GROUP BY book_id
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE books SET
+            status = CASE WHEN EXISTS (
+                SELECT 1 FROM borrows
+                WHERE borrows.book_id = books.id AND borrows.status = 'active'
+            ) THEN 'borrowed'::bookstatus ELSE 'available'::bookstatus END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE status <> CASE WHEN EXISTS (
+            SELECT 1 FROM borrows
+            WHERE borrows.book_id = books.id AND borrows.status = 'active'
+        ) THEN 'borrowed'::bookstatus ELSE 'available'::bookstatus END
+        """
+    )
+    op.create_index(
+        "ux_borrows_active_book",
+        "borrows",
+        ["book_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_borrows_active_book", table_name="borrows")
@@ -0,0 +1,80 @@
+"""Move LLM-generated text out of books into book_ai_content
+
+Revision ID: 0008_book_ai_content
+Revises: 0007_borrows_active_book_unique
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0008_book_ai_content"
+down_revision: Union[str, None] = "0007_borrows_active_book_unique"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_VECTOR_WITHOUT_AI = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+_VECTOR_WITH_AI = (
+    f"{_VECTOR_WITHOUT_AI} || "
+    "setweight(to_tsvector('english', coalesce(ai_summary, '')), 'D')"
+)
+# Frozen copy of app.models.book.AI_CONTENT_SEARCH_VECTOR_SQL
+AI_CONTENT_SEARCH_VECTOR_SQL = "setweight(to_tsvector('english', coalesce(ai_summary, '')), 'D')"
+
+
+def _replace_search_vector(expression: str) -> None:
+    op.execute("DROP INDEX IF EXISTS ix_books_search_vector")
+    op.execute("ALTER TABLE books DROP COLUMN IF EXISTS search_vector")
+    op.execute(
+        "ALTER TABLE books ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({expression}) STORED"
+    )
+    op.execute("CREATE INDEX ix_books_search_vector ON books USING GIN (search_vector)")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "book_ai_content",
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("ai_summary", sa.Text(), nullable=True),
+        sa.Column("ai_review_consensus", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["book_id"], ["books.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("book_id"),
+    )
+    op.execute(
+        "INSERT INTO book_ai_content (book_id, ai_summary, ai_review_consensus, updated_at) "
+        "SELECT id, ai_summary, ai_review_consensus, updated_at FROM books "
+        "WHERE ai_summary IS NOT NULL OR ai_review_consensus IS NOT NULL"
+    )
+    # The generated search_vector reads ai_summary, so rebuild it first
+    _replace_search_vector(_VECTOR_WITHOUT_AI)
+    op.drop_column("books", "ai_review_consensus")
+    op.drop_column("books", "ai_summary")
+    # The summary stays searchable through its own vector next to the text
+    op.execute(
+        "ALTER TABLE book_ai_content ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({AI_CONTENT_SEARCH_VECTOR_SQL}) STORED"
+    )
+    op.execute(
+        "CREATE INDEX ix_book_ai_content_search_vector "
+        "ON book_ai_content USING GIN (search_vector)"
+    )
+
+
+def downgrade() -> None:
+    op.add_column("books", sa.Column("ai_summary", sa.Text(), nullable=True))
+    op.add_column("books", sa.Column("ai_review_consensus", sa.Text(), nullable=True))
+    op.execute(
+        "UPDATE books SET ai_summary = c.ai_summary, "
+        "ai_review_consensus = c.ai_review_consensus "
+        "FROM book_ai_content c WHERE c.book_id = books.id"
+    )
+    _replace_search_vector(_VECTOR_WITH_AI)
+    op.drop_table("book_ai_content")
@@ -0,0 +1,81 @@
+"""Content stamp and write counters behind the catalog version for HTTP validators
+
+Revision ID: 0009_catalog_version
+Revises: 0008_book_ai_content
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0009_catalog_version"
+down_revision: Union[str, None] = "0008_book_ai_content"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.models.book.CATALOG_VERSION_SLOTS
+CATALOG_VERSION_SLOTS = 16
+
+# Frozen copy of app.models.book._POSTGRES_CATALOG_VERSION_DDL and
+# _POSTGRES_AI_CATALOG_VERSION_DDL
+_CATALOG_VERSION_DDL = [
+    "CREATE OR REPLACE FUNCTION catalog_version_bump(target text) RETURNS void "
+    "LANGUAGE plpgsql AS $$ BEGIN "
+    "INSERT INTO catalog_versions (scope, slot, version) "
+    f"VALUES (target, mod(txid_current(), {CATALOG_VERSION_SLOTS}), 1) "
+    "ON CONFLICT (scope, slot) DO UPDATE SET version = catalog_versions.version + 1; "
+    "END $$",
+    "CREATE OR REPLACE FUNCTION catalog_version_trigger() RETURNS trigger "
+    "LANGUAGE plpgsql AS $$ BEGIN "
+    "PERFORM catalog_version_bump(TG_ARGV[0]); RETURN NULL; END $$",
+    "CREATE OR REPLACE FUNCTION books_catalog_version_trigger() RETURNS trigger "
+    "LANGUAGE plpgsql AS $$ DECLARE target text; BEGIN "
+    "SELECT CASE "
+    "WHEN bool_or(n.content_updated_at IS DISTINCT FROM o.content_updated_at) THEN 'content' "
+    "WHEN bool_or(n.updated_at IS DISTINCT FROM o.updated_at) THEN 'availability' END "
+    "INTO target FROM new_rows n JOIN old_rows o USING (id); "
+    "IF target IS NOT NULL THEN PERFORM catalog_version_bump(target); END IF; "
+    "RETURN NULL; END $$",
+    "CREATE TRIGGER books_catalog_version_write AFTER INSERT OR DELETE ON books "
+    "FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_trigger('content')",
+    "CREATE TRIGGER books_catalog_version_update AFTER UPDATE ON books "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION books_catalog_version_trigger()",
+    "CREATE TRIGGER book_ai_content_catalog_version "
+    "AFTER INSERT OR UPDATE OR DELETE ON book_ai_content "
+    "FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_trigger('content')",
+]
+
+
+def upgrade() -> None:
+    # Stamped like updated_at, except by borrow and return
+    op.add_column("books", sa.Column("content_updated_at", sa.DateTime(timezone=True)))
+    op.execute("UPDATE books SET content_updated_at = updated_at")
+
+    # Bumped by triggers in the writing transaction; spread over slots so
+    # writers rarely queue on one row (BookRepository.catalog_version)
+    op.create_table(
+        "catalog_versions",
+        sa.Column("scope", sa.String(16), nullable=False),
+        sa.Column("slot", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("scope", "slot"),
+    )
+    for stmt in _CATALOG_VERSION_DDL:
+        op.execute(stmt)
+
+    op.add_column("users", sa.Column("activity_at", sa.DateTime(timezone=True)))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "activity_at")
+    op.execute("DROP TRIGGER IF EXISTS book_ai_content_catalog_version ON book_ai_content")
+    op.execute("DROP TRIGGER IF EXISTS books_catalog_version_update ON books")
+    op.execute("DROP TRIGGER IF EXISTS books_catalog_version_write ON books")
+    op.execute("DROP FUNCTION IF EXISTS books_catalog_version_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS catalog_version_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS catalog_version_bump(text)")
+    op.drop_table("catalog_versions")
+    op.drop_column("books", "content_updated_at")
@@ -0,0 +1,23 @@
+"""Index books.updated_at for the recommender's incremental refresh
+
+Revision ID: 0010_books_updated_at_index
+Revises: 0009_catalog_version
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0010_books_updated_at_index"
+down_revision: Union[str, None] = "0009_catalog_version"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_books_updated_at", "books", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_updated_at", table_name="books")
@@ -0,0 +1,34 @@
+"""Stamps and indexes for the text indexes' incremental refresh
+
+Revision ID: 0011_ai_content_updated_at
+Revises: 0010_books_updated_at_index
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0011_ai_content_updated_at"
+down_revision: Union[str, None] = "0010_books_updated_at_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_book_ai_content_updated_at", "book_ai_content", ["updated_at"])
+    # Moves only with the description, genre or AI summary, so ratings,
+    # reviews and borrows do not send rows through the text indexes' deltas
+    op.add_column("books", sa.Column("text_updated_at", sa.DateTime(timezone=True)))
+    op.execute(
+        "UPDATE books SET text_updated_at = GREATEST(books.updated_at, ("
+        "SELECT ai.updated_at FROM book_ai_content ai WHERE ai.book_id = books.id))"
+    )
+    op.create_index("ix_books_text_updated_at", "books", ["text_updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_text_updated_at", table_name="books")
+    op.drop_column("books", "text_updated_at")
+    op.drop_index("ix_book_ai_content_updated_at", table_name="book_ai_content")
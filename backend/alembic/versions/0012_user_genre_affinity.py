@@ -0,0 +1,44 @@
+"""Maintain per-user genre affinity on events instead of on every recommendation read
+
+Revision ID: 0012_user_genre_affinity
+Revises: 0011_ai_content_updated_at
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0012_user_genre_affinity"
+down_revision: Union[str, None] = "0011_ai_content_updated_at"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_genre_affinity",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("genre", sa.String(length=100), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "genre"),
+    )
+    # Replay history with the weights of app/repositories/affinity_repository.py
+    # (borrow 0.5, return 0.5, review (rating - 3) / 2.5), undecayed
+    op.execute(
+        "INSERT INTO user_genre_affinity (user_id, genre, score, updated_at) "
+        "SELECT e.user_id, b.genre, sum(e.weight), now() FROM ("
+        "  SELECT user_id, book_id, "
+        "    CASE WHEN status = 'returned' THEN 1.0 ELSE 0.5 END AS weight FROM borrows"
+        "  UNION ALL"
+        "  SELECT user_id, book_id, (rating - 3) / 2.5 FROM reviews"
+        ") e JOIN books b ON b.id = e.book_id "
+        "WHERE b.genre IS NOT NULL GROUP BY e.user_id, b.genre"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_genre_affinity")
@@ -0,0 +1,32 @@
+"""Precomputed top-k recommendations per user, written by the offline batch job
+
+Revision ID: 0013_user_recommendations
+Revises: 0012_user_genre_affinity
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0013_user_recommendations"
+down_revision: Union[str, None] = "0012_user_genre_affinity"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_recommendations",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "rank"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_recommendations")
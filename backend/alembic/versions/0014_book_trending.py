@@ -0,0 +1,39 @@
+"""Time-decayed borrow and review counts per book for trending and cold start
+
+Revision ID: 0014_book_trending
+Revises: 0013_user_recommendations
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.core.config import get_settings
+from app.repositories.trending_repository import rebuild_sql
+
+revision: str = "0014_book_trending"
+down_revision: Union[str, None] = "0013_user_recommendations"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "book_trending",
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["book_id"], ["books.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("book_id"),
+    )
+    op.create_index("ix_book_trending_score", "book_trending", [sa.text("score DESC"), "book_id"])
+    # Replay history as app/repositories/trending_repository.py would have
+    # recorded it, at the configured half-life; TrendingRepository.rebuild()
+    # runs the same SQL after a half-life change
+    op.execute(rebuild_sql("postgresql", get_settings().TRENDING_HALF_LIFE_DAYS))
+
+def downgrade() -> None:
+    op.drop_index("ix_book_trending_score", table_name="book_trending")
+    op.drop_table("book_trending")
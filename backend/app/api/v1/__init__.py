@@ -1,8 +1,9 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, books, recommendations
+from app.api.v1.endpoints import auth, books, events, recommendations
 
 api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(auth.router)
 api_router.include_router(books.router)
+api_router.include_router(events.router)
 api_router.include_router(recommendations.router)
@@ -1,13 +1,16 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import CurrentUser, DBSession
+from app.core.config import get_settings
+from app.core.dependencies import CurrentPrincipal, CurrentUser, DBSession
+from app.core.principal_cache import get_principal_cache
 from app.core.security import (
     create_access_token,
     create_refresh_token,
+    create_stream_token,
     hash_password,
     verify_password,
 )
@@ -16,10 +19,13 @@ from app.schemas.auth import (
     LoginRequest,
     ProfileUpdateRequest,
     SignupRequest,
+    StreamTokenResponse,
     TokenResponse,
     UserResponse,
 )
 
+settings = get_settings()
+
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
@@ -59,6 +65,15 @@ async def login(payload: LoginRequest, db: DBSession) -> TokenResponse:
     )
 
 
+@router.post("/stream-token", response_model=StreamTokenResponse)
+async def stream_token(current_user: CurrentPrincipal) -> StreamTokenResponse:
+    """Token for ?stream_token= on the event streams, which EventSource needs."""
+    return StreamTokenResponse(
+        stream_token=create_stream_token(str(current_user.id)),
+        expires_in=settings.STREAM_TOKEN_EXPIRE_SECONDS,
+    )
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_profile(current_user: CurrentUser) -> UserResponse:
     return UserResponse.model_validate(current_user)
@@ -69,6 +84,7 @@ async def update_profile(
     payload: ProfileUpdateRequest,
     current_user: CurrentUser,
     db: DBSession,
+    background_tasks: BackgroundTasks,
 ) -> UserResponse:
     repo = UserRepository(db)
     updates: dict = {}
@@ -81,11 +97,23 @@ async def update_profile(
         updates["hashed_password"] = hash_password(payload.password)
 
     user = await repo.update(current_user, **updates)
+    # After the commit: a miss in between would re-cache the old row
+    background_tasks.add_task(get_principal_cache().invalidate_user, user.id)
     return UserResponse.model_validate(user)
 
 
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate_account(
+    current_user: CurrentUser, db: DBSession, background_tasks: BackgroundTasks
+) -> None:
+    """Deactivate the caller's account: its tokens stop working, login is refused."""
+    user = await UserRepository(db).update(current_user, is_active=False)
+    # After the commit, as for a profile update
+    background_tasks.add_task(get_principal_cache().invalidate_user, user.id)
+
+
 @router.post("/signout", status_code=status.HTTP_204_NO_CONTENT)
-async def signout(current_user: CurrentUser) -> None:
+async def signout(current_user: CurrentPrincipal) -> None:
     # JWT is stateless; client should discard the token.
     # For token revocation, add a Redis blocklist here.
     return None
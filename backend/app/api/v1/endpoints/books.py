@@ -1,5 +1,5 @@
 import json
-from typing import Annotated
+from typing import Annotated, Literal
 
 from fastapi import (
     APIRouter,
@@ -7,32 +7,82 @@ from fastapi import (
     Form,
     HTTPException,
     Query,
+    Request,
+    Response,
     UploadFile,
     status,
     BackgroundTasks,
 )
 from sqlalchemy import select
-
-from app.core.dependencies import CurrentUser, DBSession
-from app.models.book import Book, BookStatus
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from app.core.config import get_settings
+from app.core.dependencies import CurrentPrincipal, DBSession
+from app.core.http_cache import (
+    CATALOG_CACHE_CONTROL,
+    cache_headers,
+    is_conditional,
+    latest,
+    make_etag,
+    not_modified,
+    not_modified_response,
+)
+from app.core.responses import JSONBytesResponse, model_response
+from app.models.book import Book
 from app.models.library import Borrow, BorrowStatus, Review
-from app.repositories.book_repository import BookRepository
+from app.repositories.affinity_repository import (
+    BORROW_WEIGHT,
+    RETURN_WEIGHT,
+    GenreAffinityRepository,
+    review_weight,
+)
+from app.repositories.book_repository import BookRepository, TotalMode
+from app.repositories.borrow_repository import BorrowRepository
+from app.repositories.search_repository import get_book_search_repository
+from app.repositories.trending_repository import (
+    BORROW_COUNT,
+    REVIEW_COUNT,
+    TrendingRepository,
+)
+from app.repositories.user_repository import UserRepository
 from app.schemas.books import (
+    AutocompleteSuggestion,
+    BOOK_VIEWS,
+    BookAnalysisBatchResponse,
     BookAnalysisResponse,
     BookResponse,
+    BookSearchHit,
+    BookSearchResponse,
     BookUpdateRequest,
     BorrowResponse,
     PaginatedBooksResponse,
     RecommendationResponse,
     ReviewCreateRequest,
     ReviewResponse,
+    SimilarBooksResponse,
+    TrendingBooksResponse,
 )
+from app.services.autocomplete_service import autocomplete, get_title_cache
+from app.services.recommendation_cache import broadcast_book_change, get_recommendation_cache
+from app.services.recommendation_catalog import get_book_catalog
+from app.services.recommendation_text_index import get_description_index
+from app.services.similar_books import get_similar_books_index
 from app.services.storage.storage_service import get_storage_service
 from app.tasks.background import generate_book_summary, update_review
+from app.utils.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    decode_rank_cursor,
+    encode_cursor,
+    encode_rank_cursor,
+)
 
+settings = get_settings()
 router = APIRouter(prefix="/books", tags=["books"])
 
 ALLOWED_CONTENT_TYPES = {"application/pdf", "text/plain"}
+MAX_ANALYSIS_BATCH = 100
 
 
 # POST /books
@@ -40,7 +90,7 @@ ALLOWED_CONTENT_TYPES = {"application/pdf", "text/plain"}
 
 @router.post("", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
 async def create_book(
-    current_user: CurrentUser,
+    current_user: CurrentPrincipal,
     db: DBSession,
     title: Annotated[str, Form()],
     author: Annotated[str, Form()],
@@ -71,6 +121,10 @@ async def create_book(
         file_url=url,
     )
 
+    # Background tasks run after get_db commits: a rolled-back create never
+    # reaches the title cache
+    background_tasks.add_task(get_title_cache().on_book_saved, book)
+
     # Fire async summary task
     background_tasks.add_task(generate_book_summary, book.id)
 
@@ -80,20 +134,182 @@ async def create_book(
 # GET /books
 
 
+def _selected_fields(view: str, fields: str | None) -> tuple[str, ...]:
+    if fields is None:
+        return BOOK_VIEWS[view]
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in BookResponse.model_fields]
+    if unknown:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, f"Unknown fields: {', '.join(unknown)}"
+        )
+    return tuple(dict.fromkeys(["id", *requested]))
+
+
 @router.get("", response_model=PaginatedBooksResponse)
 async def list_books(
+    request: Request,
     db: DBSession,
-    page: int = Query(1, ge=1),
+    page: int | None = Query(None, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-) -> PaginatedBooksResponse:
-    skip = (page - 1) * page_size
+    cursor: str | None = Query(None, description="next_cursor from a previous page"),
+    total: TotalMode = Query("exact", description="exact | estimated | none"),
+    view: Literal["compact", "full"] = Query("full", description="Field preset"),
+    fields: str | None = Query(
+        None, description="Comma-separated book fields; overrides view"
+    ),
+) -> JSONBytesResponse:
+    selected = _selected_fields(view, fields)
+    # The keyset cursor needs (created_at, id) even if the caller does not
+    query_fields = tuple(dict.fromkeys(["id", "created_at", *selected]))
+
+    repo = BookRepository(db)
+    # Lists show availability, so borrows and returns count here
+    version = await repo.catalog_version(include_availability=True)
+    etag = make_etag("books", *version, sorted(request.query_params.multi_items()))
+    if not_modified(request, etag):
+        return not_modified_response(etag, None, CATALOG_CACHE_CONTROL)
+
+    # Fetch one extra row to learn whether another page exists.
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursor as exc:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, str(exc))
+        rows = await repo.list_after(query_fields, after, limit=page_size + 1)
+        total_count = await repo.count(total)
+    else:
+        # Legacy OFFSET paging; without a page the first keyset page is served.
+        skip = ((page or 1) - 1) * page_size
+        rows, total_count = await repo.list_paginated(
+            query_fields, skip=skip, limit=page_size + 1, total_mode=total
+        )
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    # Rows are already typed by the projection, so skip per-item models and
+    # encode the page directly (see app/core/responses.py).
+    return JSONBytesResponse(
+        {
+            "items": [{f: row._mapping[f] for f in selected} for row in rows],
+            "total": total_count,
+            "page": None if cursor is not None else (page or 1),
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+        },
+        headers=cache_headers(etag, None, CATALOG_CACHE_CONTROL),
+    )
+
+
+# GET /books/search
+
+
+@router.get("/search", response_model=BookSearchResponse)
+async def search_books(
+    db: DBSession,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+    boost_rating: bool = Query(True, description="Blend average_rating into the rank"),
+) -> BookSearchResponse:
+    try:
+        after = decode_rank_cursor(cursor) if cursor else None
+    except InvalidCursor as exc:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(exc))
+
+    repo = get_book_search_repository(db)
+    hits = await repo.search(q, limit=limit + 1, after=after, boost_rating=boost_rating)
+
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    return BookSearchResponse(
+        items=[
+            BookSearchHit(
+                book=BookResponse.model_validate(h.book), rank=h.rank, snippet=h.snippet
+            )
+            for h in hits
+        ],
+        next_cursor=encode_rank_cursor(hits[-1].rank, hits[-1].book.id) if has_more else None,
+    )
+
+
+# GET /books/autocomplete
+
+
+@router.get("/autocomplete", response_model=list[AutocompleteSuggestion])
+async def autocomplete_books(
+    db: DBSession,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=25),
+) -> list[AutocompleteSuggestion]:
+    suggestions = await autocomplete(db, q, limit)
+    return [AutocompleteSuggestion.model_validate(s) for s in suggestions]
+
+
+# GET /books/trending
+
+
+@router.get("/trending", response_model=TrendingBooksResponse)
+async def trending_books(
+    db: DBSession,
+    limit: int = Query(10, ge=1, le=50),
+) -> Response:
+    # The first `limit` entries of the score index; no history is scanned
+    ranked = await TrendingRepository(db).top_k(limit)
+    books = [book for book, _ in ranked]
+    await BookRepository(db).load_ai_content(books)
+    return model_response(
+        TrendingBooksResponse,
+        {"half_life_days": settings.TRENDING_HALF_LIFE_DAYS, "books": books},
+    )
+
+
+# GET /books/analysis
+
+
+def _parse_ids(ids: str) -> list[int]:
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "ids must be comma-separated integers"
+        )
+    unique = list(dict.fromkeys(parsed))
+    if not unique:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "ids must not be empty")
+    if len(unique) > MAX_ANALYSIS_BATCH:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, f"At most {MAX_ANALYSIS_BATCH} ids per request"
+        )
+    return unique
+
+
+@router.get("/analysis", response_model=BookAnalysisBatchResponse)
+async def get_book_analyses(
+    request: Request,
+    db: DBSession,
+    ids: str = Query(..., description=f"Comma-separated book ids, at most {MAX_ANALYSIS_BATCH}"),
+    include_text: bool = Query(
+        True, description="false returns status and ratings only (grid badges)"
+    ),
+) -> JSONBytesResponse:
+    book_ids = _parse_ids(ids)
+
     repo = BookRepository(db)
-    books, total = await repo.list_paginated(skip=skip, limit=page_size)
-    return PaginatedBooksResponse(
-        items=[BookResponse.model_validate(b) for b in books],
-        total=total,
-        page=page,
-        page_size=page_size,
+    etag = make_etag(
+        "analysis-batch", *await repo.rows_version(book_ids, include_text), book_ids, include_text
+    )
+    if not_modified(request, etag):
+        return not_modified_response(etag, None, CATALOG_CACHE_CONTROL)
+
+    rows = {row.book_id: row._mapping for row in await repo.get_analyses(book_ids, include_text)}
+    return JSONBytesResponse(
+        {
+            "items": [dict(rows[i]) for i in book_ids if i in rows],
+            "not_found": [i for i in book_ids if i not in rows],
+        },
+        headers=cache_headers(etag, None, CATALOG_CACHE_CONTROL),
     )
 
 
@@ -104,24 +320,40 @@ async def list_books(
 async def update_book(
     book_id: int,
     payload: BookUpdateRequest,
-    current_user: CurrentUser,
+    current_user: CurrentPrincipal,
     db: DBSession,
+    background_tasks: BackgroundTasks,
 ) -> BookResponse:
     repo = BookRepository(db)
-    book = await repo.get_by_id(book_id)
+    book = await repo.get_by_id(book_id, joinedload(Book.ai_content))
     if not book:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Book not found")
 
     updates = payload.model_dump(exclude_unset=True)
     book = await repo.update(book, **updates)
+    # After the response, so after get_db has committed the update
+    background_tasks.add_task(get_title_cache().on_book_saved, book)
+    background_tasks.add_task(broadcast_book_change, db.bind, book_id)
     return BookResponse.model_validate(book)
 
 
 # DELETE /books/{id}
 
 
+async def _forget_book(book_id: int) -> None:
+    """Call once the delete has committed, so a rollback never masks the book."""
+    get_book_catalog().remove(book_id)
+    get_description_index().remove(book_id)
+    get_similar_books_index().remove(book_id)
+
+
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_book(book_id: int, current_user: CurrentUser, db: DBSession) -> None:
+async def delete_book(
+    book_id: int,
+    current_user: CurrentPrincipal,
+    db: DBSession,
+    background_tasks: BackgroundTasks,
+) -> None:
     repo = BookRepository(db)
     book = await repo.get_by_id(book_id)
     if not book:
@@ -132,6 +364,9 @@ async def delete_book(book_id: int, current_user: CurrentUser, db: DBSession) ->
         await storage.delete_file(book.file_key)
 
     await repo.delete(book)
+    background_tasks.add_task(get_title_cache().on_book_deleted, book_id)
+    background_tasks.add_task(broadcast_book_change, db.bind, book_id)
+    background_tasks.add_task(_forget_book, book_id)
 
 
 # POST /books/{id}/borrow
@@ -143,32 +378,22 @@ async def delete_book(book_id: int, current_user: CurrentUser, db: DBSession) ->
     status_code=status.HTTP_201_CREATED,
 )
 async def borrow_book(
-    book_id: int, current_user: CurrentUser, db: DBSession
+    book_id: int, current_user: CurrentPrincipal, db: DBSession
 ) -> BorrowResponse:
-    book = await db.get(Book, book_id)
-    if not book:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Book not found")
-    if book.status != BookStatus.AVAILABLE:
+    repo = BorrowRepository(db)
+    try:
+        borrow = await repo.borrow(current_user.id, book_id)
+    except IntegrityError:
+        # ux_borrows_active_book: someone already holds an active borrow
         raise HTTPException(status.HTTP_409_CONFLICT, "Book is currently borrowed")
-
-    # Check user doesn't already have it
-    existing = await db.execute(
-        select(Borrow).where(
-            Borrow.user_id == current_user.id,
-            Borrow.book_id == book_id,
-            Borrow.status == BorrowStatus.ACTIVE,
-        )
-    )
-    if existing.scalar_one_or_none():
-        raise HTTPException(
-            status.HTTP_409_CONFLICT, "You already have this book borrowed"
-        )
-
-    borrow = Borrow(user_id=current_user.id, book_id=book_id)
-    db.add(borrow)
-    book.status = BookStatus.BORROWED
-    await db.flush()
-    await db.refresh(borrow)
+    if borrow is None:
+        if await repo.book_status(book_id) is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Book not found")
+        raise HTTPException(status.HTTP_409_CONFLICT, "Book is currently borrowed")
+    await GenreAffinityRepository(db).record(current_user.id, book_id, BORROW_WEIGHT)
+    await TrendingRepository(db).record(book_id, BORROW_COUNT)
+    await UserRepository(db).touch_activity(current_user.id)
+    get_recommendation_cache().invalidate_user(current_user.id)
     return BorrowResponse.model_validate(borrow)
 
 
@@ -178,8 +403,8 @@ async def borrow_book(
     status_code=status.HTTP_200_OK,
 )
 async def list_borrowed_books(
-    user_id: int, current_user: CurrentUser, db: DBSession
-) -> list[BorrowResponse]:
+    user_id: int, current_user: CurrentPrincipal, db: DBSession
+) -> JSONBytesResponse:
     if user_id != current_user.id:
         raise HTTPException(
             status.HTTP_403_FORBIDDEN, "Cannot view other user's borrows"
@@ -190,8 +415,7 @@ async def list_borrowed_books(
         .where(Borrow.user_id == user_id, Borrow.status == BorrowStatus.ACTIVE.value)
         .order_by(Borrow.borrowed_at.desc())
     )
-    borrows = result.scalars().all()
-    return [BorrowResponse.model_validate(b) for b in borrows]
+    return model_response(list[BorrowResponse], result.scalars().all())
 
 
 # POST /books/{id}/return
@@ -199,32 +423,16 @@ async def list_borrowed_books(
 
 @router.post("/{book_id}/return", response_model=BorrowResponse)
 async def return_book(
-    book_id: int, current_user: CurrentUser, db: DBSession
+    book_id: int, current_user: CurrentPrincipal, db: DBSession
 ) -> BorrowResponse:
-    result = await db.execute(
-        select(Borrow).where(
-            Borrow.user_id == current_user.id,
-            Borrow.book_id == book_id,
-            Borrow.status == BorrowStatus.ACTIVE.value,
-        )
-    )
-    borrow = result.scalar_one_or_none()
-    if not borrow:
+    borrow = await BorrowRepository(db).return_book(current_user.id, book_id)
+    if borrow is None:
         raise HTTPException(
             status.HTTP_404_NOT_FOUND, "No active borrow found for this book"
         )
-
-    from datetime import datetime, timezone
-
-    borrow.status = BorrowStatus.RETURNED.value
-    borrow.returned_at = datetime.now(timezone.utc)
-
-    book = await db.get(Book, book_id)
-    if book:
-        book.status = BookStatus.AVAILABLE
-
-    await db.flush()
-    await db.refresh(borrow)
+    await GenreAffinityRepository(db).record(current_user.id, book_id, RETURN_WEIGHT)
+    await UserRepository(db).touch_activity(current_user.id)
+    get_recommendation_cache().invalidate_user(current_user.id)
     return BorrowResponse.model_validate(borrow)
 
 
@@ -239,7 +447,7 @@ async def return_book(
 async def create_review(
     book_id: int,
     payload: ReviewCreateRequest,
-    current_user: CurrentUser,
+    current_user: CurrentPrincipal,
     db: DBSession,
     background_tasks: BackgroundTasks,
 ) -> ReviewResponse:
@@ -269,9 +477,15 @@ async def create_review(
     db.add(review)
     await db.flush()
     await db.refresh(review)
+    await GenreAffinityRepository(db).record(
+        current_user.id, book_id, review_weight(payload.rating)
+    )
+    await TrendingRepository(db).record(book_id, REVIEW_COUNT)
+    await UserRepository(db).touch_activity(current_user.id)
 
     # Trigger background task for update
     background_tasks.add_task(update_review, book_id)
+    get_recommendation_cache().invalidate_user(current_user.id)
 
     return ReviewResponse.model_validate(review)
 
@@ -280,14 +494,74 @@ async def create_review(
 
 
 @router.get("/{book_id}/analysis", response_model=BookAnalysisResponse)
-async def get_book_analysis(book_id: int, db: DBSession) -> BookAnalysisResponse:
-    book = await db.get(Book, book_id)
+async def get_book_analysis(
+    book_id: int, request: Request, response: Response, db: DBSession
+) -> BookAnalysisResponse | Response:
+    repo = BookRepository(db)
+    if is_conditional(request):
+        # Pollers usually hold a current copy: answer from the timestamps
+        # alone and never read the AI text.
+        validators = await repo.get_validators(book_id)
+        if validators is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Book not found")
+        etag = make_etag("analysis", book_id, *validators)
+        last_modified = latest(*validators)
+        if not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified, CATALOG_CACHE_CONTROL)
+
+    book = await repo.get_by_id(book_id, joinedload(Book.ai_content))
     if not book:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Book not found")
+    validators = (
+        book.content_updated_at,
+        book.ai_content.updated_at if book.ai_content else None,
+    )
+    response.headers.update(
+        cache_headers(
+            make_etag("analysis", book_id, *validators),
+            latest(*validators),
+            CATALOG_CACHE_CONTROL,
+        )
+    )
     return BookAnalysisResponse(
         book_id=book.id,
         ai_summary=book.ai_summary,
         ai_review_consensus=book.ai_review_consensus,
         average_rating=book.average_rating,
         review_count=book.review_count,
+        average_sentiment=book.average_sentiment,
+        summary_status=book.summary_status,
+    )
+
+
+# GET /books/{id}/similar
+
+
+@router.get("/{book_id}/similar", response_model=SimilarBooksResponse)
+async def get_similar_books(
+    book_id: int,
+    request: Request,
+    db: DBSession,
+    limit: int = Query(10, ge=1, le=50),
+) -> Response:
+    repo = BookRepository(db)
+    book = await repo.get_by_id(book_id)
+    if book is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Book not found")
+    index = get_similar_books_index()
+    await index.ensure_fresh(db, await repo.catalog_version())
+    # What the index serves and the book's own row, not the whole catalog:
+    # edits elsewhere reach the list through the index's revision
+    etag = make_etag("similar", book_id, *index.revision, book.content_updated_at, limit)
+    if not_modified(request, etag):
+        return not_modified_response(etag, None, CATALOG_CACHE_CONTROL)
+
+    # A book with no text and no genre has no vector, hence no neighbours
+    ids = [i for i, _ in index.similar_to(book_id, limit)]
+    books = await repo.get_many(ids)
+    await repo.load_ai_content(books)
+    return model_response(
+        SimilarBooksResponse,
+        {"book_id": book_id, "books": books},
+        headers=cache_headers(etag, None, CATALOG_CACHE_CONTROL),
     )
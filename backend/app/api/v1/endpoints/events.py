@@ -0,0 +1,104 @@
+"""
+Server-sent event streams, replacing polling of GET /books/{id}/analysis.
+
+- /books/{id}/events: summary and review-consensus completion for one book,
+  preceded by a snapshot of its current state.
+- /users/me/events:   the same events for every book the caller currently
+  borrows or has reviewed.
+
+Each stream holds no DB connection once headers are sent; events come from
+the process-local EventHub, fed by the configured broker.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import orjson
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.core.config import get_settings
+from app.core.dependencies import DBSession, StreamPrincipal
+from app.repositories.book_repository import BookRepository
+from app.services.events.hub import (
+    Event,
+    Subscription,
+    book_channel,
+    get_event_hub,
+    user_channel,
+)
+
+settings = get_settings()
+
+router = APIRouter(tags=["events"])
+
+_RETRY_MS = 5000  # client reconnect delay after a dropped connection
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # stop nginx from buffering the stream
+}
+
+
+def _format(event_type: str, data: dict) -> bytes:
+    return b"event: " + event_type.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+def _format_event(event: Event) -> bytes:
+    return _format(event.type, {"book_id": event.book_id, **event.data})
+
+
+async def _stream(subscription: Subscription, first: bytes) -> AsyncIterator[bytes]:
+    try:
+        yield f"retry: {_RETRY_MS}\n".encode() + first
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.get(), settings.EVENT_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"  # keeps proxies from timing out idle streams
+                continue
+            yield _format_event(event)
+    finally:
+        subscription.close()
+
+
+def _event_stream(subscription: Subscription, first: bytes) -> StreamingResponse:
+    return StreamingResponse(
+        _stream(subscription, first),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+        # Also runs if the client leaves before the generator starts
+        background=BackgroundTask(subscription.close),
+    )
+
+
+@router.get("/books/{book_id}/events", response_class=StreamingResponse)
+async def book_events(book_id: int, db: DBSession) -> StreamingResponse:
+    # Subscribe before reading the snapshot so nothing lands in between
+    subscription = get_event_hub().subscribe(book_channel(book_id))
+    try:
+        book = await BookRepository(db).get_by_id(book_id)
+        if not book:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    except BaseException:
+        subscription.close()
+        raise
+
+    snapshot = _format(
+        "snapshot",
+        {
+            "book_id": book.id,
+            "summary_status": book.summary_status,
+            "review_count": book.review_count,
+            "average_rating": book.average_rating,
+        },
+    )
+    return _event_stream(subscription, snapshot)
+
+
+@router.get("/users/me/events", response_class=StreamingResponse)
+async def my_events(current_user: StreamPrincipal) -> StreamingResponse:
+    subscription = get_event_hub().subscribe(user_channel(current_user.id))
+    return _event_stream(subscription, b": connected\n\n")
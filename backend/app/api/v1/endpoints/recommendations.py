@@ -3,27 +3,68 @@ Recommendation API endpoint.
 
 Strategy: Hybrid Content-Based + Collaborative Filtering
 - Content-based: match books to user's genre_weights and favourite_genres
-- Collaborative: find users with similar borrow history, surface their reads
+- Collaborative: books co-borrowed with the user's history (item-item neighbours)
 - Falls back to top-rated books for cold-start users
+
+Rendered responses are cached per user (app/services/recommendation_cache.py).
 """
 
-from fastapi import APIRouter, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, BackgroundTasks, Request, Response
 
-from app.core.dependencies import CurrentUser, DBSession
-from app.models.book import Book, BookStatus
-from app.models.library import Borrow, UserPreferences
-from app.schemas.books import BookResponse, RecommendationResponse
+from app.core.dependencies import CurrentPrincipal, DBSession
+from app.core.http_cache import (
+    PRIVATE_CACHE_CONTROL,
+    cache_headers,
+    make_etag,
+    not_modified,
+    not_modified_response,
+)
+from app.core.responses import JSONBytesResponse
+from app.repositories.book_repository import BookRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.books import RecommendationResponse
+from app.services.recommendation_cache import (
+    compute_recommendations,
+    get_recommendation_cache,
+    refresh_recommendations,
+    trending_window,
+)
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
 
 @router.get("", response_model=RecommendationResponse)
-async def get_recommendations(current_user: CurrentUser, db: DBSession) -> RecommendationResponse:
-    from app.services.recommendation_service import build_recommendations
+async def get_recommendations(
+    request: Request,
+    current_user: CurrentPrincipal,
+    db: DBSession,
+    background_tasks: BackgroundTasks,
+) -> Response:
+    # Recommendations depend on the catalog (but not on who else borrowed
+    # what) and on the caller's own borrows, returns and reviews; cold-start
+    # lists also on the trending window
+    version = await BookRepository(db).catalog_version()
+    activity_at = await UserRepository(db).activity_at(current_user.id)
+    window = trending_window()
+    cache = get_recommendation_cache()
+    cached = cache.get(current_user.id, activity_at, version, window)
+    if cached is None:
+        cached = await compute_recommendations(current_user, db, activity_at, version)
+    elif cached.version != version or cached.trending_window not in (None, window):
+        # Serve the stale copy now; the refresh runs after the response
+        background_tasks.add_task(refresh_recommendations, current_user, db.bind)
 
-    books, strategy = await build_recommendations(current_user, db)
-    return RecommendationResponse(
-        books=[BookResponse.model_validate(b) for b in books],
-        strategy=strategy,
+    # The ETag names the validators the body was computed at: only the
+    # entry knows whether it is a cold-start list
+    etag = make_etag(
+        "recommendations",
+        current_user.id,
+        activity_at,
+        *cached.version,
+        cached.trending_window,
+    )
+    if not_modified(request, etag):
+        return not_modified_response(etag, None, PRIVATE_CACHE_CONTROL)
+    return JSONBytesResponse(
+        cached.body, headers=cache_headers(etag, None, PRIVATE_CACHE_CONTROL)
     )
@@ -0,0 +1,128 @@
+"""
+Response compression (brotli when available, else gzip).
+
+Only complete, non-streamed bodies of at least COMPRESSION_MIN_BYTES are
+compressed; 0 disables compression. Streamed responses (server-sent events,
+file downloads) pass through untouched, so clients keep receiving each
+chunk as it is written.
+"""
+
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+_COMPRESSIBLE = ("application/json", "text/")
+_BROTLI_QUALITY = 4  # close to gzip-6 in speed, noticeably smaller output
+_GZIP_LEVEL = 6
+
+
+def _qvalues(accept_encoding: str) -> dict[str, float]:
+    """Content-codings by q-value (RFC 9110 §12.5.3); a bad q counts as 0."""
+    codings: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = (p.strip() for p in part.split(";"))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        codings[coding.lower()] = q
+    return codings
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """The supported coding the client weighs highest (brotli on a tie)."""
+    qvalues = _qvalues(accept_encoding)
+    wildcard = qvalues.get("*", 0.0)
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    best = max(supported, key=lambda c: qvalues.get(c, wildcard))
+    return best if qvalues.get(best, wildcard) > 0 else None
+
+
+def _weak(etag: str) -> str:
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Compressed bodies carry a weak ETag (W/"..."): they are not byte-for-byte
+    the identity body its strong ETag names. Handlers already compare
+    If-None-Match weakly, so revalidation works for either form. Responses
+    that could be compressed say so with Vary: Accept-Encoding.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.minimum_size <= 0:
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if_none_match = {t.strip() for t in request_headers.get("if-none-match", "").split(",")}
+
+        start: Message | None = None
+
+        async def _send(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # held until we see the body
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            held, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=held["headers"])
+            if held["status"] == 304:
+                # Name the variant the client revalidated
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers and _weak(headers["etag"]) in if_none_match:
+                    headers["ETag"] = _weak(headers["etag"])
+                await send(held)
+                await send(message)
+                return
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(_COMPRESSIBLE)
+            ):
+                await send(held)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is None or len(body) < self.minimum_size:
+                await send(held)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            if "etag" in headers:
+                headers["ETag"] = _weak(headers["etag"])
+            await send(held)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, _send)
@@ -17,12 +17,25 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "postgresql+asyncpg://lumina:luminasecret@db:5432/luminalib"
+    DB_MAX_CONNECTIONS: int = 80
+    WEB_CONCURRENCY: int = 1
+    DB_POOL_SIZE: int | None = None
+    DB_MAX_OVERFLOW: int | None = None
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_BACKGROUND_POOL_SIZE: int = 2
+    DB_BACKGROUND_MAX_OVERFLOW: int = 2
 
     # Auth
     SECRET_KEY: str = "1234567890abcdef"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    STREAM_TOKEN_EXPIRE_SECONDS: int = 60
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10_000
 
     # Storage
     STORAGE_BACKEND: Literal["s3", "local"] = "local"
@@ -33,11 +46,78 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://ollama:11434"
     OLLAMA_MODEL: str = "llama3.2"
     MAX_CONTENT_LENGTH: int = 2000
+    LLM_MAX_CONCURRENCY: int = 4
+
+    # Long-document summarisation
+    SUMMARY_LONG_DOCUMENT_MODE: bool = False
+    SUMMARY_CHUNK_TOKENS: int = 1500
+    SUMMARY_REDUCE_FANOUT: int = 4
+    SUMMARY_CACHE_PATH: str = "/tmp/luminalib_summaries"
+
+    # Autocomplete
+    AUTOCOMPLETE_CACHE_MAX_TITLES: int = 50_000
+    AUTOCOMPLETE_CACHE_TTL_SECONDS: float = 300.0
+
+    # Recommendations
+    RECOMMENDER_ENGINE: Literal["catalog", "sql"] = "catalog"
+    RECOMMENDER_CATALOG_TTL_SECONDS: float = 600.0
+    RECOMMENDER_CATALOG_PATH: str = "/tmp/luminalib_catalog"
+    RECOMMENDER_MODELS_BUILD_INTERVAL_SECONDS: float = 86_400.0
+    RECOMMENDER_TEXT_WEIGHT: float = 0.5
+    RECOMMENDER_TEXT_INDEX_PATH: str = "/tmp/luminalib_text_index"
+    RECOMMENDER_TEXT_FEATURES: int = 2**18
+    RECOMMENDER_CF_WEIGHT: float = 1.0
+    RECOMMENDER_NEIGHBOURS: int = 20
+    RECOMMENDER_NEIGHBOURS_PATH: str = "/tmp/luminalib_item_neighbours"
+    RECOMMENDER_NEIGHBOURS_BUILD_INTERVAL_SECONDS: float = 86_400.0
+    RECOMMENDER_NEIGHBOURS_REFRESH_SECONDS: float = 30.0
+    RECOMMENDER_AFFINITY_HALF_LIFE_DAYS: float = 0.0
+    RECOMMENDER_CACHE_MAX_ENTRIES: int = 10_000
+    RECOMMENDER_CACHE_MAX_STALE_SECONDS: float = 60.0
+    RECOMMENDER_TRENDING_REFRESH_SECONDS: float = 300.0
+    RECOMMENDER_PRECOMPUTED_K: int = 50
+    RECOMMENDER_PRECOMPUTED_MAX_AGE_SECONDS: float = 86_400.0
+    RECOMMENDER_PRECOMPUTE_BLOCK: int = 64
+    RECOMMENDER_PRECOMPUTE_WORKERS: int = 0
+    RECOMMENDER_PRECOMPUTE_CHECKPOINT_PATH: str = "/tmp/luminalib_precompute.json"
+    RECOMMENDER_PRECOMPUTE_INTERVAL_SECONDS: float = 86_400.0
+    TRENDING_HALF_LIFE_DAYS: float = 7.0
+    SIMILAR_BOOKS_INDEX_PATH: str = "/tmp/luminalib_similar_books"
+    SIMILAR_BOOKS_DIMS: int = 128
+    SIMILAR_BOOKS_NPROBE: int = 16
+    SIMILAR_BOOKS_BUILD_INTERVAL_SECONDS: float = 86_400.0
+
+    # Sentiment
+    SENTIMENT_BATCH_SIZE: int = 5000
+    SENTIMENT_SCORE_INTERVAL_SECONDS: float = 300.0
+
+    # HTTP responses
+    COMPRESSION_MIN_BYTES: int = 1024
+    HTTP_CACHE_S_MAXAGE: int = 10
+    HTTP_CACHE_STALE_WHILE_REVALIDATE: int = 30
+
+    # Push events
+    EVENT_BROKER: Literal["memory", "postgres"] = "memory"
+    EVENT_QUEUE_SIZE: int = 100
+    EVENT_KEEPALIVE_SECONDS: float = 15.0
 
     @property
     def allowed_origins_list(self) -> list[str]:
         return [o.strip() for o in self.ALLOWED_ORIGINS.split(",")]
 
+    @property
+    def db_pool_limits(self) -> tuple[int, int]:
+        """(pool_size, max_overflow) for the API engine of one worker process."""
+        if self.DB_POOL_SIZE is not None:
+            overflow = self.DB_MAX_OVERFLOW
+            return self.DB_POOL_SIZE, overflow if overflow is not None else self.DB_POOL_SIZE
+        per_worker = self.DB_MAX_CONNECTIONS // max(1, self.WEB_CONCURRENCY)
+        background = self.DB_BACKGROUND_POOL_SIZE + self.DB_BACKGROUND_MAX_OVERFLOW
+        budget = max(2, per_worker - background)
+        pool_size = max(1, budget // 2)
+        overflow = self.DB_MAX_OVERFLOW
+        return pool_size, overflow if overflow is not None else budget - pool_size
+
 
 @lru_cache
 def get_settings() -> Settings:
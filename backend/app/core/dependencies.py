@@ -1,43 +1,103 @@
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.principal_cache import Principal, get_principal_cache
 from app.core.security import decode_token
 from app.db.session import get_db
 from app.models.user import User
 from app.repositories.user_repository import UserRepository
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
-    credentials_exc = HTTPException(
+def _credentials_exc() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _user_id_from_token(token: str, token_type: str = "access") -> int:
     try:
         payload = decode_token(token)
-        if payload.get("type") != "access":
-            raise credentials_exc
+        if payload.get("type") != token_type:
+            raise _credentials_exc()
         user_id: str | None = payload.get("sub")
         if not user_id:
-            raise credentials_exc
+            raise _credentials_exc()
     except JWTError:
-        raise credentials_exc
+        raise _credentials_exc()
+    return int(user_id)
+
+
+async def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> User:
+    """Full ORM user; use for handlers that read or modify the user row."""
+    user_id = _user_id_from_token(token)
 
     repo = UserRepository(db)
-    user = await repo.get_by_id(int(user_id))
+    user = await repo.get_by_id(user_id)
     if user is None or not user.is_active:
-        raise credentials_exc
+        raise _credentials_exc()
+    get_principal_cache().set(
+        token, Principal(id=user.id, username=user.username, is_active=user.is_active)
+    )
     return user
 
 
+async def _principal_for_token(
+    token: str, db: AsyncSession, token_type: str = "access"
+) -> Principal:
+    user_id = _user_id_from_token(token, token_type)
+
+    cache = get_principal_cache()
+    principal = cache.get(user_id, token)
+    if principal is None:
+        principal = await UserRepository(db).get_principal(user_id)
+        if principal is None or not principal.is_active:
+            raise _credentials_exc()
+        cache.set(token, principal)
+    return principal
+
+
+async def get_current_principal(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> Principal:
+    """
+    Lightweight identity for handlers that only need the caller's id.
+    Served from the principal cache when possible, so no DB round trip.
+    """
+    return await _principal_for_token(token, db)
+
+
+async def get_stream_principal(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    header_token: Annotated[str | None, Depends(optional_oauth2_scheme)] = None,
+    stream_token: Annotated[str | None, Query()] = None,
+) -> Principal:
+    """
+    Principal for event streams. Browsers' EventSource cannot set headers,
+    so the token may also come as ?stream_token=. Query strings end up in
+    access logs, so that one is a stream token (POST /auth/stream-token):
+    it expires within a minute and opens nothing but event streams.
+    """
+    if header_token:
+        return await _principal_for_token(header_token, db)
+    if not stream_token:
+        raise _credentials_exc()
+    return await _principal_for_token(stream_token, db, token_type="stream")
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+StreamPrincipal = Annotated[Principal, Depends(get_stream_principal)]
 DBSession = Annotated[AsyncSession, Depends(get_db)]
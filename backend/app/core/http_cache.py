@@ -0,0 +1,91 @@
+"""
+Conditional GET support: strong ETags, Last-Modified, 304s, Cache-Control.
+
+Handlers compute a validator with one cheap query, call not_modified()
+before loading anything heavy, and stamp the same headers on 200s:
+
+    etag = make_etag("analysis", book_id, updated_at)
+    if not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified, CATALOG_CACHE_CONTROL)
+"""
+
+import hashlib
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+from app.core.config import get_settings
+from app.db.base import as_utc
+
+settings = get_settings()
+
+# Shared caches (CDN / reverse proxy) may serve catalog reads for a few
+# seconds and keep serving stale copies while they revalidate in the
+# background; browsers always revalidate, which is a cheap 304.
+CATALOG_CACHE_CONTROL = (
+    f"public, max-age=0, s-maxage={settings.HTTP_CACHE_S_MAXAGE}, "
+    f"stale-while-revalidate={settings.HTTP_CACHE_STALE_WHILE_REVALIDATE}"
+)
+# Per-user responses: never stored by shared caches, always revalidated.
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: object) -> str:
+    """Strong ETag over the given validator parts."""
+    text = "|".join(
+        as_utc(p).isoformat() if isinstance(p, datetime) else str(p) for p in parts
+    )
+    return f'"{hashlib.sha1(text.encode()).hexdigest()[:24]}"'
+
+
+def latest(*values: datetime | None) -> datetime | None:
+    present = [as_utc(v) for v in values if v is not None]
+    return max(present) if present else None
+
+
+def not_modified(
+    request: Request, etag: str, last_modified: datetime | None = None
+) -> bool:
+    """RFC 9110: If-None-Match wins; If-Modified-Since is only a fallback."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # GET uses weak comparison, so ignore a W/ prefix added by proxies
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return as_utc(last_modified).replace(microsecond=0) <= as_utc(since)
+    return False
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def cache_headers(
+    etag: str, last_modified: datetime | None, cache_control: str
+) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(as_utc(last_modified), usegmt=True)
+    if cache_control.startswith("private"):
+        headers["Vary"] = "Authorization"
+    return headers
+
+
+def not_modified_response(
+    etag: str, last_modified: datetime | None, cache_control: str
+) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=cache_headers(etag, last_modified, cache_control),
+    )
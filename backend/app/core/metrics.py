@@ -0,0 +1,160 @@
+"""
+Minimal in-process metrics registry rendered in Prometheus text format.
+
+Kept dependency-free on purpose: a handful of counters, gauges and summaries
+served from GET /metrics is all the API needs. Gauges can be backed by a
+callback so values such as pool occupancy are read at scrape time.
+"""
+
+import threading
+from collections.abc import Callable
+from typing import Any
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str) -> None:
+        super().__init__(name, description)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, description: str) -> None:
+        super().__init__(name, description)
+        self._values: dict[LabelKey, float] = {}
+        self._callbacks: dict[LabelKey, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def set_function(self, fn: Callable[[], float], **labels: Any) -> None:
+        """Evaluate fn at scrape time instead of storing a value."""
+        with self._lock:
+            self._callbacks[_label_key(labels)] = fn
+
+    def remove(self, **labels: Any) -> None:
+        """Stop reporting these labels, value or callback."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+            self._callbacks.pop(key, None)
+
+    def value(self, **labels: Any) -> float:
+        key = _label_key(labels)
+        if key in self._callbacks:
+            return float(self._callbacks[key]())
+        return self._values.get(key, 0.0)
+
+    def _samples(self) -> list[str]:
+        samples = dict(self._values)
+        for key, fn in self._callbacks.items():
+            samples[key] = float(fn())
+        return [f"{self.name}{_format_labels(k)} {v}" for k, v in samples.items()]
+
+
+class Summary(_Metric):
+    """Count, sum and max of observations; enough for averages and alerts."""
+
+    type_name = "summary"
+
+    def __init__(self, name: str, description: str) -> None:
+        super().__init__(name, description)
+        self._values: dict[LabelKey, list[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            count, total, peak = self._values.get(key, [0.0, 0.0, 0.0])
+            self._values[key] = [count + 1, total + value, max(peak, value)]
+
+    def count(self, **labels: Any) -> float:
+        return self._values.get(_label_key(labels), [0.0])[0]
+
+    def _samples(self) -> list[str]:
+        lines = []
+        max_label = 'quantile="1"'
+        for key, (count, total, peak) in self._values.items():
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}{_format_labels(key, max_label)} {peak}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls: type, name: str, description: str) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def summary(self, name: str, description: str) -> Summary:
+        return self._get_or_create(Summary, name, description)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
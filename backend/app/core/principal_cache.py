@@ -0,0 +1,106 @@
+"""
+Short-TTL cache of authenticated principals.
+
+Decoding a JWT is cheap; the follow-up user lookup is a DB round trip on
+every authenticated request. Endpoints that only need the caller's id can
+depend on a lightweight Principal instead, served from this bounded
+LRU + TTL cache keyed by (user_id, token).
+
+Entries are dropped explicitly whenever the user row changes (profile
+update, deactivation) and otherwise expire after PRINCIPAL_CACHE_TTL_SECONDS,
+which bounds staleness across multiple worker processes. A TTL of 0
+disables the cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+
+from app.core.config import get_settings
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: int
+    username: str
+    is_active: bool
+
+
+class PrincipalCache:
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[tuple[int, str], tuple[float, Principal]] = OrderedDict()
+        self._keys_by_user: dict[int, set[tuple[int, str]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0 and self._max_entries > 0
+
+    def get(self, user_id: int, token: str) -> Principal | None:
+        if not self.enabled:
+            return None
+        key = (user_id, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= self._clock():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def set(self, token: str, principal: Principal) -> None:
+        if not self.enabled:
+            return
+        key = (principal.id, token)
+        with self._lock:
+            self._entries[key] = (self._clock() + self._ttl, principal)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self._max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Forget every cached token for this user."""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: tuple[int, str]) -> None:
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+@lru_cache
+def get_principal_cache() -> PrincipalCache:
+    settings = get_settings()
+    return PrincipalCache(
+        max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    )
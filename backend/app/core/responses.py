@@ -0,0 +1,56 @@
+"""
+Fast JSON responses for list-heavy endpoints.
+
+FastAPI's default path validates every row into a model, re-validates the
+whole response against response_model, turns it into plain Python objects
+and finally runs json.dumps. Handlers here return a JSONBytesResponse
+instead, which FastAPI sends untouched:
+
+  - ORM objects → one cached TypeAdapter validates the whole payload and
+    pydantic-core serialises it straight to bytes
+  - plain rows/dicts → orjson
+
+response_model stays on the route for the OpenAPI schema.
+"""
+
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# Match pydantic's output: UTC datetimes end in "Z"
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    """Building a TypeAdapter compiles a validator; do it once per type."""
+    return TypeAdapter(tp)
+
+
+def serialize(tp: Any, value: Any, *, exclude_unset: bool = False) -> bytes:
+    """Validate value (ORM objects allowed) as tp and dump it to JSON bytes."""
+    adapter = type_adapter(tp)
+    validated = adapter.validate_python(value, from_attributes=True)
+    return adapter.dump_json(validated, exclude_unset=exclude_unset)
+
+
+def model_response(
+    tp: Any,
+    value: Any,
+    status_code: int = 200,
+    headers: Mapping[str, str] | None = None,
+) -> JSONBytesResponse:
+    return JSONBytesResponse(serialize(tp, value), status_code=status_code, headers=headers)
@@ -43,6 +43,14 @@ def create_refresh_token(subject: str) -> str:
     )
 
 
+def create_stream_token(subject: str) -> str:
+    """Short-lived token that only opens event streams; safe-ish in a URL."""
+    return _create_token(
+        {"sub": subject, "type": "stream"},
+        timedelta(seconds=settings.STREAM_TOKEN_EXPIRE_SECONDS),
+    )
+
+
 def decode_token(token: str) -> dict[str, Any]:
     """Raises JWTError on failure."""
     return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -1,5 +1,12 @@
+from datetime import datetime, timezone
+
 from sqlalchemy.orm import DeclarativeBase
 
 
 class Base(DeclarativeBase):
     pass
+
+
+def as_utc(value: datetime) -> datetime:
+    """Every stamp is stored in UTC; SQLite hands them back naive."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
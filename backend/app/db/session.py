@@ -1,17 +1,87 @@
+import time
 from collections.abc import AsyncGenerator
+from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.pool import NullPool
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from .base import Base
 
 from app.core.config import get_settings
+from app.core.metrics import REGISTRY
 
 settings = get_settings()
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.ENVIRONMENT == "development",
-    poolclass=NullPool,
+POOL_CHECKOUT_WAIT = REGISTRY.summary(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection"
+)
+POOL_IN_USE = REGISTRY.gauge("db_pool_connections_in_use", "Checked-out connections")
+POOL_SIZE = REGISTRY.gauge("db_pool_size", "Configured pool size")
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited."""
+
+    _metrics_label = "api"
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(
+                time.perf_counter() - start, engine=self._metrics_label
+            )
+
+
+def _create_engine(label: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    url = make_url(settings.DATABASE_URL)
+    kwargs: dict[str, Any] = {"echo": settings.ENVIRONMENT == "development"}
+
+    if url.get_backend_name() != "postgresql" or pool_size <= 0:
+        kwargs["poolclass"] = NullPool
+    else:
+        pool_class = type(
+            f"InstrumentedQueuePool_{label}",
+            (InstrumentedQueuePool,),
+            {"_metrics_label": label},
+        )
+        kwargs.update(
+            poolclass=pool_class,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    if url.get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+        if settings.DB_STATEMENT_CACHE_SIZE == 0:
+            url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+
+    new_engine = create_async_engine(url, **kwargs)
+    pool = new_engine.sync_engine.pool
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        POOL_IN_USE.set_function(pool.checkedout, engine=label)
+        POOL_SIZE.set(pool_size, engine=label)
+    return new_engine
+
+
+_pool_size, _max_overflow = settings.db_pool_limits
+
+# Request-serving engine, used from the uvicorn event loop.
+engine = _create_engine("api", _pool_size, _max_overflow)
+
+# Background tasks run on their own event loop (see app.tasks.background);
+# asyncpg connections are bound to the loop that opened them, so they get a
+# separate engine and pool that never competes with request handlers.
+background_engine = _create_engine(
+    "background", settings.DB_BACKGROUND_POOL_SIZE, settings.DB_BACKGROUND_MAX_OVERFLOW
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -21,6 +91,13 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+BackgroundSessionLocal = async_sessionmaker(
+    bind=background_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+)
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
@@ -1,14 +1,31 @@
+from contextlib import asynccontextmanager
+
 import structlog
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.v1 import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.services.events.broker import get_event_broker
+from app.services.recommendation_cache import BOOK_CHANGED_EVENT, on_book_changed
 
 settings = get_settings()
 logger = structlog.get_logger()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cross-process events arrive on this worker's loop (no-op for "memory")
+    broker = get_event_broker()
+    broker.on(BOOK_CHANGED_EVENT, on_book_changed)
+    await broker.start()
+    yield
+    await broker.stop()
+
+
 def create_application() -> FastAPI:
     app = FastAPI(
         title="LuminaLib API",
@@ -16,6 +33,7 @@ def create_application() -> FastAPI:
         version="1.0.0",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
 
     # CORS
@@ -27,6 +45,8 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
 
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+
     # Routes
     app.include_router(api_router)
 
@@ -34,6 +54,10 @@ def create_application() -> FastAPI:
     async def health() -> dict:
         return {"status": "ok", "environment": settings.ENVIRONMENT}
 
+    @app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+    async def metrics() -> str:
+        return REGISTRY.render()
+
     return app
 
 
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from enum import Enum as PyEnum
 
-from sqlalchemy import DateTime, Enum, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import DDL, BigInteger, DateTime, Enum, Float, ForeignKey, Index, Integer, String, Text, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -21,8 +21,21 @@ class SummaryStatus(str, PyEnum):
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        # Keyset pagination for GET /books (newest first)
+        Index("ix_books_created_at_id", "created_at", "id"),
+        # Recommender: filter by genre, rank by rating
+        Index("ix_books_genre_average_rating", "genre", "average_rating"),
+        # Recommender catalog: incremental refresh reads rows changed since
+        # its watermark
+        Index("ix_books_updated_at", "updated_at"),
+        # The description index's delta scan (recommendation_text_index.py)
+        Index("ix_books_text_updated_at", "text_updated_at"),
+        # Autocomplete hot-title cache: the most reviewed books first
+        Index("ix_books_review_count_id", "review_count", "id"),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(500), nullable=False, index=True)
     author: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str | None] = mapped_column(Text)
@@ -33,16 +46,13 @@ class Book(Base):
     file_key: Mapped[str | None] = mapped_column(String(500))  # storage object key
     file_url: Mapped[str | None] = mapped_column(String(1000))  # presigned / public URL
 
-    # AI-generated fields
-    ai_summary: Mapped[str | None] = mapped_column(Text)
-    ai_review_consensus: Mapped[str | None] = mapped_column(Text)
-
     summary_status: Mapped[SummaryStatus] = mapped_column(
         Enum(SummaryStatus, values_callable=lambda x: [e.value for e in x]),
         default=SummaryStatus.PENDING,
     )
     average_rating: Mapped[float] = mapped_column(Float, default=0.0)
     review_count: Mapped[int] = mapped_column(Integer, default=0)
+    average_sentiment: Mapped[float | None] = mapped_column(Float)  # -1 to 1
 
     status: Mapped[BookStatus] = mapped_column(
         Enum(BookStatus, values_callable=lambda x: [e.value for e in x]),
@@ -57,11 +67,245 @@ class Book(Base):
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
     )
+    # Like updated_at, but borrow and return leave it alone: it moves only
+    # when what the catalog shows about the book (apart from availability)
+    # changes. The catalog_versions triggers tell the two apart.
+    content_updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+    # Moves only when the description, genre or AI summary changes: what the
+    # description and similar-books indexes vectorise (BookRepository.update
+    # and save_ai_content)
+    text_updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
 
     # ── Relationships ────────────────────────────────────────────
+    # lazy="raise": collections can be huge, so handlers must opt in with
+    # explicit loader options (selectinload, ...) on the query that needs them.
+    # passive_deletes: the FK's ON DELETE CASCADE removes children, so the ORM
+    # never has to load them just to delete a book.
     borrows: Mapped[list["Borrow"]] = relationship(
-        back_populates="book", lazy="selectin"
+        back_populates="book", lazy="raise", passive_deletes=True
     )  # noqa: F821
     reviews: Mapped[list["Review"]] = relationship(
-        back_populates="book", lazy="selectin"
+        back_populates="book", lazy="raise", passive_deletes=True
     )  # noqa: F821
+    ai_content: Mapped["BookAIContent | None"] = relationship(
+        back_populates="book", lazy="raise", passive_deletes=True
+    )
+
+    # AI text lives in book_ai_content; these read through ai_content, so the
+    # query must have loaded it (joinedload(Book.ai_content) or
+    # BookRepository.load_ai_content).
+    @property
+    def ai_summary(self) -> str | None:
+        return self.ai_content.ai_summary if self.ai_content else None
+
+    @property
+    def ai_review_consensus(self) -> str | None:
+        return self.ai_content.ai_review_consensus if self.ai_content else None
+
+
+class BookAIContent(Base):
+    """
+    Large LLM-generated text, split off from books so that list queries
+    and the row itself stay small. One row per book, created on first write.
+    """
+
+    __tablename__ = "book_ai_content"
+    __table_args__ = (
+        # Recommender description index: incremental refresh picks up new
+        # summaries by updated_at
+        Index("ix_book_ai_content_updated_at", "updated_at"),
+    )
+
+    book_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True
+    )
+    ai_summary: Mapped[str | None] = mapped_column(Text)
+    ai_review_consensus: Mapped[str | None] = mapped_column(Text)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    book: Mapped[Book] = relationship(back_populates="ai_content")
+
+
+# Spread over this many rows per scope, so concurrent writers rarely queue on
+# the same one
+CATALOG_VERSION_SLOTS = 16
+
+
+class CatalogVersionSlot(Base):
+    """
+    Write counters behind BookRepository.catalog_version, bumped by triggers
+    in the writing transaction (below). "content" counts book inserts and
+    deletes, updates that move content_updated_at and any AI text write;
+    "availability" counts updates that move only updated_at (borrow and
+    return). A scope's version is the sum of its slots.
+    """
+
+    __tablename__ = "catalog_versions"
+
+    scope: Mapped[str] = mapped_column(String(16), primary_key=True)
+    slot: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+# ── Full-text search ─────────────────────────────────────────────
+# Postgres: generated tsvector columns with GIN indexes (also created by
+# migrations 0005 and 0008), one on books and one on book_ai_content for the
+# AI summary, which a generated column on books cannot read; the search
+# query matches either. They are deliberately not mapped, so SELECT Book
+# never pays for them. SQLite: one FTS5 table over both, kept in sync by
+# triggers, which lets the test suite exercise search. See
+# app/repositories/search_repository.py.
+
+BOOKS_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+AI_CONTENT_SEARCH_VECTOR_SQL = "setweight(to_tsvector('english', coalesce(ai_summary, '')), 'D')"
+
+_FTS_COLUMNS = "title, author, description, ai_summary"
+
+_POSTGRES_SEARCH_DDL = [
+    f"ALTER TABLE books ADD COLUMN search_vector tsvector "
+    f"GENERATED ALWAYS AS ({BOOKS_SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX ix_books_search_vector ON books USING GIN (search_vector)",
+    # Autocomplete (migration 0006)
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX ix_books_title_trgm ON books USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX ix_books_author_trgm ON books USING GIN (author gin_trgm_ops)",
+]
+
+_POSTGRES_AI_SEARCH_DDL = [
+    f"ALTER TABLE book_ai_content ADD COLUMN search_vector tsvector "
+    f"GENERATED ALWAYS AS ({AI_CONTENT_SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX ix_book_ai_content_search_vector ON book_ai_content USING GIN (search_vector)",
+]
+
+# A regular (not external-content) FTS5 table, so each side can update its
+# own columns of the shared row
+_SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+    f"{_FTS_COLUMNS}, tokenize='porter unicode61')",
+    f"CREATE TRIGGER books_fts_ai AFTER INSERT ON books BEGIN "
+    f"INSERT INTO books_fts(rowid, {_FTS_COLUMNS}) "
+    f"VALUES (new.id, new.title, new.author, new.description, NULL); END",
+    "CREATE TRIGGER books_fts_ad AFTER DELETE ON books BEGIN "
+    "DELETE FROM books_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER books_fts_au AFTER UPDATE OF title, author, description ON books BEGIN "
+    "UPDATE books_fts SET title = new.title, author = new.author, "
+    "description = new.description WHERE rowid = new.id; END",
+]
+
+_SQLITE_AI_SEARCH_DDL = [
+    f"CREATE TRIGGER book_ai_content_fts_{op.lower()} AFTER {op} ON book_ai_content BEGIN "
+    f"UPDATE books_fts SET ai_summary = {value} WHERE rowid = {row}.book_id; END"
+    for op, value, row in (
+        ("INSERT", "new.ai_summary", "new"),
+        ("UPDATE", "new.ai_summary", "new"),
+        ("DELETE", "NULL", "old"),
+    )
+]
+
+for _stmt in _POSTGRES_SEARCH_DDL:
+    event.listen(Book.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+for _stmt in _SQLITE_SEARCH_DDL:
+    event.listen(Book.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in _POSTGRES_AI_SEARCH_DDL:
+    event.listen(
+        BookAIContent.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql")
+    )
+for _stmt in _SQLITE_AI_SEARCH_DDL:
+    event.listen(BookAIContent.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+
+event.listen(
+    Book.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite"),
+)
+
+# ── Catalog version ──────────────────────────────────────────────
+# Postgres: statement-level triggers (also created by migration 0009), the
+# slot picked by transaction id. SQLite: row-level triggers on slot 0.
+
+_POSTGRES_CATALOG_VERSION_DDL = [
+    "CREATE OR REPLACE FUNCTION catalog_version_bump(target text) RETURNS void "
+    "LANGUAGE plpgsql AS $$ BEGIN "
+    "INSERT INTO catalog_versions (scope, slot, version) "
+    f"VALUES (target, mod(txid_current(), {CATALOG_VERSION_SLOTS}), 1) "
+    "ON CONFLICT (scope, slot) DO UPDATE SET version = catalog_versions.version + 1; "
+    "END $$",
+    "CREATE OR REPLACE FUNCTION catalog_version_trigger() RETURNS trigger "
+    "LANGUAGE plpgsql AS $$ BEGIN "
+    "PERFORM catalog_version_bump(TG_ARGV[0]); RETURN NULL; END $$",
+    # An empty UPDATE moves nothing; one that only moves updated_at is a
+    # borrow or return
+    "CREATE OR REPLACE FUNCTION books_catalog_version_trigger() RETURNS trigger "
+    "LANGUAGE plpgsql AS $$ DECLARE target text; BEGIN "
+    "SELECT CASE "
+    "WHEN bool_or(n.content_updated_at IS DISTINCT FROM o.content_updated_at) THEN 'content' "
+    "WHEN bool_or(n.updated_at IS DISTINCT FROM o.updated_at) THEN 'availability' END "
+    "INTO target FROM new_rows n JOIN old_rows o USING (id); "
+    "IF target IS NOT NULL THEN PERFORM catalog_version_bump(target); END IF; "
+    "RETURN NULL; END $$",
+    "CREATE TRIGGER books_catalog_version_write AFTER INSERT OR DELETE ON books "
+    "FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_trigger('content')",
+    "CREATE TRIGGER books_catalog_version_update AFTER UPDATE ON books "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION books_catalog_version_trigger()",
+]
+
+_POSTGRES_AI_CATALOG_VERSION_DDL = [
+    "CREATE TRIGGER book_ai_content_catalog_version "
+    "AFTER INSERT OR UPDATE OR DELETE ON book_ai_content "
+    "FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_trigger('content')",
+]
+
+
+def _sqlite_bump(scope: str) -> str:
+    return (
+        "INSERT INTO catalog_versions (scope, slot, version) "
+        f"VALUES ('{scope}', 0, 1) "
+        "ON CONFLICT (scope, slot) DO UPDATE SET version = version + 1;"
+    )
+
+
+_SQLITE_CATALOG_VERSION_DDL = [
+    f"CREATE TRIGGER books_catalog_version_ai AFTER INSERT ON books BEGIN "
+    f"{_sqlite_bump('content')} END",
+    f"CREATE TRIGGER books_catalog_version_ad AFTER DELETE ON books BEGIN "
+    f"{_sqlite_bump('content')} END",
+    f"CREATE TRIGGER books_catalog_version_au_content AFTER UPDATE ON books "
+    f"WHEN new.content_updated_at IS NOT old.content_updated_at BEGIN "
+    f"{_sqlite_bump('content')} END",
+    f"CREATE TRIGGER books_catalog_version_au_availability AFTER UPDATE ON books "
+    f"WHEN new.content_updated_at IS old.content_updated_at "
+    f"AND new.updated_at IS NOT old.updated_at BEGIN "
+    f"{_sqlite_bump('availability')} END",
+]
+
+_SQLITE_AI_CATALOG_VERSION_DDL = [
+    f"CREATE TRIGGER book_ai_content_catalog_version_{op.lower()} AFTER {op} ON book_ai_content "
+    f"BEGIN {_sqlite_bump('content')} END"
+    for op in ("INSERT", "UPDATE", "DELETE")
+]
+
+for _stmt in _POSTGRES_CATALOG_VERSION_DDL:
+    event.listen(Book.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+for _stmt in _SQLITE_CATALOG_VERSION_DDL:
+    event.listen(Book.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in _POSTGRES_AI_CATALOG_VERSION_DDL:
+    event.listen(
+        BookAIContent.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql")
+    )
+for _stmt in _SQLITE_AI_CATALOG_VERSION_DDL:
+    event.listen(BookAIContent.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
@@ -6,8 +6,11 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    String,
     Text,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -22,10 +25,33 @@ class BorrowStatus(str, PyEnum):
 
 class Borrow(Base):
     __tablename__ = "borrows"
+    __table_args__ = (
+        # At most one active borrow per book: the final arbiter when two
+        # borrowers race for the same copy.
+        Index(
+            "ux_borrows_active_book",
+            "book_id",
+            unique=True,
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+        # Serves the return and review lookups by (user, book).
+        Index(
+            "ux_borrows_active_user_book",
+            "user_id",
+            "book_id",
+            unique=True,
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+        # list_borrowed_books: WHERE user_id, status ORDER BY borrowed_at;
+        # its user_id prefix also replaces the old single-column index.
+        Index("ix_borrows_user_status_borrowed_at", "user_id", "status", "borrowed_at"),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True
+        Integer, ForeignKey("users.id", ondelete="CASCADE")
     )
     book_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("books.id", ondelete="CASCADE"), index=True
@@ -47,8 +73,17 @@ class Borrow(Base):
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Lets the sentiment batch job find its next chunk without a scan
+        Index(
+            "ix_reviews_unscored",
+            "id",
+            postgresql_where=text("sentiment_score IS NULL"),
+            sqlite_where=text("sentiment_score IS NULL"),
+        ),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True
     )
@@ -72,14 +107,14 @@ class UserPreferences(Base):
 
     Design rationale (explained in ARCHITECTURE.md):
     - favourite_genres / disliked_genres: explicit user signals
-    - genre_weights (JSONB): ML-updated map of {genre: score} derived from
-      borrow/review history; allows fine-grained preference modelling
+    - genre_weights (JSONB): legacy ML map, no longer written; the engine
+      reads user_genre_affinity, which is kept current on every event
     - min_rating_threshold: collaborative filter lower bound
     """
 
     __tablename__ = "user_preferences"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), unique=True, index=True
     )
@@ -99,3 +134,71 @@ class UserPreferences(Base):
     )
 
     user: Mapped["User"] = relationship(back_populates="preferences")  # noqa: F821
+
+
+class UserGenreAffinity(Base):
+    """
+    Running {genre: score} per user, the recommender's content signal.
+
+    Borrow, return and review each add to the book's genre in one upsert
+    (app/repositories/affinity_repository.py), so reading a user's affinity
+    is a single primary-key range scan and GET /recommendations never
+    writes. With RECOMMENDER_AFFINITY_HALF_LIFE_DAYS set, scores carry
+    exponential time decay.
+    """
+
+    __tablename__ = "user_genre_affinity"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    genre: Mapped[str] = mapped_column(String(100), primary_key=True)
+    score: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class BookTrending(Base):
+    """
+    Time-decayed borrow and review count per book, for "trending now".
+
+    Every borrow and review adds to the book's score in one upsert
+    (app/repositories/trending_repository.py), scaled by the same
+    2^((t - DECAY_EPOCH) / half-life) factor as the genre affinity. All rows
+    share the factor that turns a score into today's decayed count, so the
+    score index is already in trending order: GET /books/trending and the
+    cold-start recommendations read the first k entries and never scan
+    history.
+    """
+
+    __tablename__ = "book_trending"
+    __table_args__ = (Index("ix_book_trending_score", text("score DESC"), "book_id"),)
+
+    book_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True
+    )
+    score: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class UserRecommendation(Base):
+    """
+    One ranked book of a user's precomputed recommendations.
+
+    Written in bulk by the offline job (app/services/recommendation_batch.py)
+    and served by build_recommendations while computed_at is recent and the
+    user's genre affinity has not moved since. book_id has no foreign key:
+    a deleted book simply drops out of the join that serves the list.
+    """
+
+    __tablename__ = "user_recommendations"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    book_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -9,7 +9,7 @@ from app.db.base import Base
 class User(Base):
     __tablename__ = "users"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
     username: Mapped[str] = mapped_column(String(100), unique=True, index=True, nullable=False)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -24,8 +24,11 @@ class User(Base):
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
     )
+    # Stamped by the user's own borrows, returns and reviews: the part of
+    # their recommendations' validator that only they can move
+    activity_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
-    # ── Relationships 
-    borrows: Mapped[list["Borrow"]] = relationship(back_populates="user", lazy="selectin")
-    reviews: Mapped[list["Review"]] = relationship(back_populates="user", lazy="selectin")
-    preferences: Mapped["UserPreferences | None"] = relationship(back_populates="user", uselist=False, lazy="selectin")
+    # ── Relationships (lazy="raise": load explicitly per query, see Book)
+    borrows: Mapped[list["Borrow"]] = relationship(back_populates="user", lazy="raise", passive_deletes=True)
+    reviews: Mapped[list["Review"]] = relationship(back_populates="user", lazy="raise", passive_deletes=True)
+    preferences: Mapped["UserPreferences | None"] = relationship(back_populates="user", uselist=False, lazy="raise", passive_deletes=True)
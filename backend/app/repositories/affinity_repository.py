@@ -0,0 +1,137 @@
+"""
+Per-user genre affinity, maintained on events instead of recomputed on reads.
+
+Each event adds a weight to the affinity for the book's genre:
+
+  - borrow  → BORROW_WEIGHT; a return adds RETURN_WEIGHT, so a finished
+              read counts one full point
+  - review  → (rating - 3) / 2.5: +0.8 for 5★ down to -0.8 for 1★, the same
+              scale as the co-borrow strengths (recommendation_neighbours.py)
+
+An event is one INSERT … SELECT genre FROM books … ON CONFLICT DO UPDATE
+SET score = score + excluded.score. Concurrent events for one user add up,
+and a book without a genre inserts nothing.
+
+Time decay: with a half-life H, an event at time t adds
+weight · 2^((t - DECAY_EPOCH) / H) instead of weight. Readers normalise the
+scores to sum to one, and the common factor 2^(-now / H) cancels in that
+normalisation, so older events fade without rewriting any row.
+
+The stored factor doubles every half-life, and float64 (Python's and the
+score column's) ends at 2^1024. decay_scale() therefore stops growing at
+2^MAX_DECAY_EXPONENT: MAX_DECAY_EXPONENT half-lives after DECAY_EPOCH
+(decay_horizon(); 2.7 years at a 1-day half-life, 19 years at 7 days)
+events keep counting, but at the same scale as the ones before, i.e.
+decay stops instead of the write failing with OverflowError. Going past
+the horizon with decay intact means rescaling the table and moving
+DECAY_EPOCH together in one migration; a warning is logged from the first
+capped event on.
+"""
+
+import logging
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.book import Book
+from app.models.library import UserGenreAffinity
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+BORROW_WEIGHT = 0.5
+RETURN_WEIGHT = 0.5
+# Scores are stored relative to this instant; history migrated by 0012
+# counts as of this date
+DECAY_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+# Largest stored factor is 2^this; leaves 2^24 of headroom for the sums
+MAX_DECAY_EXPONENT = 1000.0
+_capped_warned = False
+
+
+def review_weight(rating: int) -> float:
+    return (rating - 3) / 2.5
+
+
+def decay_scale(at: datetime, half_life_days: float | None = None) -> float:
+    """Factor an event at `at` is stored with; 1.0 when decay is off."""
+    if half_life_days is None:
+        half_life_days = settings.RECOMMENDER_AFFINITY_HALF_LIFE_DAYS
+    if half_life_days <= 0:
+        return 1.0
+    exponent = (at - DECAY_EPOCH).total_seconds() / (half_life_days * 86_400)
+    if exponent > MAX_DECAY_EXPONENT:
+        global _capped_warned
+        if not _capped_warned:
+            _capped_warned = True
+            logger.warning(
+                "decay with a %s-day half-life passed its horizon (%s); time decay has "
+                "stopped until DECAY_EPOCH is moved",
+                half_life_days,
+                decay_horizon(half_life_days).date(),
+            )
+        exponent = MAX_DECAY_EXPONENT
+    return 2.0**exponent
+
+
+def decay_horizon(half_life_days: float) -> datetime:
+    """When decay_scale() stops growing for this half-life."""
+    return DECAY_EPOCH + timedelta(days=MAX_DECAY_EXPONENT * half_life_days)
+
+
+class GenreAffinityRepository:
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def record(self, user_id: int, book_id: int, weight: float) -> None:
+        """Add weight to the user's affinity for the book's genre (one statement)."""
+        now = datetime.now(timezone.utc)
+        dialect = self._db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(UserGenreAffinity).from_select(
+            ["user_id", "genre", "score", "updated_at"],
+            select(
+                literal(user_id),
+                Book.genre,
+                literal(weight * decay_scale(now)),
+                literal(now, UserGenreAffinity.updated_at.type),
+            ).where(Book.id == book_id, Book.genre.is_not(None)),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserGenreAffinity.user_id, UserGenreAffinity.genre],
+            set_={
+                "score": UserGenreAffinity.score + stmt.excluded.score,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await self._db.execute(stmt)
+
+    async def weights(self, user_id: int) -> dict[str, float]:
+        """{genre: share} over the genres with a positive score, summing to 1."""
+        result = await self._db.execute(
+            select(UserGenreAffinity.genre, UserGenreAffinity.score).where(
+                UserGenreAffinity.user_id == user_id, UserGenreAffinity.score > 0
+            )
+        )
+        return _normalise(dict(result.tuples().all()))
+
+    async def weights_many(self, user_ids: Sequence[int]) -> dict[int, dict[str, float]]:
+        """weights() for a block of users in one query; users without any are left out."""
+        result = await self._db.execute(
+            select(
+                UserGenreAffinity.user_id, UserGenreAffinity.genre, UserGenreAffinity.score
+            ).where(UserGenreAffinity.user_id.in_(user_ids), UserGenreAffinity.score > 0)
+        )
+        scores: dict[int, dict[str, float]] = {}
+        for user_id, genre, score in result.tuples().all():
+            scores.setdefault(user_id, {})[genre] = score
+        return {user_id: _normalise(genres) for user_id, genres in scores.items()}
+
+
+def _normalise(scores: dict[str, float]) -> dict[str, float]:
+    total = sum(scores.values())
+    return {genre: score / total for genre, score in scores.items()} if total else {}
@@ -1,34 +1,240 @@
-from sqlalchemy import func, select
+import hashlib
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Literal, NamedTuple
+
+from sqlalchemy import (
+    Integer,
+    Row,
+    Select,
+    any_,
+    bindparam,
+    func,
+    inspect,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.interfaces import ORMOption
+
+from app.db.base import as_utc
+from app.models.book import Book, BookAIContent, CatalogVersionSlot
+
+TotalMode = Literal["exact", "estimated", "none"]
+
+
+# Stamps are taken before commit: a transaction may commit up to this long
+# after a later one. Incremental readers re-read this far behind what they saw.
+WATERMARK_LOOKBACK = timedelta(seconds=60)
+
+
+class CatalogVersion(NamedTuple):
+    """
+    Write counts from catalog_versions: every change to what the catalog
+    shows moves content, every borrow and return moves availability. Both
+    only grow, so a larger tuple is newer.
+    """
+
+    content: int
+    availability: int = 0
 
-from app.models.book import Book
+
+_NEWEST_FIRST = (Book.created_at.desc(), Book.id.desc())
+
+# Columns a list request may project, by response field name. AI text sits
+# in book_ai_content and is only joined when one of its fields is asked for.
+BOOK_COLUMNS = {
+    "id": Book.id,
+    "title": Book.title,
+    "author": Book.author,
+    "description": Book.description,
+    "genre": Book.genre,
+    "published_year": Book.published_year,
+    "file_url": Book.file_url,
+    "ai_summary": BookAIContent.ai_summary,
+    "ai_review_consensus": BookAIContent.ai_review_consensus,
+    "summary_status": Book.summary_status,
+    "average_rating": Book.average_rating,
+    "review_count": Book.review_count,
+    "status": Book.status,
+    "created_at": Book.created_at,
+}
+_AI_FIELDS = frozenset({"ai_summary", "ai_review_consensus"})
+
+# Columns of one analysis item (GET /books/analysis), by response field name
+ANALYSIS_COLUMNS = {
+    "book_id": Book.id,
+    "summary_status": Book.summary_status,
+    "average_rating": Book.average_rating,
+    "review_count": Book.review_count,
+    "average_sentiment": Book.average_sentiment,
+    "ai_summary": BookAIContent.ai_summary,
+    "ai_review_consensus": BookAIContent.ai_review_consensus,
+}
 
 
 class BookRepository:
     def __init__(self, db: AsyncSession) -> None:
         self._db = db
 
-    async def get_by_id(self, book_id: int) -> Book | None:
-        return await self._db.get(Book, book_id)
+    async def get_by_id(self, book_id: int, *options: ORMOption) -> Book | None:
+        """Relationships are lazy="raise"; pass loader options to eager-load them."""
+        return await self._db.get(Book, book_id, options=options)
+
+    async def get_many(self, book_ids: Sequence[int]) -> list[Book]:
+        """Books in the order of book_ids; ids with no book are skipped."""
+        if not book_ids:
+            return []
+        result = await self._db.execute(select(Book).where(Book.id.in_(book_ids)))
+        by_id = {book.id: book for book in result.scalars().all()}
+        return [by_id[i] for i in book_ids if i in by_id]
 
-    async def list_paginated(self, skip: int = 0, limit: int = 20) -> tuple[list[Book], int]:
-        count_result = await self._db.execute(select(func.count()).select_from(Book))
-        total = count_result.scalar_one()
+    @staticmethod
+    def _projection(fields: Sequence[str]) -> Select:
+        stmt = select(*(BOOK_COLUMNS[f].label(f) for f in fields)).select_from(Book)
+        if _AI_FIELDS.intersection(fields):
+            stmt = stmt.outerjoin(BookAIContent, BookAIContent.book_id == Book.id)
+        return stmt
+
+    async def list_paginated(
+        self,
+        fields: Sequence[str],
+        skip: int = 0,
+        limit: int = 20,
+        total_mode: TotalMode = "exact",
+    ) -> tuple[list[Row], int | None]:
+        """Legacy OFFSET pagination; cost grows with skip."""
+        total = await self.count(total_mode)
 
         result = await self._db.execute(
-            select(Book).order_by(Book.created_at.desc()).offset(skip).limit(limit)
+            self._projection(fields).order_by(*_NEWEST_FIRST).offset(skip).limit(limit)
         )
-        books = list(result.scalars().all())
-        return books, total
+        return list(result.all()), total
+
+    async def list_after(
+        self,
+        fields: Sequence[str],
+        after: tuple[datetime, int] | None = None,
+        limit: int = 20,
+    ) -> list[Row]:
+        """
+        Keyset pagination on (created_at, id), newest first. Served straight
+        from ix_books_created_at_id, so every page costs the same.
+
+        Only the named BOOK_COLUMNS are selected; rows expose them by name.
+        """
+        stmt = self._projection(fields).order_by(*_NEWEST_FIRST).limit(limit)
+        if after is not None:
+            stmt = stmt.where(tuple_(Book.created_at, Book.id) < tuple_(*after))
+        result = await self._db.execute(stmt)
+        return list(result.all())
+
+    async def count(self, mode: TotalMode = "exact") -> int | None:
+        """
+        exact:     SELECT count(*) – a full scan on Postgres.
+        estimated: planner statistics (pg_class.reltuples); exact elsewhere
+                   or when the table has never been analysed.
+        none:      skip counting.
+        """
+        if mode == "none":
+            return None
+        if mode == "estimated" and self._db.get_bind().dialect.name == "postgresql":
+            result = await self._db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'books'::regclass")
+            )
+            estimate = result.scalar_one_or_none()
+            if estimate is not None and estimate >= 0:
+                return int(estimate)
+        result = await self._db.execute(select(func.count()).select_from(Book))
+        return result.scalar_one()
+
+    async def catalog_version(self, include_availability: bool = False) -> CatalogVersion:
+        """
+        Changes whenever the catalog does, and only then: the counters the
+        writing transaction bumps (CatalogVersionSlot), so a write is counted
+        exactly when it commits. One query over at most
+        2 x CATALOG_VERSION_SLOTS primary-key rows, however busy the catalog.
+
+        Borrows and returns only move it with include_availability (for
+        responses that show status); recommendations, models and analyses
+        ignore other users' borrows.
+        """
+        stmt = select(CatalogVersionSlot.scope, func.sum(CatalogVersionSlot.version)).group_by(
+            CatalogVersionSlot.scope
+        )
+        if not include_availability:
+            stmt = stmt.where(CatalogVersionSlot.scope == "content")
+        counts = {scope: int(total) for scope, total in (await self._db.execute(stmt)).all()}
+        return CatalogVersion(counts.get("content", 0), counts.get("availability", 0))
+
+    async def rows_version(self, book_ids: Sequence[int], include_ai: bool = True) -> tuple:
+        """
+        Validator for a response about these books only: the count and a
+        digest of every requested row's (id, stamps), from one primary-key
+        query. Each row counts, so a write stamped before a newer one but
+        committing after it still moves the validator.
+        """
+        stmt = select(Book.id, Book.content_updated_at).where(Book.id.in_(book_ids))
+        if include_ai:
+            stmt = stmt.add_columns(BookAIContent.updated_at).outerjoin(
+                BookAIContent, BookAIContent.book_id == Book.id
+            )
+        rows = sorted(
+            (book_id, *(None if v is None else as_utc(v).isoformat() for v in stamps))
+            for book_id, *stamps in (await self._db.execute(stmt)).all()
+        )
+        # Stable across processes (unlike hash()): ETags are shared by workers
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8)
+        return len(rows), int.from_bytes(digest.digest(), "big")
+
+    async def get_validators(self, book_id: int) -> Row | None:
+        """(content_updated_at, ai_updated_at) for one book: two primary-key lookups."""
+        result = await self._db.execute(
+            select(Book.content_updated_at, BookAIContent.updated_at.label("ai_updated_at"))
+            .outerjoin(BookAIContent, BookAIContent.book_id == Book.id)
+            .where(Book.id == book_id)
+        )
+        return result.one_or_none()
+
+    async def get_analyses(self, book_ids: Sequence[int], include_text: bool = True) -> list[Row]:
+        """
+        Analysis rows for many books in one projected query, in no particular
+        order; missing ids are simply absent. On Postgres the ids travel as
+        one array parameter (= ANY(:ids)), so every batch size shares a
+        single prepared statement.
+        """
+        fields = [f for f in ANALYSIS_COLUMNS if include_text or f not in _AI_FIELDS]
+        stmt = select(*(ANALYSIS_COLUMNS[f].label(f) for f in fields)).select_from(Book)
+        if include_text:
+            stmt = stmt.outerjoin(BookAIContent, BookAIContent.book_id == Book.id)
+
+        if self._db.get_bind().dialect.name == "postgresql":
+            ids = bindparam("ids", list(book_ids), type_=postgresql.ARRAY(Integer))
+            stmt = stmt.where(Book.id == any_(ids))
+        else:
+            stmt = stmt.where(Book.id.in_(book_ids))
+        result = await self._db.execute(stmt)
+        return list(result.all())
 
     async def create(self, **kwargs) -> Book:
         book = Book(**kwargs)
         self._db.add(book)
         await self._db.flush()
         await self._db.refresh(book)
+        # A new book has no AI text yet; record that instead of querying for it
+        set_committed_value(book, "ai_content", None)
         return book
 
     async def update(self, book: Book, **kwargs) -> Book:
+        if any(
+            field in kwargs and kwargs[field] != getattr(book, field)
+            for field in ("description", "genre")
+        ):
+            book.text_updated_at = datetime.now(timezone.utc)
         for key, value in kwargs.items():
             setattr(book, key, value)
         await self._db.flush()
@@ -38,3 +244,39 @@ class BookRepository:
     async def delete(self, book: Book) -> None:
         await self._db.delete(book)
         await self._db.flush()
+
+    async def load_ai_content(self, books: Iterable[Book]) -> None:
+        """Attach ai_content to already-loaded books with one IN query."""
+        books = [b for b in books if "ai_content" in inspect(b).unloaded]
+        if not books:
+            return
+        result = await self._db.execute(
+            select(BookAIContent).where(BookAIContent.book_id.in_([b.id for b in books]))
+        )
+        content = {c.book_id: c for c in result.scalars().all()}
+        for book in books:
+            set_committed_value(book, "ai_content", content.get(book.id))
+
+    async def save_ai_content(self, book_id: int, **values: str | None) -> None:
+        """Upsert AI text for a book; safe against concurrent first writes."""
+        dialect = self._db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        now = datetime.now(timezone.utc)
+        stmt = insert(BookAIContent).values(book_id=book_id, updated_at=now, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BookAIContent.book_id],
+            set_={**values, "updated_at": now},
+        )
+        await self._db.execute(stmt)
+        if "ai_summary" in values:
+            # Stamp the text only; the book's other stamps stay put
+            await self._db.execute(
+                update(Book)
+                .where(Book.id == book_id)
+                .values(
+                    text_updated_at=now,
+                    updated_at=Book.updated_at,
+                    content_updated_at=Book.content_updated_at,
+                )
+                .execution_options(synchronize_session=False)
+            )
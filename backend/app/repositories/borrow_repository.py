@@ -0,0 +1,147 @@
+"""
+Borrow and return as single conditional statements.
+
+The database decides who wins a race, not the application: a book is only
+claimed if it is still 'available', and the unique partial index
+ux_borrows_active_book guarantees at most one active borrow per book even
+if two claims interleave.
+
+  - Postgres → one round trip each, via data-modifying CTEs
+  - SQLite   → two statements each (no DML inside WITH); SQLite serialises
+               writers, so the guarded INSERT is just as race-free
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import Row, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book, BookStatus
+from app.models.library import Borrow, BorrowStatus
+
+# Availability is not content: keep the catalog version where it is
+_UNCHANGED = Book.content_updated_at
+
+_BORROW_COLUMNS = (
+    Borrow.id,
+    Borrow.user_id,
+    Borrow.book_id,
+    Borrow.status,
+    Borrow.borrowed_at,
+    Borrow.returned_at,
+)
+
+
+class BorrowRepository:
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    @property
+    def _is_postgres(self) -> bool:
+        return self._db.get_bind().dialect.name == "postgresql"
+
+    async def borrow(self, user_id: int, book_id: int) -> Row | None:
+        """
+        Claim an available book for user_id and return the new borrow row.
+
+        Returns None if the book does not exist or is not available. Raises
+        IntegrityError if an active borrow for the book already exists.
+        """
+        now = datetime.now(timezone.utc)
+        if self._is_postgres:
+            claimed = (
+                update(Book)
+                .where(Book.id == book_id, Book.status == BookStatus.AVAILABLE)
+                .values(
+                    status=BookStatus.BORROWED, updated_at=now, content_updated_at=_UNCHANGED
+                )
+                .returning(Book.id)
+                .cte("claimed")
+            )
+            stmt = (
+                insert(Borrow)
+                .from_select(
+                    ["user_id", "book_id", "status", "borrowed_at"],
+                    select(
+                        literal(user_id),
+                        claimed.c.id,
+                        literal(BorrowStatus.ACTIVE, Borrow.status.type),
+                        literal(now, Borrow.borrowed_at.type),
+                    ),
+                )
+                .returning(*_BORROW_COLUMNS)
+                .add_cte(claimed)
+            )
+            result = await self._db.execute(stmt)
+            return result.one_or_none()
+
+        # Insert only if the book is still available, then flip its status.
+        stmt = (
+            insert(Borrow)
+            .from_select(
+                ["user_id", "book_id", "status", "borrowed_at"],
+                select(
+                    literal(user_id),
+                    Book.id,
+                    literal(BorrowStatus.ACTIVE, Borrow.status.type),
+                    literal(now, Borrow.borrowed_at.type),
+                ).where(Book.id == book_id, Book.status == BookStatus.AVAILABLE),
+            )
+            .returning(*_BORROW_COLUMNS)
+        )
+        row = (await self._db.execute(stmt)).one_or_none()
+        if row is not None:
+            await self._db.execute(
+                update(Book)
+                .where(Book.id == book_id)
+                .values(
+                    status=BookStatus.BORROWED, updated_at=now, content_updated_at=_UNCHANGED
+                )
+            )
+        return row
+
+    async def return_book(self, user_id: int, book_id: int) -> Row | None:
+        """Close user_id's active borrow of book_id and free the book.
+
+        Returns the updated borrow row, or None if there was no active borrow.
+        """
+        now = datetime.now(timezone.utc)
+        returned = (
+            update(Borrow)
+            .where(
+                Borrow.user_id == user_id,
+                Borrow.book_id == book_id,
+                Borrow.status == BorrowStatus.ACTIVE,
+            )
+            .values(status=BorrowStatus.RETURNED, returned_at=now)
+            .returning(*_BORROW_COLUMNS)
+        )
+        if self._is_postgres:
+            returned_cte = returned.cte("returned")
+            freed = (
+                update(Book)
+                .where(Book.id.in_(select(returned_cte.c.book_id)))
+                .values(
+                    status=BookStatus.AVAILABLE, updated_at=now, content_updated_at=_UNCHANGED
+                )
+                .cte("freed")
+            )
+            stmt = select(returned_cte).add_cte(freed)
+            result = await self._db.execute(stmt)
+            return result.one_or_none()
+
+        row = (await self._db.execute(returned)).one_or_none()
+        if row is not None:
+            await self._db.execute(
+                update(Book)
+                .where(Book.id == book_id)
+                .values(
+                    status=BookStatus.AVAILABLE, updated_at=now, content_updated_at=_UNCHANGED
+                )
+            )
+        return row
+
+    async def book_status(self, book_id: int) -> BookStatus | None:
+        """Cheap follow-up for a failed claim: tells 404 apart from 409."""
+        result = await self._db.execute(select(Book.status).where(Book.id == book_id))
+        return result.scalar_one_or_none()
@@ -0,0 +1,97 @@
+"""
+Precomputed recommendation lists (user_recommendations).
+
+The batch job replaces a block of users' rows at a time: one DELETE, then
+COPY on Postgres (executemany INSERT elsewhere). Serving is one query that
+joins the ranked ids to books, so hydration comes with the lookup:
+
+    SELECT books.* FROM books JOIN user_recommendations r ON r.book_id = books.id
+    WHERE r.user_id = :uid AND r.computed_at >= :cutoff
+      AND NOT EXISTS (affinity of :uid updated after r.computed_at)
+      AND NOT EXISTS (borrow of this book by :uid)
+    ORDER BY r.rank LIMIT :k
+
+A borrow, return or review after the list was computed moves the user's
+affinity, so the list stops matching and the caller scores live.
+"""
+
+from collections.abc import Sequence
+from datetime import datetime
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book
+from app.models.library import Borrow, UserGenreAffinity, UserRecommendation
+from app.models.user import User
+
+_COLUMNS = ("user_id", "rank", "book_id", "computed_at")
+
+
+class PrecomputedRecommendationRepository:
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def fresh_top_k(self, user_id: int, k: int, computed_after: datetime) -> list[Book]:
+        """The user's stored list, minus books borrowed or deleted since; [] if stale."""
+        newer_affinity = exists().where(
+            UserGenreAffinity.user_id == user_id,
+            UserGenreAffinity.updated_at > UserRecommendation.computed_at,
+        )
+        borrowed = exists().where(Borrow.user_id == user_id, Borrow.book_id == Book.id)
+        result = await self._db.execute(
+            select(Book)
+            .join(UserRecommendation, UserRecommendation.book_id == Book.id)
+            .where(
+                UserRecommendation.user_id == user_id,
+                UserRecommendation.computed_at >= computed_after,
+                ~newer_affinity,
+                ~borrowed,
+            )
+            .order_by(UserRecommendation.rank)
+            .limit(k)
+        )
+        return list(result.scalars().all())
+
+    async def users_after(self, after_id: int, limit: int, min_borrows: int = 2) -> list[int]:
+        """Next active users, in id order, with enough borrows for content-based scoring."""
+        result = await self._db.execute(
+            select(Borrow.user_id)
+            .join(User, User.id == Borrow.user_id)
+            .where(Borrow.user_id > after_id, User.is_active.is_(True))
+            .group_by(Borrow.user_id)
+            .having(func.count() >= min_borrows)
+            .order_by(Borrow.user_id)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def replace(
+        self,
+        user_ids: Sequence[int],
+        ranked: Sequence[tuple[int, Sequence[int]]],
+        computed_at: datetime,
+    ) -> int:
+        """Swap these users' lists for (user_id, [book ids best first]); returns rows written."""
+        await self._db.execute(
+            delete(UserRecommendation).where(UserRecommendation.user_id.in_(user_ids))
+        )
+        records = [
+            (user_id, rank, book_id, computed_at)
+            for user_id, book_ids in ranked
+            for rank, book_id in enumerate(book_ids)
+        ]
+        if not records:
+            return 0
+        if self._db.get_bind().dialect.name == "postgresql":
+            # COPY on the session's own connection, inside its transaction
+            connection = await self._db.connection()
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                UserRecommendation.__tablename__, records=records, columns=_COLUMNS
+            )
+        else:
+            await self._db.execute(
+                insert(UserRecommendation), [dict(zip(_COLUMNS, r)) for r in records]
+            )
+        return len(records)
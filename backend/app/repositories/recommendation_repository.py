@@ -0,0 +1,77 @@
+"""
+Content-based ranking done by the database (RECOMMENDER_ENGINE=sql).
+
+The user's genre affinities become a small inline relation that books are
+LEFT JOINed to; borrowed books are removed with an anti-join (NOT EXISTS)
+instead of a literal NOT IN list, and only ORDER BY score LIMIT k rows come
+back:
+
+    SELECT books.* FROM books
+    LEFT JOIN (VALUES ('Fiction', 0.7), ...) AS affinity (genre, weight)
+           ON affinity.genre = books.genre
+    WHERE NOT EXISTS (SELECT 1 FROM borrows
+                      WHERE borrows.book_id = books.id AND borrows.user_id = :uid)
+    ORDER BY coalesce(affinity.weight, 0) + 0.1 * average_rating
+             + 0.1 * coalesce(average_sentiment, 0) DESC, books.id
+    LIMIT :k
+"""
+
+from sqlalchemy import Float, FromClause, Integer, String, column, exists, func, literal
+from sqlalchemy import select, union_all, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book
+from app.models.library import Borrow
+
+
+class RecommendationRepository:
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    def _inline_relation(
+        self, name: str, key: str, key_type, items: dict
+    ) -> FromClause:
+        """A (key, weight) relation built from literal rows."""
+        rows = list(items.items())
+        if self._db.get_bind().dialect.name == "postgresql":
+            return values(column(key, key_type), column("weight", Float), name=name).data(rows)
+        # SQLite cannot name a VALUES subquery's columns
+        selects = [
+            select(literal(k, key_type).label(key), literal(w, Float).label("weight"))
+            for k, w in rows
+        ]
+        query = selects[0] if len(selects) == 1 else union_all(*selects)
+        return query.subquery(name)
+
+    async def top_k(
+        self,
+        user_id: int,
+        k: int,
+        affinity: dict[str, float] | None = None,
+        rating_weight: float = 1.0,
+        sentiment_weight: float = 0.0,
+        boosts: dict[int, float] | None = None,
+    ) -> list[Book]:
+        """
+        Best k books the user has never borrowed. Without an affinity this is
+        plain top-rated, ties broken by id. boosts adds a per-book term (the
+        description similarity), joined the same way on the book id.
+        """
+        score = Book.average_rating if rating_weight == 1.0 else Book.average_rating * rating_weight
+        if sentiment_weight:
+            score = score + func.coalesce(Book.average_sentiment, 0.0) * sentiment_weight
+
+        stmt = select(Book)
+        if affinity:
+            relation = self._inline_relation("affinity", "genre", String, affinity)
+            stmt = stmt.outerjoin(relation, relation.c.genre == Book.genre)
+            score = func.coalesce(relation.c.weight, 0.0) + score
+        if boosts:
+            relation = self._inline_relation("boost", "book_id", Integer, boosts)
+            stmt = stmt.outerjoin(relation, relation.c.book_id == Book.id)
+            score = score + func.coalesce(relation.c.weight, 0.0)
+
+        borrowed = exists().where(Borrow.book_id == Book.id, Borrow.user_id == user_id)
+        stmt = stmt.where(~borrowed).order_by(score.desc(), Book.id).limit(k)
+        result = await self._db.execute(stmt)
+        return list(result.scalars().all())
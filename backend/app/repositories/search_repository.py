@@ -0,0 +1,236 @@
+"""
+Full-text book search and title/author autocomplete.
+
+One interface, two engines:
+  - Postgres → generated tsvector columns + GIN indexes on books and on
+               book_ai_content (the AI summary), ts_rank, ts_headline;
+               pg_trgm GIN indexes for typo-tolerant autocomplete
+  - SQLite   → one FTS5 table over both, bm25, snippet; LIKE-based
+               autocomplete (used by tests)
+
+Search results are ordered by relevance (optionally boosted by
+average_rating) and paginated with a (rank, id) keyset cursor.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from sqlalchemy import (
+    Row,
+    and_,
+    case,
+    column,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    union,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.book import Book, BookAIContent
+
+# A 5-star book ranks up to 50% higher than an unrated one with equal relevance
+RATING_BOOST_WEIGHT = 0.5
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_books_fts = table("books_fts", column("rowid"))
+
+
+@dataclass(slots=True)
+class SearchHit:
+    book: Book
+    rank: float
+    snippet: str | None
+
+
+class BookSearchRepository(ABC):
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: tuple[float, int] | None = None,
+        boost_rating: bool = True,
+    ) -> list[SearchHit]:
+        """Return up to limit hits ranked best-first, strictly after the cursor."""
+
+    @abstractmethod
+    async def autocomplete(self, query: str, limit: int = 10) -> list[Row]:
+        """Return (id, title, author) rows whose title or author matches query."""
+
+    @staticmethod
+    def _boosted(rank: ColumnElement, boost_rating: bool) -> ColumnElement:
+        if not boost_rating:
+            return rank
+        return rank * (1.0 + RATING_BOOST_WEIGHT * func.coalesce(Book.average_rating, 0.0) / 5.0)
+
+    @staticmethod
+    def _after(rank: ColumnElement, after: tuple[float, int] | None) -> ColumnElement | None:
+        if after is None:
+            return None
+        last_rank, last_id = after
+        return or_(rank < last_rank, and_(rank == last_rank, Book.id < last_id))
+
+
+# ── Postgres
+
+class PostgresBookSearchRepository(BookSearchRepository):
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: tuple[float, int] | None = None,
+        boost_rating: bool = True,
+    ) -> list[SearchHit]:
+        tsquery = func.websearch_to_tsquery("english", query)
+        vector = literal_column("books.search_vector")
+        ai_vector = literal_column("book_ai_content.search_vector")
+        # Each GIN index finds its own matches; the AI summary weighs in at D
+        matches = union(
+            select(Book.id.label("id")).where(vector.op("@@")(tsquery)),
+            select(BookAIContent.book_id).where(ai_vector.op("@@")(tsquery)),
+        ).subquery()
+        combined = vector.op("||")(func.coalesce(ai_vector, literal_column("''::tsvector")))
+        rank = self._boosted(func.ts_rank(combined, tsquery), boost_rating)
+
+        page = (
+            select(Book.id.label("id"), rank.label("rank"))
+            .join(matches, matches.c.id == Book.id)
+            .outerjoin(BookAIContent, BookAIContent.book_id == Book.id)
+        )
+        keyset = self._after(rank, after)
+        if keyset is not None:
+            page = page.where(keyset)
+        page = page.order_by(rank.desc(), Book.id.desc()).limit(limit).subquery()
+
+        # ts_headline is expensive, so only run it for the rows on this page
+        headline = func.ts_headline(
+            "english",
+            case(
+                (vector.op("@@")(tsquery), func.coalesce(Book.description, Book.title)),
+                else_=func.coalesce(BookAIContent.ai_summary, Book.title),
+            ),
+            tsquery,
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=35, MinWords=15",
+        )
+        stmt = (
+            select(Book, page.c.rank, headline)
+            .join(page, page.c.id == Book.id)
+            .outerjoin(BookAIContent, BookAIContent.book_id == Book.id)
+            .options(contains_eager(Book.ai_content))
+            .order_by(page.c.rank.desc(), page.c.id.desc())
+        )
+        result = await self._db.execute(stmt)
+        return [SearchHit(book, float(r), snip) for book, r, snip in result.all()]
+
+    async def autocomplete(self, query: str, limit: int = 10) -> list[Row]:
+        # Substring ILIKE and the word-similarity operator (<%) are both served
+        # by the gin_trgm_ops indexes; <% is what tolerates typos.
+        pattern = f"%{_escape_like(query)}%"
+        q = literal(query)
+        score = func.greatest(
+            func.word_similarity(q, Book.title), func.word_similarity(q, Book.author)
+        )
+        stmt = (
+            select(Book.id, Book.title, Book.author)
+            .where(
+                or_(
+                    Book.title.ilike(pattern, escape="\\"),
+                    Book.author.ilike(pattern, escape="\\"),
+                    q.op("<%")(Book.title),
+                    q.op("<%")(Book.author),
+                )
+            )
+            .order_by(score.desc(), func.length(Book.title), Book.id)
+            .limit(limit)
+        )
+        result = await self._db.execute(stmt)
+        return list(result.all())
+
+
+# ── SQLite (FTS5)
+
+class SqliteBookSearchRepository(BookSearchRepository):
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: tuple[float, int] | None = None,
+        boost_rating: bool = True,
+    ) -> list[SearchHit]:
+        match = _fts5_match_expression(query)
+        if not match:
+            return []
+
+        fts = literal_column("books_fts")
+        # bm25 is "lower is better"; negate it so both engines sort DESC.
+        # Column weights mirror the Postgres setweight A/B/C/D.
+        rank = self._boosted(-func.bm25(fts, 10.0, 5.0, 2.0, 1.0), boost_rating)
+        snippet = func.snippet(fts, -1, HIGHLIGHT_START, HIGHLIGHT_STOP, "…", 16)
+
+        stmt = (
+            select(Book, rank.label("rank"), snippet)
+            .select_from(_books_fts)
+            .join(Book, Book.id == _books_fts.c.rowid)
+            .options(joinedload(Book.ai_content))
+            .where(fts.op("MATCH")(match))
+        )
+        keyset = self._after(rank, after)
+        if keyset is not None:
+            stmt = stmt.where(keyset)
+        stmt = stmt.order_by(rank.desc(), Book.id.desc()).limit(limit)
+        result = await self._db.execute(stmt)
+        return [SearchHit(book, float(r), snip) for book, r, snip in result.all()]
+
+    async def autocomplete(self, query: str, limit: int = 10) -> list[Row]:
+        # No trigram support: substring match, prefix matches first.
+        pattern = f"%{_escape_like(query)}%"
+        prefix = f"{_escape_like(query)}%"
+        stmt = (
+            select(Book.id, Book.title, Book.author)
+            .where(
+                or_(
+                    Book.title.ilike(pattern, escape="\\"),
+                    Book.author.ilike(pattern, escape="\\"),
+                )
+            )
+            .order_by(
+                case((Book.title.ilike(prefix, escape="\\"), 0), else_=1),
+                func.length(Book.title),
+                Book.id,
+            )
+            .limit(limit)
+        )
+        result = await self._db.execute(stmt)
+        return list(result.all())
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts5_match_expression(query: str) -> str:
+    """Quote each term so user input can never inject FTS5 syntax."""
+    return " ".join(f'"{token}"' for token in _TOKEN_RE.findall(query))
+
+
+def get_book_search_repository(db: AsyncSession) -> BookSearchRepository:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return PostgresBookSearchRepository(db)
+    if dialect == "sqlite":
+        return SqliteBookSearchRepository(db)
+    raise ValueError(f"Full-text search is not supported on {dialect}")
@@ -0,0 +1,112 @@
+"""
+Trending books: exponentially time-decayed borrow and review counts.
+
+A borrow or a review counts one. With a half-life H, the trending score of
+a book at time `now` is
+
+    Σ count · 2^((t - now) / H)
+
+over its events. Like the genre affinity (affinity_repository.py), each
+event is stored as count · 2^((t - DECAY_EPOCH) / H). The factor
+2^(-(now - DECAY_EPOCH) / H) that turns the stored sum into today's score is
+shared by every book, so ranking by the stored column is ranking by the
+decayed count. An event is then one upsert, nothing is ever rewritten to
+age it, and the top k is the first k entries of ix_book_trending_score.
+
+Scores grow by a factor of two per half-life. decay_scale() caps the factor
+at its horizon, MAX_DECAY_EXPONENT half-lives after the epoch (19 years at
+7 days, decay_horizon()): from then on every event counts the same and the
+list is all-time popularity since the horizon until DECAY_EPOCH is moved
+and the table rescaled. Reads divide by the same capped factor, so
+top_k() counts stay finite either way. Changing
+TRENDING_HALF_LIFE_DAYS mixes scales until the table is rebuilt from
+history with TrendingRepository.rebuild(), whose SQL (rebuild_sql()) the
+0014 migration's backfill also runs.
+"""
+
+from collections.abc import Collection
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.book import Book
+from app.models.library import BookTrending
+from app.repositories.affinity_repository import DECAY_EPOCH, MAX_DECAY_EXPONENT, decay_scale
+
+settings = get_settings()
+
+BORROW_COUNT = 1.0
+REVIEW_COUNT = 1.0
+
+
+def rebuild_sql(dialect: str, half_life_days: float) -> str:
+    """
+    INSERT … SELECT that replays every borrow and review into book_trending,
+    each at decay_scale()'s factor for its time (capped the same way).
+    """
+    if half_life_days <= 0:
+        factor = "1.0"
+    else:
+        if dialect == "postgresql":
+            seconds, smaller = "extract(epoch FROM e.at)", "least"
+        else:
+            seconds, smaller = "(julianday(e.at) - 2440587.5) * 86400", "min"
+        exponent = f"({seconds} - {DECAY_EPOCH.timestamp()}) / {half_life_days * 86_400}"
+        factor = f"power(2.0, {smaller}({exponent}, {MAX_DECAY_EXPONENT}))"
+    return (
+        "INSERT INTO book_trending (book_id, score, updated_at) "
+        f"SELECT e.book_id, sum(e.n * {factor}), max(e.at) FROM ("
+        f"  SELECT book_id, borrowed_at AS at, {BORROW_COUNT} AS n FROM borrows"
+        "  UNION ALL"
+        f"  SELECT book_id, created_at, {REVIEW_COUNT} FROM reviews"
+        ") e GROUP BY e.book_id"
+    )
+
+
+class TrendingRepository:
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def record(self, book_id: int, count: float) -> None:
+        """Add one event to the book's decayed count (one statement)."""
+        now = datetime.now(timezone.utc)
+        dialect = self._db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(BookTrending).values(
+            book_id=book_id,
+            score=count * decay_scale(now, settings.TRENDING_HALF_LIFE_DAYS),
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BookTrending.book_id],
+            set_={
+                "score": BookTrending.score + stmt.excluded.score,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await self._db.execute(stmt)
+
+    async def rebuild(self) -> None:
+        """Recompute every score from history at the current TRENDING_HALF_LIFE_DAYS."""
+        dialect = self._db.get_bind().dialect.name
+        await self._db.execute(delete(BookTrending))
+        await self._db.execute(text(rebuild_sql(dialect, settings.TRENDING_HALF_LIFE_DAYS)))
+
+    async def top_k(
+        self, k: int, exclude_ids: Collection[int] = ()
+    ) -> list[tuple[Book, float]]:
+        """(book, decayed count as of now) of the k trending books, hottest first."""
+        stmt = (
+            select(Book, BookTrending.score)
+            .join(BookTrending, BookTrending.book_id == Book.id)
+            .order_by(BookTrending.score.desc(), BookTrending.book_id)
+            .limit(k)
+        )
+        if exclude_ids:
+            stmt = stmt.where(BookTrending.book_id.not_in(exclude_ids))
+        result = await self._db.execute(stmt)
+        scale = decay_scale(datetime.now(timezone.utc), settings.TRENDING_HALF_LIFE_DAYS)
+        return [(book, score / scale) for book, score in result.tuples().all()]
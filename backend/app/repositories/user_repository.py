@@ -1,6 +1,10 @@
-from sqlalchemy import select
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import ORMOption
 
+from app.core.principal_cache import Principal
 from app.models.user import User
 
 
@@ -8,8 +12,17 @@ class UserRepository:
     def __init__(self, db: AsyncSession) -> None:
         self._db = db
 
-    async def get_by_id(self, user_id: int) -> User | None:
-        return await self._db.get(User, user_id)
+    async def get_by_id(self, user_id: int, *options: ORMOption) -> User | None:
+        """Relationships are lazy="raise"; pass loader options to eager-load them."""
+        return await self._db.get(User, user_id, options=options)
+
+    async def get_principal(self, user_id: int) -> Principal | None:
+        """Fetch only the columns needed to authorise a request."""
+        result = await self._db.execute(
+            select(User.id, User.username, User.is_active).where(User.id == user_id)
+        )
+        row = result.one_or_none()
+        return Principal(id=row.id, username=row.username, is_active=row.is_active) if row else None
 
     async def get_by_email(self, email: str) -> User | None:
         result = await self._db.execute(select(User).where(User.email == email))
@@ -27,8 +40,26 @@ class UserRepository:
         return user
 
     async def update(self, user: User, **kwargs) -> User:
+        """
+        Cached principals outlive this call: once the write has committed,
+        the caller drops them with get_principal_cache().invalidate_user.
+        """
         for key, value in kwargs.items():
             setattr(user, key, value)
         await self._db.flush()
         await self._db.refresh(user)
         return user
+
+    async def touch_activity(self, user_id: int) -> None:
+        """The user borrowed, returned or reviewed: move their activity stamp."""
+        await self._db.execute(
+            update(User)
+            .where(User.id == user_id)
+            # Not a profile edit: updated_at stays put
+            .values(activity_at=datetime.now(timezone.utc), updated_at=User.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def activity_at(self, user_id: int) -> datetime | None:
+        result = await self._db.execute(select(User.activity_at).where(User.id == user_id))
+        return result.scalar_one_or_none()
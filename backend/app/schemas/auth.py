@@ -19,6 +19,11 @@ class TokenResponse(BaseModel):
     token_type: str = "bearer"
 
 
+class StreamTokenResponse(BaseModel):
+    stream_token: str
+    expires_in: int  # seconds
+
+
 class UserResponse(BaseModel):
     id: int
     email: str
@@ -38,11 +38,68 @@ class BookResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class BookListItem(BaseModel):
+    """A BookResponse restricted to the fields chosen with view= / fields=."""
+
+    id: int
+    title: str | None = None
+    author: str | None = None
+    description: str | None = None
+    genre: str | None = None
+    published_year: int | None = None
+    file_url: str | None = None
+    ai_summary: str | None = None
+    ai_review_consensus: str | None = None
+    summary_status: str | None = None
+    average_rating: float | None = None
+    review_count: int | None = None
+    status: str | None = None
+    created_at: datetime | None = None
+
+
+# view= presets for GET /books; compact is what a grid card renders.
+BOOK_VIEWS: dict[str, tuple[str, ...]] = {
+    "full": tuple(BookResponse.model_fields),
+    "compact": (
+        "id",
+        "title",
+        "author",
+        "genre",
+        "published_year",
+        "summary_status",
+        "average_rating",
+        "review_count",
+        "status",
+        "created_at",
+    ),
+}
+
+
 class PaginatedBooksResponse(BaseModel):
-    items: list[BookResponse]
-    total: int
-    page: int
+    items: list[BookListItem]  # only the requested fields are serialised
+    total: int | None  # None when total=none was requested
+    page: int | None  # None for cursor-based requests
     page_size: int
+    next_cursor: str | None = None
+
+
+class BookSearchHit(BaseModel):
+    book: BookResponse
+    rank: float
+    snippet: str | None  # matched text, terms wrapped in <mark>…</mark>
+
+
+class BookSearchResponse(BaseModel):
+    items: list[BookSearchHit]
+    next_cursor: str | None = None
+
+
+class AutocompleteSuggestion(BaseModel):
+    id: int
+    title: str
+    author: str
+
+    model_config = {"from_attributes": True}
 
 
 # Review Schemas
@@ -85,6 +142,25 @@ class BookAnalysisResponse(BaseModel):
     ai_review_consensus: str | None
     average_rating: float
     review_count: int
+    average_sentiment: float | None = None
+    summary_status: str | None = None
+
+
+class BookAnalysisItem(BaseModel):
+    """One entry of a batch lookup; AI text is omitted when include_text=false."""
+
+    book_id: int
+    summary_status: str
+    average_rating: float
+    review_count: int
+    average_sentiment: float | None = None
+    ai_summary: str | None = None
+    ai_review_consensus: str | None = None
+
+
+class BookAnalysisBatchResponse(BaseModel):
+    items: list[BookAnalysisItem]  # in the order the ids were given
+    not_found: list[int]
 
 
 # Recommendation Schema
@@ -93,3 +169,13 @@ class RecommendationResponse(BaseModel):
     books: list[BookResponse]
     strategy: str
 
+
+class SimilarBooksResponse(BaseModel):
+    book_id: int
+    books: list[BookResponse]  # most similar first
+
+
+class TrendingBooksResponse(BaseModel):
+    half_life_days: float  # a borrow or review counts half as much after this long
+    books: list[BookResponse]  # hottest first
+
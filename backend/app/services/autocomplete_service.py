@@ -0,0 +1,250 @@
+"""
+Autocomplete Service
+Search-as-you-type over book titles and authors.
+
+Two tiers:
+  1. An in-process sorted-array prefix index of the
+     AUTOCOMPLETE_CACHE_MAX_TITLES hot titles (most reviewed; 0 disables it).
+     Lookups are a bisect plus a scan of the matching keys – microseconds,
+     no DB trip – and return the most reviewed matches first. It is
+     patched incrementally once a book create/update/delete has committed
+     and fully reloaded after AUTOCOMPLETE_CACHE_TTL_SECONDS to pick up
+     writes made by other worker processes. Only a worker's first lookup
+     waits for the load; later reloads run in the background while the old
+     index keeps serving, and patches made meanwhile are replayed onto the
+     new index before it is swapped in.
+  2. The database (pg_trgm on Postgres) for typo-tolerant matching and for
+     anything the hot set does not cover.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from functools import lru_cache
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.core.config import get_settings
+from app.models.book import Book
+from app.repositories.search_repository import get_book_search_repository
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Suggestion:
+    id: int
+    title: str
+    author: str
+
+
+def _normalise(value: str) -> str:
+    return " ".join(value.lower().split())
+
+
+def _keys_for(title: str, author: str, index_words: bool) -> set[str]:
+    """Keys a book is reachable by: full title, author and (optionally) every
+    word-suffix of the title, so "gats" finds "The Great Gatsby"."""
+    keys = {_normalise(title), _normalise(author)}
+    if index_words:
+        words = _normalise(title).split(" ")
+        keys.update(" ".join(words[i:]) for i in range(1, len(words)))
+    keys.discard("")
+    return keys
+
+
+# ── Prefix index
+
+class PrefixIndex:
+    """Sorted parallel arrays of (key, book_id) with bisect prefix search."""
+
+    def __init__(self, index_words: bool = True) -> None:
+        self._index_words = index_words
+        self._keys: list[str] = []
+        self._ids: list[int] = []
+        self._books: dict[int, Suggestion] = {}
+        self._popularity: dict[int, int] = {}  # review count; ranks the hits
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def __contains__(self, book_id: int) -> bool:
+        return book_id in self._books
+
+    def build(
+        self, books: Iterable[Suggestion], popularity: Mapping[int, int] | None = None
+    ) -> None:
+        """Bulk load: one sort instead of n insertions."""
+        self._books = {b.id: b for b in books}
+        self._popularity = {i: (popularity or {}).get(i, 0) for i in self._books}
+        pairs = sorted(
+            (key, b.id)
+            for b in self._books.values()
+            for key in _keys_for(b.title, b.author, self._index_words)
+        )
+        self._keys = [k for k, _ in pairs]
+        self._ids = [i for _, i in pairs]
+
+    def upsert(self, book: Suggestion, popularity: int = 0) -> None:
+        self.remove(book.id)
+        self._books[book.id] = book
+        self._popularity[book.id] = popularity
+        for key in _keys_for(book.title, book.author, self._index_words):
+            pos = bisect_left(self._keys, key)
+            self._keys.insert(pos, key)
+            self._ids.insert(pos, book.id)
+
+    def remove(self, book_id: int) -> None:
+        book = self._books.pop(book_id, None)
+        if book is None:
+            return
+        del self._popularity[book_id]
+        for key in _keys_for(book.title, book.author, self._index_words):
+            pos = bisect_left(self._keys, key)
+            while pos < len(self._keys) and self._keys[pos] == key:
+                if self._ids[pos] == book_id:
+                    del self._keys[pos]
+                    del self._ids[pos]
+                    break
+                pos += 1
+
+    def lookup(self, prefix: str, limit: int) -> list[Suggestion]:
+        prefix = _normalise(prefix)
+        if not prefix:
+            return []
+        found: set[int] = set()
+        pos = bisect_left(self._keys, prefix)
+        keys, ids = self._keys, self._ids
+        while pos < len(keys) and keys[pos].startswith(prefix):
+            found.add(ids[pos])
+            pos += 1
+        # Most reviewed first, newest among equals: the order the hot set is loaded in
+        popularity = self._popularity
+        best = heapq.nsmallest(limit, found, key=lambda i: (-popularity[i], -i))
+        return [self._books[i] for i in best]
+
+
+# ── Hot-title cache
+
+class TitleCache:
+    def __init__(self, max_titles: int, ttl_seconds: float) -> None:
+        self._max_titles = max_titles
+        self._ttl = ttl_seconds
+        self._index = PrefixIndex()
+        self._loaded_at: float | None = None
+        self._refresh: asyncio.Task | None = None
+        # One per reload in flight: patches to replay onto the index it builds
+        self._journals: list[list[Callable[[PrefixIndex], None]]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_titles > 0
+
+    def is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self._ttl
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self.enabled or self.is_fresh():
+            return
+        if self._loaded_at is None:
+            await self._reload(db)  # nothing to serve yet
+        elif self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._refresh_in_background(db.bind))
+
+    async def _reload(self, db: AsyncSession) -> None:
+        journal: list[Callable[[PrefixIndex], None]] = []
+        self._journals.append(journal)
+        try:
+            # A backwards scan of ix_books_review_count_id, stopped at the limit
+            result = await db.execute(
+                select(Book.id, Book.title, Book.author, Book.review_count)
+                .order_by(Book.review_count.desc(), Book.id.desc())
+                .limit(self._max_titles)
+            )
+            rows = result.all()
+            index = PrefixIndex()
+            await asyncio.to_thread(
+                index.build,
+                [Suggestion(i, title, author) for i, title, author, _ in rows],
+                {i: count for i, _, _, count in rows},
+            )
+            # Patches from after the snapshot was read; no await until the swap
+            for patch in journal:
+                patch(index)
+            self._index = index
+            self._loaded_at = time.monotonic()
+        finally:
+            self._journals.remove(journal)
+
+    async def _refresh_in_background(self, bind: AsyncEngine | AsyncConnection) -> None:
+        try:
+            async with AsyncSession(bind, expire_on_commit=False) as db:
+                await self._reload(db)
+        except Exception:
+            logger.exception("reloading the autocomplete title cache failed")
+
+    def lookup(self, prefix: str, limit: int) -> list[Suggestion]:
+        if self._loaded_at is None:
+            return []
+        return self._index.lookup(prefix, limit)
+
+    def on_book_saved(self, book: Book) -> None:
+        """Call once the write has committed, so a rollback never reaches the cache."""
+        suggestion = Suggestion(book.id, book.title, book.author)
+        popularity = book.review_count or 0
+
+        def patch(index: PrefixIndex) -> None:
+            # New books join the hot set while there is room; existing
+            # entries are always refreshed so a renamed title never lingers.
+            if book.id in index or len(index) < self._max_titles:
+                index.upsert(suggestion, popularity)
+
+        self._patch(patch)
+
+    def on_book_deleted(self, book_id: int) -> None:
+        """Call once the delete has committed."""
+        self._patch(lambda index: index.remove(book_id))
+
+    def _patch(self, patch: Callable[[PrefixIndex], None]) -> None:
+        if self._loaded_at is not None:
+            patch(self._index)
+        for journal in self._journals:
+            journal.append(patch)
+
+    def clear(self) -> None:
+        if self._refresh is not None:
+            self._refresh.cancel()
+            self._refresh = None
+        self._index = PrefixIndex()
+        self._loaded_at = None
+
+
+@lru_cache
+def get_title_cache() -> TitleCache:
+    return TitleCache(
+        max_titles=settings.AUTOCOMPLETE_CACHE_MAX_TITLES,
+        ttl_seconds=settings.AUTOCOMPLETE_CACHE_TTL_SECONDS,
+    )
+
+
+async def autocomplete(db: AsyncSession, query: str, limit: int = 10) -> list[Suggestion]:
+    """Hot-cache prefix hits first, topped up from the typo-tolerant DB index."""
+    cache = get_title_cache()
+    await cache.ensure_loaded(db)
+    suggestions = cache.lookup(query, limit)
+    if len(suggestions) >= limit:
+        return suggestions
+
+    seen = {s.id for s in suggestions}
+    rows = await get_book_search_repository(db).autocomplete(query, limit)
+    for row in rows:
+        if row.id not in seen and len(suggestions) < limit:
+            suggestions.append(Suggestion(row.id, row.title, row.author))
+            seen.add(row.id)
+    return suggestions
@@ -0,0 +1,185 @@
+"""
+Cross-process delivery of book events.
+
+Background tasks publish through the configured broker; every API worker
+feeds what it receives into its local EventHub:
+
+- memory:   single-process deployments and tests; publish goes straight
+            to this process's hub.
+- postgres: LISTEN/NOTIFY on one dedicated connection per API worker, so
+            any number of workers (and the task runner) share one stream.
+
+Events of a type with a registered handler (on()) are consumed by that
+handler in every worker instead of going to the streams: that is how a
+worker tells the others to drop cached state, e.g. recommendation lists
+showing a book that just changed.
+"""
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from functools import lru_cache
+
+from sqlalchemy import func, select, union
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.services.events.hub import Event, EventHub, get_event_hub
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EVENTS_PUBLISHED = REGISTRY.counter("events_published_total", "Book events published")
+
+NOTIFY_CHANNEL = "luminalib_events"
+# NOTIFY payloads are capped at 8000 bytes; large audiences are split
+_NOTIFY_MAX_USERS = 500
+# Reconnect backoff: doubles per failed attempt, reset once listening
+_RECONNECT_DELAY_SECONDS = 2.0
+_RECONNECT_MAX_DELAY_SECONDS = 60.0
+
+
+# ── Abstract Interface
+class EventBroker(ABC):
+    def __init__(self, hub: EventHub) -> None:
+        self._hub = hub
+        self._handlers: dict[str, Callable[[Event], None]] = {}
+
+    def on(self, event_type: str, handler: Callable[[Event], None]) -> None:
+        """Hand events of this type to handler in this process, not to the streams."""
+        self._handlers[event_type] = handler
+
+    @abstractmethod
+    async def publish(self, bind: AsyncEngine | AsyncConnection, event: Event) -> None:
+        """
+        Deliver the event to every API worker's hub. Anything sent through
+        the database goes on a session of its own over bind, so the
+        caller's transaction is never committed or aborted by a publish.
+        """
+
+    async def start(self) -> None:
+        """Begin feeding remote events into the local hub (API lifespan)."""
+
+    async def stop(self) -> None:
+        """Release whatever start() acquired."""
+
+    def _deliver(self, event: Event) -> None:
+        handler = self._handlers.get(event.type)
+        if handler is None:
+            self._hub.publish(event)
+            return
+        try:
+            handler(event)
+        except Exception:
+            logger.exception("handling %s event for book %s failed", event.type, event.book_id)
+
+
+# ── In-process Implementation
+class InProcessEventBroker(EventBroker):
+    async def publish(self, bind: AsyncEngine | AsyncConnection, event: Event) -> None:
+        self._deliver(event)
+
+
+# ── Postgres LISTEN/NOTIFY Implementation
+class PostgresEventBroker(EventBroker):
+    def __init__(self, hub: EventHub, dsn: str) -> None:
+        super().__init__(hub)
+        self._dsn = dsn
+        self._task: asyncio.Task | None = None
+
+    async def publish(self, bind: AsyncEngine | AsyncConnection, event: Event) -> None:
+        users = event.user_ids
+        parts = [
+            Event(event.type, event.book_id, event.data, users[i : i + _NOTIFY_MAX_USERS], i == 0)
+            for i in range(0, max(len(users), 1), _NOTIFY_MAX_USERS)
+        ]
+        async with AsyncSession(bind) as db:
+            for part in parts:
+                payload = json.dumps(part.to_dict())
+                await db.execute(select(func.pg_notify(NOTIFY_CHANNEL, payload)))
+            # NOTIFY is transactional: listeners see it once this commits
+            await db.commit()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen_forever(self) -> None:
+        import asyncpg
+
+        failures = 0
+        while True:
+            lost = asyncio.Event()
+            conn = None
+            try:
+                conn = await asyncpg.connect(self._dsn)
+                conn.add_termination_listener(lambda _conn: lost.set())
+                await conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                failures = 0
+                await lost.wait()
+                logger.warning("event listener connection lost; reconnecting")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                failures += 1
+                logger.warning("event listener could not listen; retrying", exc_info=True)
+            finally:
+                if conn is not None:
+                    await conn.close()
+            await asyncio.sleep(
+                min(_RECONNECT_DELAY_SECONDS * 2 ** failures, _RECONNECT_MAX_DELAY_SECONDS)
+            )
+
+    def _on_notify(self, _conn, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            event = Event.from_dict(json.loads(payload))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("ignoring malformed event payload: %r", payload[:200])
+            return
+        self._deliver(event)
+
+
+@lru_cache
+def get_event_broker() -> EventBroker:
+    """Returns the configured broker; one per process, shared by all requests."""
+    hub = get_event_hub()
+    if settings.EVENT_BROKER == "postgres":
+        url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+        return PostgresEventBroker(hub, url.render_as_string(hide_password=False))
+    return InProcessEventBroker(hub)
+
+
+# ── Publishing helper used by background tasks
+async def publish_book_event(db: AsyncSession, book_id: int, event_type: str, **data) -> None:
+    """
+    Publish to the book's stream and to the feeds of users who currently
+    borrow or have reviewed it. Call it once the result is committed: the
+    event goes out on a session of its own. Best effort: a failed publish
+    is logged and never fails the task that produced the result.
+    """
+    from app.models.library import Borrow, BorrowStatus, Review
+
+    try:
+        audience = union(
+            select(Borrow.user_id).where(
+                Borrow.book_id == book_id, Borrow.status == BorrowStatus.ACTIVE
+            ),
+            select(Review.user_id).where(Review.book_id == book_id),
+        )
+        user_ids = tuple(sorted((await db.execute(audience)).scalars().all()))
+        event = Event(type=event_type, book_id=book_id, data=data, user_ids=user_ids)
+        await get_event_broker().publish(db.bind, event)
+        EVENTS_PUBLISHED.inc(type=event_type)
+    except Exception:
+        logger.exception("publishing %s event for book %s failed", event_type, book_id)
@@ -0,0 +1,154 @@
+"""
+In-process fan-out of book events to open SSE connections.
+
+Every stream owns a queue of EVENT_QUEUE_SIZE events, bound to the event
+loop that created it. publish() is thread-safe: background tasks run on
+their own loop, so delivery to a subscriber on another loop goes through
+call_soon_threadsafe.
+A subscriber that falls behind loses its oldest events rather than growing
+without bound; streams send a fresh snapshot on reconnect, so a dropped
+intermediate event is never the only copy of the current state.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+
+EVENTS_DELIVERED = REGISTRY.counter("events_delivered_total", "Events queued to subscribers")
+EVENTS_DROPPED = REGISTRY.counter(
+    "events_dropped_total", "Events dropped because a subscriber fell behind"
+)
+EVENT_SUBSCRIBERS = REGISTRY.gauge("event_subscribers", "Open event streams")
+
+
+def book_channel(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class Event:
+    type: str  # "summary" | "review_consensus", or one a broker handler consumes
+    book_id: int
+    data: dict[str, Any] = field(default_factory=dict)
+    user_ids: tuple[int, ...] = ()  # per-user feeds that also receive it
+    book_stream: bool = True  # False for the overflow parts of a split event
+
+    @property
+    def channels(self) -> list[str]:
+        users = [user_channel(u) for u in self.user_ids]
+        return [book_channel(self.book_id), *users] if self.book_stream else users
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "type": self.type,
+            "book_id": self.book_id,
+            "data": self.data,
+            "user_ids": list(self.user_ids),
+            "book_stream": self.book_stream,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any]) -> "Event":
+        return cls(
+            type=raw["type"],
+            book_id=int(raw["book_id"]),
+            data=raw.get("data") or {},
+            user_ids=tuple(int(u) for u in raw.get("user_ids") or ()),
+            book_stream=bool(raw.get("book_stream", True)),
+        )
+
+
+class Subscription:
+    def __init__(self, hub: "EventHub", channels: tuple[str, ...], max_queue: int) -> None:
+        self._hub = hub
+        self.channels = channels
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=max_queue)
+
+    async def get(self) -> Event:
+        return await self._queue.get()
+
+    def close(self) -> None:
+        self._hub._unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _deliver(self, event: Event) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(event)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:  # subscriber's loop already closed
+            pass
+
+    def _put(self, event: Event) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            EVENTS_DROPPED.inc()
+        self._queue.put_nowait(event)
+        EVENTS_DELIVERED.inc()
+
+
+class EventHub:
+    def __init__(self, max_queue: int) -> None:
+        self._max_queue = max_queue
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, *channels: str) -> Subscription:
+        """Must be called from the loop that will consume the events."""
+        subscription = Subscription(self, channels, self._max_queue)
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def publish(self, event: Event) -> int:
+        """Fan the event out to local subscribers; returns how many got it."""
+        with self._lock:
+            targets = {
+                sub for ch in event.channels for sub in self._subscribers.get(ch, ())
+            }
+        for subscription in targets:
+            subscription._deliver(event)
+        return len(targets)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({sub for subs in self._subscribers.values() for sub in subs})
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for channel in subscription.channels:
+                subs = self._subscribers.get(channel)
+                if subs is None:
+                    continue
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[channel]
+
+
+@lru_cache
+def get_event_hub() -> EventHub:
+    hub = EventHub(max_queue=get_settings().EVENT_QUEUE_SIZE)
+    EVENT_SUBSCRIBERS.set_function(hub.subscriber_count)
+    return hub
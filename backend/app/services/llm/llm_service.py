@@ -4,8 +4,14 @@ LLM abstraction layer.
 Swap providers by changing LLM_BACKEND in .env:
   - "ollama"  → Ollama (local, default)
   - "openai"  → OpenAI API
+
+Every call to the backend goes through llm_limiter(), so LLM_MAX_CONCURRENCY
+caps the requests one process has in flight, however many books are being
+summarised at once.
 """
 
+import asyncio
+import weakref
 from abc import ABC, abstractmethod
 
 import httpx
@@ -14,6 +20,21 @@ from app.core.config import get_settings
 
 settings = get_settings()
 
+# One limiter per event loop: a semaphore cannot be shared across loops, and
+# every background task runs on the same one (app/tasks/background.py)
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def llm_limiter() -> asyncio.Semaphore:
+    """The process-wide cap on LLM requests in flight (LLM_MAX_CONCURRENCY)."""
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return limiter
+
 
 # ── Abstract Interface
 
@@ -22,6 +43,11 @@ class LLMService(ABC):
     async def complete(self, system_prompt: str, user_prompt: str, max_tokens: int = 512) -> str:
         """Return the model's text completion."""
 
+    @property
+    def model_id(self) -> str:
+        """Backend and model; part of cached summary keys."""
+        return type(self).__name__
+
 
 # ── Prompt Templates
 
@@ -40,6 +66,19 @@ REVIEW_CONSENSUS_SYSTEM = (
 )
 
 
+CHUNK_SUMMARY_SYSTEM = (
+    "You are a professional librarian reading one section of a longer book. "
+    "Summarise only the section you are given: key events, ideas and characters. "
+    "Keep your summary under 200 words."
+)
+
+REDUCE_SUMMARY_SYSTEM = (
+    "You are a professional librarian. You are given summaries of consecutive "
+    "sections of a book. Merge them into one coherent summary that preserves "
+    "the overall arc, themes and writing style. Keep it under 300 words."
+)
+
+
 def build_summary_prompt(title: str, author: str, content_excerpt: str) -> str:
     return (
         f"Book: '{title}' by {author}\n\n"
@@ -48,6 +87,27 @@ def build_summary_prompt(title: str, author: str, content_excerpt: str) -> str:
     )
 
 
+def build_chunk_summary_prompt(
+    title: str, author: str, chunk: str, index: int, total: int
+) -> str:
+    return (
+        f"Book: '{title}' by {author}\n"
+        f"Section {index + 1} of {total}:\n{chunk}\n\n"
+        "Summarise this section."
+    )
+
+
+def build_reduce_prompt(title: str, author: str, partial_summaries: list[str]) -> str:
+    formatted = "\n\n".join(
+        f"Part {i + 1}:\n{s}" for i, s in enumerate(partial_summaries)
+    )
+    return (
+        f"Book: '{title}' by {author}\n\n"
+        f"Section summaries, in order:\n{formatted}\n\n"
+        "Combine these into a single summary."
+    )
+
+
 def build_review_consensus_prompt(book_title: str, reviews: list[dict]) -> str:
     formatted = "\n".join(
         f"- Rating {r['rating']}/5: {r['body']}" for r in reviews[:30]
@@ -66,6 +126,10 @@ class OllamaLLMService(LLMService):
         self._base_url = settings.OLLAMA_BASE_URL
         self._model = settings.OLLAMA_MODEL
 
+    @property
+    def model_id(self) -> str:
+        return f"ollama:{self._model}"
+
     async def complete(self, system_prompt: str, user_prompt: str, max_tokens: int = 512) -> str:
         async with httpx.AsyncClient(timeout=120) as client:
             resp = await client.post(
@@ -0,0 +1,203 @@
+"""
+Hierarchical (map-reduce) summarisation for long books.
+
+  1. Split the extracted text into token-budgeted chunks.
+  2. MAP    – summarise every chunk concurrently, bounded by LLM_MAX_CONCURRENCY
+              across every summary the process is running (llm_limiter()).
+  3. REDUCE – merge partial summaries SUMMARY_REDUCE_FANOUT at a time, level
+              by level, until a single summary remains.
+
+Every intermediate result is cached on disk under the SHA-256 of its prompt,
+so re-running after a partial failure only calls the LLM for missing pieces.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import uuid
+
+from app.core.config import get_settings
+from app.services.llm.llm_service import (
+    CHUNK_SUMMARY_SYSTEM,
+    REDUCE_SUMMARY_SYSTEM,
+    LLMService,
+    build_chunk_summary_prompt,
+    build_reduce_prompt,
+    llm_limiter,
+)
+
+settings = get_settings()
+
+# Rough heuristic for English prose; avoids pulling in a tokenizer.
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+# ── Chunking
+
+def split_into_chunks(text: str, max_tokens: int) -> list[str]:
+    """
+    Pack paragraphs (then sentences, then hard slices) into chunks of at
+    most max_tokens, keeping natural boundaries wherever possible.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces: list[str] = []
+    for para in _PARAGRAPH_RE.split(text):
+        para = para.strip()
+        if not para:
+            continue
+        if len(para) <= max_chars:
+            pieces.append(para)
+            continue
+        for sentence in _SENTENCE_RE.split(para):
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence:
+                pieces.append(sentence)
+
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for piece in pieces:
+        extra = len(piece) + (2 if current else 0)
+        if current and size + extra > max_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+            extra = len(piece)
+        current.append(piece)
+        size += extra
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+# ── Cache
+
+class SummaryCache:
+    """
+    One small JSON file per intermediate summary, keyed by content hash.
+    get and set block on file I/O; call them off the event loop.
+    """
+
+    def __init__(self, base_path: str | None = None) -> None:
+        self._base = base_path or settings.SUMMARY_CACHE_PATH
+        os.makedirs(self._base, exist_ok=True)
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._base, f"{key}.json")
+
+    def get(self, key: str) -> str | None:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)["summary"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def set(self, key: str, summary: str) -> None:
+        # Write-then-rename so a crash never leaves a truncated entry. The
+        # temp name is the writer's own: workers may write the same key.
+        tmp = f"{self._path(key)}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary}, f)
+        os.replace(tmp, self._path(key))
+
+
+# ── Map-reduce
+
+class MapReduceSummarizer:
+    def __init__(
+        self,
+        llm: LLMService,
+        cache: SummaryCache | None = None,
+        chunk_tokens: int | None = None,
+        fanout: int | None = None,
+        max_concurrency: int | None = None,
+        model_id: str = "",
+    ) -> None:
+        self._llm = llm
+        self._cache = cache or SummaryCache()
+        self._chunk_tokens = chunk_tokens or settings.SUMMARY_CHUNK_TOKENS
+        self._fanout = max(2, fanout or settings.SUMMARY_REDUCE_FANOUT)
+        # A limit of its own, or the process-wide one shared with every other call
+        self._limiter = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        # Part of every cache key so switching models never reuses old output
+        self._model_id = model_id or llm.model_id
+
+    async def summarize(self, title: str, author: str, text: str) -> str:
+        chunks = split_into_chunks(text, self._chunk_tokens)
+        if not chunks:
+            return ""
+        semaphore = self._limiter or llm_limiter()
+
+        total = len(chunks)
+        level = await self._gather(
+            semaphore,
+            [
+                (CHUNK_SUMMARY_SYSTEM, build_chunk_summary_prompt(title, author, c, i, total))
+                for i, c in enumerate(chunks)
+            ],
+            max_tokens=300,
+        )
+        while len(level) > 1:
+            groups = [
+                level[i : i + self._fanout] for i in range(0, len(level), self._fanout)
+            ]
+            level = await self._gather(
+                semaphore,
+                [(REDUCE_SUMMARY_SYSTEM, build_reduce_prompt(title, author, g)) for g in groups],
+                max_tokens=400,
+            )
+        return level[0]
+
+    async def _gather(
+        self,
+        semaphore: asyncio.Semaphore,
+        prompts: list[tuple[str, str]],
+        max_tokens: int,
+    ) -> list[str]:
+        results = await asyncio.gather(
+            *(self._complete_cached(semaphore, s, u, max_tokens) for s, u in prompts),
+            return_exceptions=True,
+        )
+        # Let every sibling finish (and cache) before surfacing a failure.
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results  # type: ignore[return-value]
+
+    async def _complete_cached(
+        self,
+        semaphore: asyncio.Semaphore,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int,
+    ) -> str:
+        key = SummaryCache.key(self._model_id, system_prompt, user_prompt)
+        cached = await asyncio.to_thread(self._cache.get, key)
+        if cached is not None:
+            return cached
+        async with semaphore:
+            summary = await self._llm.complete(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                max_tokens=max_tokens,
+            )
+        await asyncio.to_thread(self._cache.set, key, summary)
+        return summary
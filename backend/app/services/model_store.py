@@ -0,0 +1,123 @@
+"""
+Recommender model artifacts shared by every worker on a host.
+
+A model is published as a generation: a directory of plain .npy arrays and
+a meta.json, written in full before a CURRENT file is pointed at it by
+rename. Readers see either the old generation or the new one, never half a
+write, and switch by re-reading CURRENT; nobody restarts.
+
+Workers open the arrays with np.load(mmap_mode=...), so the pages live once
+in the page cache however many workers map them, and attaching costs no
+build and next to no private memory. Arrays a worker patches in place are
+mapped copy-on-write ("c"): only the pages it touches become its own.
+
+One worker builds at a time: build_lock() takes a non-blocking flock on the
+model directory, and the workers that do not get it keep serving the
+current generation and adopt the new one when it appears.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import numpy as np
+
+_CURRENT = "CURRENT"
+_LOCK = ".build.lock"
+
+
+class Generation(NamedTuple):
+    name: str
+    arrays: dict[str, np.ndarray]
+    meta: dict
+
+
+def current_generation(path: str) -> str | None:
+    try:
+        with open(os.path.join(path, _CURRENT)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_generation(
+    path: str,
+    generation: str | None = None,
+    mmap_mode: Mapping[str, str | None] | str | None = "r",
+) -> Generation | None:
+    """
+    A generation's arrays (default: the live one), memory-mapped. mmap_mode
+    may map array names to modes; names not listed are mapped read-only.
+    A generation pruned while it is being opened is replaced by whatever
+    CURRENT names by then.
+    """
+    generation = generation or current_generation(path)
+    while generation is not None:
+        try:
+            return _open_generation(path, generation, mmap_mode)
+        except FileNotFoundError:
+            # Pruned after CURRENT moved past it: two newer generations exist
+            latest = current_generation(path)
+            if latest == generation:
+                return None
+            generation = latest
+    return None
+
+
+def _open_generation(
+    path: str, generation: str, mmap_mode: Mapping[str, str | None] | str | None
+) -> Generation:
+    directory = os.path.join(path, generation)
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {}
+    for name in meta["arrays"]:
+        mode = mmap_mode.get(name, "r") if isinstance(mmap_mode, Mapping) else mmap_mode
+        arrays[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+    return Generation(generation, arrays, meta)
+
+
+def write_generation(path: str, arrays: Mapping[str, np.ndarray], meta: dict) -> str:
+    """
+    Write a complete generation directory, then point CURRENT at it with a
+    rename. The generation before the previous one is deleted; mapped pages
+    of removed files stay valid for the workers still holding them.
+    """
+    os.makedirs(path, exist_ok=True)
+    name = f"gen-{time.time_ns()}-{os.getpid()}"
+    directory = os.path.join(path, name)
+    os.makedirs(directory)
+    for key, value in arrays.items():
+        np.save(os.path.join(directory, f"{key}.npy"), value)
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({**meta, "arrays": list(arrays)}, f)
+    pointer = os.path.join(path, f"{_CURRENT}.{os.getpid()}.tmp")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(path, _CURRENT))
+
+    generations = sorted(g for g in os.listdir(path) if g.startswith("gen-"))
+    for old in generations[: max(generations.index(name) - 1, 0)]:
+        shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+    return name
+
+
+@contextmanager
+def build_lock(path: str) -> Iterator[bool]:
+    """Yields True to the one process that may build and publish right now."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, _LOCK), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
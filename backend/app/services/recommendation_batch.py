@@ -0,0 +1,323 @@
+"""
+Offline precompute of every active user's recommendations.
+
+Most recommendation traffic arrives in the morning, when everyone opens the
+app at once. This job scores users ahead of time into user_recommendations,
+and build_recommendations serves a stored list while it is younger than
+RECOMMENDER_PRECOMPUTED_MAX_AGE_SECONDS and the user has not borrowed,
+returned or reviewed since (see precomputed_repository.py). Anyone else is
+scored live.
+
+  - Users with at least two borrows (below that the live path answers
+    cold-start) are read in id order, RECOMMENDER_PRECOMPUTE_BLOCK at a
+    time, with one query each for their borrows, affinities and preferences.
+  - A block is scored as a matrix (BookCatalog.recommend_many): one
+    (users × candidate books) array, where the candidates are each genre's
+    head plus the boosted books. Description profiles go through one sparse
+    product (DescriptionIndex.similar_to_many). Co-borrow boosts are summed
+    per user, a few neighbour lists each.
+  - Blocks are scored in a process pool of RECOMMENDER_PRECOMPUTE_WORKERS.
+    Each worker receives the catalog, description index and neighbours once,
+    at start-up; per block only the users' histories travel.
+  - Finished blocks are written in order: one DELETE and one COPY (Postgres)
+    or executemany INSERT, a commit, then the block's last user id goes to
+    RECOMMENDER_PRECOMPUTE_CHECKPOINT_PATH. A rerun after a crash continues
+    after that id, and the file is removed once a run completes.
+
+The scores are the live path's, block for block: same catalog arrays, same
+boosts, same tie-break. Throughput is logged per block and exported as
+recommendation_precompute_users_per_second.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.models.library import Borrow, UserPreferences
+from app.repositories.affinity_repository import GenreAffinityRepository
+from app.repositories.book_repository import BookRepository
+from app.repositories.precomputed_repository import PrecomputedRecommendationRepository
+from app.services.recommendation_catalog import BookCatalog, UserSignals
+from app.services.recommendation_neighbours import ItemNeighbours
+from app.services.recommendation_service import BOOST_CANDIDATES
+from app.services.recommendation_text_index import DescriptionIndex
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+USERS_PER_SECOND = REGISTRY.gauge(
+    "recommendation_precompute_users_per_second", "Throughput of the last precompute run"
+)
+
+
+class UserHistory(NamedTuple):
+    user_id: int
+    borrowed: list[int]
+    genre_weights: dict[str, float]
+    favourite: list[str]
+    disliked: list[str]
+
+
+@dataclass
+class PrecomputeReport:
+    users: int
+    rows: int
+    seconds: float
+    resumed_after: int | None = None
+
+    @property
+    def users_per_second(self) -> float:
+        return self.users / self.seconds if self.seconds else 0.0
+
+
+# ── Scoring (runs in the worker processes)
+
+
+class BlockScorer:
+    """Scores blocks of users against one snapshot of the ranking models."""
+
+    def __init__(
+        self,
+        catalog: BookCatalog,
+        k: int,
+        text_index: DescriptionIndex | None = None,
+        neighbours: ItemNeighbours | None = None,
+        text_weight: float = 0.0,
+        cf_weight: float = 0.0,
+    ) -> None:
+        self._catalog = catalog
+        self._k = k
+        self._text_index = text_index
+        self._neighbours = neighbours
+        self._text_weight = text_weight
+        self._cf_weight = cf_weight
+
+    def __call__(self, block: Sequence[UserHistory]) -> list[tuple[int, list[int]]]:
+        """(user_id, book ids best first) for each user with a genre affinity."""
+        # Without an affinity the live path falls back to top-rated; leave
+        # those users to it
+        block = [user for user in block if user.genre_weights]
+        histories = [user.borrowed for user in block]
+        boosts: list[dict[int, float]] = [{} for _ in block]
+        if self._text_index is not None:
+            matches = self._text_index.similar_to_many(histories, BOOST_CANDIDATES, histories)
+            for boost, user_matches in zip(boosts, matches):
+                for book_id, similarity in user_matches:
+                    boost[book_id] = self._text_weight * similarity
+        if self._neighbours is not None:
+            for boost, history in zip(boosts, histories):
+                for book_id, score in self._neighbours.recommend(
+                    history, BOOST_CANDIDATES, exclude_ids=history
+                ):
+                    boost[book_id] = boost.get(book_id, 0.0) + self._cf_weight * score
+        ranked = self._catalog.recommend_many(
+            [
+                UserSignals(u.genre_weights, u.borrowed, u.favourite, u.disliked, boost)
+                for u, boost in zip(block, boosts)
+            ],
+            self._k,
+        )
+        return [(user.user_id, ids) for user, ids in zip(block, ranked)]
+
+
+_worker_scorer: BlockScorer | None = None
+
+
+def _init_worker(scorer: BlockScorer) -> None:
+    global _worker_scorer
+    _worker_scorer = scorer
+
+
+def _score_in_worker(block: Sequence[UserHistory]) -> list[tuple[int, list[int]]]:
+    return _worker_scorer(block)
+
+
+# ── Inputs
+
+
+async def load_scorer(db: AsyncSession, k: int) -> BlockScorer:
+    """Fresh models of the job's own, so serving singletons are never shared."""
+    version = await BookRepository(db).catalog_version()
+    catalog = BookCatalog()
+    await catalog.ensure_fresh(db, version)
+    text_index = neighbours = None
+    if settings.RECOMMENDER_TEXT_WEIGHT > 0:
+        text_index = DescriptionIndex(
+            path=settings.RECOMMENDER_TEXT_INDEX_PATH,
+            n_features=settings.RECOMMENDER_TEXT_FEATURES,
+        )
+        await text_index.ensure_fresh(db, version)
+    if settings.RECOMMENDER_CF_WEIGHT > 0:
+        neighbours = ItemNeighbours(
+            path=settings.RECOMMENDER_NEIGHBOURS_PATH,
+            n_neighbours=settings.RECOMMENDER_NEIGHBOURS,
+        )
+        await neighbours.ensure_fresh(db, wait=True)
+    return BlockScorer(
+        catalog,
+        k,
+        text_index,
+        neighbours,
+        text_weight=settings.RECOMMENDER_TEXT_WEIGHT,
+        cf_weight=settings.RECOMMENDER_CF_WEIGHT,
+    )
+
+
+async def load_histories(db: AsyncSession, user_ids: Sequence[int]) -> list[UserHistory]:
+    """Borrows, affinities and preferences of a block of users (three queries)."""
+    borrowed: dict[int, list[int]] = {user_id: [] for user_id in user_ids}
+    result = await db.execute(
+        select(Borrow.user_id, Borrow.book_id).where(Borrow.user_id.in_(user_ids))
+    )
+    for user_id, book_id in result.tuples().all():
+        borrowed[user_id].append(book_id)
+    weights = await GenreAffinityRepository(db).weights_many(user_ids)
+    result = await db.execute(
+        select(
+            UserPreferences.user_id,
+            UserPreferences.favourite_genres,
+            UserPreferences.disliked_genres,
+        ).where(UserPreferences.user_id.in_(user_ids))
+    )
+    prefs = {user_id: (fav or [], disliked or []) for user_id, fav, disliked in result.tuples()}
+    return [
+        UserHistory(
+            user_id, borrowed[user_id], weights.get(user_id, {}), *prefs.get(user_id, ([], []))
+        )
+        for user_id in user_ids
+    ]
+
+
+# ── Checkpoints
+
+
+def _read_checkpoint(path: str | None) -> dict | None:
+    """The unfinished run to resume, if its rows are still young enough to serve."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    started = datetime.fromisoformat(checkpoint["started_at"])
+    max_age = timedelta(seconds=settings.RECOMMENDER_PRECOMPUTED_MAX_AGE_SECONDS)
+    return checkpoint if datetime.now(timezone.utc) - started < max_age else None
+
+
+def _write_checkpoint(path: str | None, checkpoint: dict) -> None:
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def _remove_checkpoint(path: str | None) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+# ── The job
+
+
+async def precompute_recommendations(
+    db: AsyncSession,
+    *,
+    k: int | None = None,
+    block_size: int | None = None,
+    workers: int | None = None,
+    checkpoint_path: str | None = None,
+) -> PrecomputeReport:
+    """Score every active user with two or more borrows and store their top k."""
+    k = k or settings.RECOMMENDER_PRECOMPUTED_K
+    block_size = block_size or settings.RECOMMENDER_PRECOMPUTE_BLOCK
+    if workers is None:
+        workers = settings.RECOMMENDER_PRECOMPUTE_WORKERS
+    workers = workers or os.cpu_count() or 1
+    if checkpoint_path is None:
+        checkpoint_path = settings.RECOMMENDER_PRECOMPUTE_CHECKPOINT_PATH
+
+    checkpoint = _read_checkpoint(checkpoint_path)
+    resumed_after = checkpoint["last_user_id"] if checkpoint else None
+    if checkpoint is None:
+        checkpoint = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "last_user_id": 0,
+            "users": 0,
+        }
+    else:
+        logger.info("precompute resuming after user %s", resumed_after)
+
+    scorer = await load_scorer(db, k)
+    repo = PrecomputedRecommendationRepository(db)
+    loop = asyncio.get_running_loop()
+    pool: Executor | None = None
+    if workers > 1:
+        # spawn: the parent runs an event loop and driver threads, which a
+        # forked child would inherit mid-flight
+        pool = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(scorer,),
+        )
+
+    users = rows = 0
+    start = time.perf_counter()
+    after = checkpoint["last_user_id"]
+    # Blocks in flight, oldest first, so checkpoints only ever move forward.
+    # One more than there are workers, so the next block is read while they score
+    pending: deque[tuple[asyncio.Future, list[int], datetime]] = deque()
+    try:
+        while True:
+            user_ids = await repo.users_after(after, block_size)
+            if user_ids:
+                after = user_ids[-1]
+                # Stamped before the inputs are read: an event landing while
+                # the block is scored makes its lists stale, not wrong
+                computed_at = datetime.now(timezone.utc)
+                block = await load_histories(db, user_ids)
+                if pool is not None:
+                    scored = loop.run_in_executor(pool, _score_in_worker, block)
+                else:
+                    scored = asyncio.ensure_future(asyncio.to_thread(scorer, block))
+                pending.append((scored, user_ids, computed_at))
+            while pending and (not user_ids or len(pending) > workers):
+                scored, block_ids, computed_at = pending.popleft()
+                rows += await repo.replace(block_ids, await scored, computed_at)
+                await db.commit()
+                users += len(block_ids)
+                checkpoint["last_user_id"] = block_ids[-1]
+                checkpoint["users"] += len(block_ids)
+                _write_checkpoint(checkpoint_path, checkpoint)
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    "precompute: %s users (%.0f users/s), through user %s",
+                    checkpoint["users"], users / elapsed if elapsed else 0.0, block_ids[-1],
+                )
+            if not user_ids:
+                break
+    finally:
+        for scored, _, _ in pending:
+            scored.cancel()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    _remove_checkpoint(checkpoint_path)
+    report = PrecomputeReport(users, rows, time.perf_counter() - start, resumed_after)
+    USERS_PER_SECOND.set(report.users_per_second)
+    return report
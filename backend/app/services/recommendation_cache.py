@@ -0,0 +1,290 @@
+"""
+Per-user cache of rendered GET /recommendations responses.
+
+A user's recommendations only change when the catalog's content changes or
+when the user borrows, returns or reviews. Each entry holds the encoded
+JSON body, the user's activity stamp (users.activity_at, moved by their own
+borrows, returns and reviews) and the content catalog version it was
+computed at (BookRepository.catalog_version(), which other users' borrows
+leave alone), so a hit costs two queries and no scoring or hydration:
+
+  - other activity stamp → recomputed inline: the user acted, maybe on
+                           another worker
+  - same catalog version → served as is
+  - older version        → served, and a background task recomputes it
+                           (stale-while-revalidate), so hot users never wait
+  - older than RECOMMENDER_CACHE_MAX_STALE_SECONDS, or invalidated
+                         → recomputed inline
+
+Both validators live in the database, so every worker sees a write the
+moment it commits. Updating or deleting a book additionally drops every
+entry listing it, in this worker at once and in the others through the
+event broker (broadcast_book_change, once the change has committed),
+instead of serving a list with the old book until the next refresh.
+
+A new book only moves the catalog version, which makes entries stale
+rather than wrong.
+
+Cold-start lists are the exception: they rank what everyone has been
+borrowing and reviewing lately, which neither validator sees. Such an entry
+also records the trending window it was computed in (wall-clock intervals of
+RECOMMENDER_TRENDING_REFRESH_SECONDS, the same on every worker) and goes
+stale, like an older version, once the window moves.
+
+A recompute that started before an invalidation is not stored (each user
+has an epoch, bumped on invalidation), so a slow refresh cannot put back
+what a borrow just dropped.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.core.principal_cache import Principal
+from app.core.responses import serialize
+from app.models.user import User
+from app.repositories.book_repository import BookRepository, CatalogVersion
+from app.repositories.user_repository import UserRepository
+from app.schemas.books import RecommendationResponse
+from app.services.events.broker import get_event_broker
+from app.services.events.hub import Event
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "recommendation_cache_requests_total", "Recommendation cache lookups by result"
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "recommendation_cache_hit_ratio", "Share of lookups served from the cache (fresh or stale)"
+)
+CACHE_ENTRIES = REGISTRY.gauge("recommendation_cache_entries", "Cached recommendation lists")
+RECOMPUTE_SECONDS = REGISTRY.summary(
+    "recommendation_recompute_seconds", "Time to compute and render one user's recommendations"
+)
+
+# Broker event telling every worker to drop the lists that show a book
+BOOK_CHANGED_EVENT = "recommendations_book_changed"
+
+
+@dataclass(frozen=True, slots=True)
+class CachedRecommendations:
+    activity_at: datetime | None
+    version: CatalogVersion
+    body: bytes
+    book_ids: frozenset[int]
+    computed_at: float
+    # The trending window a cold-start list was computed in; None otherwise
+    trending_window: int | None = None
+
+
+def trending_window(now: float | None = None) -> int:
+    """The current RECOMMENDER_TRENDING_REFRESH_SECONDS interval of the wall clock."""
+    now = time.time() if now is None else now
+    return int(now // get_settings().RECOMMENDER_TRENDING_REFRESH_SECONDS)
+
+
+class RecommendationCache:
+    def __init__(
+        self,
+        max_entries: int,
+        max_stale_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_entries = max_entries
+        self._max_stale = max_stale_seconds
+        self._clock = clock
+        self._entries: OrderedDict[int, CachedRecommendations] = OrderedDict()
+        self._epochs: dict[int, int] = {}
+        self._era = 0
+        self._refreshing: set[int] = set()
+        self._lookups = {"hit": 0, "stale": 0, "miss": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0
+
+    def get(
+        self,
+        user_id: int,
+        activity_at: datetime | None,
+        version: CatalogVersion,
+        window: int | None = None,
+    ) -> CachedRecommendations | None:
+        """The entry to serve for these validators; stale ones need a refresh."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.activity_at != activity_at:
+                result, entry = "miss", None
+            elif entry.version == version and entry.trending_window in (None, window):
+                result = "hit"
+            elif self._clock() - entry.computed_at <= self._max_stale:
+                result = "stale"
+            else:
+                result, entry = "miss", None
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+            self._lookups[result] += 1
+        CACHE_REQUESTS.inc(result=result)
+        return entry
+
+    def ticket(self, user_id: int) -> tuple[int, int]:
+        """Take before computing; set() ignores results older than an invalidation."""
+        with self._lock:
+            return self._era, self._epochs.get(user_id, 0)
+
+    def set(self, user_id: int, ticket: tuple[int, int], entry: CachedRecommendations) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if ticket != (self._era, self._epochs.get(user_id, 0)):
+                return
+            current = self._entries.get(user_id)
+            if (
+                current is not None
+                and current.activity_at == entry.activity_at
+                and current.version > entry.version
+            ):
+                return
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """The user borrowed, returned or reviewed: recompute on the next request."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._epochs[user_id] = self._epochs.get(user_id, 0) + 1
+            if len(self._epochs) > 4 * self._max_entries:
+                # Start a new era instead of keeping an epoch for every user
+                # ever seen; computes in flight are simply not stored
+                self._epochs.clear()
+                self._era += 1
+
+    def invalidate_book(self, book_id: int) -> None:
+        """The book changed or is gone: drop every list that shows it."""
+        with self._lock:
+            for user_id in [u for u, e in self._entries.items() if book_id in e.book_ids]:
+                del self._entries[user_id]
+
+    def begin_refresh(self, user_id: int) -> bool:
+        """False if a refresh for this user is already running."""
+        with self._lock:
+            if user_id in self._refreshing:
+                return False
+            self._refreshing.add(user_id)
+            return True
+
+    def end_refresh(self, user_id: int) -> None:
+        with self._lock:
+            self._refreshing.discard(user_id)
+
+    def hit_ratio(self) -> float:
+        total = sum(self._lookups.values())
+        return (self._lookups["hit"] + self._lookups["stale"]) / total if total else 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._epochs.clear()
+            self._refreshing.clear()
+            self._lookups = dict.fromkeys(self._lookups, 0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+async def compute_recommendations(
+    user: User | Principal,
+    db: AsyncSession,
+    activity_at: datetime | None,
+    version: CatalogVersion,
+    mode: str = "inline",
+) -> CachedRecommendations:
+    """Build, render and cache the user's recommendations at these validators."""
+    from app.services.recommendation_service import (
+        COLD_START_STRATEGIES,
+        build_recommendations,
+    )
+
+    cache = get_recommendation_cache()
+    ticket = cache.ticket(user.id)
+    start = time.perf_counter()
+    books, strategy = await build_recommendations(user, db, catalog_version=version)
+    await BookRepository(db).load_ai_content(books)
+    body = serialize(RecommendationResponse, {"books": books, "strategy": strategy})
+    RECOMPUTE_SECONDS.observe(time.perf_counter() - start, mode=mode)
+
+    entry = CachedRecommendations(
+        activity_at,
+        version,
+        body,
+        frozenset(book.id for book in books),
+        time.monotonic(),
+        trending_window() if strategy in COLD_START_STRATEGIES else None,
+    )
+    cache.set(user.id, ticket, entry)
+    return entry
+
+
+async def refresh_recommendations(
+    user: User | Principal, bind: AsyncEngine | AsyncConnection
+) -> None:
+    """Background recompute of a stale entry, on its own session."""
+    cache = get_recommendation_cache()
+    if not cache.begin_refresh(user.id):
+        return
+    try:
+        async with AsyncSession(bind, expire_on_commit=False) as db:
+            activity_at = await UserRepository(db).activity_at(user.id)
+            version = await BookRepository(db).catalog_version()
+            await compute_recommendations(user, db, activity_at, version, mode="background")
+    except Exception:
+        logger.exception("refreshing recommendations for user %s failed", user.id)
+    finally:
+        cache.end_refresh(user.id)
+
+
+async def broadcast_book_change(bind: AsyncEngine | AsyncConnection, book_id: int) -> None:
+    """
+    Drop the lists showing the book here, then in every other worker
+    through the event broker. Run it after the change commits (endpoints
+    add it as a background task), or a recompute could cache the old row
+    again. Best effort, like publish_book_event: the catalog version still
+    marks those lists stale if the publish fails.
+    """
+    get_recommendation_cache().invalidate_book(book_id)
+    try:
+        event = Event(type=BOOK_CHANGED_EVENT, book_id=book_id, book_stream=False)
+        await get_event_broker().publish(bind, event)
+    except Exception:
+        logger.exception("broadcasting the change of book %s failed", book_id)
+
+
+def on_book_changed(event: Event) -> None:
+    """Broker handler for BOOK_CHANGED_EVENT, registered by each API worker."""
+    get_recommendation_cache().invalidate_book(event.book_id)
+
+
+@lru_cache
+def get_recommendation_cache() -> RecommendationCache:
+    settings = get_settings()
+    cache = RecommendationCache(
+        max_entries=settings.RECOMMENDER_CACHE_MAX_ENTRIES,
+        max_stale_seconds=settings.RECOMMENDER_CACHE_MAX_STALE_SECONDS,
+    )
+    CACHE_HIT_RATIO.set_function(cache.hit_ratio)
+    CACHE_ENTRIES.set_function(cache.__len__)
+    return cache
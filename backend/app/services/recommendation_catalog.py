@@ -0,0 +1,563 @@
+"""
+Columnar in-memory catalog for the recommender.
+
+Every book is one slot in a set of parallel NumPy arrays (id, genre code,
+rating, sentiment, availability), a few dozen bytes per book instead of a
+full ORM object. Scoring a user is one vectorised pass:
+
+    score = genre_vector[genre_code] + 0.1 * rating + 0.1 * sentiment
+
+where genre_vector already folds in the user's genre weights and the
+favourite / disliked boosts, so those masks cost one gather instead of a
+comparison per book. np.argpartition picks the top-k in O(n); only those k
+rows are then loaded from the database. recommend_many scores a block of
+users at once: their genre vectors stack into one (users × books) gather.
+
+Freshness: writes to books bump the catalog version (see app/models/book.py).
+When the version moves, only rows with updated_at past the last watermark
+are re-read and patched in place. A deleted book leaves no row to read: the
+deleting worker drops it directly, other workers drop it when hydration
+cannot find it, and RECOMMENDER_CATALOG_TTL_SECONDS bounds the rest with a
+full reload.
+
+Sharing: with RECOMMENDER_CATALOG_PATH set, the full reload is done by one
+worker at a time (model_store.build_lock), which publishes the arrays as a
+generation; every worker maps the current one copy-on-write. Ids are kept
+sorted, so an id is found by binary search rather than a per-worker dict,
+and a generation carries spare slots for books added after it. Patching a
+few books then dirties a few pages, and a worker costs little more than the
+page cache it shares with the others.
+"""
+
+import asyncio
+import time
+from operator import itemgetter
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.base import as_utc
+from app.models.book import Book, BookStatus
+from app.repositories.book_repository import (
+    WATERMARK_LOOKBACK,
+    BookRepository,
+    CatalogVersion,
+)
+from app.services.model_store import (
+    Generation,
+    build_lock,
+    current_generation,
+    read_generation,
+    write_generation,
+)
+
+settings = get_settings()
+
+RATING_WEIGHT = 0.1
+SENTIMENT_WEIGHT = 0.1
+FAVOURITE_BOOST = 0.5
+DISLIKED_PENALTY = 0.5
+
+_NO_GENRE = -1
+# Far above the float64 rounding of a score, far below any real difference
+_ROUNDING_MARGIN = 1e-9
+_RELOAD_BATCH = 10_000
+_COLUMNS = ("ids", "genre_codes", "ratings", "sentiments", "available", "alive")
+# Spare slots a published generation carries for books added after it
+_MIN_SPARE = 1_024
+_SPARE_FRACTION = 0.1
+
+_CATALOG_COLUMNS = (
+    Book.id,
+    Book.genre,
+    Book.average_rating,
+    Book.average_sentiment,
+    Book.status,
+    Book.updated_at,
+)
+
+
+class UserSignals(NamedTuple):
+    """One user's inputs to BookCatalog.recommend, for scoring users in blocks."""
+
+    genre_weights: dict[str, float]
+    exclude_ids: Sequence[int] = ()
+    favourite: Sequence[str] = ()
+    disliked: Sequence[str] = ()
+    boosts: Mapping[int, float] | None = None
+
+
+def genre_affinity(
+    genre_weights: dict[str, float],
+    favourite: Iterable[str] = (),
+    disliked: Iterable[str] = (),
+) -> dict[str, float]:
+    """The genre part of a user's score: learned weight ± explicit preferences."""
+    affinity = dict(genre_weights)
+    for genre in favourite:
+        affinity[genre] = affinity.get(genre, 0.0) + FAVOURITE_BOOST
+    for genre in disliked:
+        affinity[genre] = affinity.get(genre, 0.0) - DISLIKED_PENALTY
+    return affinity
+
+
+def top_k_indices(
+    ids: np.ndarray, scores: np.ndarray, candidates: np.ndarray, k: int
+) -> np.ndarray:
+    """Positions of the k best-scoring candidates, best first (ties: lower id)."""
+    if k <= 0 or candidates.size == 0:
+        return candidates[:0]
+    candidate_scores = scores[candidates]
+    if candidates.size > k:
+        # argpartition splits ties at the k-th score arbitrarily; keep
+        # every tied candidate so the id tie-break below decides
+        kth = -np.partition(-candidate_scores, k - 1)[k - 1]
+        keep = candidate_scores >= kth
+        candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+    order = np.lexsort((ids[candidates], -candidate_scores))[:k]
+    return candidates[order]
+
+
+class BookCatalog:
+    def __init__(self, ttl_seconds: float = 600.0, path: str | None = None) -> None:
+        self._ttl = ttl_seconds
+        self._path = path or None
+        self._lock = asyncio.Lock()
+        self.version: CatalogVersion | None = None
+        self._loaded_at: float | None = None
+        self._watermark: datetime | None = None
+        self._generation: str | None = None
+        self._reset(capacity=0)
+
+    def _reset(self, capacity: int) -> None:
+        self._size = 0
+        self._live = 0
+        # Slots [0, _sorted) hold ascending ids; later appends go in _appended
+        self._sorted = 0
+        self._appended: dict[int, int] = {}
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.genre_codes = np.full(capacity, _NO_GENRE, dtype=np.int32)
+        self.ratings = np.zeros(capacity, dtype=np.float64)
+        self.sentiments = np.zeros(capacity, dtype=np.float64)
+        self.available = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.genres: list[str] = []
+        self._genre_code: dict[str, int] = {}
+        self._changed()
+
+    def _changed(self) -> None:
+        # Per-genre order for recommend_many, rebuilt on next use
+        self._by_genre: tuple | None = None
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in _COLUMNS)
+
+    # ── Loading
+
+    def build(self, rows: Iterable[Sequence], version: CatalogVersion | None = None) -> None:
+        """Bulk load from (id, genre, rating, sentiment, status[, updated_at]) rows."""
+        rows = sorted(rows, key=itemgetter(0))
+        n = len(rows)
+        self._reset(capacity=n)
+        self._watermark = None
+        self._generation = None
+        if n:
+            self._size = self._live = self._sorted = n
+            self.ids[:] = np.fromiter((r[0] for r in rows), np.int64, n)
+            self.genre_codes[:] = np.fromiter((self._code_for(r[1]) for r in rows), np.int32, n)
+            self.ratings[:] = np.fromiter((r[2] or 0.0 for r in rows), np.float64, n)
+            self.sentiments[:] = np.fromiter((r[3] or 0.0 for r in rows), np.float64, n)
+            self.available[:] = np.fromiter(
+                (r[4] == BookStatus.AVAILABLE for r in rows), bool, n
+            )
+            self.alive[:] = True
+            stamps = [r[5] for r in rows if len(r) > 5 and r[5] is not None]
+            if stamps:
+                self._watermark = as_utc(max(stamps))
+        self.version = version
+        self._loaded_at = time.monotonic()
+
+    def upsert_many(self, rows: Iterable[Sequence]) -> None:
+        rows = list(rows)
+        slots = self._slots([r[0] for r in rows], live_only=False)
+        for row, slot in zip(rows, slots.tolist()):
+            book_id, genre, rating, sentiment, status = row[:5]
+            if slot < 0:
+                # Appended by an earlier row of this batch, or new
+                slot = self._appended.get(book_id)
+                if slot is None:
+                    slot = self._append_slot(book_id)
+            elif not self.alive[slot]:
+                self.alive[slot] = True
+                self._live += 1
+            self.genre_codes[slot] = self._code_for(genre)
+            self.ratings[slot] = rating or 0.0
+            self.sentiments[slot] = sentiment or 0.0
+            self.available[slot] = status == BookStatus.AVAILABLE
+            if len(row) > 5 and row[5] is not None:
+                stamp = as_utc(row[5])
+                if self._watermark is None or stamp > self._watermark:
+                    self._watermark = stamp
+        self._changed()
+
+    def remove(self, book_id: int) -> None:
+        slot = int(self._slots([book_id])[0])
+        if slot >= 0:
+            self.alive[slot] = False
+            self._live -= 1
+            self._changed()
+
+    def _code_for(self, genre: str | None) -> int:
+        if not genre:
+            return _NO_GENRE
+        code = self._genre_code.get(genre)
+        if code is None:
+            code = self._genre_code[genre] = len(self.genres)
+            self.genres.append(genre)
+        return code
+
+    def _append_slot(self, book_id: int) -> int:
+        if self._size == len(self.ids):
+            self._grow(max(16, 2 * len(self.ids)))
+        slot = self._size
+        self._size += 1
+        self._live += 1
+        self.ids[slot] = book_id
+        self.alive[slot] = True
+        self._appended[book_id] = slot
+        return slot
+
+    def _slots(self, book_ids: Iterable[int], live_only: bool = True) -> np.ndarray:
+        """Slot of each id, -1 for ids not in the catalog (or removed from it)."""
+        wanted = np.fromiter(book_ids, np.int64)
+        slots = np.full(len(wanted), -1, dtype=np.int64)
+        if self._sorted and len(wanted):
+            ids = self.ids[: self._sorted]
+            found = np.minimum(np.searchsorted(ids, wanted), self._sorted - 1)
+            hit = ids[found] == wanted
+            slots[hit] = found[hit]
+        if self._appended:
+            for i in np.flatnonzero(slots < 0).tolist():
+                slots[i] = self._appended.get(int(wanted[i]), -1)
+        if live_only:
+            known = np.flatnonzero(slots >= 0)
+            slots[known[~self.alive[slots[known]]]] = -1
+        return slots
+
+    def _grow(self, capacity: int) -> None:
+        for name in _COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            if name == "genre_codes":
+                new[:] = _NO_GENRE
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def clear(self) -> None:
+        self._reset(capacity=0)
+        self.version = self._loaded_at = self._watermark = self._generation = None
+
+    # ── Sharing
+
+    def _snapshot(self) -> tuple[dict, dict]:
+        # Only taken right after a full reload: every slot is sorted and alive
+        n = self._size
+        capacity = n + max(_MIN_SPARE, int(n * _SPARE_FRACTION))
+        arrays = {}
+        for name in _COLUMNS:
+            old = getattr(self, name)
+            arrays[name] = np.full(capacity, _NO_GENRE if name == "genre_codes" else 0, old.dtype)
+            arrays[name][:n] = old[:n]
+        meta = {
+            "size": n,
+            "live": self._live,
+            "genres": self.genres,
+            "watermark": self._watermark.isoformat() if self._watermark else "",
+            "built_at": time.time(),
+        }
+        return arrays, meta
+
+    def _restore(self, saved: Generation) -> None:
+        meta = saved.meta
+        self._reset(capacity=0)
+        for name in _COLUMNS:
+            setattr(self, name, saved.arrays[name])
+        self._size = self._sorted = meta["size"]
+        self._live = meta["live"]
+        self.genres = list(meta["genres"])
+        self._genre_code = {genre: code for code, genre in enumerate(self.genres)}
+        watermark = meta["watermark"]
+        self._watermark = datetime.fromisoformat(watermark) if watermark else None
+        # Age from the build, so workers adopting it late still expire together
+        self._loaded_at = time.monotonic() - max(0.0, time.time() - meta["built_at"])
+        self._generation = saved.name
+
+    def save(self, path: str) -> None:
+        generation = write_generation(path, *self._snapshot())
+        self._restore(read_generation(path, generation, "c"))
+
+    async def _publish(self) -> None:
+        generation = await asyncio.to_thread(write_generation, self._path, *self._snapshot())
+        # Copy-on-write: patches stay private to the worker making them
+        saved = await asyncio.to_thread(read_generation, self._path, generation, "c")
+        self._restore(saved)
+
+    # ── Freshness
+
+    def _is_fresh(self, version: CatalogVersion) -> bool:
+        return (
+            self._loaded_at is not None
+            and version == self.version
+            and time.monotonic() - self._loaded_at < self._ttl
+        )
+
+    def _expired(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at >= self._ttl
+            or self._watermark is None
+        )
+
+    async def ensure_fresh(self, db: AsyncSession, version: CatalogVersion | None = None) -> None:
+        if version is None:
+            version = await BookRepository(db).catalog_version()
+        if self._is_fresh(version):
+            return
+        async with self._lock:
+            if self._is_fresh(version):
+                return
+            if self._path:
+                await self._adopt_published()
+            if not self._expired():
+                await self._apply_changes(db)
+            elif not self._path:
+                await self._reload(db)
+            else:
+                await self._rebuild_shared(db)
+            self.version = version
+
+    async def _adopt_published(self) -> None:
+        current = await asyncio.to_thread(current_generation, self._path)
+        if current and current != self._generation:
+            saved = await asyncio.to_thread(read_generation, self._path, current, "c")
+            if saved is not None:
+                self._restore(saved)
+
+    async def _rebuild_shared(self, db: AsyncSession) -> None:
+        with build_lock(self._path) as builder:
+            if builder:
+                # The last builder may have published since CURRENT was read
+                await self._adopt_published()
+                if self._expired():
+                    await self._reload(db)
+                    await self._publish()
+                    return
+        if self._watermark is None:
+            await self._reload(db)
+        else:
+            # Someone else is rebuilding: patch what we have and adopt theirs
+            # at the next check
+            await self._apply_changes(db)
+            self._loaded_at = time.monotonic()
+
+    async def _reload(self, db: AsyncSession) -> None:
+        # Streamed in partitions so other requests on this loop interleave
+        rows: list = []
+        result = await db.stream(
+            select(*_CATALOG_COLUMNS)
+            .order_by(Book.id)
+            .execution_options(yield_per=_RELOAD_BATCH)
+        )
+        async for partition in result.partitions():
+            rows.extend(partition)
+        # Built off the loop into a fresh catalog, then swapped in whole, so
+        # requests scoring meanwhile see the old arrays or the new, never a mix
+        fresh = BookCatalog()
+        await asyncio.to_thread(fresh.build, rows, self.version)
+        self._take(fresh)
+
+    def _take(self, other: "BookCatalog") -> None:
+        own = ("_ttl", "_path", "_lock")
+        vars(self).update({k: v for k, v in vars(other).items() if k not in own})
+
+    async def _apply_changes(self, db: AsyncSession) -> None:
+        since = self._watermark - WATERMARK_LOOKBACK
+        changed = await db.execute(select(*_CATALOG_COLUMNS).where(Book.updated_at >= since))
+        self.upsert_many(changed.all())
+
+    # ── Scoring
+
+    def genre_vector(
+        self,
+        genre_weights: dict[str, float],
+        favourite: Iterable[str] = (),
+        disliked: Iterable[str] = (),
+    ) -> np.ndarray:
+        """Per-genre score; the last slot is for books without a genre."""
+        vector = np.zeros(len(self.genres) + 1, dtype=np.float64)
+        for genre, weight in genre_affinity(genre_weights, favourite, disliked).items():
+            code = self._genre_code.get(genre)
+            if code is not None:
+                vector[code] = weight
+        return vector
+
+    def candidate_mask(self, exclude_ids: Iterable[int] = (), available_only: bool = False):
+        mask = self.alive[: self._size].copy()
+        if available_only:
+            mask &= self.available[: self._size]
+        slots = self._slots(exclude_ids)
+        mask[slots[slots >= 0]] = False
+        return mask
+
+    def scores(self, genre_vector: np.ndarray) -> np.ndarray:
+        """One score per book; a (users × genres) input gives a row per user."""
+        n = self._size
+        # _NO_GENRE (-1) indexes the trailing no-genre slot
+        return (
+            genre_vector[..., self.genre_codes[:n]]
+            + RATING_WEIGHT * self.ratings[:n]
+            + SENTIMENT_WEIGHT * self.sentiments[:n]
+        )
+
+    def top_k(self, scores: np.ndarray, mask: np.ndarray, k: int) -> list[int]:
+        """Ids of the k best-scoring candidates, best first (ties: lower id)."""
+        slots = top_k_indices(self.ids[: self._size], scores, np.flatnonzero(mask), k)
+        return self.ids[slots].tolist()
+
+    def recommend(
+        self,
+        genre_weights: dict[str, float],
+        k: int,
+        exclude_ids: Iterable[int] = (),
+        favourite: Iterable[str] = (),
+        disliked: Iterable[str] = (),
+        boosts: Mapping[int, float] | None = None,
+    ) -> list[int]:
+        """boosts adds a per-book term (e.g. description similarity) to the score."""
+        vector = self.genre_vector(genre_weights, favourite, disliked)
+        scores = self.scores(vector)
+        self._add_boosts(scores, boosts)
+        return self.top_k(scores, self.candidate_mask(exclude_ids), k)
+
+    def recommend_many(self, users: Sequence[UserSignals], k: int) -> list[list[int]]:
+        """
+        recommend() for a block of users, with the same results.
+
+        A score is the genre's weight plus a per-book term, so within a genre
+        books rank the same way for every user. Only the head of each genre
+        (k books, plus the most any user of the block excludes from it) and
+        the boosted books can make a top k, and the block is scored as one
+        (users × those books) matrix.
+        """
+        if k <= 0 or any(w < 0 for u in users if u.boosts for w in u.boosts.values()):
+            # A negative boost could sink a genre's head below the rest
+            return [
+                self.recommend(
+                    u.genre_weights, k, u.exclude_ids, u.favourite, u.disliked, u.boosts
+                )
+                for u in users
+            ]
+        if not users:
+            return []
+        excluded = []
+        for user in users:
+            slots = self._slots(user.exclude_ids)
+            excluded.append(slots[slots >= 0])
+        # Counted per genre code + 1, so books without a genre land in column 0
+        per_genre = np.zeros(len(self.genres) + 1, dtype=np.int64)
+        for slots in excluded:
+            np.maximum(
+                per_genre,
+                np.bincount(self.genre_codes[slots] + 1, minlength=len(per_genre)),
+                out=per_genre,
+            )
+        columns = [self._genre_heads(k, per_genre)]
+        boosted = [self._boost_slots(user.boosts) for user in users]
+        columns.extend(slots for slots, _ in boosted)
+        candidates = np.unique(np.concatenate(columns))
+        position = np.full(self._size, -1, dtype=np.int64)
+        position[candidates] = np.arange(len(candidates))
+
+        vectors = np.stack(
+            [self.genre_vector(u.genre_weights, u.favourite, u.disliked) for u in users]
+        )
+        # Same terms in the same order as scores(), so the values match exactly
+        scores = (
+            vectors[:, self.genre_codes[candidates]]
+            + RATING_WEIGHT * self.ratings[candidates]
+            + SENTIMENT_WEIGHT * self.sentiments[candidates]
+        )
+        ids = self.ids[candidates]
+        ranked = []
+        for row, (hit_slots, weights), slots in zip(scores, boosted, excluded):
+            row[position[hit_slots]] += weights
+            allowed = np.ones(len(candidates), dtype=bool)
+            allowed[position[slots][position[slots] >= 0]] = False
+            best = top_k_indices(ids, row, np.flatnonzero(allowed), k)
+            ranked.append(ids[best].tolist())
+        return ranked
+
+    def _genre_heads(self, k: int, extra: np.ndarray) -> np.ndarray:
+        """Slots of each genre's best k + extra[code + 1] books by rating/sentiment term."""
+        if self._by_genre is None:
+            slots = np.flatnonzero(self.alive[: self._size])
+            term = RATING_WEIGHT * self.ratings[slots] + SENTIMENT_WEIGHT * self.sentiments[slots]
+            codes = self.genre_codes[slots]
+            order = np.lexsort((self.ids[slots], -term, codes))
+            codes = codes[order]
+            starts = np.flatnonzero(np.diff(codes, prepend=codes[:1] - 1))
+            ends = np.r_[starts[1:], len(codes)]
+            self._by_genre = (slots[order], term[order], codes[starts], starts, ends)
+        slots, term, codes, starts, ends = self._by_genre
+        heads = []
+        for code, start, end in zip(codes.tolist(), starts.tolist(), ends.tolist()):
+            last = start + min(end - start, k + int(extra[code + 1])) - 1
+            # Keep books whose term is within rounding of the last one: sums
+            # that close may round to the same score and then tie-break by id
+            floor = term[last] - _ROUNDING_MARGIN
+            stop = start + int(np.searchsorted(-term[start:end], -floor, side="right"))
+            heads.append(slots[start:stop])
+        return np.concatenate(heads) if heads else np.zeros(0, dtype=np.int64)
+
+    def _add_boosts(self, scores: np.ndarray, boosts: Mapping[int, float] | None) -> None:
+        slots, weights = self._boost_slots(boosts)
+        scores[slots] += weights
+
+    def _boost_slots(
+        self, boosts: Mapping[int, float] | None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """(slots, weights) of the boosted books present in the catalog."""
+        boosts = boosts or {}
+        slots = self._slots(boosts)
+        weights = np.fromiter(boosts.values(), np.float64, len(boosts))
+        hit = slots >= 0
+        return slots[hit], weights[hit]
+
+    def top_rated(self, k: int, exclude_ids: Iterable[int] = ()) -> list[int]:
+        return self.top_k(self.ratings[: self._size], self.candidate_mask(exclude_ids), k)
+
+
+async def build_catalog_file(db: AsyncSession, path: str | None = None) -> int:
+    """Reload every book and publish a new generation; returns the books loaded."""
+    catalog = BookCatalog()
+    await catalog._reload(db)
+    await asyncio.to_thread(catalog.save, path or settings.RECOMMENDER_CATALOG_PATH)
+    return len(catalog)
+
+
+@lru_cache
+def get_book_catalog() -> BookCatalog:
+    return BookCatalog(
+        ttl_seconds=settings.RECOMMENDER_CATALOG_TTL_SECONDS,
+        path=settings.RECOMMENDER_CATALOG_PATH,
+    )
@@ -0,0 +1,535 @@
+"""
+Item-item collaborative filtering from co-borrows.
+
+Every borrow is an interaction of strength 1.0; a review replaces it with
+1 + (rating - 3) / 2.5, so 1★ counts 0.2 and 5★ counts 1.8. Interactions
+form a sparse user × book matrix, read from the database in streamed
+chunks. Two books are similar when the same readers took them: the cosine
+between their columns. Only the top-N neighbours of each book are kept, in
+two fixed-width arrays (book × N neighbour column, book × N similarity).
+
+Similarities come from a blocked sparse product: a block of columns times
+the whole matrix gives block × n_books dot products, scaled into cosines by
+the column norms the model keeps; each row's top N is kept and the block is
+discarded, so memory is bounded by the block size instead of n_books². An
+update only rescales the block it recomputes, never the whole matrix.
+
+A request sums the neighbour lists of the user's history: O(history × N).
+
+Freshness: build_item_neighbours (app/tasks/background.py) runs the full
+build nightly and publishes it to RECOMMENDER_NEIGHBOURS_PATH as a
+model_store generation, which every worker maps read-only. In between, the
+worker holding the build lock folds in borrows and reviews whose id is past
+the model's watermark and publishes the result; the others adopt it. The
+books involved and the histories of their readers get their neighbour rows
+recomputed; other books' lists pick up the change at the next full build.
+
+Ids are taken at insert but become visible at commit, so a row can commit
+below a watermark already read past. Each catch-up re-reads the last
+_ID_LOOKBACK ids of each table; folding an interaction in twice changes
+nothing. A model is never fitted inside a request: until one is published,
+a fit runs in the background and requests go without collaborative boosts.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.core.config import get_settings
+from app.models.library import Borrow, Review
+from app.services.model_store import (
+    build_lock,
+    current_generation,
+    read_generation,
+    write_generation,
+)
+from app.services.recommendation_catalog import top_k_indices
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+BORROW_STRENGTH = 1.0
+_LOAD_BATCH = 50_000
+_BLOCK = 1024  # columns per similarity block
+# Ids re-read below each watermark, for rows that committed late
+_ID_LOOKBACK = 5_000
+# Bumped when a generation's arrays change; older ones are rebuilt, not read
+_FORMAT = 2
+
+
+def review_strength(rating: int | float) -> float:
+    return 1.0 + (rating - 3) / 2.5
+
+
+class Interactions(NamedTuple):
+    user_ids: np.ndarray
+    book_ids: np.ndarray
+    strengths: np.ndarray
+    from_review: np.ndarray  # a review's strength overrides a borrow's
+    last_borrow_id: int
+    last_review_id: int
+
+
+@dataclass(frozen=True, slots=True)
+class NeighbourModel:
+    book_ids: np.ndarray  # column -> book id
+    user_ids: np.ndarray  # row -> user id
+    matrix: sparse.csr_matrix  # users × books interaction strengths
+    neighbours: np.ndarray  # books × N neighbour columns, -1 padded
+    similarities: np.ndarray  # books × N cosine, best first
+    norms: np.ndarray  # column L2 norms of matrix
+    last_borrow_id: int = 0
+    last_review_id: int = 0
+
+
+# ── Loading interactions
+
+
+async def load_interactions(
+    db: AsyncSession, after_borrow_id: int = 0, after_review_id: int = 0
+) -> Interactions:
+    """Borrows and reviews with ids past the given watermarks, streamed in chunks."""
+    borrows_stmt = select(Borrow.id, Borrow.user_id, Borrow.book_id).order_by(Borrow.id)
+    reviews_stmt = select(Review.id, Review.user_id, Review.book_id, Review.rating).order_by(
+        Review.id
+    )
+    borrows_stmt = borrows_stmt.where(Borrow.id > after_borrow_id)
+    reviews_stmt = reviews_stmt.where(Review.id > after_review_id)
+    borrows = await _stream_columns(db, borrows_stmt)
+    reviews = await _stream_columns(db, reviews_stmt)
+    return make_interactions(
+        borrows[:, 1:],
+        reviews[:, 1:],
+        last_borrow_id=int(borrows[-1, 0]) if len(borrows) else after_borrow_id,
+        last_review_id=int(reviews[-1, 0]) if len(reviews) else after_review_id,
+    )
+
+
+def make_interactions(
+    borrows: Sequence = (),
+    reviews: Sequence = (),
+    last_borrow_id: int = 0,
+    last_review_id: int = 0,
+) -> Interactions:
+    """From (user_id, book_id) borrows and (user_id, book_id, rating) reviews."""
+    borrows = np.array(borrows, dtype=np.int64).reshape(-1, 2)
+    reviews = np.array(reviews, dtype=np.int64).reshape(-1, 3)
+    n_borrows, n_reviews = len(borrows), len(reviews)
+    return Interactions(
+        user_ids=np.concatenate([borrows[:, 0], reviews[:, 0]]),
+        book_ids=np.concatenate([borrows[:, 1], reviews[:, 1]]),
+        strengths=np.concatenate(
+            [
+                np.full(n_borrows, BORROW_STRENGTH, dtype=np.float32),
+                review_strength(reviews[:, 2]).astype(np.float32),
+            ]
+        ),
+        from_review=np.repeat([False, True], [n_borrows, n_reviews]),
+        last_borrow_id=last_borrow_id,
+        last_review_id=last_review_id,
+    )
+
+
+async def _stream_columns(db: AsyncSession, stmt) -> np.ndarray:
+    chunks = []
+    result = await db.stream(stmt.execution_options(yield_per=_LOAD_BATCH))
+    async for partition in result.partitions():
+        chunks.append(np.array(partition, dtype=np.int64))
+    width = len(stmt.selected_columns)
+    return np.concatenate(chunks) if chunks else np.zeros((0, width), dtype=np.int64)
+
+
+def _dedupe(interactions: Interactions) -> Interactions:
+    """One entry per (user, book): the latest review if any, else the borrow."""
+    users, books = interactions.user_ids, interactions.book_ids
+    # lexsort is stable, so within a pair the input (id) order survives
+    order = np.lexsort((interactions.from_review, books, users))
+    users, books = users[order], books[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (users[1:] != users[:-1]) | (books[1:] != books[:-1])
+    keep = order[last]
+    return interactions._replace(
+        user_ids=interactions.user_ids[keep],
+        book_ids=interactions.book_ids[keep],
+        strengths=interactions.strengths[keep],
+        from_review=interactions.from_review[keep],
+    )
+
+
+# ── Building
+
+
+def column_norms(matrix: sparse.csr_matrix) -> np.ndarray:
+    return np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel()).astype(np.float32)
+
+
+def neighbour_rows(
+    matrix: sparse.csr_matrix,
+    columns: np.ndarray,
+    n_neighbours: int,
+    block: int = _BLOCK,
+    norms: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Top-N cosine neighbours of the given columns, block by block."""
+    neighbours = np.full((len(columns), n_neighbours), -1, dtype=np.int32)
+    similarities = np.zeros((len(columns), n_neighbours), dtype=np.float32)
+    if not len(columns):
+        return neighbours, similarities
+
+    if norms is None:
+        norms = column_norms(matrix)
+    inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    # A full build converts once; a few dirty columns are sliced out directly
+    by_column = matrix.tocsc() if len(columns) > block else matrix
+
+    for start in range(0, len(columns), block):
+        chunk = columns[start : start + block]
+        cosines = (by_column[:, chunk].T @ matrix).tocsr()
+        rows = np.repeat(np.arange(len(chunk)), np.diff(cosines.indptr))
+        cosines.data *= inverse[chunk][rows] * inverse[cosines.indices]
+        keep = (cosines.indices != chunk[rows]) & (cosines.data > 0)
+        rows, cols, sims = rows[keep], cosines.indices[keep], cosines.data[keep]
+        # Per row: best first, ties by column
+        order = np.lexsort((cols, -sims, rows))
+        rows, cols, sims = rows[order], cols[order], sims[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        top = rank < n_neighbours
+        neighbours[start + rows[top], rank[top]] = cols[top]
+        similarities[start + rows[top], rank[top]] = sims[top]
+    return neighbours, similarities
+
+
+def fit_model(
+    interactions: Interactions, n_neighbours: int, block: int = _BLOCK
+) -> NeighbourModel:
+    interactions = _dedupe(interactions)
+    book_ids, cols = np.unique(interactions.book_ids, return_inverse=True)
+    user_ids, rows = np.unique(interactions.user_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (interactions.strengths.astype(np.float32), (rows, cols)),
+        shape=(len(user_ids), len(book_ids)),
+    )
+    norms = column_norms(matrix)
+    neighbours, similarities = neighbour_rows(
+        matrix, np.arange(len(book_ids)), n_neighbours, block, norms
+    )
+    return NeighbourModel(
+        book_ids, user_ids, matrix, neighbours, similarities, norms,
+        interactions.last_borrow_id, interactions.last_review_id,
+    )
+
+
+def _positions(known: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Append unseen values to known; return (all ids, index of each value)."""
+    unseen = np.setdiff1d(values, known)
+    ids = np.concatenate([known, unseen])
+    sorter = np.argsort(ids, kind="stable")
+    return ids, sorter[np.searchsorted(ids, values, sorter=sorter)]
+
+
+def update_model(
+    model: NeighbourModel, interactions: Interactions, block: int = _BLOCK
+) -> NeighbourModel:
+    """Fold new interactions in; returns a new model and leaves `model` intact.
+
+    Interactions already on record change nothing, so the same rows may be
+    folded in again; the result is then `model` with the new watermarks.
+    """
+    watermarks = {
+        "last_borrow_id": max(model.last_borrow_id, interactions.last_borrow_id),
+        "last_review_id": max(model.last_review_id, interactions.last_review_id),
+    }
+    if not len(interactions.user_ids):
+        return replace(model, **watermarks)
+    interactions = _dedupe(interactions)
+    book_ids, cols = _positions(model.book_ids, interactions.book_ids)
+    user_ids, rows = _positions(model.user_ids, interactions.user_ids)
+
+    matrix = model.matrix.copy()
+    matrix.resize((len(user_ids), len(book_ids)))
+    existing = np.asarray(matrix[rows, cols]).ravel()
+    # A borrow never overrides a review already on record
+    changed = (interactions.from_review | (existing == 0)) & (
+        interactions.strengths != existing
+    )
+    if not changed.any():
+        return replace(model, **watermarks)
+    matrix = (
+        matrix
+        + sparse.csr_matrix(
+            (
+                (interactions.strengths - existing)[changed].astype(np.float32),
+                (rows[changed], cols[changed]),
+            ),
+            shape=matrix.shape,
+        )
+    ).tocsr()
+
+    # The new pairs change those books' cosines with everything their
+    # readers took, so recompute all of those rows
+    readers = np.unique(rows[changed])
+    dirty = np.union1d(cols[changed], matrix[readers].indices).astype(np.int64)
+
+    # Only the changed columns' norms move
+    norms = np.zeros(len(book_ids), dtype=np.float32)
+    norms[: len(model.book_ids)] = model.norms
+    touched = np.unique(cols[changed])
+    norms[touched] = column_norms(matrix[:, touched])
+
+    n_books, n_neighbours = len(book_ids), model.neighbours.shape[1]
+    neighbours = np.full((n_books, n_neighbours), -1, dtype=np.int32)
+    similarities = np.zeros((n_books, n_neighbours), dtype=np.float32)
+    neighbours[: len(model.book_ids)] = model.neighbours
+    similarities[: len(model.book_ids)] = model.similarities
+    neighbours[dirty], similarities[dirty] = neighbour_rows(
+        matrix, dirty, n_neighbours, block, norms
+    )
+    return NeighbourModel(
+        book_ids, user_ids, matrix, neighbours, similarities, norms, **watermarks
+    )
+
+
+# ── Persistence
+
+
+def _write_model(path: str, model: NeighbourModel) -> str:
+    return write_generation(
+        path,
+        {
+            "book_ids": model.book_ids,
+            # Column lookup order, so workers need no id -> column dict
+            "book_order": np.argsort(model.book_ids, kind="stable"),
+            "user_ids": model.user_ids,
+            "data": model.matrix.data,
+            "indices": model.matrix.indices,
+            "indptr": model.matrix.indptr,
+            "neighbours": model.neighbours,
+            "similarities": model.similarities,
+            "norms": model.norms,
+        },
+        {
+            "format": _FORMAT,
+            "last_borrow_id": model.last_borrow_id,
+            "last_review_id": model.last_review_id,
+        },
+    )
+
+
+def _read_model(
+    path: str, generation: str | None = None, mmap_mode: str | None = "r"
+) -> tuple[str, NeighbourModel, np.ndarray] | None:
+    """(generation, model, book_order) of a published model, memory-mapped."""
+    saved = read_generation(path, generation, mmap_mode)
+    if saved is None or saved.meta.get("format") != _FORMAT:
+        return None
+    arrays = saved.arrays
+    book_ids, user_ids = arrays["book_ids"], arrays["user_ids"]
+    matrix = sparse.csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=(len(user_ids), len(book_ids)),
+    )
+    model = NeighbourModel(
+        book_ids, user_ids, matrix, arrays["neighbours"], arrays["similarities"],
+        arrays["norms"], saved.meta["last_borrow_id"], saved.meta["last_review_id"],
+    )
+    return saved.name, model, arrays["book_order"]
+
+
+async def build_neighbour_file(db: AsyncSession, path: str | None = None) -> int:
+    """The nightly full build: fit from every interaction and publish it."""
+    path = path or settings.RECOMMENDER_NEIGHBOURS_PATH
+    interactions = await load_interactions(db)
+    model = await asyncio.to_thread(fit_model, interactions, settings.RECOMMENDER_NEIGHBOURS)
+    await asyncio.to_thread(_write_model, path, model)
+    return len(model.book_ids)
+
+
+# ── Serving
+
+
+class ItemNeighbours:
+    def __init__(
+        self,
+        path: str | None = None,
+        n_neighbours: int = 20,
+        refresh_seconds: float = 30.0,
+    ) -> None:
+        self._path = path or None
+        self._n_neighbours = n_neighbours
+        self._refresh = refresh_seconds
+        self._lock = asyncio.Lock()
+        self._fitting: asyncio.Task | None = None
+        self.clear()
+
+    def clear(self) -> None:
+        if self._fitting is not None:
+            self._fitting.cancel()
+            self._fitting = None
+        self.model: NeighbourModel | None = None
+        self._order = np.zeros(0, dtype=np.int64)
+        self._checked_at: float | None = None
+        self._generation: str | None = None
+
+    def __len__(self) -> int:
+        return len(self.model.book_ids) if self.model is not None else 0
+
+    def adopt(self, model: NeighbourModel, order: np.ndarray | None = None) -> None:
+        """Serve `model`; order sorts its book_ids (computed when not given)."""
+        self._order = np.argsort(model.book_ids, kind="stable") if order is None else order
+        self.model = model
+        self._checked_at = time.monotonic()
+
+    def fit(self, interactions: Interactions) -> None:
+        self.adopt(fit_model(interactions, self._n_neighbours))
+
+    def update(self, interactions: Interactions) -> None:
+        self.adopt(update_model(self.model, interactions))
+
+    # ── Freshness
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._checked_at is not None
+            and time.monotonic() - self._checked_at < self._refresh
+        )
+
+    async def ensure_fresh(self, db: AsyncSession, wait: bool = False) -> None:
+        """Catch up with new interactions. With no model yet, a fit starts in
+        the background; the caller goes without unless `wait` (batch jobs)."""
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if self._is_fresh():
+                return
+            if self._path:
+                await self._adopt_published()
+            if self.model is None:
+                if self._fitting is None or self._fitting.done():
+                    self._fitting = asyncio.create_task(self._fit_in_background(db.bind))
+                if wait:
+                    await asyncio.shield(self._fitting)
+                return
+            if not self._path:
+                await self._catch_up(db)
+                return
+            with build_lock(self._path) as builder:
+                if builder:
+                    # The last builder may have published since CURRENT was read
+                    await self._adopt_published()
+                    if await self._catch_up(db):
+                        await self._publish()
+            # Otherwise another worker is folding the same interactions in
+            self._checked_at = time.monotonic()
+
+    async def _fit_in_background(self, bind: AsyncEngine | AsyncConnection) -> None:
+        """First fit, when nothing is published: one worker fits and publishes it."""
+        try:
+            if not self._path:
+                await self._fit(bind)
+                return
+            with build_lock(self._path) as builder:
+                if builder:
+                    await self._adopt_published()
+                    if self.model is None:
+                        await self._fit(bind)
+                        await self._publish()
+        except Exception:
+            logger.exception("fitting item neighbours failed")
+        finally:
+            self._fitting = None
+
+    async def _fit(self, bind: AsyncEngine | AsyncConnection) -> None:
+        async with AsyncSession(bind, expire_on_commit=False) as db:
+            interactions = await load_interactions(db)
+        self.adopt(await asyncio.to_thread(fit_model, interactions, self._n_neighbours))
+
+    async def _catch_up(self, db: AsyncSession) -> bool:
+        """Fold in interactions past the watermark; True if the model changed."""
+        model = self.model
+        interactions = await load_interactions(
+            db,
+            max(0, model.last_borrow_id - _ID_LOOKBACK),
+            max(0, model.last_review_id - _ID_LOOKBACK),
+        )
+        updated = await asyncio.to_thread(update_model, model, interactions)
+        self.adopt(updated)
+        return updated.matrix is not model.matrix
+
+    async def _adopt_published(self) -> None:
+        current = await asyncio.to_thread(current_generation, self._path)
+        if current and current != self._generation:
+            saved = await asyncio.to_thread(_read_model, self._path, current)
+            if saved is not None:
+                self._generation, model, order = saved
+                self.adopt(model, order)
+
+    async def _publish(self) -> None:
+        # The private copy update_model made is dropped for the mapped one
+        generation = await asyncio.to_thread(_write_model, self._path, self.model)
+        saved = await asyncio.to_thread(_read_model, self._path, generation)
+        if saved is not None:
+            self._generation, model, order = saved
+            self.adopt(model, order)
+
+    # ── Scoring
+
+    def _cols(self, book_ids: Iterable[int]) -> np.ndarray:
+        """Columns of the given books that the model knows, in input order."""
+        wanted = np.fromiter(book_ids, np.int64)
+        if self.model is None or not len(self.model.book_ids) or not len(wanted):
+            return np.zeros(0, dtype=np.int64)
+        ids = self.model.book_ids
+        found = np.searchsorted(ids, wanted, sorter=self._order)
+        cols = self._order[np.minimum(found, len(ids) - 1)]
+        return cols[ids[cols] == wanted]
+
+    def neighbours_of(self, book_id: int) -> list[tuple[int, float]]:
+        cols = self._cols([book_id])
+        if not len(cols):
+            return []
+        col = int(cols[0])
+        neighbours = self.model.neighbours[col]
+        valid = neighbours >= 0
+        return list(
+            zip(
+                self.model.book_ids[neighbours[valid]].tolist(),
+                self.model.similarities[col][valid].astype(float).tolist(),
+            )
+        )
+
+    def recommend(
+        self, history: Iterable[int], k: int, exclude_ids: Iterable[int] = ()
+    ) -> list[tuple[int, float]]:
+        """(id, mean similarity to the history) of the k best books."""
+        cols = self._cols(history)
+        if not len(cols) or k <= 0:
+            return []
+        neighbours = self.model.neighbours[cols].ravel()
+        similarities = self.model.similarities[cols].ravel()
+        valid = neighbours >= 0
+        candidates, inverse = np.unique(neighbours[valid], return_inverse=True)
+        scores = np.bincount(inverse, weights=similarities[valid]) / len(cols)
+
+        blocked = np.concatenate([cols, self._cols(exclude_ids)])
+        allowed = np.flatnonzero(~np.isin(candidates, blocked))
+        ids = self.model.book_ids[candidates]
+        best = top_k_indices(ids, scores, allowed, k)
+        return list(zip(ids[best].tolist(), scores[best].tolist()))
+
+
+@lru_cache
+def get_item_neighbours() -> ItemNeighbours:
+    return ItemNeighbours(
+        path=settings.RECOMMENDER_NEIGHBOURS_PATH,
+        n_neighbours=settings.RECOMMENDER_NEIGHBOURS,
+        refresh_seconds=settings.RECOMMENDER_NEIGHBOURS_REFRESH_SECONDS,
+    )
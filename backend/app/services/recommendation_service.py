@@ -3,121 +3,264 @@ Recommendation Service
 strategies, chosen based on user data:
 
 CONTENT-BASED (default)
-   - Build a weighted genre score from user's borrow/review history
-   - Rank available books by genre match + average_rating
-   - sklearn TF-IDF vectoriser on book descriptions for sub-genre signals
+   - Weighted genre score from the user's borrow/review history, maintained
+     incrementally in user_genre_affinity (affinity_repository.py)
+   - Rank available books by genre match + average_rating + average_sentiment
+   - TF-IDF similarity of descriptions / AI summaries to the user's borrowed
+     books adds a sub-genre signal (recommendation_text_index.py)
+   - Item-item collaborative filtering adds books that readers of the same
+     books also borrowed (recommendation_neighbours.py)
 
-COLD-START fallback → return top-rated books.
+COLD-START (fewer than two borrows) → what is trending now: time-decayed
+borrow and review counts (trending_repository.py), topped up with top-rated
+books while the library is too quiet to fill the list.
+
+FALLBACK (no usable genre affinity) → top-rated books.
+
+Content-based lists precomputed by the offline job (recommendation_batch.py)
+are served as they are while recent; everything else is scored on request.
+Ranking runs against the columnar BookCatalog; only the top-k rows are
+loaded as ORM objects.
 """
 
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.core.principal_cache import Principal
 from app.models.book import Book, BookStatus
 from app.models.library import Borrow, UserPreferences
 from app.models.user import User
+from app.repositories.affinity_repository import GenreAffinityRepository
+from app.repositories.book_repository import CatalogVersion
+from app.repositories.precomputed_repository import PrecomputedRecommendationRepository
+from app.repositories.recommendation_repository import RecommendationRepository
+from app.repositories.trending_repository import TrendingRepository
+from app.services.recommendation_catalog import (
+    RATING_WEIGHT,
+    SENTIMENT_WEIGHT,
+    BookCatalog,
+    genre_affinity,
+    get_book_catalog,
+)
+from app.services.recommendation_neighbours import ItemNeighbours, get_item_neighbours
+from app.services.recommendation_text_index import DescriptionIndex, get_description_index
+
+settings = get_settings()
+
+# Books taken from the description index and the co-borrow neighbours per
+# request; the rest of the catalog gets no such term
+BOOST_CANDIDATES = 200
+
+# Lists that follow what everyone borrows and reviews, not only the catalog
+# and the user's own activity (recommendation_cache.trending_window)
+COLD_START_STRATEGIES = frozenset({"cold_start_trending", "cold_start_top_rated"})
+
+PRECOMPUTED_LOOKUPS = REGISTRY.counter(
+    "recommendation_precomputed_lookups_total",
+    "Content-based requests by whether a fresh precomputed list served them",
+)
 
 
 async def build_recommendations(
-    user: User, db: AsyncSession, limit: int = 10
+    user: User | Principal,
+    db: AsyncSession,
+    limit: int = 10,
+    catalog_version: CatalogVersion | None = None,
+    catalog: BookCatalog | None = None,
+    text_index: DescriptionIndex | None = None,
+    neighbours: ItemNeighbours | None = None,
+    precomputed: bool = True,
 ) -> tuple[list[Book], str]:
+    """
+    Ranking runs on the engine chosen by RECOMMENDER_ENGINE:
+      catalog → the in-memory columnar catalog; only the top-k rows are loaded.
+                Pass catalog_version when the caller already read it (the
+                endpoint does, for its ETag) to save a query.
+      sql     → the database scores and returns only the top-k rows.
+    Either way a fresh precomputed list is served first (precomputed=False
+    always scores live).
+    """
     # Load user borrow history
-    borrow_result = await db.execute(select(Borrow).where(Borrow.user_id == user.id))
-    user_borrows = borrow_result.scalars().all()
-    borrowed_book_ids = {b.book_id for b in user_borrows}
+    borrow_result = await db.execute(select(Borrow.book_id).where(Borrow.user_id == user.id))
+    borrowed = list(borrow_result.scalars().all())
+
+    if precomputed and len(borrowed) >= 2:
+        books = await _precomputed(user.id, db, limit)
+        PRECOMPUTED_LOOKUPS.inc(result="hit" if books else "miss")
+        if books:
+            return books, "content_based"
+
+    if catalog is None and settings.RECOMMENDER_ENGINE == "sql":
+        ranker: _Ranker = _SqlRanker(db, user.id)
+    else:
+        catalog = catalog or get_book_catalog()
+        await catalog.ensure_fresh(db, catalog_version)
+        ranker = _CatalogRanker(db, catalog, set(borrowed))
+
+    # COLD-START
+    if len(borrowed) < 2:
+        return await _cold_start(db, ranker, limit, borrowed)
 
     # Load preferences
     prefs_result = await db.execute(
         select(UserPreferences).where(UserPreferences.user_id == user.id)
     )
     prefs: UserPreferences | None = prefs_result.scalar_one_or_none()
-    print(prefs, "prefs loaded")
 
-    # Load all available books not yet borrowed
-    books_result = await db.execute(
-        select(Book).where(Book.id.not_in(borrowed_book_ids) if borrowed_book_ids else True)
-    )
-    all_books: list[Book] = list(books_result.scalars().all())
+    # CONTENT-BASED: affinities are kept current by borrow, return and
+    # review, so reading them is one indexed query and this path never writes
+    genre_weights = await GenreAffinityRepository(db).weights(user.id)
 
-    if not all_books:
-        return [], "no_books_available"
+    if genre_weights:
+        if text_index is None and settings.RECOMMENDER_TEXT_WEIGHT > 0:
+            text_index = get_description_index()
+        if neighbours is None and settings.RECOMMENDER_CF_WEIGHT > 0:
+            neighbours = get_item_neighbours()
+        boosts = await _description_boosts(borrowed, db, catalog_version, text_index)
+        for book_id, boost in (await _collaborative_boosts(borrowed, db, neighbours)).items():
+            boosts[book_id] = boosts.get(book_id, 0.0) + boost
+        books = await ranker.content_based(
+            genre_weights,
+            limit,
+            favourite=(prefs.favourite_genres or []) if prefs else [],
+            disliked=(prefs.disliked_genres or []) if prefs else [],
+            boosts=boosts,
+        )
+        if not books:
+            return [], "no_books_available"
+        return books, "content_based"
 
-    # COLD-START
-    if len(user_borrows) < 2:
-        books = sorted(all_books, key=lambda b: b.average_rating, reverse=True)[:limit]
-        return books, "cold_start_top_rated"
+    # Final fallback
+    books = await ranker.top_rated(limit)
+    return books, "fallback_top_rated" if books else "no_books_available"
 
-    # CONTENT-BASED
-    genre_weights: dict[str, float] = {}
 
-    if prefs and prefs.genre_weights:
-        genre_weights = prefs.genre_weights  # type: ignore[assignment]
+# Ranking engines
 
-    # Build genre weights from borrow history if not in prefs
-    if not genre_weights:
-        genre_weights = await _compute_genre_weights(user.id, db)
 
-    if genre_weights:
-        scored = _score_books_content_based(all_books, genre_weights, prefs)
-        books = [b for b, _ in sorted(scored, key=lambda x: x[1], reverse=True)][:limit]
-        # Persist updated weights for next call
-        await _upsert_genre_weights(user.id, genre_weights, db)
-        return books, "content_based"
+class _Ranker(ABC):
+    @abstractmethod
+    async def top_rated(self, k: int) -> list[Book]:
+        """The k best-rated books the user has not borrowed."""
 
+    @abstractmethod
+    async def content_based(
+        self,
+        genre_weights: dict[str, float],
+        k: int,
+        favourite: Iterable[str],
+        disliked: Iterable[str],
+        boosts: dict[int, float],
+    ) -> list[Book]:
+        """The k best books by genre affinity, preferences, rating and boosts."""
 
-    # Final fallback
-    books = sorted(all_books, key=lambda b: b.average_rating, reverse=True)[:limit]
-    return books, "fallback_top_rated"
+
+class _CatalogRanker(_Ranker):
+    def __init__(self, db: AsyncSession, catalog: BookCatalog, borrowed: set[int]) -> None:
+        self._db = db
+        self._catalog = catalog
+        self._borrowed = borrowed
+
+    async def top_rated(self, k: int) -> list[Book]:
+        ids = self._catalog.top_rated(k, exclude_ids=self._borrowed)
+        return await _hydrate(ids, self._db, self._catalog)
+
+    async def content_based(self, genre_weights, k, favourite, disliked, boosts) -> list[Book]:
+        ids = self._catalog.recommend(
+            genre_weights,
+            k,
+            exclude_ids=self._borrowed,
+            favourite=favourite,
+            disliked=disliked,
+            boosts=boosts,
+        )
+        return await _hydrate(ids, self._db, self._catalog)
+
+
+class _SqlRanker(_Ranker):
+    def __init__(self, db: AsyncSession, user_id: int) -> None:
+        self._repo = RecommendationRepository(db)
+        self._user_id = user_id
+
+    async def top_rated(self, k: int) -> list[Book]:
+        return await self._repo.top_k(self._user_id, k)
+
+    async def content_based(self, genre_weights, k, favourite, disliked, boosts) -> list[Book]:
+        return await self._repo.top_k(
+            self._user_id,
+            k,
+            affinity=genre_affinity(genre_weights, favourite, disliked),
+            rating_weight=RATING_WEIGHT,
+            sentiment_weight=SENTIMENT_WEIGHT,
+            boosts=boosts,
+        )
 
 
 #Helpers
 
-async def _compute_genre_weights(user_id: int, db: AsyncSession) -> dict[str, float]:
-    """Compute genre weights from borrow history."""
-    result = await db.execute(
-        select(Book).join(Borrow, Borrow.book_id == Book.id).where(Borrow.user_id == user_id)
-    )
-    borrowed: list[Book] = list(result.scalars().all())
-    weights: dict[str, float] = {}
-    for book in borrowed:
-        if book.genre:
-            weights[book.genre] = weights.get(book.genre, 0.0) + 1.0
-    # Normalise
-    total = sum(weights.values()) or 1.0 # normalizing to 1 to avoid zero division
-    return {g: w / total for g, w in weights.items()} # normalized to 1 for checking against content-based scoring
-
-
-def _score_books_content_based(
-    books: list[Book],
-    genre_weights: dict[str, float],
-    prefs: UserPreferences | None,
-) -> list[tuple[Book, float]]:
-    scored = []
-    fav = set(prefs.favourite_genres or []) if prefs else set()
-    disliked = set(prefs.disliked_genres or []) if prefs else set()
-
-    for book in books:
-        genre = book.genre or ""
-        score = genre_weights.get(genre, 0.0)
-        if genre in fav:
-            score += 0.5 # boost for  favourites
-        if genre in disliked:
-            score -= 0.5 # penalty for disliked
-        # Blend with rating
-        score += book.average_rating * 0.1
-        scored.append((book, score))
-    return scored
-
-
-async def _upsert_genre_weights(user_id: int, weights: dict, db: AsyncSession) -> None:
-    result = await db.execute(
-        select(UserPreferences).where(UserPreferences.user_id == user_id)
-    )
-    prefs = result.scalar_one_or_none()
-    if prefs:
-        prefs.genre_weights = weights  # type: ignore[assignment]
-    else:
-        prefs = UserPreferences(user_id=user_id, genre_weights=weights)
-    db.add(prefs)
-    await db.commit()
-    await db.flush()
+async def _hydrate(ids: Sequence[int], db: AsyncSession, catalog: BookCatalog) -> list[Book]:
+    """Load the ranked rows in rank order; ids deleted meanwhile leave the catalog."""
+    if not ids:
+        return []
+    result = await db.execute(select(Book).where(Book.id.in_(ids)))
+    by_id = {book.id: book for book in result.scalars().all()}
+    for missing in set(ids) - by_id.keys():
+        catalog.remove(missing)
+    return [by_id[i] for i in ids if i in by_id]
+
+
+async def _cold_start(
+    db: AsyncSession, ranker: _Ranker, limit: int, borrowed: Sequence[int]
+) -> tuple[list[Book], str]:
+    """Trending books, then top-rated ones if too few were borrowed or reviewed lately."""
+    books = [book for book, _ in await TrendingRepository(db).top_k(limit, borrowed)]
+    if len(books) == limit:
+        return books, "cold_start_trending"
+    seen = {book.id for book in books}
+    more = await ranker.top_rated(limit + len(seen))
+    books += [book for book in more if book.id not in seen][: limit - len(books)]
+    if not books:
+        return [], "no_books_available"
+    return books, "cold_start_trending" if seen else "cold_start_top_rated"
+
+
+async def _precomputed(user_id: int, db: AsyncSession, limit: int) -> list[Book]:
+    """The batch job's list if it is recent, untouched since and still has limit books."""
+    max_age = settings.RECOMMENDER_PRECOMPUTED_MAX_AGE_SECONDS
+    if max_age <= 0 or limit > settings.RECOMMENDER_PRECOMPUTED_K:
+        return []
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+    books = await PrecomputedRecommendationRepository(db).fresh_top_k(user_id, limit, cutoff)
+    # Short when books were borrowed or deleted since; score live instead
+    return books if len(books) == limit else []
+
+
+async def _description_boosts(
+    borrowed: Sequence[int],
+    db: AsyncSession,
+    catalog_version: CatalogVersion | None,
+    index: DescriptionIndex | None,
+) -> dict[int, float]:
+    """Score terms for the books whose text reads most like the user's borrows."""
+    if index is None:
+        return {}
+    await index.ensure_fresh(db, catalog_version)
+    matches = index.similar_to(borrowed, BOOST_CANDIDATES, exclude_ids=borrowed)
+    return {book_id: settings.RECOMMENDER_TEXT_WEIGHT * sim for book_id, sim in matches}
+
+
+async def _collaborative_boosts(
+    borrowed: Sequence[int], db: AsyncSession, neighbours: ItemNeighbours | None
+) -> dict[int, float]:
+    """Score terms for the books most often co-borrowed with the user's history."""
+    if neighbours is None:
+        return {}
+    await neighbours.ensure_fresh(db)
+    matches = neighbours.recommend(borrowed, BOOST_CANDIDATES, exclude_ids=borrowed)
+    return {book_id: settings.RECOMMENDER_CF_WEIGHT * score for book_id, score in matches}
@@ -0,0 +1,520 @@
+"""
+Description similarity for sub-genre recommendations.
+
+Each book's description and AI summary are hashed into a fixed feature
+space (sklearn HashingVectorizer, sublinear tf, rows L2-normalised) and kept
+as one row of a scipy CSR matrix. The feature space never changes, so a new
+or edited book is vectorised on its own without refitting a vocabulary. IDF
+is derived from per-feature document frequencies, which are adjusted as
+rows come and go; it is frozen between merges, so a changed book costs the
+norm of its own row rather than of every row, and the weights catch up on
+the next merge (the delta is at most a tenth of the base).
+
+A user's profile is the normalised tf-idf sum of the books they borrowed.
+Every book is scored against it (cosine similarity of tf-idf vectors) by
+walking the postings of the profile's terms, a transposed copy of the
+matrix, so books sharing no term with the profile cost nothing; then
+top_k_indices picks the best. similar_to_many stacks a block of profiles
+into one sparse product.
+
+Persistence: the matrix, its postings, the ids (sorted, so a book's row is
+a binary search away), document frequencies and watermark are published to
+RECOMMENDER_TEXT_INDEX_PATH as a model_store generation. Workers map it on
+first use, so a restarted worker only reads books changed since, and every
+worker on a host shares one copy. Changed books are vectorised into a
+small private delta that shadows their base rows; once the delta outgrows
+a fraction of the base, the worker holding the build lock merges it and
+publishes a new generation, which the others adopt. Full builds and merges
+run in a worker thread on a private copy, under the build lock, and are
+swapped in whole; until a first generation exists, workers that do not
+hold the lock serve without description boosts rather than build their own.
+
+Only books.text_updated_at, which moves with the description, genre or AI
+summary, sends a book through the delta. The genre is there for the
+similar-books index, which shares the stamp; here it only re-vectorises an
+unchanged text.
+"""
+
+import asyncio
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.base import as_utc
+from app.models.book import Book, BookAIContent
+from app.repositories.book_repository import (
+    WATERMARK_LOOKBACK,
+    BookRepository,
+    CatalogVersion,
+)
+from app.services.model_store import (
+    Generation,
+    build_lock,
+    current_generation,
+    read_generation,
+    write_generation,
+)
+from app.services.recommendation_catalog import top_k_indices
+
+settings = get_settings()
+
+_RELOAD_BATCH = 10_000
+_MIN_MERGE = 1_000  # delta rows tolerated before merging, however small the base
+# Bumped when a generation's arrays change; older ones are rebuilt, not read
+_FORMAT = 2
+# df is patched in place as rows come and go, so it is mapped copy-on-write
+_MMAP_MODES = {"df": "c"}
+
+_TEXT_QUERY = select(
+    Book.id,
+    Book.description,
+    BookAIContent.ai_summary,
+    Book.text_updated_at,
+).outerjoin(BookAIContent, BookAIContent.book_id == Book.id)
+
+
+def _document(description: str | None, summary: str | None) -> str:
+    return "\n".join(t for t in (description, summary) if t)
+
+
+class DescriptionIndex:
+    def __init__(
+        self,
+        path: str | None = None,
+        n_features: int = 2**18,
+        merge_fraction: float = 0.1,
+    ) -> None:
+        self._path = path or None
+        self._n_features = n_features
+        self._merge_fraction = merge_fraction
+        self._vectorizer = HashingVectorizer(
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None,
+            stop_words="english",
+            dtype=np.float32,
+        )
+        self._lock = asyncio.Lock()
+        self.version: CatalogVersion | None = None
+        self._loaded = False
+        self._unsaved = False
+        self._watermark: datetime | None = None
+        self._generation: str | None = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._base = sparse.csr_matrix((0, self._n_features), dtype=np.float32)
+        self._base_postings: sparse.csr_matrix | None = None
+        self._base_ids = np.zeros(0, dtype=np.int64)
+        self._base_live = np.zeros(0, dtype=bool)
+        self._delta: dict[int, sparse.csr_matrix] = {}
+        self._df = np.zeros(self._n_features, dtype=np.int64)
+        self._changed()
+
+    def _changed(self) -> None:
+        # Derived from the base, rebuilt lazily on the next query
+        self._idf: np.ndarray | None = None
+        self._base_norms: np.ndarray | None = None
+        self._delta_changed()
+
+    def _delta_changed(self) -> None:
+        self._delta_block: tuple[np.ndarray, sparse.csr_matrix, np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return int(self._base_live.sum()) + len(self._delta)
+
+    # ── Loading
+
+    def _vectorize(self, documents: Sequence[str]) -> sparse.csr_matrix:
+        if not documents:
+            return sparse.csr_matrix((0, self._n_features), dtype=np.float32)
+        counts = self._vectorizer.transform(documents)
+        np.log(counts.data, out=counts.data)
+        counts.data += 1.0
+        return normalize(counts, copy=False)
+
+    def build(self, rows: Iterable[Sequence], version: CatalogVersion | None = None) -> None:
+        """Bulk load from (id, description, ai_summary[, text_updated_at]) rows."""
+        rows = list(rows)
+        self._reset()
+        self._watermark = None
+        matrix = self._vectorize([_document(r[1], r[2]) for r in rows])
+        self._set_base(np.fromiter((r[0] for r in rows), np.int64, len(rows)), matrix)
+        self._df = np.bincount(matrix.indices, minlength=self._n_features)
+        self._advance_watermark(rows)
+        self._prepare()
+        self.version = version
+        self._generation = None
+        self._loaded = True
+        self._unsaved = True
+
+    def _set_base(
+        self,
+        ids: np.ndarray,
+        matrix: sparse.csr_matrix,
+        postings: sparse.csr_matrix | None = None,
+    ) -> None:
+        if len(ids) > 1 and (np.diff(ids) < 0).any():
+            order = np.argsort(ids, kind="stable")
+            ids, matrix = ids[order], matrix[order]
+        self._base = matrix
+        self._base_ids = ids
+        self._base_live = np.ones(len(ids), dtype=bool)
+        self._base_postings = postings
+        self._changed()
+
+    def _base_slot(self, book_id: int) -> int | None:
+        """Row of a live base book, None if it has none."""
+        slot = int(np.searchsorted(self._base_ids, book_id))
+        if slot < len(self._base_ids) and self._base_ids[slot] == book_id:
+            return slot if self._base_live[slot] else None
+        return None
+
+    def _advance_watermark(self, rows: Sequence[Sequence]) -> None:
+        stamps = [as_utc(r[3]) for r in rows if len(r) > 3 and r[3] is not None]
+        if stamps and (self._watermark is None or max(stamps) > self._watermark):
+            self._watermark = max(stamps)
+
+    def upsert_many(self, rows: Iterable[Sequence]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        matrix = self._vectorize([_document(r[1], r[2]) for r in rows])
+        for position, row in enumerate(rows):
+            self._drop(row[0])
+            vector = matrix[position]
+            self._delta[row[0]] = vector
+            self._df[vector.indices] += 1
+        self._advance_watermark(rows)
+        self._delta_changed()
+        if not self._path and self._needs_merge():
+            # A shared index is merged by whoever publishes (ensure_fresh)
+            self.merge()
+
+    def _needs_merge(self) -> bool:
+        return len(self._delta) > max(_MIN_MERGE, self._merge_fraction * len(self._base_ids))
+
+    def remove(self, book_id: int) -> None:
+        if self._drop(book_id):
+            self._delta_changed()
+
+    def _drop(self, book_id: int) -> bool:
+        vector = self._delta.pop(book_id, None)
+        if vector is not None:
+            self._df[vector.indices] -= 1
+            return True
+        slot = self._base_slot(book_id)
+        if slot is None:
+            return False
+        self._base_live[slot] = False
+        start, end = self._base.indptr[slot], self._base.indptr[slot + 1]
+        self._df[self._base.indices[start:end]] -= 1
+        return True
+
+    def merge(self) -> None:
+        """Fold the delta into the base matrix and drop shadowed rows."""
+        keep = np.flatnonzero(self._base_live)
+        if not self._delta and keep.size == len(self._base_ids):
+            return
+        ids = np.concatenate(
+            [self._base_ids[keep], np.fromiter(self._delta, np.int64, len(self._delta))]
+        )
+        matrix = sparse.vstack([self._base[keep], *self._delta.values()], format="csr")
+        self._delta = {}
+        self._set_base(ids, matrix)
+        self._unsaved = True
+
+    def _detached(self) -> "DescriptionIndex":
+        """A copy to merge and save off the loop; the base arrays are shared, read-only."""
+        copy = DescriptionIndex(n_features=self._n_features, merge_fraction=self._merge_fraction)
+        copy._set_base(self._base_ids, self._base, self._base_postings)
+        copy._base_live = self._base_live.copy()
+        copy._delta = dict(self._delta)
+        copy._df = self._df.copy()
+        copy._watermark = self._watermark
+        copy._loaded = True
+        return copy
+
+    def _take(self, other: "DescriptionIndex") -> None:
+        """Swap in another index's state in one step on the loop."""
+        own = ("_path", "_n_features", "_merge_fraction", "_vectorizer", "_lock", "version")
+        vars(self).update({k: v for k, v in vars(other).items() if k not in own})
+
+    def clear(self) -> None:
+        self._reset()
+        self.version = self._watermark = self._generation = None
+        self._loaded = self._unsaved = False
+
+    # ── Persistence
+
+    def save(self, path: str) -> None:
+        self.merge()
+        generation = write_generation(path, *self._snapshot())
+        # Serve from the files just written so their pages are shared
+        self._restore(_read_generation(path, self._n_features, generation))
+
+    def load(self, path: str) -> bool:
+        saved = _read_generation(path, self._n_features)
+        if saved is not None:
+            self._restore(saved)
+        return saved is not None
+
+    def _snapshot(self) -> tuple[dict, dict]:
+        # Only taken right after a merge, so every base row is live; df keeps
+        # changing in place while the files are written, hence the copy
+        if self._base_postings is None:
+            self._base_postings = self._base.T.tocsr()
+        postings = self._base_postings
+        self._prepare()
+        arrays = {
+            "idf": self._idf,
+            "norms": self._base_norms,
+            "data": self._base.data,
+            "indices": self._base.indices,
+            "indptr": self._base.indptr,
+            "postings_data": postings.data,
+            "postings_indices": postings.indices,
+            "postings_indptr": postings.indptr,
+            "ids": self._base_ids,
+            "df": self._df.copy(),
+        }
+        meta = {
+            "format": _FORMAT,
+            "n_features": self._n_features,
+            "watermark": self._watermark.isoformat() if self._watermark else "",
+        }
+        return arrays, meta
+
+    def _restore(self, saved: Generation) -> None:
+        self._reset()
+        arrays, meta = saved.arrays, saved.meta
+        ids = arrays["ids"]
+        matrix = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(len(ids), self._n_features),
+        )
+        postings = sparse.csr_matrix(
+            (arrays["postings_data"], arrays["postings_indices"], arrays["postings_indptr"]),
+            shape=(self._n_features, len(ids)),
+        )
+        self._set_base(ids, matrix, postings)
+        self._idf, self._base_norms = arrays["idf"], arrays["norms"]
+        self._df = arrays["df"]
+        watermark = meta["watermark"]
+        self._watermark = datetime.fromisoformat(watermark) if watermark else None
+        self._generation = saved.name
+        self._loaded = True
+
+    # ── Freshness
+
+    async def ensure_fresh(self, db: AsyncSession, version: CatalogVersion | None = None) -> None:
+        if version is None:
+            version = await BookRepository(db).catalog_version()
+        if self._loaded and version == self.version:
+            return
+        async with self._lock:
+            if self._loaded and version == self.version:
+                return
+            if self._path:
+                # First use, or another worker published a newer generation:
+                # adopt it (dropping our delta), then catch up from its watermark
+                current = await asyncio.to_thread(current_generation, self._path)
+                if current and current != self._generation:
+                    saved = await asyncio.to_thread(
+                        _read_generation, self._path, self._n_features, current
+                    )
+                    if saved is not None:
+                        self._restore(saved)
+            if self._watermark is None and self._path:
+                if not await self._build_shared(db):
+                    return
+            elif self._watermark is None:
+                await self._reload(db)
+            else:
+                await self._apply_changes(db)
+            if self._path and (self._unsaved or self._needs_merge()):
+                await self._publish()
+            self.version = version
+
+    async def _build_shared(self, db: AsyncSession) -> bool:
+        """First build of a shared index; False if another worker is building it."""
+        with build_lock(self._path) as builder:
+            if not builder:
+                return False
+            # The last builder may have published since CURRENT was read
+            saved = await asyncio.to_thread(_read_generation, self._path, self._n_features)
+            if saved is not None:
+                self._restore(saved)
+                await self._apply_changes(db)
+            else:
+                await self._reload(db)
+                await self._publish_locked()
+            return True
+
+    async def _publish(self) -> None:
+        with build_lock(self._path) as builder:
+            if builder:
+                await self._publish_locked()
+            # Otherwise another worker is publishing; ours would be no newer
+
+    async def _publish_locked(self) -> None:
+        # Merge, write and map the files off the event loop on a copy; queries
+        # keep reading the current state until it is swapped in
+        detached = self._detached()
+        await asyncio.to_thread(detached.save, self._path)
+        self._take(detached)
+        self._unsaved = False
+
+    async def _reload(self, db: AsyncSession) -> None:
+        rows: list = []
+        result = await db.stream(_TEXT_QUERY.execution_options(yield_per=_RELOAD_BATCH))
+        async for partition in result.partitions():
+            rows.extend(partition)
+        fresh = DescriptionIndex(n_features=self._n_features, merge_fraction=self._merge_fraction)
+        await asyncio.to_thread(fresh.build, rows, self.version)
+        self._take(fresh)
+
+    async def _apply_changes(self, db: AsyncSession) -> None:
+        since = self._watermark - WATERMARK_LOOKBACK
+        result = await db.execute(_TEXT_QUERY.where(Book.text_updated_at >= since))
+        self.upsert_many(result.all())
+
+    # ── Scoring
+
+    def _prepare(self) -> None:
+        """Derive idf and the base norms now rather than on the next query."""
+        idf = self._weights()
+        if self._base_norms is None:
+            self._base_norms = self._norms(self._base, idf)
+
+    def _weights(self) -> np.ndarray:
+        if self._idf is None:
+            n = len(self)
+            self._idf = (np.log((1 + n) / (1 + self._df)) + 1).astype(np.float32)
+        return self._idf
+
+    @staticmethod
+    def _norms(matrix: sparse.csr_matrix, idf: np.ndarray) -> np.ndarray:
+        # Length of each row once idf is applied, for the cosine denominator
+        squared = matrix.copy()
+        squared.data **= 2
+        return np.sqrt(squared @ (idf * idf))
+
+    def _blocks(self):
+        """(ids, postings, idf-weighted norms, live mask) for the base and the delta.
+
+        Postings are the rows transposed (features × books), so a query only
+        walks the books containing its terms.
+        """
+        self._prepare()
+        idf = self._weights()
+        if self._base_postings is None:
+            self._base_postings = self._base.T.tocsr()
+        yield self._base_ids, self._base_postings, self._base_norms, self._base_live
+        if self._delta:
+            if self._delta_block is None:
+                matrix = sparse.vstack(list(self._delta.values()), format="csr")
+                ids = np.fromiter(self._delta, np.int64, len(self._delta))
+                self._delta_block = (ids, matrix.T.tocsr(), self._norms(matrix, idf))
+            ids, postings, norms = self._delta_block
+            yield ids, postings, norms, np.ones(len(ids), dtype=bool)
+
+    def _terms(self, book_id: int) -> tuple[np.ndarray, np.ndarray] | None:
+        """(feature indices, tf values) of one book's text."""
+        vector = self._delta.get(book_id)
+        if vector is not None:
+            return vector.indices, vector.data
+        slot = self._base_slot(book_id)
+        if slot is None:
+            return None
+        start, end = self._base.indptr[slot], self._base.indptr[slot + 1]
+        return self._base.indices[start:end], self._base.data[start:end]
+
+    def profile(self, book_ids: Iterable[int]) -> tuple[np.ndarray, np.ndarray] | None:
+        """Unit tf-idf vector of the given books' text as (features, values), None if empty."""
+        terms = [t for t in map(self._terms, book_ids) if t is not None and len(t[0])]
+        if not terms:
+            return None
+        features, inverse = np.unique(np.concatenate([t[0] for t in terms]), return_inverse=True)
+        summed = np.bincount(inverse, weights=np.concatenate([t[1] for t in terms]))
+        summed *= self._weights()[features]
+        norm = np.linalg.norm(summed)
+        return (features, summed / norm) if norm else None
+
+    def similar_to(
+        self, book_ids: Iterable[int], k: int, exclude_ids: Iterable[int] = ()
+    ) -> list[tuple[int, float]]:
+        """(id, cosine) of the k books whose text best matches book_ids' profile."""
+        return self.similar_to_many([book_ids], k, [exclude_ids])[0]
+
+    def similar_to_many(
+        self,
+        histories: Sequence[Iterable[int]],
+        k: int,
+        exclude_ids: Sequence[Iterable[int]] | None = None,
+    ) -> list[list[tuple[int, float]]]:
+        """similar_to for a block of users: one sparse product per block of books."""
+        results: list[list[tuple[int, float]]] = [[] for _ in histories]
+        profiles = [self.profile(h) for h in histories]
+        users = [u for u, profile in enumerate(profiles) if profile is not None]
+        if not users or k <= 0:
+            return results
+        weights = self._weights()
+        # (users × features), one sparse row per profile
+        features = [profiles[u][0] for u in users]
+        values = [(weights[f] * profiles[u][1]).astype(np.float32) for u, f in zip(users, features)]
+        indptr = np.concatenate([[0], np.cumsum([len(f) for f in features])])
+        queries = sparse.csr_matrix(
+            (np.concatenate(values), np.concatenate(features), indptr),
+            shape=(len(users), self._n_features),
+        )
+        all_ids, all_scores = [], []
+        for ids, postings, norms, live in self._blocks():
+            scores = (queries @ postings).toarray()
+            np.divide(scores, norms, out=scores, where=norms > 0)
+            scores[:, ~live] = 0.0
+            all_ids.append(ids)
+            all_scores.append(scores)
+        ids, scores = np.concatenate(all_ids), np.concatenate(all_scores, axis=1)
+        for row, u in enumerate(users):
+            user_scores = scores[row]
+            excluded = np.fromiter(exclude_ids[u] if exclude_ids else (), np.int64)
+            if excluded.size:
+                user_scores[np.isin(ids, excluded)] = 0.0
+            best = top_k_indices(ids, user_scores, np.flatnonzero(user_scores > 0), k)
+            results[u] = list(zip(ids[best].tolist(), user_scores[best].astype(float).tolist()))
+        return results
+
+
+def _read_generation(
+    path: str, n_features: int, generation: str | None = None
+) -> Generation | None:
+    """A published index; None when there is none or it no longer fits."""
+    saved = read_generation(path, generation, _MMAP_MODES)
+    if saved is None or saved.meta.get("format") != _FORMAT:
+        return None
+    return saved if saved.meta["n_features"] == n_features else None
+
+
+async def build_text_index_file(db: AsyncSession, path: str | None = None) -> int:
+    """Vectorise every book and publish a new generation; returns the books indexed."""
+    index = DescriptionIndex(n_features=settings.RECOMMENDER_TEXT_FEATURES)
+    await index._reload(db)
+    await asyncio.to_thread(index.save, path or settings.RECOMMENDER_TEXT_INDEX_PATH)
+    return len(index)
+
+
+@lru_cache
+def get_description_index() -> DescriptionIndex:
+    return DescriptionIndex(
+        path=settings.RECOMMENDER_TEXT_INDEX_PATH,
+        n_features=settings.RECOMMENDER_TEXT_FEATURES,
+    )
@@ -0,0 +1,190 @@
+"""
+Sentiment Service
+CPU-only, lexicon-based sentiment scoring for reader reviews.
+
+Scoring is vectorised: a batch of review bodies is turned into a sparse
+term-count matrix over a fixed lexicon vocabulary (sklearn CountVectorizer)
+and multiplied by the lexicon weight vector in one sparse dot product.
+Negations ("not good") are handled with bigram entries that flip the
+unigram weight. Raw scores are squashed into [-1, 1].
+
+A single call to the LLM per review would be far too slow, so the model
+is never involved here.
+"""
+
+import re
+from collections.abc import Iterable, Sequence
+from functools import lru_cache
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.book import Book
+from app.models.library import Review
+
+settings = get_settings()
+
+
+# ── Lexicon
+
+SENTIMENT_LEXICON: dict[str, float] = {
+    # positive
+    "amazing": 3.0, "awesome": 3.0, "beautiful": 2.5, "beautifully": 2.5,
+    "best": 3.0, "brilliant": 3.0, "captivating": 2.5, "charming": 2.0,
+    "clever": 2.0, "compelling": 2.5, "delightful": 3.0, "engaging": 2.5,
+    "enjoy": 2.0, "enjoyable": 2.5, "enjoyed": 2.0, "excellent": 3.0,
+    "fantastic": 3.0, "fascinating": 2.5, "favourite": 2.5, "favorite": 2.5,
+    "fun": 2.0, "gem": 2.5, "good": 1.5, "gorgeous": 2.5, "gripping": 2.5,
+    "great": 2.5, "happy": 2.0, "helpful": 1.5, "impressive": 2.5,
+    "insightful": 2.5, "inspiring": 2.5, "interesting": 1.5, "love": 3.0,
+    "loved": 3.0, "masterpiece": 3.5, "memorable": 2.0, "moving": 2.0,
+    "nice": 1.5, "perfect": 3.0, "pleasant": 1.5, "powerful": 2.0,
+    "recommend": 2.0, "recommended": 2.0, "refreshing": 2.0, "rich": 1.5,
+    "satisfying": 2.0, "solid": 1.5, "stunning": 3.0, "superb": 3.0,
+    "thoughtful": 2.0, "thrilling": 2.5, "touching": 2.0, "well": 1.0,
+    "wonderful": 3.0, "worth": 1.5,
+    # negative
+    "annoying": -2.0, "awful": -3.0, "bad": -2.0, "bland": -1.5,
+    "boring": -2.5, "clumsy": -1.5, "confusing": -2.0, "disappointed": -2.5,
+    "disappointing": -2.5, "dull": -2.0, "flat": -1.5, "forgettable": -2.0,
+    "hate": -3.0, "hated": -3.0, "horrible": -3.0, "lacking": -1.5,
+    "mediocre": -2.0, "mess": -2.0, "messy": -1.5, "overrated": -2.0,
+    "pointless": -2.5, "poor": -2.0, "poorly": -2.0, "predictable": -1.5,
+    "repetitive": -1.5, "shallow": -2.0, "slow": -1.5, "tedious": -2.5,
+    "terrible": -3.0, "unbearable": -3.0, "unconvincing": -2.0,
+    "unreadable": -3.0, "waste": -3.0, "weak": -2.0, "worse": -2.5,
+    "worst": -3.5,
+}
+
+NEGATORS: tuple[str, ...] = (
+    "not", "no", "never", "hardly", "isn't", "wasn't", "don't",
+    "didn't", "doesn't", "can't", "couldn't", "won't",
+)
+
+_TOKEN_RE = re.compile(r"(?u)\b\w[\w']*\b")
+
+# VADER-style normalisation constant: score = raw / sqrt(raw² + alpha)
+SENTIMENT_ALPHA = 15.0
+
+
+# ── Scorer
+
+class SentimentScorer:
+    """Score many texts at once with a sparse lexicon dot product."""
+
+    def __init__(
+        self,
+        lexicon: dict[str, float] = SENTIMENT_LEXICON,
+        negators: Iterable[str] = NEGATORS,
+        alpha: float = SENTIMENT_ALPHA,
+    ) -> None:
+        self._negators = frozenset(negators)
+        vocabulary: dict[str, int] = {}
+        weights: list[float] = []
+        for word, weight in lexicon.items():
+            vocabulary[word] = len(weights)
+            weights.append(weight)
+            # The unigram still fires inside "not good", so the bigram
+            # carries twice the opposite weight to net out at -weight.
+            for neg in self._negators:
+                vocabulary[f"{neg} {word}"] = len(weights)
+                weights.append(-2.0 * weight)
+
+        self._vectorizer = CountVectorizer(
+            vocabulary=vocabulary,
+            analyzer=self._analyze,
+            dtype=np.float32,
+        )
+        self._weights = np.asarray(weights, dtype=np.float32)
+        self._alpha = alpha
+
+    def _analyze(self, text: str) -> list[str]:
+        # Only bigrams that start with a negator can hit the vocabulary,
+        # so skip building the rest; this roughly doubles throughput.
+        tokens = _TOKEN_RE.findall(text.lower())
+        negators = self._negators
+        tokens.extend(
+            f"{a} {b}" for a, b in zip(tokens, tokens[1:]) if a in negators
+        )
+        return tokens
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a float array of scores in [-1, 1], one per text."""
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        counts = self._vectorizer.transform(texts)
+        raw = counts @ self._weights
+        return raw / np.sqrt(raw * raw + self._alpha)
+
+    def score(self, text: str) -> float:
+        return float(self.score_batch([text])[0])
+
+
+@lru_cache
+def get_sentiment_scorer() -> SentimentScorer:
+    return SentimentScorer()
+
+
+# ── Batch job helpers
+
+async def score_unscored_reviews(
+    db: AsyncSession, batch_size: int | None = None
+) -> int:
+    """
+    Score every review with a NULL sentiment_score, batch_size rows at a
+    time, refreshing the mean of each chunk's books with it. Returns the
+    number scored. Commits after each chunk so a crash only loses the
+    chunk in flight.
+    """
+    batch_size = batch_size or settings.SENTIMENT_BATCH_SIZE
+    scorer = get_sentiment_scorer()
+    last_id = 0
+    scored = 0
+
+    while True:
+        result = await db.execute(
+            select(Review.id, Review.book_id, Review.body)
+            .where(Review.sentiment_score.is_(None), Review.id > last_id)
+            .order_by(Review.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+
+        scores = scorer.score_batch([r.body for r in rows])
+        await db.execute(
+            update(Review),
+            [
+                {"id": r.id, "sentiment_score": float(s)}
+                for r, s in zip(rows, scores)
+            ],
+        )
+        # Per chunk: keeps the IN list bounded by batch_size
+        await refresh_book_sentiment(db, {r.book_id for r in rows})
+        scored += len(rows)
+        last_id = rows[-1].id
+        await db.commit()
+
+    return scored
+
+
+async def refresh_book_sentiment(db: AsyncSession, book_ids: Iterable[int]) -> None:
+    """Recompute Book.average_sentiment from scored reviews in one UPDATE."""
+    ids = list(book_ids)
+    if not ids:
+        return
+    mean = (
+        select(func.avg(Review.sentiment_score))
+        .where(Review.book_id == Book.id, Review.sentiment_score.is_not(None))
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(Book)
+        .where(Book.id.in_(ids))
+        .values(average_sentiment=mean)
+        .execution_options(synchronize_session=False)
+    )
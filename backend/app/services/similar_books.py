@@ -0,0 +1,582 @@
+"""
+"Similar books": approximate nearest neighbours over per-book vectors.
+
+Each book becomes one dense unit vector. Its description and AI summary are
+hashed into `dims` signed buckets (HashingVectorizer with alternating signs,
+which acts as a sparse random projection of the bag of words), with
+sublinear tf. A seeded random direction for the genre is then added,
+weighted by genre_weight. Books with neither text nor genre get no vector.
+
+The index is an inverted file (IVF). Spherical k-means splits the vectors
+into about 2·sqrt(n) lists, and the vectors are stored sorted by list, so
+each list is one contiguous slice. A query scores the centroids, scans the
+`nprobe` closest lists exactly and returns their top k. That reads roughly
+nprobe / nlist of the catalog instead of all of it.
+
+Updates never move the centroids. New or changed books go into a small
+unsorted tail, which every query scans in full. Removed books are masked
+out. Once the tail outgrows a fraction of the lists it is merged: each tail
+vector is assigned to its nearest centroid and the slices are rebuilt. The
+centroids are retrained only when the catalog has grown 4x since they were
+fitted.
+
+Persistence: SIMILAR_BOOKS_INDEX_PATH is a directory of generations, each
+holding plain .npy arrays, plus a CURRENT file naming the live generation.
+A new generation is written in full, and then CURRENT is swapped by rename
+(see model_store.py), by one worker at a time. Workers open the vectors
+with np.load(mmap_mode="r"), so every worker on a host shares one copy in
+the page cache. Training, merging and writing run in a worker thread on a
+private copy, under the build lock, and are swapped in whole; until a first
+generation exists, workers that do not hold the lock answer with no
+neighbours rather than train their own. build_similar_books retrains
+nightly (app/tasks/scheduler.py).
+
+Only books.text_updated_at, which moves with the genre, description or AI
+summary, sends a book into the tail. `revision` names what a worker serves
+(its generation and the changes applied on top) for the endpoint's ETag.
+"""
+
+import asyncio
+import zlib
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.base import as_utc
+from app.models.book import Book, BookAIContent
+from app.repositories.book_repository import (
+    WATERMARK_LOOKBACK,
+    BookRepository,
+    CatalogVersion,
+)
+from app.services.model_store import (
+    Generation,
+    build_lock,
+    current_generation,
+    read_generation,
+    write_generation,
+)
+from app.services.recommendation_catalog import top_k_indices
+
+settings = get_settings()
+
+_RELOAD_BATCH = 10_000
+_MIN_IVF = 2_000  # below this a single list is searched exhaustively
+_MIN_MERGE = 1_000  # tail rows tolerated before merging, however small the lists
+_RETRAIN_GROWTH = 4.0
+_KMEANS_ITERATIONS = 8
+_KMEANS_SAMPLE_PER_LIST = 32
+_BLOCK = 4_096  # rows per matrix product when assigning to centroids
+
+_VECTOR_QUERY = select(
+    Book.id,
+    Book.genre,
+    Book.description,
+    BookAIContent.ai_summary,
+    Book.text_updated_at,
+).outerjoin(BookAIContent, BookAIContent.book_id == Book.id)
+
+
+def _document(description: str | None, summary: str | None) -> str:
+    return "\n".join(t for t in (description, summary) if t)
+
+
+def list_count(n: int) -> int:
+    return 1 if n < _MIN_IVF else int(2 * np.sqrt(n))
+
+
+class BookVectorizer:
+    """(genre, description, ai_summary) → unit float32 vectors of `dims`."""
+
+    def __init__(self, dims: int = 128, genre_weight: float = 0.5) -> None:
+        self.dims = dims
+        self.genre_weight = genre_weight
+        self._hasher = HashingVectorizer(
+            n_features=dims,
+            alternate_sign=True,
+            norm=None,
+            stop_words="english",
+            dtype=np.float32,
+        )
+        self._genres: dict[str, np.ndarray] = {}
+
+    def _genre(self, genre: str) -> np.ndarray:
+        key = genre.strip().lower()
+        vector = self._genres.get(key)
+        if vector is None:
+            # Seeded by the name, so every worker derives the same direction
+            rng = np.random.default_rng(zlib.crc32(key.encode()))
+            vector = rng.standard_normal(self.dims).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            self._genres[key] = vector
+        return vector
+
+    def transform(self, rows: Sequence[Sequence]) -> np.ndarray:
+        """One row per (genre, description, ai_summary); all-zero when there is nothing."""
+        vectors = np.zeros((len(rows), self.dims), dtype=np.float32)
+        if not rows:
+            return vectors
+        counts = self._hasher.transform([_document(r[1], r[2]) for r in rows])
+        counts.eliminate_zeros()  # colliding terms of opposite sign
+        # Sublinear tf, keeping the hash sign
+        np.copysign(np.log(np.abs(counts.data)) + 1.0, counts.data, out=counts.data)
+        counts.toarray(out=vectors)
+        _normalize(vectors)
+        for position, row in enumerate(rows):
+            if row[0]:
+                vectors[position] += self.genre_weight * self._genre(row[0])
+        return _normalize(vectors)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for each row, in blocks."""
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _BLOCK):
+        out[start : start + _BLOCK] = np.argmax(
+            vectors[start : start + _BLOCK] @ centroids.T, axis=1
+        )
+    return out
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of the vectors."""
+    rng = np.random.default_rng(seed)
+    size = min(len(vectors), nlist * _KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[np.sort(rng.choice(len(vectors), size, replace=False))]
+    centroids = sample[rng.choice(size, nlist, replace=False)].copy()
+    for _ in range(_KMEANS_ITERATIONS):
+        assigned = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assigned, sample)
+        empty = np.flatnonzero(~sums.any(axis=1))
+        # An empty list restarts from a random point instead of dying out
+        sums[empty] = sample[rng.choice(size, empty.size, replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class SimilarBooksIndex:
+    def __init__(
+        self,
+        path: str | None = None,
+        dims: int = 128,
+        nprobe: int = 16,
+        genre_weight: float = 0.5,
+        merge_fraction: float = 0.1,
+    ) -> None:
+        self._path = path or None
+        self.nprobe = nprobe
+        self._merge_fraction = merge_fraction
+        self._vectorizer = BookVectorizer(dims, genre_weight)
+        self._lock = asyncio.Lock()
+        self.version: CatalogVersion | None = None
+        self._loaded = False
+        self._unsaved = False
+        self._generation: str | None = None
+        self._watermark: datetime | None = None
+        self._changes = 0  # upserts and removals since the last build or adoption
+        self._reset()
+
+    def _reset(self) -> None:
+        dims = self._vectorizer.dims
+        self._centroids = np.zeros((1, dims), dtype=np.float32)
+        self._trained_on = 0
+        # Vectors sorted by list: list l is rows offsets[l]:offsets[l + 1]
+        self._vectors = np.zeros((0, dims), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(2, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._order = np.zeros(0, dtype=np.int64)  # sorts _ids, for lookups by id
+        self._tail: dict[int, np.ndarray] = {}
+        self._tail_block: tuple[np.ndarray, np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return int(self._alive.sum()) + len(self._tail)
+
+    @property
+    def nlist(self) -> int:
+        return len(self._centroids)
+
+    @property
+    def revision(self) -> tuple[str | None, int]:
+        """Changes whenever what similar_to returns may have."""
+        return self._generation, self._changes
+
+    # ── Loading
+
+    def build(self, rows: Iterable[Sequence], version: CatalogVersion | None = None) -> None:
+        """Bulk load from (id, genre, description, ai_summary[, text_updated_at]) rows."""
+        rows = list(rows)
+        vectors = self._vectorizer.transform([r[1:4] for r in rows])
+        ids = np.fromiter((r[0] for r in rows), np.int64, len(rows))
+        keep = vectors.any(axis=1)
+        self.build_vectors(ids[keep], vectors[keep], version)
+        self._advance_watermark(rows)
+
+    def build_vectors(
+        self, ids: np.ndarray, vectors: np.ndarray, version: CatalogVersion | None = None
+    ) -> None:
+        """Bulk load already computed unit vectors, training fresh centroids."""
+        self._reset()
+        self._watermark = None
+        self._train(ids, vectors)
+        self._changes += 1
+        self.version = version
+        self._loaded = True
+        self._unsaved = True
+
+    def _train(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        nlist = list_count(len(ids))
+        if nlist > 1:
+            self._centroids = train_centroids(vectors, nlist)
+        else:
+            # One list holding everything: an exhaustive scan
+            self._centroids = np.zeros((1, self._vectorizer.dims), dtype=np.float32)
+        self._trained_on = len(ids)
+        self._store(ids, vectors)
+
+    def _store(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        if self.nlist > 1:
+            lists = _nearest(vectors, self._centroids)
+        else:
+            lists = np.zeros(len(ids), dtype=np.int64)
+        order = np.argsort(lists, kind="stable")
+        self._vectors = np.ascontiguousarray(vectors[order])
+        self._ids = ids[order]
+        self._offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(lists, minlength=self.nlist))]
+        ).astype(np.int64)
+        self._alive = np.ones(len(ids), dtype=bool)
+        self._order = np.argsort(self._ids, kind="stable")
+        self._tail = {}
+        self._tail_block = None
+
+    def _advance_watermark(self, rows: Sequence[Sequence]) -> None:
+        stamps = [as_utc(r[4]) for r in rows if len(r) > 4 and r[4] is not None]
+        if stamps and (self._watermark is None or max(stamps) > self._watermark):
+            self._watermark = max(stamps)
+
+    def upsert_many(self, rows: Iterable[Sequence]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        vectors = self._vectorizer.transform([r[1:4] for r in rows])
+        for row, vector in zip(rows, vectors):
+            current = self.vector_of(row[0])
+            if current is None and not vector.any():
+                continue
+            if current is not None and np.array_equal(current, vector):
+                continue  # re-read inside the lookback, unchanged
+            self._drop(row[0])
+            if vector.any():
+                self._tail[row[0]] = vector
+            self._tail_block = None
+            self._changes += 1
+        self._advance_watermark(rows)
+        if not self._path and self._needs_merge():
+            # A shared index is merged by whoever publishes (ensure_fresh)
+            self.merge()
+
+    def _needs_merge(self) -> bool:
+        return len(self._tail) > max(_MIN_MERGE, self._merge_fraction * len(self._ids))
+
+    def remove(self, book_id: int) -> None:
+        if self._drop(book_id):
+            self._tail_block = None
+            self._changes += 1
+
+    def _drop(self, book_id: int) -> bool:
+        if self._tail.pop(book_id, None) is not None:
+            return True
+        slot = self._slot(book_id)
+        if slot is None:
+            return False
+        self._alive[slot] = False
+        return True
+
+    def merge(self) -> None:
+        """Fold the tail into the lists and drop removed rows."""
+        keep = np.flatnonzero(self._alive)
+        if not self._tail and keep.size == len(self._ids):
+            return
+        tail_ids, tail_vectors = self._tail_arrays()
+        ids = np.concatenate([self._ids[keep], tail_ids])
+        vectors = np.concatenate([self._vectors[keep], tail_vectors])
+        if list_count(len(ids)) > 1 and (
+            self.nlist == 1 or len(ids) > _RETRAIN_GROWTH * self._trained_on
+        ):
+            self._train(ids, vectors)
+        else:
+            self._store(ids, vectors)
+        self._unsaved = True
+
+    def _detached(self) -> "SimilarBooksIndex":
+        """A copy to merge and save off the loop; the stored arrays are shared, read-only."""
+        copy = SimilarBooksIndex(
+            dims=self._vectorizer.dims,
+            genre_weight=self._vectorizer.genre_weight,
+            merge_fraction=self._merge_fraction,
+        )
+        for name in ("_centroids", "_trained_on", "_vectors", "_ids", "_offsets", "_order"):
+            setattr(copy, name, getattr(self, name))
+        copy._alive = self._alive.copy()
+        copy._tail = dict(self._tail)
+        copy._watermark = self._watermark
+        return copy
+
+    def _take(self, other: "SimilarBooksIndex") -> None:
+        """Swap in another index's state in one step on the loop."""
+        own = (
+            "_path", "nprobe", "_merge_fraction", "_vectorizer", "_lock", "version", "_changes",
+        )
+        vars(self).update({k: v for k, v in vars(other).items() if k not in own})
+        self._changes += 1
+
+    def clear(self) -> None:
+        self._reset()
+        self.version = self._watermark = self._generation = None
+        self._loaded = self._unsaved = False
+
+    # ── Persistence
+
+    def save(self, path: str) -> None:
+        self.merge()
+        generation = write_generation(path, *self._snapshot())
+        # Serve from the files just written so their pages are shared
+        self._restore(_read_generation(path, self._vectorizer.dims, generation))
+
+    def load(self, path: str) -> bool:
+        saved = _read_generation(path, self._vectorizer.dims)
+        if saved is not None:
+            self._restore(saved)
+        return saved is not None
+
+    def _snapshot(self) -> tuple[dict, dict]:
+        # Only taken right after a merge, so every stored row is alive
+        arrays = {
+            "vectors": self._vectors,
+            "ids": self._ids,
+            "offsets": self._offsets,
+            "centroids": self._centroids,
+            "order": self._order,
+        }
+        meta = {
+            "dims": self._vectorizer.dims,
+            "genre_weight": self._vectorizer.genre_weight,
+            "trained_on": self._trained_on,
+            "watermark": self._watermark.isoformat() if self._watermark else "",
+        }
+        return arrays, meta
+
+    def _restore(self, saved: Generation) -> None:
+        self._reset()
+        arrays, meta = saved.arrays, saved.meta
+        self._vectors = arrays["vectors"]
+        self._ids = arrays["ids"]
+        self._offsets = arrays["offsets"]
+        self._centroids = arrays["centroids"]
+        self._alive = np.ones(len(self._ids), dtype=bool)
+        self._order = arrays["order"]
+        self._trained_on = meta["trained_on"]
+        watermark = meta["watermark"]
+        self._watermark = datetime.fromisoformat(watermark) if watermark else None
+        self._generation = saved.name
+        self._changes = 0
+        self._loaded = True
+
+    # ── Freshness
+
+    async def ensure_fresh(self, db: AsyncSession, version: CatalogVersion | None = None) -> None:
+        if version is None:
+            version = await BookRepository(db).catalog_version()
+        if self._loaded and version == self.version:
+            return
+        async with self._lock:
+            if self._loaded and version == self.version:
+                return
+            current = self._path and await asyncio.to_thread(current_generation, self._path)
+            if current and current != self._generation:
+                # First use, or another process (e.g. the nightly build)
+                # published a newer generation: adopt it, then catch up
+                saved = await asyncio.to_thread(
+                    _read_generation, self._path, self._vectorizer.dims
+                )
+                if saved is not None:
+                    self._restore(saved)
+            if self._watermark is None and self._path:
+                if not await self._build_shared(db):
+                    return
+            elif self._watermark is None:
+                await self._reload(db)
+            else:
+                await self._apply_changes(db)
+            if self._path and (self._unsaved or self._needs_merge()):
+                await self._publish()
+            self.version = version
+
+    async def _build_shared(self, db: AsyncSession) -> bool:
+        """First build of a shared index; False if another worker is building it."""
+        with build_lock(self._path) as builder:
+            if not builder:
+                return False
+            # The last builder may have published since CURRENT was read
+            saved = await asyncio.to_thread(_read_generation, self._path, self._vectorizer.dims)
+            if saved is not None:
+                self._restore(saved)
+                await self._apply_changes(db)
+            else:
+                await self._reload(db)
+                await self._publish_locked()
+            return True
+
+    async def _publish(self) -> None:
+        with build_lock(self._path) as builder:
+            if builder:
+                await self._publish_locked()
+            # Otherwise another worker is publishing; keep our tail and adopt theirs
+
+    async def _publish_locked(self) -> None:
+        # Merge (maybe retrain), write and map the files off the event loop
+        # on a copy; queries keep reading the current state until the swap
+        detached = self._detached()
+        await asyncio.to_thread(detached.save, self._path)
+        self._take(detached)
+        self._changes = 0
+        self._unsaved = False
+
+    async def _reload(self, db: AsyncSession) -> None:
+        rows: list = []
+        result = await db.stream(_VECTOR_QUERY.execution_options(yield_per=_RELOAD_BATCH))
+        async for partition in result.partitions():
+            rows.extend(partition)
+        fresh = SimilarBooksIndex(
+            dims=self._vectorizer.dims,
+            genre_weight=self._vectorizer.genre_weight,
+            merge_fraction=self._merge_fraction,
+        )
+        await asyncio.to_thread(fresh.build, rows, self.version)
+        self._take(fresh)
+
+    async def _apply_changes(self, db: AsyncSession) -> None:
+        since = self._watermark - WATERMARK_LOOKBACK
+        result = await db.execute(_VECTOR_QUERY.where(Book.text_updated_at >= since))
+        self.upsert_many(result.all())
+
+    # ── Search
+
+    def vector_of(self, book_id: int) -> np.ndarray | None:
+        vector = self._tail.get(book_id)
+        if vector is not None:
+            return vector
+        slot = self._slot(book_id)
+        if slot is None:
+            return None
+        return np.asarray(self._vectors[slot])
+
+    def _slot(self, book_id: int) -> int | None:
+        """Row of a live stored book, None if it has none."""
+        if not len(self._ids):
+            return None
+        found = int(np.searchsorted(self._ids, book_id, sorter=self._order))
+        slot = int(self._order[min(found, len(self._ids) - 1)])
+        return slot if self._ids[slot] == book_id and self._alive[slot] else None
+
+    def _tail_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._tail_block is None:
+            ids = np.fromiter(self._tail, np.int64, len(self._tail))
+            vectors = np.array(list(self._tail.values()), np.float32).reshape(
+                -1, self._vectorizer.dims
+            )
+            self._tail_block = (ids, vectors)
+        return self._tail_block
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude_ids: Iterable[int] = (),
+        nprobe: int | None = None,
+    ) -> list[tuple[int, float]]:
+        """(id, cosine) of the k best matches in the nprobe closest lists and the tail."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        if nprobe < self.nlist:
+            probed = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        else:
+            probed = np.arange(self.nlist)
+        slots = np.concatenate(
+            [np.arange(self._offsets[i], self._offsets[i + 1]) for i in probed]
+        )
+        return self._rank(slots, query, k, exclude_ids)
+
+    def exact_search(
+        self, query: np.ndarray, k: int, exclude_ids: Iterable[int] = ()
+    ) -> list[tuple[int, float]]:
+        """Same as search, but scanning every vector: the baseline for recall."""
+        return self._rank(np.arange(len(self._ids)), query, k, exclude_ids)
+
+    def _rank(
+        self, slots: np.ndarray, query: np.ndarray, k: int, exclude_ids: Iterable[int]
+    ) -> list[tuple[int, float]]:
+        slots = slots[self._alive[slots]]
+        if slots.size == len(self._ids):
+            # Every list probed: one product over the (possibly mapped) array
+            scores = self._vectors @ query
+        else:
+            scores = self._vectors[slots] @ query
+        tail_ids, tail_vectors = self._tail_arrays()
+        ids = np.concatenate([self._ids[slots], tail_ids])
+        scores = np.concatenate([scores, tail_vectors @ query]).astype(np.float64)
+        excluded = np.fromiter(exclude_ids, np.int64)
+        candidates = np.arange(len(ids))
+        if excluded.size:
+            candidates = candidates[~np.isin(ids, excluded)]
+        best = top_k_indices(ids, scores, candidates, k)
+        return list(zip(ids[best].tolist(), scores[best].tolist()))
+
+    def similar_to(self, book_id: int, k: int) -> list[tuple[int, float]]:
+        """The k books nearest to book_id, itself excluded; [] if it has no vector."""
+        query = self.vector_of(book_id)
+        if query is None or k <= 0:
+            return []
+        return self.search(query, k, exclude_ids=[book_id])
+
+
+# ── Generations on disk
+
+# The vectors and ids stay mapped; the small arrays every query walks are copied
+_MMAP_MODES = {"vectors": "r", "ids": "r", "order": "r", "offsets": None, "centroids": None}
+
+
+def _read_generation(path: str, dims: int, generation: str | None = None) -> Generation | None:
+    saved = read_generation(path, generation, _MMAP_MODES)
+    return saved if saved is not None and saved.meta["dims"] == dims else None
+
+
+async def build_similar_books_file(db: AsyncSession, path: str | None = None) -> int:
+    """Retrain from every book and publish a new generation; returns the books indexed."""
+    index = SimilarBooksIndex(dims=settings.SIMILAR_BOOKS_DIMS)
+    index.version = await BookRepository(db).catalog_version()
+    await index._reload(db)
+    await asyncio.to_thread(index.save, path or settings.SIMILAR_BOOKS_INDEX_PATH)
+    return len(index)
+
+
+@lru_cache
+def get_similar_books_index() -> SimilarBooksIndex:
+    return SimilarBooksIndex(
+        path=settings.SIMILAR_BOOKS_INDEX_PATH,
+        dims=settings.SIMILAR_BOOKS_DIMS,
+        nprobe=settings.SIMILAR_BOOKS_NPROBE,
+    )
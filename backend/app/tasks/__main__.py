@@ -0,0 +1,28 @@
+"""Command line for the periodic jobs; see app.tasks.scheduler."""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.core.config import get_settings
+from app.tasks.scheduler import get_job, jobs, run_job, run_schedule
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.tasks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("schedule", help="run every job on its interval")
+    run = commands.add_parser("run", help="run one job now")
+    run.add_argument("job", choices=[job.name for job in jobs()])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=get_settings().LOG_LEVEL)
+    if args.command == "schedule":
+        asyncio.run(run_schedule())
+        return 0
+    return 0 if asyncio.run(run_job(get_job(args.job))) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
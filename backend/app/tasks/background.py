@@ -4,6 +4,7 @@ All LLM generation is offloaded here so that HTTP responses remain fast.
 
 import asyncio
 import logging
+import threading
 
 from app.core.config import get_settings
 
@@ -12,10 +13,28 @@ logger = logging.getLogger(__name__)
 
 
 # Helper: run async code
+#
+# All tasks share one long-lived event loop on a daemon thread. A fresh
+# asyncio.run() per task would throw away the background connection pool
+# (asyncpg connections are tied to the loop that created them).
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="background-tasks", daemon=True
+            ).start()
+        return _loop
 
 
 def _run(coro):
-    return asyncio.run(coro)
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
 
 
 # Task: Generate book summary
@@ -25,73 +44,95 @@ def generate_book_summary(book_id: int) -> None:
     """Read book content from storage, call LLM, persist summary."""
     try:
         _run(_generate_book_summary_async(book_id))
-    except Exception as exc:
+    except Exception:
         logger.exception("generate_book_summary failed for book %s", book_id)
 
 
 async def _generate_book_summary_async(book_id: int) -> None:
-    from app.db.session import AsyncSessionLocal
+    from app.db.session import BackgroundSessionLocal
     from app.models.book import Book, SummaryStatus
+    from app.repositories.book_repository import BookRepository
+    from app.services.events.broker import publish_book_event
     from app.services.llm.llm_service import (
         BOOK_SUMMARY_SYSTEM,
         build_summary_prompt,
         get_llm_service,
+        llm_limiter,
     )
+    from app.services.llm.summarization import MapReduceSummarizer, estimate_tokens
     from app.services.storage.storage_service import get_storage_service
     from app.utils.text_extraction import extract_text
 
-    async with AsyncSessionLocal() as db:
+    async with BackgroundSessionLocal() as db:
         book = await db.get(Book, book_id)
         if not book or not book.file_key:
             return
 
         book.summary_status = SummaryStatus.PROCESSING
         await db.commit()
+        await publish_book_event(db, book_id, "summary", summary_status=book.summary_status)
 
         try:
             storage = get_storage_service()
             raw_bytes = await storage.read_file(book.file_key)
-            content_text = extract_text(raw_bytes, book.file_key)[
-                : settings.MAX_CONTENT_LENGTH
-            ]  # because of LLM input limits
+            full_text = extract_text(raw_bytes, book.file_key)
 
             llm = get_llm_service()
-            summary = await llm.complete(
-                system_prompt=BOOK_SUMMARY_SYSTEM,
-                user_prompt=build_summary_prompt(book.title, book.author, content_text),
-                max_tokens=400,
-            )
+            if (
+                settings.SUMMARY_LONG_DOCUMENT_MODE
+                and estimate_tokens(full_text) > settings.SUMMARY_CHUNK_TOKENS
+            ):
+                summary = await MapReduceSummarizer(llm).summarize(
+                    book.title, book.author, full_text
+                )
+            else:
+                content_text = full_text[
+                    : settings.MAX_CONTENT_LENGTH
+                ]  # because of LLM input limits
+                async with llm_limiter():
+                    summary = await llm.complete(
+                        system_prompt=BOOK_SUMMARY_SYSTEM,
+                        user_prompt=build_summary_prompt(book.title, book.author, content_text),
+                        max_tokens=400,
+                    )
 
-            book.ai_summary = summary
+            await BookRepository(db).save_ai_content(book.id, ai_summary=summary)
             book.summary_status = SummaryStatus.COMPLETED
         except Exception:
             book.summary_status = SummaryStatus.FAILED
             raise
         finally:
             await db.commit()
+            await publish_book_event(
+                db, book_id, "summary", summary_status=book.summary_status
+            )
 
 
 # Task: Update review
 def update_review(book_id: int) -> None:
     try:
         _run(_update_review_async(book_id))
-    except Exception as exc:
+    except Exception:
         logger.exception("update_review_consensus failed for book %s", book_id)
 
 
 async def _update_review_async(book_id: int) -> None:
     from sqlalchemy import select
 
-    from app.db.session import AsyncSessionLocal
+    from app.db.session import BackgroundSessionLocal
     from app.models.book import Book
     from app.models.library import Review
+    from app.repositories.book_repository import BookRepository
+    from app.services.events.broker import publish_book_event
     from app.services.llm.llm_service import (
         REVIEW_CONSENSUS_SYSTEM,
         build_review_consensus_prompt,
         get_llm_service,
+        llm_limiter,
     )
+    from app.services.sentiment_service import get_sentiment_scorer
 
-    async with AsyncSessionLocal() as db:
+    async with BackgroundSessionLocal() as db:
         book = await db.get(Book, book_id)
         if not book:
             return
@@ -101,16 +142,127 @@ async def _update_review_async(book_id: int) -> None:
         if not reviews:
             return
 
+        # Score any reviews the batch job hasn't reached yet in one pass
+        unscored = [r for r in reviews if r.sentiment_score is None]
+        if unscored:
+            scores = get_sentiment_scorer().score_batch([r.body for r in unscored])
+            for review, score in zip(unscored, scores):
+                review.sentiment_score = float(score)
+
         review_dicts = [{"rating": r.rating, "body": r.body} for r in reviews]
 
         llm = get_llm_service()
-        consensus = await llm.complete(
-            system_prompt=REVIEW_CONSENSUS_SYSTEM,
-            user_prompt=build_review_consensus_prompt(book.title, review_dicts),
-            max_tokens=300,
-        )
+        async with llm_limiter():
+            consensus = await llm.complete(
+                system_prompt=REVIEW_CONSENSUS_SYSTEM,
+                user_prompt=build_review_consensus_prompt(book.title, review_dicts),
+                max_tokens=300,
+            )
 
-        book.ai_review_consensus = consensus
+        await BookRepository(db).save_ai_content(book.id, ai_review_consensus=consensus)
         book.review_count = len(reviews)
         book.average_rating = sum(r.rating for r in reviews) / len(reviews)
+        book.average_sentiment = sum(r.sentiment_score for r in reviews) / len(reviews)
         await db.commit()
+        await publish_book_event(
+            db,
+            book_id,
+            "review_consensus",
+            review_count=book.review_count,
+            average_rating=book.average_rating,
+        )
+
+
+# Task: Score review sentiment (batch)
+def score_review_sentiments() -> None:
+    """Score all unscored reviews in chunks; safe to run on a schedule."""
+    try:
+        _run(score_review_sentiments_async())
+    except Exception:
+        logger.exception("score_review_sentiments failed")
+
+
+async def score_review_sentiments_async() -> None:
+    from app.db.session import BackgroundSessionLocal
+    from app.services.sentiment_service import score_unscored_reviews
+
+    async with BackgroundSessionLocal() as db:
+        scored = await score_unscored_reviews(db)
+        logger.info("score_review_sentiments scored %s reviews", scored)
+
+
+# Task: Publish the shared recommender models (nightly, or after bulk imports)
+def build_recommender_models() -> None:
+    """Rebuild the catalog and description index once for every worker on the host."""
+    try:
+        _run(build_recommender_models_async())
+    except Exception:
+        logger.exception("build_recommender_models failed")
+
+
+async def build_recommender_models_async() -> None:
+    from app.db.session import BackgroundSessionLocal
+    from app.services.recommendation_catalog import build_catalog_file
+    from app.services.recommendation_text_index import build_text_index_file
+
+    async with BackgroundSessionLocal() as db:
+        books = await build_catalog_file(db)
+        indexed = await build_text_index_file(db)
+        logger.info("build_recommender_models loaded %s books, indexed %s", books, indexed)
+
+
+# Task: Build item-item neighbours (nightly)
+def build_item_neighbours() -> None:
+    """Full collaborative-filtering build; run nightly. Workers adopt the new generation."""
+    try:
+        _run(build_item_neighbours_async())
+    except Exception:
+        logger.exception("build_item_neighbours failed")
+
+
+async def build_item_neighbours_async() -> None:
+    from app.db.session import BackgroundSessionLocal
+    from app.services.recommendation_neighbours import build_neighbour_file
+
+    async with BackgroundSessionLocal() as db:
+        books = await build_neighbour_file(db)
+        logger.info("build_item_neighbours indexed %s books", books)
+
+
+# Task: Retrain the similar-books index (nightly)
+def build_similar_books() -> None:
+    """Fresh IVF centroids over every book; workers adopt the new generation."""
+    try:
+        _run(build_similar_books_async())
+    except Exception:
+        logger.exception("build_similar_books failed")
+
+
+async def build_similar_books_async() -> None:
+    from app.db.session import BackgroundSessionLocal
+    from app.services.similar_books import build_similar_books_file
+
+    async with BackgroundSessionLocal() as db:
+        books = await build_similar_books_file(db)
+        logger.info("build_similar_books indexed %s books", books)
+
+
+# Task: Precompute every active user's recommendations (before the morning peak)
+def precompute_recommendations() -> None:
+    """Batch-score users into user_recommendations; resumes from its checkpoint."""
+    try:
+        _run(precompute_recommendations_async())
+    except Exception:
+        logger.exception("precompute_recommendations failed")
+
+
+async def precompute_recommendations_async() -> None:
+    from app.db.session import BackgroundSessionLocal
+    from app.services.recommendation_batch import precompute_recommendations
+
+    async with BackgroundSessionLocal() as db:
+        report = await precompute_recommendations(db)
+        logger.info(
+            "precompute_recommendations stored %s users in %.1fs (%.0f users/s)",
+            report.users, report.seconds, report.users_per_second,
+        )
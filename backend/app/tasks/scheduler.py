@@ -0,0 +1,99 @@
+"""
+Periodic jobs. One scheduler process per deployment runs them:
+
+    python -m app.tasks schedule      # every job, on its interval, forever
+    python -m app.tasks run <job>     # one job, now (cron, deploy hooks, ops)
+
+Jobs run one at a time on the scheduler's own event loop and session, so a
+slow job delays the next one instead of competing with it for the
+background pool. Every job is due once at start-up, then every interval
+seconds after it finishes; an interval of 0 disables the job. Jobs due at
+the same moment run in list order, so the nightly precompute scores with
+the models the builds before it just published.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import NamedTuple
+
+from app.core.config import get_settings
+from app.tasks import background
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class Job(NamedTuple):
+    name: str
+    run: Callable[[], Awaitable[None]]
+    interval: float  # seconds between runs; 0 disables
+
+
+def jobs() -> list[Job]:
+    return [
+        Job(
+            "score_review_sentiments",
+            background.score_review_sentiments_async,
+            settings.SENTIMENT_SCORE_INTERVAL_SECONDS,
+        ),
+        Job(
+            "build_recommender_models",
+            background.build_recommender_models_async,
+            settings.RECOMMENDER_MODELS_BUILD_INTERVAL_SECONDS,
+        ),
+        Job(
+            "build_item_neighbours",
+            background.build_item_neighbours_async,
+            settings.RECOMMENDER_NEIGHBOURS_BUILD_INTERVAL_SECONDS,
+        ),
+        Job(
+            "build_similar_books",
+            background.build_similar_books_async,
+            settings.SIMILAR_BOOKS_BUILD_INTERVAL_SECONDS,
+        ),
+        Job(
+            "precompute_recommendations",
+            background.precompute_recommendations_async,
+            settings.RECOMMENDER_PRECOMPUTE_INTERVAL_SECONDS,
+        ),
+    ]
+
+
+def get_job(name: str) -> Job:
+    for job in jobs():
+        if job.name == name:
+            return job
+    raise KeyError(name)
+
+
+async def run_job(job: Job) -> bool:
+    """Run one job; failures are logged, never raised, so the schedule goes on."""
+    start = time.monotonic()
+    try:
+        await job.run()
+    except Exception:
+        logger.exception("job %s failed", job.name)
+        return False
+    logger.info("job %s finished in %.1fs", job.name, time.monotonic() - start)
+    return True
+
+
+async def run_schedule(
+    schedule: list[Job] | None = None,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+) -> None:
+    """Run each enabled job when it falls due, until cancelled."""
+    schedule = [job for job in (schedule or jobs()) if job.interval > 0]
+    if not schedule:
+        return
+    due = {job.name: clock() for job in schedule}
+    while True:
+        job = min(schedule, key=lambda j: due[j.name])
+        wait = due[job.name] - clock()
+        if wait > 0:
+            await sleep(wait)
+        await run_job(job)
+        due[job.name] = clock() + job.interval
@@ -0,0 +1,51 @@
+"""Opaque keyset-pagination cursors."""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode(payload: dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict[str, Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    if not isinstance(data, dict):
+        raise TypeError("cursor payload must be an object")
+    return data
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the sort key of the last row on a page."""
+    return _encode({"c": created_at.isoformat(), "i": row_id})
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_cursor; raises InvalidCursor on tampered input."""
+    try:
+        data = _decode(cursor)
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor("Invalid pagination cursor") from exc
+
+
+def encode_rank_cursor(rank: float, row_id: int) -> str:
+    """Cursor for relevance-ordered results: (rank DESC, id DESC)."""
+    return _encode({"r": rank, "i": row_id})
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        data = _decode(cursor)
+        return float(data["r"]), int(data["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor("Invalid pagination cursor") from exc
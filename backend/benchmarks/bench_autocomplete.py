@@ -0,0 +1,74 @@
+"""
+Latency benchmark for the in-process autocomplete prefix index.
+
+    python -m benchmarks.bench_autocomplete [n_titles] [--no-words]
+
+Builds a synthetic catalog (1M titles by default), then times prefix
+lookups of 1-6 characters. Target: p99 well under 10 ms. --no-words indexes
+only full titles and authors, which roughly quarters memory use.
+"""
+
+import random
+import sys
+import time
+
+from app.services.autocomplete_service import PrefixIndex, Suggestion
+
+_WORDS = (
+    "the a of and night day river stone garden house city war peace love "
+    "shadow light queen king empire island ocean winter summer silent last "
+    "first secret lost dream fire ice iron glass song story history life "
+    "death road journey star moon sun forest mountain storm hidden golden"
+).split()
+_NAMES = "anna ben clara david emma felix grace henry iris jack kate leo mia noah".split()
+
+
+def _catalog(n: int, seed: int = 0) -> list[Suggestion]:
+    rng = random.Random(seed)
+    return [
+        Suggestion(
+            i,
+            " ".join(rng.choices(_WORDS, k=rng.randint(2, 5))).title() + f" {i}",
+            f"{rng.choice(_NAMES).title()} {rng.choice(_WORDS).title()}son",
+        )
+        for i in range(n)
+    ]
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main(n: int = 1_000_000, index_words: bool = True, queries: int = 20_000) -> None:
+    books = _catalog(n)
+    index = PrefixIndex(index_words=index_words)
+
+    start = time.perf_counter()
+    index.build(books)
+    print(f"built index over {n:,} titles in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    prefixes = [rng.choice(_WORDS + _NAMES)[: rng.randint(1, 6)] for _ in range(queries)]
+    samples = []
+    for prefix in prefixes:
+        t0 = time.perf_counter()
+        index.lookup(prefix, 10)
+        samples.append((time.perf_counter() - t0) * 1000)
+    print(
+        f"lookup over {queries:,} prefixes: "
+        f"p50={_percentile(samples, 0.50):.3f}ms "
+        f"p99={_percentile(samples, 0.99):.3f}ms "
+        f"max={max(samples):.3f}ms"
+    )
+
+    start = time.perf_counter()
+    for i in range(1000):
+        index.upsert(Suggestion(n + i, f"New Release {i}", "Fresh Author"))
+    per_book_ms = (time.perf_counter() - start) * 1000 / 1000
+    print(f"incremental upsert: {per_book_ms:.3f}ms per book")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    main(int(args[0]) if args else 1_000_000, index_words="--no-words" not in sys.argv)
@@ -0,0 +1,119 @@
+"""
+Latency benchmark: read-then-write borrow vs. single-statement borrow.
+
+    python -m benchmarks.bench_borrow [cycles] [workers]
+
+Runs against DATABASE_URL (point it at Postgres for representative
+numbers; it falls back to a temporary SQLite file). Each worker repeatedly
+borrows and returns its own book, so on Postgres the comparison measures
+round trips rather than row-lock contention (SQLite has a single write lock,
+so its tail also reflects how long each flow holds it). Prints p50/p99.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import get_settings
+from app.db.base import Base
+from app.models.book import Book, BookStatus
+from app.models.library import Borrow, BorrowStatus
+from app.models.user import User
+from app.repositories.borrow_repository import BorrowRepository
+
+
+async def _legacy_borrow(db: AsyncSession, user_id: int, book_id: int) -> None:
+    # The pre-0007 flow: get, existence check, insert, flush, refresh.
+    book = await db.get(Book, book_id)
+    assert book is not None and book.status == BookStatus.AVAILABLE
+    existing = await db.execute(
+        select(Borrow).where(
+            Borrow.user_id == user_id,
+            Borrow.book_id == book_id,
+            Borrow.status == BorrowStatus.ACTIVE,
+        )
+    )
+    assert existing.scalar_one_or_none() is None
+    borrow = Borrow(user_id=user_id, book_id=book_id)
+    db.add(borrow)
+    book.status = BookStatus.BORROWED
+    await db.flush()
+    await db.refresh(borrow)
+
+
+async def _atomic_borrow(db: AsyncSession, user_id: int, book_id: int) -> None:
+    assert await BorrowRepository(db).borrow(user_id, book_id) is not None
+
+
+_TABLES = [User.__table__, Book.__table__, Borrow.__table__]
+
+FLOWS = {"legacy": _legacy_borrow, "atomic": _atomic_borrow}
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _worker(sessions, flow, user_id: int, book_id: int, cycles: int) -> list[float]:
+    samples = []
+    for _ in range(cycles):
+        async with sessions() as db:
+            t0 = time.perf_counter()
+            await flow(db, user_id, book_id)
+            await db.commit()
+            samples.append((time.perf_counter() - t0) * 1000)
+        async with sessions() as db:
+            await BorrowRepository(db).return_book(user_id, book_id)
+            await db.commit()
+    return samples
+
+
+async def main(cycles: int = 200, workers: int = 8) -> None:
+    url = os.environ.get("DATABASE_URL") or get_settings().DATABASE_URL
+    if not url.startswith("postgresql"):
+        url = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+    engine = create_async_engine(url, connect_args={"timeout": 30} if "sqlite" in url else {})
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=_TABLES)
+    async with sessions() as db:
+        users = [
+            User(email=f"bench{i}@example.com", username=f"bench{i}", hashed_password="x")
+            for i in range(workers)
+        ]
+        books = [Book(title=f"Bench {i}", author="Bench") for i in range(workers)]
+        db.add_all([*users, *books])
+        await db.commit()
+        pairs = [(u.id, b.id) for u, b in zip(users, books)]
+
+    try:
+        print(f"{url.split(':')[0]}: {workers} workers x {cycles} borrows")
+        for name, flow in FLOWS.items():
+            results = await asyncio.gather(
+                *(_worker(sessions, flow, u, b, cycles) for u, b in pairs)
+            )
+            samples = [s for r in results for s in r]
+            print(
+                f"{name:>7}: p50={_percentile(samples, 0.50):.2f}ms "
+                f"p99={_percentile(samples, 0.99):.2f}ms"
+            )
+    finally:
+        async with sessions() as db:
+            book_ids = [b for _, b in pairs]
+            await db.execute(delete(Borrow).where(Borrow.book_id.in_(book_ids)))
+            await db.execute(delete(Book).where(Book.id.in_(book_ids)))
+            await db.execute(delete(User).where(User.id.in_([u for u, _ in pairs])))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.run(main(*args))
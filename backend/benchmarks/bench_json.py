@@ -0,0 +1,133 @@
+"""
+CPU cost of serialising list responses: FastAPI default path vs. the fast
+path in app/core/responses.py.
+
+    python -m benchmarks.bench_json [items] [requests]
+
+"default" is what the handlers used to do: BookResponse.model_validate per
+row, then FastAPI's serialize_response (re-validation against
+response_model, jsonable conversion) and JSONResponse's json.dumps.
+Compression cost is reported separately for the fast-path body (the
+synthetic text is repetitive, so ratios are optimistic).
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.compression import brotli, compress
+from app.core.responses import JSONBytesResponse, serialize
+from app.schemas.books import (
+    BOOK_VIEWS,
+    BookResponse,
+    BorrowResponse,
+    PaginatedBooksResponse,
+    RecommendationResponse,
+)
+
+_SUMMARY = " ".join(["lorem ipsum dolor sit amet"] * 60)  # ~300 words
+
+
+def _books(n: int) -> list[SimpleNamespace]:
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            id=i, title=f"Book {i}", author="Author Name", description="A description " * 10,
+            genre="Fiction", published_year=2001, file_url=f"http://storage/{i}",
+            ai_summary=_SUMMARY, ai_review_consensus=_SUMMARY, summary_status="completed",
+            average_rating=4.2, review_count=17, status="available",
+            created_at=now - timedelta(minutes=i),
+        )
+        for i in range(n)
+    ]
+
+
+def _borrows(n: int) -> list[SimpleNamespace]:
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            id=i, book_id=i, user_id=1, status="active", borrowed_at=now, returned_at=None
+        )
+        for i in range(n)
+    ]
+
+
+async def _default(field, content) -> bytes:
+    value = await serialize_response(field=field, response_content=content)
+    return JSONResponse(value).body
+
+
+def _time(fn, requests: int) -> float:
+    start = time.process_time()
+    for _ in range(requests):
+        fn()
+    return (time.process_time() - start) / requests * 1000
+
+
+def main(items: int = 100, requests: int = 500) -> None:
+    loop = asyncio.new_event_loop()
+    books, borrows = _books(items), _borrows(items)
+    full = BOOK_VIEWS["full"]
+    compact = BOOK_VIEWS["compact"]
+
+    def page(fields):
+        return {
+            "items": [{f: getattr(b, f) for f in fields} for b in books],
+            "total": items, "page": 1, "page_size": items, "next_cursor": None,
+        }
+
+    books_field = create_response_field("b", PaginatedBooksResponse, mode="serialization")
+    borrows_field = create_response_field("b", list[BorrowResponse], mode="serialization")
+    recs_field = create_response_field("r", RecommendationResponse, mode="serialization")
+
+    cases = {
+        "GET /books (full)": (
+            lambda: loop.run_until_complete(_default(books_field, PaginatedBooksResponse(
+                items=[BookResponse.model_validate(b).model_dump() for b in books],
+                total=items, page=1, page_size=items,
+            ))),
+            lambda: JSONBytesResponse(page(full)).body,
+        ),
+        "GET /books (compact)": (
+            None,
+            lambda: JSONBytesResponse(page(compact)).body,
+        ),
+        "GET /books/{id}/borrowed": (
+            lambda: loop.run_until_complete(_default(
+                borrows_field, [BorrowResponse.model_validate(b) for b in borrows]
+            )),
+            lambda: serialize(list[BorrowResponse], borrows),
+        ),
+        "GET /recommendations": (
+            lambda: loop.run_until_complete(_default(recs_field, RecommendationResponse(
+                books=[BookResponse.model_validate(b) for b in books], strategy="x",
+            ))),
+            lambda: serialize(RecommendationResponse, {"books": books, "strategy": "x"}),
+        ),
+    }
+
+    print(f"{items} items per response, {requests} requests, CPU ms/request")
+    for name, (default, fast) in cases.items():
+        fast_ms = _time(fast, requests)
+        body = fast()
+        line = f"{name:<26} fast={fast_ms:6.3f}ms"
+        if default is not None:
+            default_ms = _time(default, requests)
+            line += f"  default={default_ms:6.3f}ms  ({default_ms / fast_ms:.1f}x)"
+        line += f"  body={len(body) / 1024:.0f}KiB"
+        for encoding in ("gzip", "br") if brotli else ("gzip",):
+            ms = _time(lambda: compress(body, encoding), max(1, requests // 5))
+            line += f"  {encoding}={len(compress(body, encoding)) / 1024:.0f}KiB/{ms:.2f}ms"
+        print(line)
+    loop.close()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,64 @@
+"""
+Item-item collaborative filtering at scale: full build, incremental update
+and per-request scoring on a synthetic co-borrow history.
+
+    python -m benchmarks.bench_neighbours [borrows] [books] [users]
+
+Book popularity is Zipf-like, so a few books co-occur with almost
+everything, which is the expensive case for the similarity product.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from app.services.recommendation_neighbours import (
+    ItemNeighbours,
+    fit_model,
+    make_interactions,
+    update_model,
+)
+
+
+def _borrows(n: int, books: int, users: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, books + 1) ** 0.8
+    return np.column_stack(
+        [
+            rng.integers(1, users + 1, n),
+            rng.choice(np.arange(1, books + 1), n, p=popularity / popularity.sum()),
+        ]
+    )
+
+
+def main(n: int = 1_000_000, books: int = 50_000, users: int = 100_000) -> None:
+    history = _borrows(n, books, users, seed=0)
+
+    t0 = time.perf_counter()
+    model = fit_model(make_interactions(history), n_neighbours=20)
+    build = time.perf_counter() - t0
+    size = sum(a.nbytes for a in (model.neighbours, model.similarities, model.book_ids))
+    matrix = model.matrix.data.nbytes + model.matrix.indices.nbytes + model.matrix.indptr.nbytes
+    print(
+        f"{n:,} borrows, {len(model.book_ids):,} books: full build {build:.1f}s, "
+        f"neighbour lists {size / 2**20:.1f} MiB, interaction matrix {matrix / 2**20:.1f} MiB"
+    )
+
+    fresh = make_interactions(_borrows(1_000, books, users, seed=1))
+    t0 = time.perf_counter()
+    model = update_model(model, fresh)
+    print(f"incremental update of 1,000 borrows: {time.perf_counter() - t0:.2f}s")
+
+    neighbours = ItemNeighbours()
+    neighbours.adopt(model)
+    rng = np.random.default_rng(2)
+    histories = [rng.choice(model.book_ids, 50).tolist() for _ in range(200)]
+    t0 = time.perf_counter()
+    for h in histories:
+        neighbours.recommend(h, 200, exclude_ids=h)
+    print(f"recommend (50-book history): {(time.perf_counter() - t0) / 200 * 1000:.2f} ms/request")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:4]])
@@ -0,0 +1,108 @@
+"""
+Offline precompute throughput: users/s scored one at a time (the live path's
+calls) vs. in blocks (BlockScorer), in-process and across a process pool.
+
+    python -m benchmarks.bench_precompute [n_books] [users] [block] [workers]
+
+Models are built in memory from synthetic books and borrows, so the numbers
+are scoring only; the job's reads and COPY come on top.
+"""
+
+import multiprocessing
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.models.book import BookStatus
+from app.services.recommendation_batch import (
+    BlockScorer,
+    UserHistory,
+    _init_worker,
+    _score_in_worker,
+)
+from app.services.recommendation_catalog import BookCatalog
+from app.services.recommendation_neighbours import ItemNeighbours, make_interactions
+from app.services.recommendation_text_index import DescriptionIndex
+
+_GENRES = [f"genre-{i}" for i in range(40)]
+_WORDS = [f"w{i}" for i in range(50_000)]
+# Zipf-like word frequencies, as in real descriptions
+_FREQUENCIES = [1 / (rank + 10) for rank in range(len(_WORDS))]
+
+
+def _models(n: int, users: int, seed: int = 0):
+    rng = random.Random(seed)
+    genres = [rng.choice(_GENRES) for _ in range(n)]
+    catalog = BookCatalog()
+    catalog.build(
+        (i + 1, genres[i], rng.uniform(0, 5), rng.uniform(-1, 1), BookStatus.AVAILABLE)
+        for i in range(n)
+    )
+    text_index = DescriptionIndex()
+    text_index.build(
+        (i + 1, " ".join(rng.choices(_WORDS, _FREQUENCIES, k=40)), None) for i in range(n)
+    )
+    histories = [rng.sample(range(1, n + 1), rng.randint(2, 30)) for _ in range(users)]
+    neighbours = ItemNeighbours()
+    neighbours.fit(
+        make_interactions([(u + 1, b) for u, history in enumerate(histories) for b in history])
+    )
+    block = [
+        UserHistory(
+            u + 1,
+            history,
+            {g: rng.random() for g in rng.sample(_GENRES, 4)},
+            _GENRES[:1],
+            [],
+        )
+        for u, history in enumerate(histories)
+    ]
+    return catalog, text_index, neighbours, block
+
+
+def main(n: int = 100_000, users: int = 1_000, block: int = 64, workers: int = 2) -> None:
+    catalog, text_index, neighbours, histories = _models(n, users)
+    scorer = BlockScorer(catalog, 50, text_index, neighbours, text_weight=0.5, cf_weight=1.0)
+    print(f"{n:,} books, {users:,} users, k=50")
+
+    # The live path's calls, one user at a time
+    start = time.perf_counter()
+    one_by_one = []
+    for user in histories:
+        boosts = {
+            book_id: 0.5 * similarity
+            for book_id, similarity in text_index.similar_to(user.borrowed, 200, user.borrowed)
+        }
+        for book_id, score in neighbours.recommend(user.borrowed, 200, user.borrowed):
+            boosts[book_id] = boosts.get(book_id, 0.0) + score
+        ids = catalog.recommend(
+            user.genre_weights, 50, user.borrowed, user.favourite, user.disliked, boosts
+        )
+        one_by_one.append((user.user_id, ids))
+    elapsed = time.perf_counter() - start
+    print(f"one user at a time:         {users / elapsed:8.0f} users/s")
+
+    blocks = [histories[i : i + block] for i in range(0, users, block)]
+    start = time.perf_counter()
+    blocked = [ranked for b in blocks for ranked in scorer(b)]
+    elapsed = time.perf_counter() - start
+    print(f"blocks of {block:<4}             {users / elapsed:8.0f} users/s")
+    assert blocked == one_by_one
+
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(scorer,),
+    ) as pool:
+        list(pool.map(_score_in_worker, blocks[:workers]))  # start-up
+        start = time.perf_counter()
+        pooled = [ranked for result in pool.map(_score_in_worker, blocks) for ranked in result]
+        elapsed = time.perf_counter() - start
+    print(f"blocks of {block}, {workers} processes: {users / elapsed:8.0f} users/s")
+    assert pooled == one_by_one
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:5]))
@@ -0,0 +1,93 @@
+"""
+Per-request scoring cost of the recommender: the old per-object loop over
+every candidate book vs. one vectorised pass over the columnar catalog.
+
+    python -m benchmarks.bench_recommend [n_books] [requests]
+
+The loop numbers exclude loading n ORM objects from the database, which
+the old path also paid on every request.
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from app.models.book import BookStatus
+from app.services.recommendation_catalog import BookCatalog
+
+_GENRES = [f"genre-{i}" for i in range(40)] + [None]
+
+
+def score_per_object(books, genre_weights: dict[str, float], prefs) -> list[tuple]:
+    """The old per-object scoring loop, kept as the benchmark's baseline."""
+    scored = []
+    fav = set(prefs.favourite_genres or []) if prefs else set()
+    disliked = set(prefs.disliked_genres or []) if prefs else set()
+
+    for book in books:
+        genre = book.genre or ""
+        score = genre_weights.get(genre, 0.0)
+        if genre in fav:
+            score += 0.5  # boost for favourites
+        if genre in disliked:
+            score -= 0.5  # penalty for disliked
+        # Blend with rating and reader sentiment
+        score += book.average_rating * 0.1
+        score += (book.average_sentiment or 0.0) * 0.1
+        scored.append((book, score))
+    return scored
+
+
+def _rows(n: int, seed: int = 0) -> list[tuple]:
+    rng = random.Random(seed)
+    return [
+        (i, rng.choice(_GENRES), rng.uniform(0, 5), rng.uniform(-1, 1), BookStatus.AVAILABLE)
+        for i in range(1, n + 1)
+    ]
+
+
+def main(n: int = 500_000, requests: int = 20) -> None:
+    rows = _rows(n)
+    rng = random.Random(1)
+    weights = {g: rng.random() for g in rng.sample(_GENRES[:-1], 5)}
+    prefs = SimpleNamespace(favourite_genres=_GENRES[:2], disliked_genres=_GENRES[2:4])
+    borrowed = set(rng.sample(range(1, n + 1), 50))
+
+    tracemalloc.start()
+    books = [
+        SimpleNamespace(id=i, genre=g, average_rating=r, average_sentiment=s)
+        for i, g, r, s, _ in rows
+    ]
+    objects_mb = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    catalog = BookCatalog()
+    catalog.build(rows)
+    build_s = time.perf_counter() - start
+
+    def loop() -> list[int]:
+        candidates = [b for b in books if b.id not in borrowed]
+        scored = score_per_object(candidates, weights, prefs)
+        return [b.id for b, _ in sorted(scored, key=lambda x: x[1], reverse=True)[:10]]
+
+    def vectorised() -> list[int]:
+        return catalog.recommend(
+            weights, 10, borrowed, prefs.favourite_genres, prefs.disliked_genres
+        )
+
+    print(f"{n:,} books; catalog {catalog.nbytes / 2**20:.1f} MiB "
+          f"(built in {build_s:.2f}s) vs {objects_mb:.0f} MiB of bare objects")
+    for name, fn, reps in (("loop", loop, max(1, requests // 10)), ("vectorised", vectorised, requests)):
+        fn()
+        start = time.perf_counter()
+        for _ in range(reps):
+            fn()
+        print(f"{name:<11} {(time.perf_counter() - start) / reps * 1000:8.1f} ms/request")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,140 @@
+"""
+Per-request latency of the two recommender engines against catalog size:
+RECOMMENDER_ENGINE=catalog (in-memory NumPy scoring, k rows hydrated) vs.
+RECOMMENDER_ENGINE=sql (the database scores and returns k rows).
+
+    python -m benchmarks.bench_recommend_sql [sizes] [requests]
+
+e.g. `python -m benchmarks.bench_recommend_sql 10000,100000 50`. Runs against
+DATABASE_URL (point it at Postgres for representative numbers; it falls
+back to a temporary SQLite file). The catalog's one-off load is reported
+separately; its per-request numbers assume a warm, unchanged catalog.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import get_settings
+from app.db.base import Base
+from app.models.book import Book, BookAIContent
+from app.models.library import Borrow
+from app.models.user import User
+from app.repositories.recommendation_repository import RecommendationRepository
+from app.services.recommendation_catalog import (
+    RATING_WEIGHT,
+    SENTIMENT_WEIGHT,
+    BookCatalog,
+    genre_affinity,
+)
+
+_GENRES = [f"genre-{i}" for i in range(40)] + [None]
+_TABLES = [User.__table__, Book.__table__, BookAIContent.__table__, Borrow.__table__]
+_BORROWED = 50
+_AUTHOR = "bench-recommend"
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _seed(sessions, n: int) -> tuple[int, list[int]]:
+    rng = random.Random(n)
+    async with sessions() as db:
+        user = User(email=f"rec{n}@example.com", username=f"rec{n}", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        for start in range(0, n, 10_000):
+            await db.execute(
+                insert(Book),
+                [
+                    {
+                        "title": f"Bench {i}",
+                        "author": _AUTHOR,
+                        "genre": rng.choice(_GENRES),
+                        "average_rating": round(rng.uniform(0, 5), 2),
+                        "average_sentiment": round(rng.uniform(-1, 1), 3),
+                    }
+                    for i in range(start, min(n, start + 10_000))
+                ],
+            )
+        await db.flush()
+        ids = (await db.execute(select(Book.id).where(Book.author == _AUTHOR))).scalars().all()
+        borrowed = rng.sample(list(ids), _BORROWED)
+        await db.execute(
+            insert(Borrow), [{"user_id": user.id, "book_id": b} for b in borrowed]
+        )
+        await db.commit()
+        return user.id, borrowed
+
+
+async def _time(run, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        await run()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+async def main(sizes: list[int], requests: int = 50) -> None:
+    url = os.environ.get("DATABASE_URL") or get_settings().DATABASE_URL
+    if not url.startswith("postgresql"):
+        url = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+    engine = create_async_engine(url)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=_TABLES)
+
+    rng = random.Random(1)
+    weights = {g: rng.random() for g in rng.sample(_GENRES[:-1], 5)}
+    favourite, disliked = _GENRES[:2], _GENRES[2:4]
+    k = 10
+
+    print(f"{url.split(':')[0]}: top-{k}, {requests} requests per engine")
+    try:
+        for n in sizes:
+            user_id, borrowed = await _seed(sessions, n)
+            async with sessions() as db:
+                catalog = BookCatalog()
+                t0 = time.perf_counter()
+                await catalog.ensure_fresh(db, version=0)
+                load_ms = (time.perf_counter() - t0) * 1000
+
+                async def catalog_engine():
+                    ids = catalog.recommend(weights, k, set(borrowed), favourite, disliked)
+                    (await db.execute(select(Book).where(Book.id.in_(ids)))).scalars().all()
+
+                repo = RecommendationRepository(db)
+                affinity = genre_affinity(weights, favourite, disliked)
+
+                async def sql_engine():
+                    await repo.top_k(user_id, k, affinity, RATING_WEIGHT, SENTIMENT_WEIGHT)
+
+                print(f"{n:>8} books (catalog load {load_ms:.0f}ms)")
+                for name, run in (("catalog", catalog_engine), ("sql", sql_engine)):
+                    samples = await _time(run, requests)
+                    print(
+                        f"{name:>16}: p50={_percentile(samples, 0.50):.2f}ms "
+                        f"p99={_percentile(samples, 0.99):.2f}ms"
+                    )
+            async with sessions() as db:
+                await db.execute(delete(Borrow).where(Borrow.user_id == user_id))
+                await db.execute(delete(Book).where(Book.author == _AUTHOR))
+                await db.execute(delete(User).where(User.id == user_id))
+                await db.commit()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in (sys.argv[1] if len(sys.argv) > 1 else "10000,100000").split(",")]
+    args = [int(a) for a in sys.argv[2:3]]
+    asyncio.run(main(sizes, *args))
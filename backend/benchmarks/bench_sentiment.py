@@ -0,0 +1,40 @@
+"""
+Throughput benchmark for the lexicon sentiment scorer.
+
+    python -m benchmarks.bench_sentiment [n_reviews]
+
+Target: > 10k reviews/sec on a single core.
+"""
+
+import random
+import sys
+import time
+
+from app.services.sentiment_service import SENTIMENT_LEXICON, SentimentScorer
+
+_FILLER = (
+    "the book story characters plot author chapter ending writing pace "
+    "world reader pages middle start idea style voice"
+).split()
+
+
+def _synthetic_reviews(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    words = list(SENTIMENT_LEXICON) + ["not"] * 5 + _FILLER * 4
+    return [" ".join(rng.choices(words, k=rng.randint(15, 60))) for _ in range(n)]
+
+
+def main(n: int = 100_000) -> None:
+    reviews = _synthetic_reviews(n)
+    scorer = SentimentScorer()
+    scorer.score_batch(reviews[:100])  # warm-up
+
+    start = time.perf_counter()
+    for i in range(0, n, 5000):
+        scorer.score_batch(reviews[i : i + 5000])
+    elapsed = time.perf_counter() - start
+    print(f"scored {n} reviews in {elapsed:.2f}s -> {n / elapsed:,.0f} reviews/sec")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,85 @@
+"""
+Memory per worker: recommender models mapped from one published generation
+vs. a private copy in every worker.
+
+    python -m benchmarks.bench_shared_models [n_books] [workers]
+
+The catalog, description index and co-borrow neighbours are built once
+from synthetic data and published (model_store). Each worker process then
+attaches, serves a few hundred recommendations to touch its pages, and
+reports how its RssAnon (private) and RssFile (page cache, shared between
+workers) grew, from /proc/self/status.
+"""
+
+import multiprocessing
+import sys
+import tempfile
+import time
+
+from app.services.model_store import read_generation
+from app.services.recommendation_catalog import BookCatalog
+from app.services.recommendation_neighbours import ItemNeighbours, _read_model, _write_model
+from app.services.recommendation_text_index import DescriptionIndex
+from benchmarks.bench_precompute import _models
+
+REQUESTS = 300
+
+
+def _rss() -> dict[str, int]:
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    return {name: int(fields[name].split()[0]) for name in ("RssAnon", "RssFile")}
+
+
+def _worker(paths: tuple[str, str, str], n_features: int, shared: bool, users: list):
+    before = _rss()
+    start = time.perf_counter()
+    catalog_path, text_path, neighbours_path = paths
+    catalog = BookCatalog()
+    catalog._restore(read_generation(catalog_path, mmap_mode="c" if shared else None))
+    text_index = DescriptionIndex(n_features=n_features)
+    text_index._restore(
+        read_generation(text_path, mmap_mode={"df": "c"} if shared else None)
+    )
+    neighbours = ItemNeighbours()
+    _, model, order = _read_model(neighbours_path, mmap_mode="r" if shared else None)
+    neighbours.adopt(model, order)
+    attached = time.perf_counter() - start
+
+    for user in users:
+        boosts = dict(text_index.similar_to(user.borrowed, 200, user.borrowed))
+        for book_id, score in neighbours.recommend(user.borrowed, 200, user.borrowed):
+            boosts[book_id] = boosts.get(book_id, 0.0) + score
+        catalog.recommend(user.genre_weights, 50, user.borrowed, user.favourite, boosts=boosts)
+    after = _rss()
+    return attached, {name: after[name] - before[name] for name in after}
+
+
+def main(n: int = 100_000, workers: int = 4) -> None:
+    catalog, text_index, neighbours, users = _models(n, REQUESTS)
+    with tempfile.TemporaryDirectory() as root:
+        paths = (f"{root}/catalog", f"{root}/text_index", f"{root}/neighbours")
+        catalog.save(paths[0])
+        text_index.save(paths[1])
+        _write_model(paths[2], neighbours.model)
+        n_features = text_index._n_features
+        print(f"{n:,} books, {workers} workers, {REQUESTS} requests each")
+
+        context = multiprocessing.get_context("spawn")
+        for shared in (False, True):
+            with context.Pool(workers) as pool:
+                results = pool.starmap(
+                    _worker, [(paths, n_features, shared, users)] * workers
+                )
+            anon = sum(r[1]["RssAnon"] for r in results) / workers / 1024
+            file = sum(r[1]["RssFile"] for r in results) / workers / 1024
+            attach = sum(r[0] for r in results) / workers * 1000
+            label = "mapped generation" if shared else "private copies"
+            print(
+                f"{label:<18} attach {attach:7.1f} ms   "
+                f"+RssAnon {anon:7.1f} MiB   +RssFile {file:7.1f} MiB  (per worker)"
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,66 @@
+"""
+Similar books: IVF recall and latency against exact search.
+
+    python -m benchmarks.bench_similar [books ...]
+
+Vectors are synthetic: books cluster around topic directions with
+per-book noise, roughly what hashed descriptions plus genre look like. For
+each nprobe the benchmark reports recall@10 (overlap with the exact top 10)
+and the mean latency of one query, next to the exhaustive scan.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from app.services.similar_books import SimilarBooksIndex, list_count
+
+QUERIES = 200
+K = 10
+
+
+def _vectors(n: int, dims: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((max(n // 500, 20), dims)).astype(np.float32)
+    topics /= np.linalg.norm(topics, axis=1, keepdims=True)
+    vectors = topics[rng.integers(0, len(topics), n)]
+    vectors += rng.standard_normal((n, dims), dtype=np.float32) * (1.5 / np.sqrt(dims))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def _timed(search, queries: list) -> tuple[list, float]:
+    t0 = time.perf_counter()
+    results = [search(q) for q in queries]
+    return results, (time.perf_counter() - t0) / len(queries) * 1000
+
+
+def main(n: int) -> None:
+    index = SimilarBooksIndex()
+    vectors = _vectors(n, dims=128)
+    t0 = time.perf_counter()
+    index.build_vectors(np.arange(1, n + 1), vectors)
+    print(
+        f"{n:,} books, {list_count(n):,} lists: build {time.perf_counter() - t0:.1f}s, "
+        f"vectors {vectors.nbytes / 2**20:.0f} MiB"
+    )
+    del vectors
+
+    rng = np.random.default_rng(1)
+    queries = [
+        (int(b), index.vector_of(int(b))) for b in rng.integers(1, n + 1, QUERIES)
+    ]
+    exact, exact_ms = _timed(lambda q: index.exact_search(q[1], K, [q[0]]), queries)
+    print(f"  exact          recall 1.000  {exact_ms:7.2f} ms/query")
+    for nprobe in (1, 4, 8, 16, 32, 64):
+        found, ms = _timed(lambda q: index.search(q[1], K, [q[0]], nprobe=nprobe), queries)
+        hits = sum(
+            len({b for b, _ in a} & {b for b, _ in e}) for a, e in zip(found, exact)
+        )
+        print(f"  nprobe {nprobe:<6}  recall {hits / (K * QUERIES):.3f}  {ms:7.2f} ms/query")
+
+
+if __name__ == "__main__":
+    for books in [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000]:
+        main(books)
@@ -3,6 +3,12 @@
 import os
 
 os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+# Ids restart per test, so recommender models are never persisted
+os.environ["RECOMMENDER_CATALOG_PATH"] = ""
+os.environ["RECOMMENDER_TEXT_INDEX_PATH"] = ""
+os.environ["RECOMMENDER_NEIGHBOURS_PATH"] = ""
+os.environ["SIMILAR_BOOKS_INDEX_PATH"] = ""
+os.environ["RECOMMENDER_PRECOMPUTE_CHECKPOINT_PATH"] = ""
 
 import sqlalchemy.dialects.postgresql as _pg
 from sqlalchemy import JSON as _JSON
@@ -10,10 +16,13 @@ from sqlalchemy import JSON as _JSON
 _pg.JSONB = _JSON  # type
 
 # Standard imports
+import io
 import pytest
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from unittest.mock import AsyncMock, patch
 
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -23,9 +32,16 @@ from sqlalchemy.pool import StaticPool
 
 # Now it's safe to import app modules
 from app.core.config import get_settings
+from app.core.principal_cache import get_principal_cache
 from app.db.base import Base
 from app.db.session import get_db
 from app.main import create_application
+from app.services.autocomplete_service import get_title_cache
+from app.services.recommendation_catalog import get_book_catalog
+from app.services.recommendation_cache import get_recommendation_cache
+from app.services.recommendation_neighbours import get_item_neighbours
+from app.services.similar_books import get_similar_books_index
+from app.services.recommendation_text_index import get_description_index
 
 # Import all models so their tables are registered on Base.metadata
 import app.models.user 
@@ -71,6 +87,25 @@ async def db_session(_create_tables) -> AsyncGenerator[AsyncSession, None]:
         await session.commit()
 
 
+@pytest.fixture()
+def background_sessions(db_session: AsyncSession, monkeypatch) -> None:
+    """Point background tasks and scheduled jobs at the test database."""
+    monkeypatch.setattr("app.db.session.BackgroundSessionLocal", _TestSessionLocal)
+
+
+@pytest.fixture()
+def query_log() -> list[str]:
+    """Record every SQL statement sent to the test engine."""
+    statements: list[str] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    yield statements
+    event.remove(_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+
 @pytest.fixture()
 async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     """httpx AsyncClient wired to the FastAPI app with the test DB session."""
@@ -78,15 +113,23 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     async def _override_get_db():
         yield db_session
 
-    app = create_application()
-    app.dependency_overrides[get_db] = _override_get_db
+    application = create_application()
+    application.dependency_overrides[get_db] = _override_get_db
+    # User ids restart per test, so never carry principals across tests
+    get_principal_cache().clear()
+    get_title_cache().clear()
+    get_book_catalog().clear()
+    get_description_index().clear()
+    get_item_neighbours().clear()
+    get_recommendation_cache().clear()
+    get_similar_books_index().clear()
 
     async with AsyncClient(
-        transport=ASGITransport(app=app), base_url="http://test"
+        transport=ASGITransport(app=application), base_url="http://test"
     ) as ac:
         yield ac
 
-    app.dependency_overrides.clear()
+    application.dependency_overrides.clear()
 
 
 @pytest.fixture()
@@ -107,3 +150,35 @@ async def auth_headers(client: AsyncClient) -> dict[str, str]:
     )
     token = resp.json()["access_token"]
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture()
+def mock_storage():
+    """Patch the storage service for the whole test; yields the mock."""
+    mock = AsyncMock()
+    mock.upload_file.return_value = "fake-key"
+    mock.get_url.return_value = "http://storage/fake-key"
+    mock.delete_file.return_value = None
+    with patch("app.api.v1.endpoints.books.get_storage_service", return_value=mock):
+        yield mock
+
+
+@pytest.fixture()
+def create_book(
+    client: AsyncClient, auth_headers: dict[str, str], mock_storage
+) -> Callable[..., Awaitable[int]]:
+    """Upload a book as the test user (no summary task); returns its id."""
+
+    async def _create(title: str = "Book", author: str = "Author", **data) -> int:
+        with patch("app.api.v1.endpoints.books.generate_book_summary"):
+            resp = await client.post(
+                "/api/v1/books",
+                headers=auth_headers,
+                files={"file": ("b.txt", io.BytesIO(b"content"), "text/plain")},
+                data={"title": title, "author": author, **data},
+            )
+        assert resp.status_code == 201
+        return resp.json()["id"]
+
+    return _create
+
@@ -0,0 +1,129 @@
+"""Tests for title/author autocomplete and the hot-title prefix index."""
+import asyncio
+
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book
+from app.repositories.book_repository import BookRepository
+from app.services.autocomplete_service import (
+    PrefixIndex,
+    Suggestion,
+    TitleCache,
+    get_title_cache,
+)
+
+
+def _index(*books: tuple[int, str, str]) -> PrefixIndex:
+    index = PrefixIndex()
+    index.build(Suggestion(*b) for b in books)
+    return index
+
+
+def test_prefix_matches_title_author_and_inner_words():
+    index = _index((1, "The Great Gatsby", "F. Scott Fitzgerald"), (2, "Great Expectations", "Charles Dickens"))
+    assert {s.id for s in index.lookup("great", 10)} == {1, 2}
+    assert [s.id for s in index.lookup("gats", 10)] == [1]
+    assert [s.id for s in index.lookup("charles", 10)] == [2]
+    assert index.lookup("  GREAT   exp", 10)[0].id == 2
+
+
+def test_lookup_is_deduplicated_and_limited():
+    index = _index(*[(i, f"Dune {i}", "Dune Author") for i in range(5)])
+    hits = index.lookup("dune", 3)
+    assert len(hits) == 3 and len({h.id for h in hits}) == 3
+
+
+def test_upsert_replaces_old_keys_and_remove_forgets_book():
+    index = _index((1, "Old Title", "A"))
+    index.upsert(Suggestion(1, "New Title", "A"))
+    assert index.lookup("old", 10) == []
+    assert index.lookup("new", 10)[0].title == "New Title"
+    index.remove(1)
+    assert index.lookup("new", 10) == [] and len(index) == 0
+
+
+def test_hits_are_ranked_by_popularity_not_by_key():
+    index = PrefixIndex()
+    index.build(
+        [Suggestion(i, title, "A") for i, title in ((1, "Dune"), (2, "Dune II"), (3, "Dunes"))],
+        {1: 5, 2: 40, 3: 12},
+    )
+    assert [s.id for s in index.lookup("dune", 2)] == [2, 3]
+    index.upsert(Suggestion(4, "Dune Road", "A"), 100)
+    assert [s.id for s in index.lookup("dune", 10)] == [4, 2, 3, 1]
+
+
+async def test_writes_during_a_background_reload_survive_the_swap(
+    db_session: AsyncSession, monkeypatch
+):
+    repo = BookRepository(db_session)
+    old = await repo.create(title="Persuasion", author="Austen")
+    await db_session.commit()
+    cache = TitleCache(max_titles=10, ttl_seconds=0)
+    await cache.ensure_loaded(db_session)
+
+    # A rename and a new book commit while the reload is building its index
+    snapshot_read = asyncio.Event()
+    release = asyncio.Event()
+    to_thread = asyncio.to_thread
+
+    async def slow_build(fn, *args):
+        snapshot_read.set()
+        await release.wait()
+        return await to_thread(fn, *args)
+
+    monkeypatch.setattr("app.services.autocomplete_service.asyncio.to_thread", slow_build)
+    await cache.ensure_loaded(db_session)
+    await snapshot_read.wait()
+    cache.on_book_saved(Book(id=old.id, title="Emma", author="Austen", review_count=0))
+    cache.on_book_saved(Book(id=old.id + 1, title="Pride", author="Austen", review_count=0))
+    release.set()
+    await cache._refresh
+
+    assert cache.lookup("pers", 5) == []
+    assert [s.title for s in cache.lookup("austen", 5)] == ["Pride", "Emma"]
+
+
+async def test_autocomplete_endpoint(client: AsyncClient, create_book):
+    await create_book("Moby Dick", "Herman Melville")
+    await create_book("Middlemarch", "George Eliot")
+
+    resp = await client.get("/api/v1/books/autocomplete?q=mo")
+    assert resp.status_code == 200
+    assert [s["title"] for s in resp.json()] == ["Moby Dick"]
+
+    resp = await client.get("/api/v1/books/autocomplete?q=eliot")
+    assert [s["title"] for s in resp.json()] == ["Middlemarch"]
+
+
+async def test_cache_follows_updates_and_deletes(
+    client: AsyncClient, auth_headers: dict, create_book
+):
+    book_id = await create_book("Persuasion")
+    await client.get("/api/v1/books/autocomplete?q=per")  # loads the cache
+    assert get_title_cache().lookup("pers", 5)
+
+    await client.put(f"/api/v1/books/{book_id}", headers=auth_headers, json={"title": "Emma"})
+    assert get_title_cache().lookup("pers", 5) == []
+    assert get_title_cache().lookup("emm", 5)[0].id == book_id
+
+    await client.delete(f"/api/v1/books/{book_id}", headers=auth_headers)
+    assert get_title_cache().lookup("emm", 5) == []
+    resp = await client.get("/api/v1/books/autocomplete?q=emm")
+    assert resp.json() == []
+
+
+async def test_expired_cache_serves_while_reloading(client: AsyncClient, create_book):
+    await create_book("Persuasion")
+    await client.get("/api/v1/books/autocomplete?q=per")
+    cache = get_title_cache()
+    cache._loaded_at -= cache._ttl  # expire it
+    # A write this worker never saw (another worker's)
+    cache.on_book_deleted(next(iter(cache._index._books)))
+
+    resp = await client.get("/api/v1/books/autocomplete?q=pers")
+    assert resp.json()[0]["title"] == "Persuasion"  # answered by the database
+    assert cache._refresh is not None
+    await cache._refresh
+    assert cache.is_fresh() and cache.lookup("pers", 5)[0].title == "Persuasion"
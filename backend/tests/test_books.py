@@ -4,6 +4,10 @@ from unittest.mock import AsyncMock, patch
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.book_repository import BookRepository
+from app.schemas.books import BOOK_VIEWS
 
 
 def _txt_file(name: str = "book.txt", content: str = "Hello world") -> tuple:
@@ -53,6 +57,87 @@ async def test_list_books_paginated(client: AsyncClient, auth_headers: dict):
     assert len(data["items"]) == 2
 
 
+async def _create_books(client: AsyncClient, auth_headers: dict, n: int) -> None:
+    with _mock_storage(), _mock_background():
+        for i in range(n):
+            await client.post(
+                "/api/v1/books",
+                headers=auth_headers,
+                files={"file": _txt_file(f"book{i}.txt")},
+                data={"title": f"Book {i}", "author": "Author"},
+            )
+
+
+async def test_list_books_cursor_walks_every_book_once(
+    client: AsyncClient, auth_headers: dict
+):
+    await _create_books(client, auth_headers, 5)
+
+    seen: list[int] = []
+    resp = await client.get("/api/v1/books?page_size=2&total=none")
+    while True:
+        data = resp.json()
+        assert data["total"] is None
+        seen.extend(item["id"] for item in data["items"])
+        if not data["next_cursor"]:
+            break
+        resp = await client.get(
+            f"/api/v1/books?page_size=2&total=none&cursor={data['next_cursor']}"
+        )
+        assert resp.json()["page"] is None
+
+    assert len(seen) == 5 and len(set(seen)) == 5
+    assert seen == sorted(seen, reverse=True)  # newest first
+
+
+async def test_list_books_estimated_total_falls_back_to_exact(
+    client: AsyncClient, auth_headers: dict
+):
+    await _create_books(client, auth_headers, 2)
+    resp = await client.get("/api/v1/books?total=estimated")
+    assert resp.json()["total"] == 2
+
+
+async def test_list_books_invalid_cursor(client: AsyncClient):
+    resp = await client.get("/api/v1/books?cursor=not-a-cursor")
+    assert resp.status_code == 400
+
+
+async def test_list_books_views(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession
+):
+    await _create_books(client, auth_headers, 1)
+    book_id = (await client.get("/api/v1/books")).json()["items"][0]["id"]
+    await BookRepository(db_session).save_ai_content(book_id, ai_summary="Long summary")
+
+    full = (await client.get("/api/v1/books")).json()["items"][0]
+    assert full["ai_summary"] == "Long summary"
+    assert full["ai_review_consensus"] is None
+
+    compact = (await client.get("/api/v1/books?view=compact")).json()["items"][0]
+    assert set(compact) == set(BOOK_VIEWS["compact"])
+    assert "ai_summary" not in compact and "description" not in compact
+
+
+async def test_list_books_fields_projection(client: AsyncClient, auth_headers: dict):
+    await _create_books(client, auth_headers, 3)
+
+    resp = await client.get("/api/v1/books?fields=title,author&page_size=2&total=none")
+    data = resp.json()
+    assert [set(item) for item in data["items"]] == [{"id", "title", "author"}] * 2
+
+    # The cursor still works although created_at was not requested
+    resp = await client.get(
+        f"/api/v1/books?fields=title&page_size=2&cursor={data['next_cursor']}"
+    )
+    assert [set(item) for item in resp.json()["items"]] == [{"id", "title"}]
+
+
+async def test_list_books_unknown_field(client: AsyncClient):
+    resp = await client.get("/api/v1/books?fields=title,password")
+    assert resp.status_code == 400
+
+
 # Create book
 
 async def test_create_book_success(client: AsyncClient, auth_headers: dict):
@@ -104,6 +189,21 @@ async def test_update_book_title(client: AsyncClient, auth_headers: dict):
     assert resp.json()["title"] == "Updated Title"
 
 
+async def test_update_book_keeps_ai_content(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession
+):
+    await _create_books(client, auth_headers, 1)
+    book_id = (await client.get("/api/v1/books")).json()["items"][0]["id"]
+    await BookRepository(db_session).save_ai_content(book_id, ai_summary="Summary")
+    db_session.expunge_all()
+
+    resp = await client.put(
+        f"/api/v1/books/{book_id}", headers=auth_headers, json={"genre": "Fiction"}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["ai_summary"] == "Summary"
+
+
 async def test_update_book_not_found(client: AsyncClient, auth_headers: dict):
     resp = await client.put(
         "/api/v1/books/99999",
@@ -135,3 +235,30 @@ async def test_delete_book(client: AsyncClient, auth_headers: dict):
 async def test_delete_book_not_found(client: AsyncClient, auth_headers: dict):
     resp = await client.delete("/api/v1/books/99999", headers=auth_headers)
     assert resp.status_code == 404
+
+
+# Batch analysis
+
+async def test_batch_analysis_keeps_order_and_reports_missing(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession
+):
+    await _create_books(client, auth_headers, 2)
+    newer, older = [b["id"] for b in (await client.get("/api/v1/books")).json()["items"]]
+    await BookRepository(db_session).save_ai_content(older, ai_summary="Summary")
+
+    resp = await client.get(f"/api/v1/books/analysis?ids={older},99999,{newer},{older}")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [item["book_id"] for item in data["items"]] == [older, newer]
+    assert data["items"][0]["ai_summary"] == "Summary"
+    assert data["items"][0]["summary_status"] == "pending"
+    assert data["not_found"] == [99999]
+
+    badges = await client.get(f"/api/v1/books/analysis?ids={older}&include_text=false")
+    assert "ai_summary" not in badges.json()["items"][0]
+
+
+@pytest.mark.parametrize("ids", ["", "1,x", ",".join(str(i) for i in range(101))])
+async def test_batch_analysis_rejects_bad_ids(client: AsyncClient, ids: str):
+    resp = await client.get(f"/api/v1/books/analysis?ids={ids}")
+    assert resp.status_code == 400
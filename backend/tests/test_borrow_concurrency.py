@@ -0,0 +1,87 @@
+"""Many borrowers racing for one copy: exactly one may win."""
+import asyncio
+from collections.abc import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.principal_cache import get_principal_cache
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.session import get_db
+from app.main import create_application
+from app.models.book import Book, BookStatus
+from app.models.library import Borrow, BorrowStatus
+from app.models.user import User
+
+BORROWERS = 100
+
+
+@pytest.fixture()
+async def file_engine(tmp_path):
+    # The shared in-memory session used elsewhere serialises everything;
+    # this needs one connection and transaction per request, as in production.
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'race.db'}",
+        connect_args={"timeout": 30},
+        poolclass=NullPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def test_concurrent_borrows_have_exactly_one_winner(file_engine):
+    sessions = async_sessionmaker(file_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with sessions() as db:
+        book = Book(title="Only Copy", author="A")
+        users = [
+            User(email=f"u{i}@example.com", username=f"u{i}", hashed_password="x")
+            for i in range(BORROWERS)
+        ]
+        db.add_all([book, *users])
+        await db.commit()
+        tokens = [create_access_token(str(u.id)) for u in users]
+
+    async def _get_db() -> AsyncGenerator[AsyncSession, None]:
+        async with sessions() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    app = create_application()
+    app.dependency_overrides[get_db] = _get_db
+    get_principal_cache().clear()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        responses = await asyncio.gather(
+            *(
+                ac.post(
+                    f"/api/v1/books/{book.id}/borrow",
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                for token in tokens
+            )
+        )
+
+    codes = sorted(r.status_code for r in responses)
+    assert codes.count(201) == 1, codes
+    assert codes.count(409) == BORROWERS - 1, codes
+
+    async with sessions() as db:
+        active = await db.scalar(
+            select(func.count()).select_from(Borrow).where(
+                Borrow.book_id == book.id, Borrow.status == BorrowStatus.ACTIVE
+            )
+        )
+        status = await db.scalar(select(Book.status).where(Book.id == book.id))
+    assert active == 1
+    assert status == BookStatus.BORROWED
@@ -0,0 +1,66 @@
+"""Tests for connection pool sizing, engine construction and pool metrics."""
+from collections.abc import AsyncGenerator, Callable
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import Settings
+from app.db import session as db_session_module
+from app.db.session import InstrumentedQueuePool, POOL_IN_USE, POOL_SIZE, _create_engine
+
+PG_URL = "postgresql+asyncpg://u:p@localhost:5432/db"
+
+
+@pytest.fixture()
+async def make_engine() -> AsyncGenerator[Callable[..., AsyncEngine], None]:
+    """Build throwaway engines; dispose them and drop their gauges afterwards."""
+    created: list[tuple[str, AsyncEngine]] = []
+
+    def make(label: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+        with patch.object(db_session_module.settings, "DATABASE_URL", PG_URL):
+            engine = _create_engine(label, pool_size=pool_size, max_overflow=max_overflow)
+        created.append((label, engine))
+        return engine
+
+    yield make
+    for label, engine in created:
+        POOL_IN_USE.remove(engine=label)
+        POOL_SIZE.remove(engine=label)
+        await engine.dispose()
+
+
+def test_pool_limits_derived_from_worker_count():
+    s = Settings(DB_MAX_CONNECTIONS=80, WEB_CONCURRENCY=4)
+    pool_size, overflow = s.db_pool_limits
+    # 80 / 4 workers = 20 per process, minus 4 for the background engine
+    assert pool_size + overflow == 16
+    assert pool_size == 8
+
+
+def test_pool_limits_explicit_override():
+    s = Settings(DB_POOL_SIZE=5, DB_MAX_OVERFLOW=1)
+    assert s.db_pool_limits == (5, 1)
+
+
+def test_postgres_engine_uses_instrumented_queue_pool(make_engine):
+    engine = make_engine("test", pool_size=3, max_overflow=2)
+    pool = engine.sync_engine.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    assert pool.size() == 3
+    assert pool._pre_ping is True
+    assert POOL_IN_USE.value(engine="test") == 0
+
+
+def test_pool_size_zero_falls_back_to_null_pool(make_engine):
+    engine = make_engine("test-null", pool_size=0, max_overflow=0)
+    assert isinstance(engine.sync_engine.pool, NullPool)
+
+
+async def test_metrics_endpoint_exposes_pool_gauges(client: AsyncClient, make_engine):
+    make_engine("scrape", pool_size=1, max_overflow=0)
+    resp = await client.get("/metrics")
+    assert resp.status_code == 200
+    assert 'db_pool_connections_in_use{engine="scrape"} 0' in resp.text
@@ -0,0 +1,166 @@
+"""Server-sent events for summary / consensus completion."""
+import asyncio
+import json
+import threading
+
+import asyncpg
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.events import broker
+from app.services.events.broker import publish_book_event
+from app.services.events.hub import Event, EventHub, book_channel, user_channel
+
+
+async def _read_events(client: AsyncClient, url: str, count: int, trigger=None):
+    """
+    Drive the ASGI app directly (httpx's ASGITransport buffers the whole
+    body, which never ends for a stream) and disconnect after `count` events.
+    """
+    path, _, query = url.partition("?")
+    body = bytearray()
+    opened, done = asyncio.Event(), asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+            opened.set()
+            if body.count(b"event: ") >= count:
+                done.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "", "headers": [],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    task = asyncio.create_task(client._transport.app(scope, receive, send))
+    await asyncio.wait_for(opened.wait(), 5)
+    if trigger is not None:
+        await trigger()
+    await asyncio.wait_for(task, 5)
+
+    events = []
+    for block in body.decode().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def test_hub_fans_out_across_threads_and_drops_oldest():
+    hub = EventHub(max_queue=2)
+    with hub.subscribe(book_channel(1)) as book_sub, hub.subscribe(user_channel(7)) as user_sub:
+        # Background tasks publish from another thread / event loop
+        thread = threading.Thread(
+            target=lambda: [hub.publish(Event("summary", 1, {"n": n}, (7,))) for n in range(3)]
+        )
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0)
+
+        assert [(await book_sub.get()).data["n"] for _ in range(2)] == [1, 2]
+        assert (await user_sub.get()).book_id == 1
+        assert hub.subscriber_count() == 2
+    assert hub.subscriber_count() == 0
+    assert hub.publish(Event("summary", 1)) == 0
+
+
+async def test_book_stream_sends_snapshot_then_completion(
+    client: AsyncClient, db_session: AsyncSession, create_book
+):
+    book_id = await create_book()
+
+    events = await _read_events(
+        client,
+        f"/api/v1/books/{book_id}/events",
+        count=2,
+        trigger=lambda: publish_book_event(
+            db_session, book_id, "summary", summary_status="completed"
+        ),
+    )
+
+    assert events[0] == (
+        "snapshot",
+        {"book_id": book_id, "summary_status": "pending", "review_count": 0, "average_rating": 0.0},
+    )
+    assert events[1] == ("summary", {"book_id": book_id, "summary_status": "completed"})
+
+
+async def test_user_feed_only_carries_books_the_user_is_involved_with(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, create_book
+):
+    borrowed = await create_book("Borrowed")
+    other = await create_book("Other")
+    await client.post(f"/api/v1/books/{borrowed}/borrow", headers=auth_headers)
+    token = (await client.post("/api/v1/auth/stream-token", headers=auth_headers)).json()
+
+    async def trigger():
+        await publish_book_event(db_session, other, "review_consensus", review_count=1)
+        await publish_book_event(db_session, borrowed, "review_consensus", review_count=3)
+
+    events = await _read_events(
+        client, f"/api/v1/users/me/events?stream_token={token['stream_token']}", count=1, trigger=trigger
+    )
+    assert events == [("review_consensus", {"book_id": borrowed, "review_count": 3})]
+
+
+async def test_stream_errors_are_plain_responses(client: AsyncClient):
+    assert (await client.get("/api/v1/books/999/events")).status_code == 404
+    assert (await client.get("/api/v1/users/me/events")).status_code == 401
+
+
+async def test_only_stream_tokens_go_in_the_query_string(
+    client: AsyncClient, auth_headers: dict
+):
+    access = auth_headers["Authorization"].removeprefix("Bearer ")
+    resp = await client.get(f"/api/v1/users/me/events?stream_token={access}")
+    assert resp.status_code == 401
+    stream = (await client.post("/api/v1/auth/stream-token", headers=auth_headers)).json()
+    assert stream["expires_in"] == 60
+    resp = await client.get(
+        "/api/v1/auth/me", headers={"Authorization": f"Bearer {stream['stream_token']}"}
+    )
+    assert resp.status_code == 401
+
+
+async def test_listener_retries_failed_connects_and_listens(monkeypatch):
+    listening = asyncio.Event()
+    attempts = []
+
+    class Conn:
+        def add_termination_listener(self, callback):
+            pass
+
+        async def add_listener(self, channel, callback):
+            if len(attempts) < 3:
+                raise asyncpg.InterfaceError("listen failed")
+            listening.set()
+
+        async def close(self):
+            pass
+
+    async def connect(dsn):
+        attempts.append(dsn)
+        if len(attempts) < 2:
+            raise OSError("refused")
+        return Conn()
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+    monkeypatch.setattr(broker, "_RECONNECT_DELAY_SECONDS", 0.001)
+    listener = broker.PostgresEventBroker(EventHub(max_queue=1), "postgresql://x")
+    await listener.start()
+    try:
+        await asyncio.wait_for(listening.wait(), 5)
+    finally:
+        await listener.stop()
+    assert len(attempts) == 3
@@ -0,0 +1,81 @@
+"""Genre affinity maintained on borrow/return/review; recommendations stay read-only."""
+from datetime import timedelta
+from unittest.mock import patch
+
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.library import UserGenreAffinity
+from app.repositories.affinity_repository import (
+    DECAY_EPOCH,
+    MAX_DECAY_EXPONENT,
+    GenreAffinityRepository,
+    decay_horizon,
+    decay_scale,
+)
+from app.repositories.book_repository import BookRepository
+
+
+async def test_events_update_affinity_and_reads_never_write(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, query_log: list[str]
+):
+    repo = BookRepository(db_session)
+    fantasy = [await repo.create(title=f"F{i}", author="A", genre="Fantasy") for i in range(3)]
+    history = await repo.create(title="H", author="A", genre="History")
+    untagged = await repo.create(title="U", author="A")
+    await db_session.commit()
+    me = (await client.get("/api/v1/auth/me", headers=auth_headers)).json()["id"]
+    affinity = GenreAffinityRepository(db_session)
+
+    for book in (fantasy[0], history, untagged):
+        await client.post(f"/api/v1/books/{book.id}/borrow", headers=auth_headers)
+    assert await affinity.weights(me) == {"Fantasy": 0.5, "History": 0.5}
+
+    # A finished read counts a full point; a 1★ review outweighs the borrow,
+    # so that genre drops out until something positive happens there again
+    await client.post(f"/api/v1/books/{fantasy[0].id}/return", headers=auth_headers)
+    with patch("app.api.v1.endpoints.books.update_review"):
+        await client.post(
+            f"/api/v1/books/{history.id}/reviews",
+            headers=auth_headers,
+            json={"rating": 1, "body": "Not for me at all, sadly."},
+        )
+    assert await affinity.weights(me) == {"Fantasy": 1.0}
+    await client.post(f"/api/v1/books/{fantasy[1].id}/borrow", headers=auth_headers)
+    with patch("app.api.v1.endpoints.books.update_review"):
+        await client.post(
+            f"/api/v1/books/{fantasy[1].id}/reviews",
+            headers=auth_headers,
+            json={"rating": 5, "body": "Loved every page of it."},
+        )
+    assert await affinity.weights(me) == {"Fantasy": 1.0}
+    result = await db_session.execute(
+        select(UserGenreAffinity.genre, UserGenreAffinity.score)
+    )
+    scores = dict(result.tuples().all())
+    assert abs(scores["Fantasy"] - 2.3) < 1e-9 and abs(scores["History"] + 0.3) < 1e-9
+
+    query_log.clear()
+    resp = await client.get("/api/v1/recommendations", headers=auth_headers)
+    assert resp.json()["strategy"] == "content_based"
+    assert resp.json()["books"][0]["id"] == fantasy[2].id
+    verbs = {q.lstrip().split(None, 1)[0].upper() for q in query_log}
+    assert verbs == {"SELECT"}
+
+
+def test_decay_cancels_in_normalisation():
+    # With a 30-day half-life an event 30 days later weighs twice as much,
+    # whatever the absolute date
+    later = DECAY_EPOCH + timedelta(days=400)
+    assert decay_scale(later + timedelta(days=30), 30) / decay_scale(later, 30) == 2.0
+    assert decay_scale(later, 0) == 1.0
+
+
+def test_decay_stops_at_its_horizon_instead_of_overflowing():
+    # A 1-day half-life reaches float64's limit within three years
+    horizon = decay_horizon(1)
+    assert horizon - DECAY_EPOCH == timedelta(days=MAX_DECAY_EXPONENT)
+    assert decay_scale(horizon - timedelta(days=1), 1) == 2.0 ** (MAX_DECAY_EXPONENT - 1)
+    for years in (3, 30):
+        assert decay_scale(DECAY_EPOCH + timedelta(days=365 * years), 1) == 2.0**MAX_DECAY_EXPONENT
@@ -0,0 +1,194 @@
+"""Conditional GETs: ETag/Last-Modified validators and cheap 304s."""
+from datetime import datetime, timedelta, timezone
+
+from httpx import AsyncClient
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import CATALOG_VERSION_SLOTS, Book, CatalogVersionSlot
+from app.repositories.book_repository import BookRepository
+
+
+async def test_list_books_304_costs_one_query(
+    client: AsyncClient, query_log: list[str], db_session: AsyncSession, create_book
+):
+    await create_book()
+    first = await client.get("/api/v1/books?page_size=5")
+    etag = first.headers["etag"]
+    assert "s-maxage" in first.headers["cache-control"]
+
+    db_session.expunge_all()
+    query_log.clear()
+    resp = await client.get("/api/v1/books?page_size=5", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == etag
+    # The version: one statement over the counters alone, never the books
+    [version] = query_log
+    assert "FROM catalog_versions" in version
+    assert "books" not in version
+
+    # Different query, different representation
+    other = await client.get("/api/v1/books?page_size=6", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+async def test_list_books_etag_changes_on_write(
+    client: AsyncClient, auth_headers: dict, create_book
+):
+    book_id = await create_book()
+    etag = (await client.get("/api/v1/books")).headers["etag"]
+
+    await client.post(f"/api/v1/books/{book_id}/borrow", headers=auth_headers)
+    resp = await client.get("/api/v1/books", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+
+
+async def test_analysis_304_skips_ai_text(
+    client: AsyncClient, query_log: list[str], db_session: AsyncSession, create_book
+):
+    book_id = await create_book()
+    await BookRepository(db_session).save_ai_content(book_id, ai_summary="Summary")
+
+    first = await client.get(f"/api/v1/books/{book_id}/analysis")
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    db_session.expunge_all()
+    query_log.clear()
+    resp = await client.get(
+        f"/api/v1/books/{book_id}/analysis", headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == 304
+    assert len(query_log) == 1
+    assert "ai_summary" not in query_log[0] and "WHERE books.id = ?" in query_log[0]
+
+    resp = await client.get(
+        f"/api/v1/books/{book_id}/analysis", headers={"If-Modified-Since": last_modified}
+    )
+    assert resp.status_code == 304
+
+
+async def test_analysis_etag_changes_when_ai_content_lands(
+    client: AsyncClient, db_session: AsyncSession, create_book
+):
+    book_id = await create_book()
+    etag = (await client.get(f"/api/v1/books/{book_id}/analysis")).headers["etag"]
+
+    await BookRepository(db_session).save_ai_content(book_id, ai_review_consensus="Loved")
+    resp = await client.get(
+        f"/api/v1/books/{book_id}/analysis", headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["ai_review_consensus"] == "Loved"
+
+
+async def test_analysis_conditional_missing_book(client: AsyncClient):
+    resp = await client.get("/api/v1/books/999/analysis", headers={"If-None-Match": '"x"'})
+    assert resp.status_code == 404
+
+
+async def test_recommendations_are_private_and_revalidated(
+    client: AsyncClient, auth_headers: dict, create_book
+):
+    await create_book()
+    first = await client.get("/api/v1/recommendations", headers=auth_headers)
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert "authorization" in first.headers["vary"].lower()
+
+    resp = await client.get(
+        "/api/v1/recommendations",
+        headers={**auth_headers, "If-None-Match": first.headers["etag"]},
+    )
+    assert resp.status_code == 304
+
+
+async def test_borrows_only_move_validators_that_show_availability(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, create_book
+):
+    book_id = await create_book()
+    other_id = await create_book("Other")
+    repo = BookRepository(db_session)
+    content, listed = await repo.catalog_version(), await repo.catalog_version(True)
+    analysis = await client.get(f"/api/v1/books/analysis?ids={other_id}")
+    recommended = await client.get("/api/v1/recommendations", headers=auth_headers)
+
+    await client.post(f"/api/v1/books/{book_id}/borrow", headers=auth_headers)
+    assert await repo.catalog_version() == content
+    assert await repo.catalog_version(True) > listed
+    resp = await client.get(
+        f"/api/v1/books/analysis?ids={other_id}",
+        headers={"If-None-Match": analysis.headers["etag"]},
+    )
+    assert resp.status_code == 304
+    # The borrower's own recommendations do change
+    resp = await client.get(
+        "/api/v1/recommendations",
+        headers={**auth_headers, "If-None-Match": recommended.headers["etag"]},
+    )
+    assert resp.status_code == 200
+
+
+async def test_deleting_a_book_moves_the_catalog_version(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, create_book
+):
+    book_id = await create_book()
+    version = await BookRepository(db_session).catalog_version()
+    await client.delete(f"/api/v1/books/{book_id}", headers=auth_headers)
+    assert (await BookRepository(db_session).catalog_version()).content > version.content
+
+
+async def test_a_write_stamped_behind_a_later_one_moves_the_catalog_version(
+    client: AsyncClient, db_session: AsyncSession, create_book
+):
+    early_id = await create_book("Early")
+    await create_book("Late")
+    repo = BookRepository(db_session)
+    version = await repo.catalog_version()
+
+    # A transaction that stamped its row before the newest write commits only now
+    stamped = datetime.now(timezone.utc) - timedelta(hours=1)
+    await db_session.execute(
+        update(Book).where(Book.id == early_id).values(content_updated_at=stamped)
+    )
+    moved = await repo.catalog_version()
+    assert moved > version
+    assert await repo.catalog_version() == moved
+
+
+async def test_the_catalog_version_reads_a_bounded_number_of_rows(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, create_book
+):
+    book_id = await create_book()
+    repo = BookRepository(db_session)
+    version = await repo.catalog_version(True)
+    for _ in range(20):
+        await client.post(f"/api/v1/books/{book_id}/borrow", headers=auth_headers)
+        await client.post(f"/api/v1/books/{book_id}/return", headers=auth_headers)
+
+    # Forty writes later the version has counted every one of them, yet it
+    # is still summed from the same few counter rows
+    moved = await repo.catalog_version(True)
+    assert moved.availability == version.availability + 40
+    assert moved.content == version.content
+    rows = await db_session.scalar(select(func.count()).select_from(CatalogVersionSlot))
+    assert rows <= 2 * CATALOG_VERSION_SLOTS
+
+
+async def test_batch_analysis_etag_moves_on_a_write_stamped_behind_a_newer_one(
+    client: AsyncClient, db_session: AsyncSession, create_book
+):
+    early_id = await create_book("Early")
+    late_id = await create_book("Late")
+    url = f"/api/v1/books/analysis?ids={early_id},{late_id}"
+    etag = (await client.get(url)).headers["etag"]
+
+    # Stamped before the newest row in the set, so the set's max stays put
+    stamped = datetime.now(timezone.utc) - timedelta(hours=1)
+    await db_session.execute(
+        update(Book)
+        .where(Book.id == early_id)
+        .values(average_rating=4.5, content_updated_at=stamped)
+    )
+    resp = await client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["items"][0]["average_rating"] == 4.5
@@ -0,0 +1,68 @@
+"""EXPLAIN-based checks that every hot query is served by an index."""
+import pytest
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book
+from app.models.library import Borrow, BorrowStatus, Review
+
+HOT_QUERIES = {
+    "borrow/return/review active-borrow check": select(Borrow).where(
+        Borrow.user_id == 1,
+        Borrow.book_id == 2,
+        Borrow.status == BorrowStatus.ACTIVE.value,
+    ),
+    "list_borrowed_books": select(Borrow)
+    .where(Borrow.user_id == 1, Borrow.status == BorrowStatus.ACTIVE.value)
+    .order_by(Borrow.borrowed_at.desc()),
+    "recommender genre ranking": select(Book)
+    .where(Book.genre == "Fiction")
+    .order_by(Book.average_rating.desc())
+    .limit(10),
+    "GET /books keyset page": select(Book)
+    .where(tuple_(Book.created_at, Book.id) < tuple_(text("'2026-01-01'"), 10))
+    .order_by(Book.created_at.desc(), Book.id.desc())
+    .limit(20),
+    "autocomplete hot titles": select(Book.id, Book.title, Book.author)
+    .order_by(Book.review_count.desc(), Book.id.desc())
+    .limit(50),
+    "sentiment batch next chunk": select(Review.id, Review.book_id, Review.body)
+    .where(Review.sentiment_score.is_(None), Review.id > 0)
+    .order_by(Review.id)
+    .limit(500),
+}
+
+
+async def _plan(db: AsyncSession, stmt) -> str:
+    sql = stmt.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    result = await db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+    return "\n".join(row[-1] for row in result.all())
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+async def test_hot_query_uses_index(db_session: AsyncSession, name: str):
+    plan = await _plan(db_session, HOT_QUERIES[name])
+    assert "USING INDEX" in plan or "USING COVERING INDEX" in plan, plan
+    assert "USE TEMP B-TREE" not in plan, plan  # no sort step
+
+
+async def test_only_one_active_borrow_per_user_and_book(db_session: AsyncSession):
+    db_session.add(Borrow(user_id=1, book_id=1, status=BorrowStatus.RETURNED))
+    db_session.add(Borrow(user_id=1, book_id=1, status=BorrowStatus.ACTIVE))
+    await db_session.flush()
+
+    db_session.add(Borrow(user_id=1, book_id=1, status=BorrowStatus.ACTIVE))
+    with pytest.raises(Exception, match="UNIQUE"):
+        await db_session.flush()
+
+
+async def test_only_one_active_borrow_per_book(db_session: AsyncSession):
+    db_session.add(Borrow(user_id=1, book_id=1, status=BorrowStatus.ACTIVE))
+    db_session.add(Borrow(user_id=2, book_id=1, status=BorrowStatus.RETURNED))
+    await db_session.flush()
+
+    db_session.add(Borrow(user_id=2, book_id=1, status=BorrowStatus.ACTIVE))
+    with pytest.raises(Exception, match="UNIQUE"):
+        await db_session.flush()
@@ -0,0 +1,171 @@
+"""Recommender models published once and mapped by every worker."""
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import BookStatus
+from app.models.library import Borrow, BorrowStatus
+from app.models.user import User
+from app.repositories.book_repository import BookRepository
+from app.services.model_store import (
+    build_lock,
+    current_generation,
+    read_generation,
+    write_generation,
+)
+from app.services.recommendation_catalog import BookCatalog
+from app.services.recommendation_neighbours import ItemNeighbours
+from app.services.recommendation_text_index import DescriptionIndex
+
+
+def _reloads(query_log: list[str]) -> list[str]:
+    # The full catalog reload is the only read ordered by id
+    return [q for q in query_log if "ORDER BY books.id" in q]
+
+
+def test_one_builder_at_a_time(tmp_path):
+    with build_lock(str(tmp_path)) as first:
+        with build_lock(str(tmp_path)) as second:
+            assert first and not second
+    with build_lock(str(tmp_path)) as again:
+        assert again
+
+
+def test_a_generation_pruned_while_opening_is_read_from_current(tmp_path, monkeypatch):
+    path = str(tmp_path)
+    write_generation(path, {"a": np.zeros(3), "b": np.zeros(3)}, {"n": 0})
+    load = np.load
+    published = []
+
+    def publish_twice_then_load(file, **kwargs):
+        # Two publishes by another worker between our CURRENT read and the arrays
+        if not published:
+            published.extend(
+                write_generation(path, {"a": np.full(3, n), "b": np.full(3, n)}, {"n": n})
+                for n in (1, 2)
+            )
+        return load(file, **kwargs)
+
+    monkeypatch.setattr("app.services.model_store.np.load", publish_twice_then_load)
+    saved = read_generation(path)
+    assert saved.name == published[-1] == current_generation(path)
+    assert saved.meta["n"] == 2 and list(saved.arrays["b"]) == [2, 2, 2]
+
+
+async def test_workers_share_the_published_catalog(
+    db_session: AsyncSession, query_log: list[str], tmp_path
+):
+    repo = BookRepository(db_session)
+    books = [
+        await repo.create(
+            title=f"B{i}", author="A", genre=("Fantasy", "History")[i % 2], average_rating=i % 5
+        )
+        for i in range(6)
+    ]
+    await db_session.commit()
+    path = str(tmp_path / "catalog")
+    builder, worker = BookCatalog(path=path), BookCatalog(path=path)
+    await builder.ensure_fresh(db_session)
+    first = current_generation(path)
+    assert builder._generation == first
+
+    # A second worker maps the same files instead of reloading
+    query_log.clear()
+    await worker.ensure_fresh(db_session)
+    assert worker._generation == first and not _reloads(query_log)
+    assert isinstance(worker.ids, np.memmap)
+    assert worker.recommend({"Fantasy": 1.0}, 3) == builder.recommend({"Fantasy": 1.0}, 3)
+
+    # Patches are copy-on-write: private to the worker, and new books land
+    # in the generation's spare slots
+    capacity = len(worker.ids)
+    worker.upsert_many(
+        [
+            (books[0].id, "History", 5.0, 1.0, BookStatus.AVAILABLE),
+            (10_000, "Fantasy", 5.0, None, BookStatus.AVAILABLE),
+        ]
+    )
+    slot = int(worker._slots([books[0].id])[0])
+    assert worker.ratings[slot] == 5.0 and builder.ratings[slot] == 0.0
+    assert len(worker.ids) == capacity and worker.recommend({"Fantasy": 1.0}, 1) == [10_000]
+    worker.remove(10_000)
+
+    # While someone else holds the build lock an expired worker patches and
+    # keeps serving; it never reloads on its own
+    worker._ttl = 0.0
+    with build_lock(path):
+        query_log.clear()
+        await worker.ensure_fresh(db_session, version=-1)
+    assert worker._generation == first and not _reloads(query_log)
+
+    # The next full reload is published once and adopted without a restart
+    builder._ttl = 0.0
+    await repo.create(title="New", author="A", genre="Fantasy", average_rating=5.0)
+    await db_session.commit()
+    await builder.ensure_fresh(db_session)
+    assert builder._generation != first
+    worker._ttl = 600.0
+    query_log.clear()
+    await worker.ensure_fresh(db_session)
+    assert worker._generation == builder._generation and not _reloads(query_log)
+    assert worker.ratings[slot] == 0.0
+    assert len(worker) == len(builder) == 7
+
+
+async def test_neighbours_and_text_index_follow_the_publisher(
+    db_session: AsyncSession, query_log: list[str], tmp_path
+):
+    repo = BookRepository(db_session)
+    books = [
+        await repo.create(title=f"T{i}", author="A", description=f"Dragons, part {i}.")
+        for i in range(4)
+    ]
+    users = [
+        User(email=f"m{i}@example.com", username=f"m{i}", hashed_password="x") for i in range(2)
+    ]
+    db_session.add_all(users)
+    await db_session.flush()
+    db_session.add_all(
+        Borrow(user_id=u.id, book_id=b.id, status=BorrowStatus.RETURNED)
+        for u in users
+        for b in books[:2]
+    )
+    await db_session.commit()
+
+    path = str(tmp_path / "neighbours")
+    first = ItemNeighbours(path=path, refresh_seconds=0)
+    second = ItemNeighbours(path=path, refresh_seconds=0)
+    await first.ensure_fresh(db_session, wait=True)
+    query_log.clear()
+    await second.ensure_fresh(db_session)
+    # Attached to the published model: only borrows past its watermark are read
+    assert all("borrows.id >" in q for q in query_log if "FROM borrows" in q)
+    assert isinstance(second.model.neighbours, np.memmap)
+    assert [b for b, _ in second.recommend([books[0].id], k=3)] == [books[1].id]
+
+    # New borrows are folded in by one worker and published; the other adopts them
+    db_session.add(Borrow(user_id=users[0].id, book_id=books[2].id))
+    await db_session.commit()
+    await first.ensure_fresh(db_session)
+    with build_lock(path):
+        await second.ensure_fresh(db_session)
+    assert second._generation == first._generation == current_generation(path)
+    assert second.recommend([books[2].id], k=3) == first.recommend([books[2].id], k=3)
+    assert isinstance(second.model.neighbours, np.memmap)
+
+    text_path = str(tmp_path / "text_index")
+    publisher, reader = DescriptionIndex(path=text_path), DescriptionIndex(path=text_path)
+    await publisher.ensure_fresh(db_session)
+    await reader.ensure_fresh(db_session)
+    assert reader._generation == publisher._generation
+    # Views of the mapped files, not copies
+    assert not reader._base_postings.data.flags.owndata
+    assert not reader._base_postings.data.flags.writeable
+    assert reader.similar_to([books[0].id], k=2) == publisher.similar_to([books[0].id], k=2)
+
+    # Until a first generation exists, only the lock holder builds one
+    late = DescriptionIndex(path=str(tmp_path / "late"))
+    with build_lock(str(tmp_path / "late")):
+        await late.ensure_fresh(db_session)
+    assert len(late) == 0 and late.similar_to([books[0].id], k=2) == []
+    await late.ensure_fresh(db_session)
+    assert late.similar_to([books[0].id], k=2) == publisher.similar_to([books[0].id], k=2)
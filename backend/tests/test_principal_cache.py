@@ -0,0 +1,94 @@
+"""Tests for the authenticated-principal LRU + TTL cache."""
+from httpx import AsyncClient
+
+from app.core.principal_cache import Principal, PrincipalCache, get_principal_cache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_expiry():
+    clock = _Clock()
+    cache = PrincipalCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set("tok", Principal(1, "a", True))
+    assert cache.get(1, "tok") == Principal(1, "a", True)
+    clock.now = 5.1
+    assert cache.get(1, "tok") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = PrincipalCache(max_entries=2, ttl_seconds=60)
+    cache.set("t1", Principal(1, "a", True))
+    cache.set("t2", Principal(2, "b", True))
+    cache.get(1, "t1")
+    cache.set("t3", Principal(3, "c", True))
+    assert cache.get(2, "t2") is None
+    assert cache.get(1, "t1") is not None
+    assert cache.get(3, "t3") is not None
+
+
+def test_invalidate_user_drops_every_token():
+    cache = PrincipalCache(max_entries=10, ttl_seconds=60)
+    cache.set("t1", Principal(1, "a", True))
+    cache.set("t2", Principal(1, "a", True))
+    cache.set("t3", Principal(2, "b", True))
+    cache.invalidate_user(1)
+    assert cache.get(1, "t1") is None and cache.get(1, "t2") is None
+    assert cache.get(2, "t3") is not None
+
+
+def test_zero_ttl_disables_cache():
+    cache = PrincipalCache(max_entries=10, ttl_seconds=0)
+    cache.set("t", Principal(1, "a", True))
+    assert cache.get(1, "t") is None
+
+
+async def _user_id(client: AsyncClient, auth_headers: dict) -> int:
+    return (await client.get("/api/v1/auth/me", headers=auth_headers)).json()["id"]
+
+
+async def test_cached_principal_skips_user_lookup(
+    client: AsyncClient, auth_headers: dict, query_log: list[str]
+):
+    user_id = await _user_id(client, auth_headers)
+
+    query_log.clear()
+    resp = await client.get(f"/api/v1/books/{user_id}/borrowed", headers=auth_headers)
+    assert resp.status_code == 200
+    assert not any("FROM users" in s for s in query_log)
+
+
+async def test_deactivation_invalidates_cached_principal(
+    client: AsyncClient, auth_headers: dict
+):
+    user_id = await _user_id(client, auth_headers)
+    resp = await client.get(f"/api/v1/books/{user_id}/borrowed", headers=auth_headers)
+    assert resp.status_code == 200
+    token = auth_headers["Authorization"].split(" ", 1)[1]
+    assert get_principal_cache().get(user_id, token) is not None
+
+    resp = await client.delete("/api/v1/auth/me", headers=auth_headers)
+    assert resp.status_code == 204
+
+    # The cached principal would still say active; the endpoint dropped it
+    resp = await client.get(f"/api/v1/books/{user_id}/borrowed", headers=auth_headers)
+    assert resp.status_code == 401
+
+
+async def test_profile_update_refreshes_principal(
+    client: AsyncClient, auth_headers: dict
+):
+    user_id = await _user_id(client, auth_headers)
+    resp = await client.put(
+        "/api/v1/auth/me", headers=auth_headers, json={"full_name": "New Name"}
+    )
+    assert resp.status_code == 200
+
+    token = auth_headers["Authorization"].split(" ", 1)[1]
+    assert get_principal_cache().get(user_id, token) is None
@@ -0,0 +1,116 @@
+"""Guard rails on how many SQL statements each endpoint issues."""
+from unittest.mock import patch
+
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def _borrow_and_review(client: AsyncClient, auth_headers: dict, book_id: int) -> None:
+    await client.post(f"/api/v1/books/{book_id}/borrow", headers=auth_headers)
+    with patch("app.api.v1.endpoints.books.update_review"):
+        await client.post(
+            f"/api/v1/books/{book_id}/reviews",
+            headers=auth_headers,
+            json={"rating": 4, "body": "A great read with interesting insights."},
+        )
+
+
+def _reset(db_session: AsyncSession, query_log: list[str]) -> None:
+    # The test client shares one session; drop its identity map so every
+    # request pays for its own lookups, as it would in production.
+    db_session.expunge_all()
+    query_log.clear()
+
+
+def _touches(statements: list[str], table: str) -> bool:
+    return any(f"FROM {table}" in s for s in statements)
+
+
+async def test_me_is_one_query_regardless_of_history(
+    client: AsyncClient, auth_headers: dict, query_log: list[str],
+    db_session: AsyncSession, create_book,
+):
+    for _ in range(3):
+        book_id = await create_book()
+        await _borrow_and_review(client, auth_headers, book_id)
+
+    _reset(db_session, query_log)
+    resp = await client.get("/api/v1/auth/me", headers=auth_headers)
+    assert resp.status_code == 200
+    assert len(query_log) == 1
+    assert not _touches(query_log, "borrows") and not _touches(query_log, "reviews")
+
+
+async def test_analysis_does_not_load_borrows_or_reviews(
+    client: AsyncClient, auth_headers: dict, query_log: list[str],
+    db_session: AsyncSession, create_book,
+):
+    book_id = await create_book()
+    await _borrow_and_review(client, auth_headers, book_id)
+
+    _reset(db_session, query_log)
+    resp = await client.get(f"/api/v1/books/{book_id}/analysis")
+    assert resp.status_code == 200
+    assert len(query_log) == 1
+
+
+async def test_list_books_query_count(
+    client: AsyncClient, auth_headers: dict, query_log: list[str],
+    db_session: AsyncSession, create_book,
+):
+    for _ in range(3):
+        book_id = await create_book()
+        await _borrow_and_review(client, auth_headers, book_id)
+
+    _reset(db_session, query_log)
+    resp = await client.get("/api/v1/books")
+    assert resp.status_code == 200
+    assert len(query_log) == 3  # catalog version (ETag) + count + page
+    assert not _touches(query_log, "borrows") and not _touches(query_log, "reviews")
+
+    # AI text is only joined when a view asks for it
+    _reset(db_session, query_log)
+    resp = await client.get("/api/v1/books?view=compact")
+    assert resp.status_code == 200
+    assert len(query_log) == 3
+    # The catalog version reads only the end of book_ai_content's index
+    assert not any("book_ai_content" in s for s in query_log[1:])
+
+
+async def test_borrow_and_return_query_counts(
+    client: AsyncClient, auth_headers: dict, query_log: list[str],
+    db_session: AsyncSession, create_book,
+):
+    book_id = await create_book()
+
+    _reset(db_session, query_log)
+    resp = await client.post(f"/api/v1/books/{book_id}/borrow", headers=auth_headers)
+    assert resp.status_code == 201
+    # Guarded INSERT + status UPDATE (a single CTE statement on Postgres),
+    # then the genre-affinity and trending upserts and the user's activity
+    # stamp. The principal is cached, so no user lookup.
+    assert len(query_log) == 5
+    assert not _touches(query_log, "reviews")
+
+    _reset(db_session, query_log)
+    resp = await client.post(f"/api/v1/books/{book_id}/return", headers=auth_headers)
+    assert resp.status_code == 200
+    assert len(query_log) == 4
+    assert not _touches(query_log, "reviews")
+
+
+async def test_batch_analysis_is_one_query_for_any_batch(
+    client: AsyncClient, query_log: list[str],
+    db_session: AsyncSession, create_book,
+):
+    ids = [await create_book() for _ in range(5)]
+
+    _reset(db_session, query_log)
+    resp = await client.get(f"/api/v1/books/analysis?ids={','.join(map(str, ids))}")
+    assert resp.status_code == 200
+    assert len(query_log) == 2  # the rows' version (ETag) + one projected select
+
+    _reset(db_session, query_log)
+    resp = await client.get(f"/api/v1/books/analysis?ids={ids[0]}&include_text=false")
+    assert len(query_log) == 2
+    assert not any("book_ai_content" in s for s in query_log)
@@ -0,0 +1,131 @@
+"""Offline recommendation precompute: parity with live scoring, serving, resume."""
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.library import Borrow, BorrowStatus, UserRecommendation
+from app.models.user import User
+from app.repositories.affinity_repository import GenreAffinityRepository
+from app.repositories.book_repository import BookRepository
+from app.repositories.precomputed_repository import PrecomputedRecommendationRepository
+from app.services.recommendation_batch import precompute_recommendations
+from app.services.recommendation_catalog import BookCatalog
+from app.services.recommendation_neighbours import ItemNeighbours
+from app.services.recommendation_service import build_recommendations
+from app.services.recommendation_text_index import DescriptionIndex
+
+_GENRES = ("Fantasy", "History", "Science")
+_WORDS = ("dragons and wizards", "kings and battles", "stars and atoms")
+
+
+async def _library(db: AsyncSession) -> list[User]:
+    """30 books, six readers with overlapping histories, plus two who are skipped."""
+    repo = BookRepository(db)
+    books = [
+        await repo.create(
+            title=f"B{i}", author="A", genre=_GENRES[i % 3], average_rating=(i * 7) % 5,
+            description=f"A tale of {_WORDS[i % 3]}, part {i}.",
+        )
+        for i in range(30)
+    ]
+    users = [
+        User(email=f"u{i}@example.com", username=f"u{i}", hashed_password="x",
+             is_active=i != 7)
+        for i in range(8)
+    ]
+    db.add_all(users)
+    await db.flush()
+    affinity = GenreAffinityRepository(db)
+    for i, user in enumerate(users):
+        # u6 has a single borrow (cold start); u7 is inactive
+        history = books[i : i + (1 if i == 6 else 2 + i % 3)]
+        for book in history:
+            db.add(Borrow(user_id=user.id, book_id=book.id, status=BorrowStatus.RETURNED))
+            await affinity.record(user.id, book.id, 1.0)
+    await db.commit()
+    return users
+
+
+async def _stored(db: AsyncSession) -> dict[int, list[int]]:
+    result = await db.execute(
+        select(UserRecommendation.user_id, UserRecommendation.book_id).order_by(
+            UserRecommendation.user_id, UserRecommendation.rank
+        )
+    )
+    lists: dict[int, list[int]] = {}
+    for user_id, book_id in result.tuples():
+        lists.setdefault(user_id, []).append(book_id)
+    return lists
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+async def test_precomputed_lists_match_live_scoring_and_are_served(
+    db_session: AsyncSession, query_log: list[str], workers: int
+):
+    users = await _library(db_session)
+    report = await precompute_recommendations(
+        db_session, k=5, block_size=4, workers=workers, checkpoint_path=""
+    )
+    assert report.users == 6 and report.rows == 30 and report.users_per_second > 0
+
+    stored = await _stored(db_session)
+    assert stored.keys() == {u.id for u in users[:6]}
+    neighbours = ItemNeighbours()
+    await neighbours.ensure_fresh(db_session, wait=True)
+    for user in users[:6]:
+        live, strategy = await build_recommendations(
+            user, db_session, limit=5, catalog=BookCatalog(), text_index=DescriptionIndex(),
+            neighbours=neighbours, precomputed=False,
+        )
+        assert strategy == "content_based"
+        assert stored[user.id] == [b.id for b in live]
+
+    # Served straight from the table: the borrow history, then one join
+    query_log.clear()
+    served, strategy = await build_recommendations(users[0], db_session, limit=5)
+    assert strategy == "content_based" and [b.id for b in served] == stored[users[0].id]
+    assert len(query_log) == 2 and "user_recommendations" in query_log[1]
+
+    # A review since the run moves the affinity: the list is no longer served
+    await GenreAffinityRepository(db_session).record(users[0].id, stored[users[0].id][0], -0.8)
+    await db_session.commit()
+    precomputed = PrecomputedRecommendationRepository(db_session)
+    any_age = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    assert await precomputed.fresh_top_k(users[0].id, 5, any_age) == []
+    assert len(await precomputed.fresh_top_k(users[1].id, 5, any_age)) == 5
+    query_log.clear()
+    await build_recommendations(users[0], db_session, limit=5)
+    assert len(query_log) > 2
+
+
+async def test_interrupted_run_resumes_from_checkpoint(db_session: AsyncSession, tmp_path):
+    users = await _library(db_session)
+    checkpoint = tmp_path / "precompute.json"
+    replace = PrecomputedRecommendationRepository.replace
+    calls = 0
+
+    async def crash_on_second_block(self, *args):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("worker lost")
+        return await replace(self, *args)
+
+    with patch.object(PrecomputedRecommendationRepository, "replace", crash_on_second_block):
+        with pytest.raises(RuntimeError):
+            await precompute_recommendations(
+                db_session, k=5, block_size=2, workers=1, checkpoint_path=str(checkpoint)
+            )
+    saved = json.loads(checkpoint.read_text())
+    assert saved["last_user_id"] == users[1].id and saved["users"] == 2
+
+    report = await precompute_recommendations(
+        db_session, k=5, block_size=2, workers=1, checkpoint_path=str(checkpoint)
+    )
+    assert report.resumed_after == users[1].id and report.users == 4
+    assert (await _stored(db_session)).keys() == {u.id for u in users[:6]}
+    assert not checkpoint.exists()
@@ -0,0 +1,235 @@
+"""Per-user recommendation cache: staleness, invalidation, endpoint wiring, metrics."""
+import json
+from datetime import datetime, timezone
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db
+from app.main import create_application
+from app.models.user import User
+from app.repositories.book_repository import BookRepository
+from app.repositories.trending_repository import BORROW_COUNT, TrendingRepository
+from app.repositories.user_repository import UserRepository
+from app.services.events.broker import EventBroker, PostgresEventBroker
+from app.services.events.hub import Event, EventHub
+from app.services.recommendation_cache import (
+    BOOK_CHANGED_EVENT,
+    CachedRecommendations,
+    RecommendationCache,
+    get_recommendation_cache,
+    on_book_changed,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _entry(
+    version: int, books: tuple[int, ...] = (1,), at: float = 0.0, window: int | None = None
+) -> CachedRecommendations:
+    return CachedRecommendations(None, version, b"{}", frozenset(books), at, window)
+
+
+def test_fresh_stale_and_expired_entries():
+    clock = _Clock()
+    cache = RecommendationCache(max_entries=10, max_stale_seconds=30, clock=clock)
+    assert cache.get(1, None, version=5) is None
+    cache.set(1, cache.ticket(1), _entry(5))
+
+    assert cache.get(1, None, version=5).version == 5  # hit
+    clock.now = 30
+    assert cache.get(1, None, version=6).version == 5  # stale, still served
+    clock.now = 31
+    assert cache.get(1, None, version=6) is None  # too old to serve
+    assert cache.hit_ratio() == 0.5
+
+    # An older result never replaces a newer one
+    cache.set(1, cache.ticket(1), _entry(7))
+    cache.set(1, cache.ticket(1), _entry(6))
+    assert cache.get(1, None, version=7).version == 7
+
+    # The user's own activity, from any worker, turns the entry into a miss
+    assert cache.get(1, datetime.now(timezone.utc), version=7) is None
+
+
+def test_invalidation_is_precise_and_beats_slow_recomputes():
+    cache = RecommendationCache(max_entries=10, max_stale_seconds=30)
+    for user_id, books in ((1, (10, 11)), (2, (11, 12)), (3, (13,))):
+        cache.set(user_id, cache.ticket(user_id), _entry(1, books))
+
+    ticket = cache.ticket(1)  # a recompute for user 1 starts…
+    cache.invalidate_user(1)  # …and the user borrows meanwhile
+    cache.set(1, ticket, _entry(1))
+    assert cache.get(1, None, version=1) is None
+    assert cache.get(2, None, version=1) is not None
+
+    cache.invalidate_book(11)
+    assert cache.get(2, None, version=1) is None
+    assert cache.get(3, None, version=1) is not None
+
+    # Least recently used entries go first
+    small = RecommendationCache(max_entries=2, max_stale_seconds=30)
+    for user_id in (1, 2):
+        small.set(user_id, small.ticket(user_id), _entry(1))
+    small.get(1, None, version=1)
+    small.set(3, small.ticket(3), _entry(1))
+    assert small.get(2, None, version=1) is None and small.get(1, None, version=1) is not None
+
+
+def test_cold_start_entries_go_stale_with_the_trending_window():
+    clock = _Clock()
+    cache = RecommendationCache(max_entries=10, max_stale_seconds=30, clock=clock)
+    cache.set(1, cache.ticket(1), _entry(5, window=100))
+    cache.set(2, cache.ticket(2), _entry(5))
+
+    assert cache.get(1, None, version=5, window=100) is not None
+    assert cache.get(1, None, version=5, window=101).trending_window == 100  # stale
+    clock.now = 31
+    assert cache.get(1, None, version=5, window=101) is None
+    # Lists that do not follow trending ignore the window
+    assert cache.get(2, None, version=5, window=101) is not None
+    assert cache.hit_ratio() == 0.75
+
+
+async def test_cold_start_lists_follow_other_users_borrows(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, monkeypatch
+):
+    repo = BookRepository(db_session)
+    books = [await repo.create(title=f"B{i}", author="A", genre="Sci-Fi") for i in range(3)]
+    await db_session.commit()
+    window = [100]
+    for module in ("app.services.recommendation_cache", "app.api.v1.endpoints.recommendations"):
+        monkeypatch.setattr(f"{module}.trending_window", lambda: window[0])
+
+    first = await client.get("/api/v1/recommendations", headers=auth_headers)
+    assert first.json()["strategy"] == "cold_start_top_rated"
+
+    # Someone else borrows: neither the catalog version nor the caller's
+    # activity moves, so the list holds until the trending window does
+    await TrendingRepository(db_session).record(books[2].id, BORROW_COUNT)
+    await db_session.commit()
+    etag = first.headers["etag"]
+    headers = {**auth_headers, "If-None-Match": etag}
+    assert (await client.get("/api/v1/recommendations", headers=headers)).status_code == 304
+
+    window[0] = 101
+    stale = await client.get("/api/v1/recommendations", headers=headers)
+    assert stale.status_code == 304
+    fresh = await client.get("/api/v1/recommendations", headers=headers)
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+    assert fresh.json()["strategy"] == "cold_start_trending"
+    assert fresh.json()["books"][0]["id"] == books[2].id
+
+
+async def test_endpoint_serves_cached_bodies_and_refreshes_stale_ones(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, query_log: list[str]
+):
+    repo = BookRepository(db_session)
+    books = [await repo.create(title=f"B{i}", author="A", genre="Sci-Fi") for i in range(3)]
+    await db_session.commit()
+    cache = get_recommendation_cache()
+
+    first = await client.get("/api/v1/recommendations", headers=auth_headers)
+    assert first.status_code == 200
+
+    # A hit reads the catalog version and the user's activity stamp, nothing else
+    query_log.clear()
+    second = await client.get("/api/v1/recommendations", headers=auth_headers)
+    assert second.content == first.content
+    assert len(query_log) == 2 and "activity_at" in query_log[1]
+
+    # A catalog change elsewhere: the stale body is served, then refreshed
+    await repo.create(title="New", author="N", genre="Sci-Fi", average_rating=5.0)
+    await db_session.commit()
+    stale = await client.get("/api/v1/recommendations", headers=auth_headers)
+    assert stale.content == first.content
+    assert stale.headers["etag"] == first.headers["etag"]
+    fresh = await client.get("/api/v1/recommendations", headers=auth_headers)
+    assert fresh.json()["books"][0]["title"] == "New"
+    assert fresh.headers["etag"] != first.headers["etag"]
+
+    # Another user's borrow moves neither validator: still a hit
+    other = User(email="o@example.com", username="o", hashed_password="x")
+    db_session.add(other)
+    await db_session.flush()
+    await UserRepository(db_session).touch_activity(other.id)
+    await db_session.commit()
+    query_log.clear()
+    assert (await client.get("/api/v1/recommendations", headers=auth_headers)).content == (
+        fresh.content
+    )
+    assert len(query_log) == 2
+
+    # Borrowing drops the user's entry: the next call recomputes inline
+    await client.post(f"/api/v1/books/{books[0].id}/borrow", headers=auth_headers)
+    assert len(cache) == 0
+    after = await client.get("/api/v1/recommendations", headers=auth_headers)
+    assert books[0].id not in [b["id"] for b in after.json()["books"]]
+
+    metrics = (await client.get("/metrics")).text
+    assert 'recommendation_cache_requests_total{result="stale"} ' in metrics
+    assert "recommendation_cache_hit_ratio " in metrics
+    assert 'recommendation_recompute_seconds_count{mode="background"} ' in metrics
+
+
+async def test_book_changes_reach_the_caches_of_other_workers(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession
+):
+    book = await BookRepository(db_session).create(title="B", author="A", genre="Sci-Fi")
+    await db_session.commit()
+    cache = get_recommendation_cache()
+    await client.get("/api/v1/recommendations", headers=auth_headers)
+    assert len(cache) == 1
+
+    # Another worker updated the book: its NOTIFY arrives on this worker's listener
+    worker = PostgresEventBroker(EventHub(max_queue=1), "postgresql://x")
+    worker.on(BOOK_CHANGED_EVENT, on_book_changed)
+    payload = Event(type=BOOK_CHANGED_EVENT, book_id=book.id, book_stream=False).to_dict()
+    worker._on_notify(None, 0, "luminalib_events", json.dumps(payload))
+    assert len(cache) == 0
+
+    # The worker that took the write drops its own entries at once
+    await client.get("/api/v1/recommendations", headers=auth_headers)
+    db_session.expunge(book)
+    resp = await client.put(f"/api/v1/books/{book.id}", headers=auth_headers, json={"title": "C"})
+    assert resp.status_code == 200 and len(cache) == 0
+
+
+async def test_book_change_is_broadcast_after_the_request_commits(
+    auth_headers: dict, db_session: AsyncSession, monkeypatch
+):
+    book = await BookRepository(db_session).create(title="B", author="A")
+    await db_session.commit()
+    db_session.expunge(book)
+    commits: list[str] = []
+    event.listen(db_session.sync_session, "after_commit", lambda _s: commits.append("db"))
+
+    class RecordingBroker(EventBroker):
+        async def publish(self, bind, published: Event) -> None:
+            commits.append(published.type)
+
+    monkeypatch.setattr(
+        "app.services.recommendation_cache.get_event_broker", lambda: RecordingBroker(None)
+    )
+
+    async def committing_get_db():
+        # Like get_db: commit once the handler is done
+        yield db_session
+        await db_session.commit()
+
+    app = create_application()
+    app.dependency_overrides[get_db] = committing_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.put(
+            f"/api/v1/books/{book.id}", headers=auth_headers, json={"title": "C"}
+        )
+    assert resp.status_code == 200
+    # The request's own commit first, and the broadcast never commits it
+    assert commits == ["db", BOOK_CHANGED_EVENT]
@@ -0,0 +1,184 @@
+"""Columnar recommender catalog: scoring parity, top-k, incremental refresh."""
+import random
+import threading
+from unittest.mock import MagicMock
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book, BookStatus
+from app.models.library import UserPreferences
+from app.repositories.book_repository import BookRepository
+from app.services.recommendation_catalog import (
+    DISLIKED_PENALTY,
+    FAVOURITE_BOOST,
+    RATING_WEIGHT,
+    SENTIMENT_WEIGHT,
+    BookCatalog,
+    UserSignals,
+)
+from app.services.recommendation_service import _hydrate
+
+_GENRES = ["Fiction", "History", "Science", "Fantasy", None]
+
+
+def _random_books(n: int, seed: int = 7) -> list[Book]:
+    rng = random.Random(seed)
+    books = []
+    for i in range(1, n + 1):
+        b = Book()
+        b.id = i
+        b.genre = rng.choice(_GENRES)
+        b.average_rating = round(rng.uniform(0, 5), 2)
+        b.average_sentiment = rng.choice([None, round(rng.uniform(-1, 1), 2)])
+        b.status = rng.choice(list(BookStatus))
+        books.append(b)
+    return books
+
+
+def _reference_scores(books, genre_weights: dict[str, float], prefs) -> list[tuple]:
+    """(book, score) one object at a time: the oracle the vectorised catalog must match."""
+    fav = set(prefs.favourite_genres or []) if prefs else set()
+    disliked = set(prefs.disliked_genres or []) if prefs else set()
+    scored = []
+    for book in books:
+        genre = book.genre or ""
+        score = genre_weights.get(genre, 0.0)
+        if genre in fav:
+            score += FAVOURITE_BOOST
+        if genre in disliked:
+            score -= DISLIKED_PENALTY
+        score += book.average_rating * RATING_WEIGHT
+        score += (book.average_sentiment or 0.0) * SENTIMENT_WEIGHT
+        scored.append((book, score))
+    return scored
+
+
+def _catalog(books: list[Book]) -> BookCatalog:
+    catalog = BookCatalog()
+    catalog.build(
+        [(b.id, b.genre, b.average_rating, b.average_sentiment, b.status) for b in books]
+    )
+    return catalog
+
+
+def test_vectorised_scores_match_reference_loop():
+    books = _random_books(500)
+    weights = {"Fiction": 0.6, "History": 0.3, "Poetry": 0.1}
+    prefs = MagicMock(spec=UserPreferences)
+    prefs.favourite_genres = ["Fantasy"]
+    prefs.disliked_genres = ["History"]
+
+    catalog = _catalog(books)
+    vector = catalog.genre_vector(weights, prefs.favourite_genres, prefs.disliked_genres)
+    scores = catalog.scores(vector)
+    for (book, expected), got in zip(_reference_scores(books, weights, prefs), scores):
+        assert abs(expected - got) < 1e-5, book.id
+
+
+def test_top_k_excludes_and_breaks_ties_by_id():
+    books = _random_books(200)
+    catalog = _catalog(books)
+    weights = {"Science": 1.0}
+    excluded = {b.id for b in books[:50]}
+
+    top = catalog.recommend(weights, 10, exclude_ids=excluded)
+
+    expected = sorted(
+        ((score, b.id) for b, score in _reference_scores(books, weights, None)
+         if b.id not in excluded),
+        key=lambda pair: (-pair[0], pair[1]),
+    )[:10]
+    assert top == [book_id for _, book_id in expected]
+    assert catalog.recommend(weights, 0) == []
+
+    catalog.remove(top[0])
+    assert top[0] not in catalog.recommend(weights, 10, exclude_ids=excluded)
+    assert len(catalog) == 199
+
+
+def test_block_scoring_matches_one_user_at_a_time():
+    books = _random_books(2_000)
+    # Coarse ratings make many exact ties inside each genre
+    for book in books:
+        book.average_rating = round(book.average_rating)
+    catalog = _catalog(books)
+    catalog.remove(books[0].id)
+    rng = random.Random(3)
+    users = [
+        UserSignals(
+            {g: rng.random() for g in rng.sample(_GENRES[:-1], 2)},
+            exclude_ids=rng.sample(range(1, 2_001), rng.randint(0, 300)),
+            favourite=rng.sample(_GENRES[:-1], 1),
+            disliked=rng.sample(_GENRES[:-1], rng.randint(0, 1)),
+            boosts={rng.randint(1, 2_000): rng.random() for _ in range(rng.randint(0, 40))},
+        )
+        for _ in range(40)
+    ]
+    expected = [
+        catalog.recommend(u.genre_weights, 25, u.exclude_ids, u.favourite, u.disliked, u.boosts)
+        for u in users
+    ]
+    assert catalog.recommend_many(users, 25) == expected
+
+    catalog.upsert_many([(books[1].id, "Poetry", 5.0, 1.0, BookStatus.AVAILABLE)])
+    poet = UserSignals({"Poetry": 1.0})
+    assert catalog.recommend_many([poet], 1) == [[books[1].id]]
+
+
+def test_catalog_grows_past_initial_capacity():
+    catalog = BookCatalog()
+    catalog.build([])
+    catalog.upsert_many((i, "Fiction", float(i % 5), None, BookStatus.AVAILABLE) for i in range(1, 101))
+    assert len(catalog) == 100
+    assert catalog.top_rated(3) == [4, 9, 14]
+
+
+async def test_full_reload_builds_off_the_event_loop(db_session: AsyncSession, monkeypatch):
+    await BookRepository(db_session).create(title="A", author="X", genre="Fiction")
+    await db_session.commit()
+    threads = []
+    build = BookCatalog.build
+
+    def spy(self, rows, version=None):
+        threads.append(threading.get_ident())
+        build(self, rows, version)
+
+    monkeypatch.setattr(BookCatalog, "build", spy)
+    catalog = BookCatalog()
+    await catalog.ensure_fresh(db_session)
+    assert len(catalog) == 1
+    assert threads and threading.get_ident() not in threads
+
+
+async def test_refresh_applies_only_changed_rows(db_session: AsyncSession, query_log: list[str]):
+    repo = BookRepository(db_session)
+    first = await repo.create(title="A", author="X", genre="Fiction", average_rating=1.0)
+    second = await repo.create(title="B", author="X", genre="History", average_rating=2.0)
+    await db_session.commit()
+
+    catalog = BookCatalog(ttl_seconds=3600)
+    await catalog.ensure_fresh(db_session)
+    assert catalog.top_rated(2) == [second.id, first.id]
+
+    # Same version: nothing is read
+    query_log.clear()
+    await catalog.ensure_fresh(db_session, catalog.version)
+    assert query_log == []
+
+    third = await repo.create(title="C", author="X", genre="Science", average_rating=3.0)
+    await db_session.execute(update(Book).where(Book.id == first.id).values(average_rating=4.0))
+    await db_session.commit()
+
+    query_log.clear()
+    await catalog.ensure_fresh(db_session)
+    assert len(query_log) == 2  # catalog version + changed rows
+    assert "updated_at >=" in query_log[1]
+    assert catalog.top_rated(3) == [first.id, third.id, second.id]
+
+    # A row deleted elsewhere drops out when hydration misses it
+    await db_session.delete(third)
+    await db_session.commit()
+    books = await _hydrate([first.id, third.id], db_session, catalog)
+    assert [b.id for b in books] == [first.id]
+    assert third.id not in catalog.top_rated(3)
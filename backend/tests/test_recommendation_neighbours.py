@@ -0,0 +1,156 @@
+"""Item-item collaborative filtering: blocked cosine, incremental updates, serving."""
+import random
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book
+from app.models.library import Borrow, BorrowStatus, Review
+from app.models.user import User
+from app.services.recommendation_neighbours import (
+    ItemNeighbours,
+    build_neighbour_file,
+    fit_model,
+    make_interactions,
+    update_model,
+)
+
+
+def _random_history(seed: int, users: int = 60, books: int = 40):
+    rng = random.Random(seed)
+    borrows = [(u, rng.randint(1, books)) for u in range(1, users + 1) for _ in range(6)]
+    reviews = [(u, b, rng.randint(1, 5)) for u, b in rng.sample(borrows, 80)]
+    return borrows, reviews
+
+
+def _dense_cosine(model) -> np.ndarray:
+    dense = model.matrix.toarray().astype(np.float64)
+    norms = np.linalg.norm(dense, axis=0)
+    cosine = dense.T @ dense / np.outer(norms, norms)
+    np.fill_diagonal(cosine, 0.0)
+    return cosine
+
+
+def test_blocked_neighbours_match_dense_cosine():
+    borrows, reviews = _random_history(seed=1)
+    model = fit_model(make_interactions(borrows, reviews), n_neighbours=5, block=7)
+    cosine = _dense_cosine(model)
+
+    for col in range(len(model.book_ids)):
+        expected = np.sort(cosine[col][cosine[col] > 0])[::-1][:5]
+        got = model.similarities[col][model.neighbours[col] >= 0]
+        assert np.allclose(got, expected, atol=1e-5), col
+        for neighbour, similarity in zip(model.neighbours[col], model.similarities[col]):
+            if neighbour >= 0:
+                assert abs(cosine[col, neighbour] - similarity) < 1e-5
+
+    # A 5★ review outweighs a plain borrow of the same pair
+    user, book, _ = next(r for r in reviews if r[2] == 5)
+    row = int(np.searchsorted(model.user_ids, user))
+    col = int(np.searchsorted(model.book_ids, book))
+    assert model.matrix[row, col] == np.float32(1.8)
+
+
+def test_incremental_update_matches_a_full_fit():
+    borrows, reviews = _random_history(seed=2)
+    early, late = borrows[:200], borrows[200:] + [(999, 7), (999, 41)]
+    # A borrow after a review keeps the review's strength
+    late.append(reviews[0][:2])
+
+    model = update_model(
+        fit_model(make_interactions(early, reviews), n_neighbours=5),
+        make_interactions(late, last_borrow_id=9),
+    )
+    full = fit_model(make_interactions(borrows[:200] + late, reviews), n_neighbours=5)
+
+    order = np.argsort(model.book_ids)
+    user_order = np.argsort(model.user_ids)
+    assert np.array_equal(model.book_ids[order], full.book_ids)
+    assert model.last_borrow_id == 9
+    assert (model.matrix[user_order][:, order] != full.matrix).nnz == 0
+
+    # Rows of books touched by the new borrows are exact
+    for book in {b for _, b in late}:
+        col = int(np.flatnonzero(model.book_ids == book)[0])
+        full_col = int(np.searchsorted(full.book_ids, book))
+        assert np.allclose(model.similarities[col], full.similarities[full_col], atol=1e-6)
+        assert list(model.book_ids[model.neighbours[col][model.neighbours[col] >= 0]]) == list(
+            full.book_ids[full.neighbours[full_col][full.neighbours[full_col] >= 0]]
+        )
+    assert np.allclose(model.norms[order], full.norms, atol=1e-6)
+
+    # Folding the same interactions in again changes nothing
+    again = update_model(model, make_interactions(late, last_borrow_id=9))
+    assert again.matrix is model.matrix and again.neighbours is model.neighbours
+
+
+def test_recommend_sums_neighbours_of_the_history():
+    neighbours = ItemNeighbours(n_neighbours=3)
+    # Readers of 1 and 2 also took 3; one of them took 4
+    neighbours.fit(make_interactions([(1, 1), (1, 3), (2, 2), (2, 3), (2, 4), (3, 5)]))
+
+    ranked = neighbours.recommend([1, 2], k=5)
+    assert [book_id for book_id, _ in ranked] == [3, 4]
+    assert ranked[0][1] > ranked[1][1]
+    assert neighbours.recommend([1, 2], k=5, exclude_ids=[3])[0][0] == 4
+    assert neighbours.recommend([5], k=5) == []  # nobody else read 5
+    assert neighbours.recommend([99], k=5) == []
+    assert {b for b, _ in neighbours.neighbours_of(3)} == {1, 2, 4}
+
+
+async def test_serving_folds_in_new_borrows_and_reads_the_nightly_file(
+    db_session: AsyncSession, query_log: list[str], tmp_path
+):
+    users = [
+        User(email=f"cf{i}@example.com", username=f"cf{i}", hashed_password="x") for i in range(3)
+    ]
+    books = [Book(title=f"CF {i}", author="A") for i in range(4)]
+    db_session.add_all([*users, *books])
+    await db_session.flush()
+    u, b = [x.id for x in users], [x.id for x in books]
+
+    def returned(user_id: int, book_id: int) -> Borrow:
+        return Borrow(user_id=user_id, book_id=book_id, status=BorrowStatus.RETURNED)
+
+    db_session.add_all([returned(u[0], b[0]), returned(u[0], b[1]), returned(u[1], b[0])])
+    await db_session.commit()
+
+    # The first fit runs in the background, not in the request
+    neighbours = ItemNeighbours(refresh_seconds=0)
+    await neighbours.ensure_fresh(db_session)
+    assert neighbours.recommend([b[0]], k=3) == []
+    await neighbours.ensure_fresh(db_session, wait=True)
+    assert [x for x, _ in neighbours.recommend([b[0]], k=3)] == [b[1]]
+
+    db_session.add_all(
+        [returned(u[1], b[2]), Review(user_id=u[2], book_id=b[2], rating=5, body="!"),
+         Review(user_id=u[2], book_id=b[3], rating=4, body="!")]
+    )
+    await db_session.commit()
+    query_log.clear()
+    await neighbours.ensure_fresh(db_session)
+    assert any("borrows.id >" in q for q in query_log)
+    assert [x for x, _ in neighbours.recommend([b[0]], k=3)] == [b[1], b[2]]
+    assert [x for x, _ in neighbours.recommend([b[3]], k=3)] == [b[2]]
+
+    # The nightly build publishes a file that a fresh worker adopts
+    path = str(tmp_path / "neighbours.npz")
+    assert await build_neighbour_file(db_session, path) == 4
+    worker = ItemNeighbours(path=path, refresh_seconds=0)
+    query_log.clear()
+    await worker.ensure_fresh(db_session)
+    # Only what came after the file's watermark is read
+    assert all("borrows.id >" in q for q in query_log if "FROM borrows" in q)
+    assert any("FROM borrows" in q for q in query_log)
+    assert worker.recommend([b[0]], k=3) == neighbours.recommend([b[0]], k=3)
+
+    # A borrow that commits below the watermark already read is still found
+    watermark = neighbours.model.last_borrow_id
+    db_session.add(Borrow(id=watermark + 10, user_id=u[2], book_id=b[1]))
+    await db_session.commit()
+    await neighbours.ensure_fresh(db_session)
+    db_session.add(Borrow(id=watermark + 5, user_id=u[2], book_id=b[0]))
+    await db_session.commit()
+    await neighbours.ensure_fresh(db_session)
+    assert neighbours.model.last_borrow_id == watermark + 10
+    assert b[3] in [x for x, _ in neighbours.recommend([b[0]], k=3)]
@@ -0,0 +1,73 @@
+"""SQL ranking path: same order as the catalog, anti-join, k rows only."""
+import random
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book
+from app.models.library import Borrow
+from app.models.user import User
+from app.repositories.recommendation_repository import RecommendationRepository
+from app.services.recommendation_catalog import (
+    RATING_WEIGHT,
+    SENTIMENT_WEIGHT,
+    BookCatalog,
+    genre_affinity,
+)
+
+_GENRES = ["Fiction", "History", "Science", None]
+
+
+async def _seed(db: AsyncSession) -> tuple[int, set[int]]:
+    rng = random.Random(3)
+    user = User(email="sql@example.com", username="sql", hashed_password="x")
+    books = [
+        Book(
+            title=f"Book {i}", author="A", genre=rng.choice(_GENRES),
+            average_rating=rng.choice([1.0, 2.5, 4.0, 4.5]),
+            average_sentiment=rng.choice([None, -0.5, 0.5]),
+        )
+        for i in range(60)
+    ]
+    db.add_all([user, *books])
+    await db.flush()
+    borrowed = {b.id for b in books[:10]}
+    db.add_all(Borrow(user_id=user.id, book_id=book_id) for book_id in borrowed)
+    await db.commit()
+    return user.id, borrowed
+
+
+async def test_sql_and_catalog_rank_identically(db_session: AsyncSession, query_log: list[str]):
+    user_id, borrowed = await _seed(db_session)
+    catalog = BookCatalog()
+    await catalog.ensure_fresh(db_session)
+    repo = RecommendationRepository(db_session)
+
+    weights = {"Fiction": 0.6, "Science": 0.4}
+    query_log.clear()
+    ranked = await repo.top_k(
+        user_id, 8, genre_affinity(weights, ["History"], ["Science"]),
+        RATING_WEIGHT, SENTIMENT_WEIGHT,
+    )
+    assert len(query_log) == 1
+    assert "NOT (EXISTS" in query_log[0] and "LIMIT" in query_log[0]
+    assert "NOT IN" not in query_log[0]
+
+    ids = [b.id for b in ranked]
+    assert not borrowed.intersection(ids)
+    assert ids == catalog.recommend(weights, 8, borrowed, ["History"], ["Science"])
+
+    # Description-similarity boosts join on the book id
+    boosts = {book_id: 0.3 for book_id in range(40, 60, 3)}
+    boosted = await repo.top_k(
+        user_id, 8, genre_affinity(weights), RATING_WEIGHT, SENTIMENT_WEIGHT, boosts
+    )
+    assert [b.id for b in boosted] == catalog.recommend(weights, 8, borrowed, boosts=boosts)
+
+    top_rated = await repo.top_k(user_id, 5)
+    assert [b.id for b in top_rated] == catalog.top_rated(5, borrowed)
+
+
+async def test_sql_single_genre_affinity(db_session: AsyncSession):
+    user_id, borrowed = await _seed(db_session)
+    ranked = await RecommendationRepository(db_session).top_k(user_id, 3, {"History": 5.0})
+    assert all(b.genre == "History" for b in ranked)
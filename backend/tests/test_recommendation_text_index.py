@@ -0,0 +1,132 @@
+"""Description TF-IDF index: cosine parity, incremental updates, persistence, blending."""
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.library import Borrow
+from app.models.user import User
+from app.repositories.affinity_repository import BORROW_WEIGHT, GenreAffinityRepository
+from app.repositories.book_repository import BookRepository
+from app.services.recommendation_catalog import BookCatalog
+from app.services.recommendation_service import build_recommendations
+from app.services.recommendation_text_index import DescriptionIndex
+
+_TEXTS = {
+    1: ("Dragons guard the mountain pass.", "A young wizard bargains with dragons."),
+    2: ("A wizard school hides a dragon egg.", None),
+    3: ("Detectives chase a jewel thief through London.", None),
+    4: (None, "A detective story about a stolen jewel and a London heist."),
+    5: ("Stars, galaxies and the physics of black holes.", None),
+    6: ("Black holes explained for curious readers.", "Physics without equations."),
+    7: (None, None),
+}
+
+
+def _rows(texts: dict) -> list[tuple]:
+    return [(book_id, description, summary) for book_id, (description, summary) in texts.items()]
+
+
+def test_similarity_matches_sklearn_tfidf_cosine():
+    index = DescriptionIndex(n_features=2**20)
+    index.build(_rows(_TEXTS))
+
+    documents = ["\n".join(t for t in pair if t) for pair in _TEXTS.values()]
+    tfidf = TfidfVectorizer(sublinear_tf=True, stop_words="english").fit_transform(documents)
+    expected = (tfidf @ tfidf[0].T).toarray().ravel()
+
+    got = dict(index.similar_to([1], k=10, exclude_ids=[1]))
+    assert got.keys() == {2}  # only book 2 shares terms with book 1
+    for book_id, similarity in got.items():
+        assert abs(similarity - expected[book_id - 1]) < 1e-5
+
+    assert [b for b, _ in index.similar_to([3], k=1)] == [3]
+    assert index.similar_to([7], k=5) == []  # no text, no profile
+    assert index.similar_to([999], k=5) == []
+
+
+def test_incremental_updates_match_a_rebuild(tmp_path):
+    texts = dict(_TEXTS)
+    index = DescriptionIndex()
+    index.build(_rows(texts))
+    base_norms = index._base_norms
+
+    changes = {
+        5: ("A dragon hatches among the stars.", None),
+        8: ("Dragons and wizards at war.", None),
+    }
+    index.upsert_many(_rows(changes))
+    index.remove(3)
+    texts.update(changes)
+    del texts[3]
+    # Only the changed rows are normalised; idf waits for the merge
+    assert index._base_norms is base_norms
+    assert [b for b, _ in index.similar_to([1, 2], k=2, exclude_ids=[1, 2])] == [8, 5]
+    index.merge()
+
+    rebuilt = DescriptionIndex()
+    rebuilt.build(_rows(texts))
+
+    def ranked(ix: DescriptionIndex) -> list[tuple[int, float]]:
+        return [(b, round(s, 5)) for b, s in ix.similar_to([1, 2], k=10, exclude_ids=[1, 2])]
+
+    assert ranked(index) == ranked(rebuilt)
+    assert [b for b, _ in ranked(index)][:2] == [8, 5]
+    assert np.array_equal(index._df, rebuilt._df)
+
+    # Saving merges the delta; a fresh worker loads the same index
+    path = str(tmp_path / "text_index")
+    index.save(path)
+    loaded = DescriptionIndex()
+    assert loaded.load(path)
+    assert len(loaded) == len(texts)
+    assert ranked(loaded) == ranked(rebuilt)
+    assert not DescriptionIndex(n_features=2**10).load(path)
+
+
+async def test_recommendations_blend_description_similarity(
+    db_session: AsyncSession, query_log: list[str]
+):
+    repo = BookRepository(db_session)
+    user = User(email="text@example.com", username="text", hashed_password="x")
+    db_session.add(user)
+    read = [
+        await repo.create(title=f"Read {i}", author="A", genre="Fantasy", description=d)
+        for i, d in enumerate(["Dragons over the sea.", "A dragon rider's first flight."])
+    ]
+    popular = await repo.create(
+        title="Popular", author="B", genre="Fantasy", average_rating=4.0,
+        description="Court intrigue among rival noble houses.",
+    )
+    quiet = await repo.create(
+        title="Quiet", author="C", genre="Fantasy", average_rating=3.0, description="A ship."
+    )
+    await db_session.flush()
+    db_session.add_all(Borrow(user_id=user.id, book_id=b.id) for b in read)
+    for book in read:
+        await GenreAffinityRepository(db_session).record(user.id, book.id, BORROW_WEIGHT)
+    await db_session.commit()
+
+    catalog, index = BookCatalog(), DescriptionIndex()
+    books, strategy = await build_recommendations(
+        user, db_session, limit=2, catalog=catalog, text_index=index
+    )
+    assert strategy == "content_based"
+    assert [b.id for b in books] == [popular.id, quiet.id]
+
+    # A generated summary lands in the index on the next version bump
+    await repo.save_ai_content(quiet.id, ai_summary="A dragon rider flies over the sea.")
+    await db_session.commit()
+    query_log.clear()
+    books, _ = await build_recommendations(
+        user, db_session, limit=2, catalog=catalog, text_index=index
+    )
+    assert [b.id for b in books] == [quiet.id, popular.id]
+    assert any("books.text_updated_at >=" in q for q in query_log)
+
+    # A new rating or a review consensus leaves the text stamp alone
+    stamp = popular.text_updated_at
+    await repo.update(popular, average_rating=4.5)
+    await repo.save_ai_content(popular.id, ai_review_consensus="Readers agree.")
+    await db_session.commit()
+    await db_session.refresh(popular)
+    assert popular.text_updated_at == stamp
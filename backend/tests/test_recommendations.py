@@ -4,13 +4,17 @@ from unittest.mock import AsyncMock, MagicMock
 import pytest
 
 from app.models.book import Book, BookStatus
-from app.models.library import Borrow, UserPreferences
+from app.models.library import UserPreferences
 from app.models.user import User
-from app.services.recommendation_service import (
-    _compute_genre_weights,
-    _score_books_content_based,
-    build_recommendations,
+from app.services.recommendation_catalog import (
+    DISLIKED_PENALTY,
+    FAVOURITE_BOOST,
+    RATING_WEIGHT,
+    BookCatalog,
 )
+from app.services.recommendation_neighbours import ItemNeighbours, make_interactions
+from app.services.recommendation_text_index import DescriptionIndex
+from app.services.recommendation_service import build_recommendations
 
 def _make_book(id: int, genre: str = "Fiction", rating: float = 3.0) -> Book:
     b = Book()
@@ -25,8 +29,17 @@ def _make_book(id: int, genre: str = "Fiction", rating: float = 3.0) -> Book:
     return b
 
 
-def _make_db(borrows: list, books_result: list) -> AsyncMock:
-    """Build a minimal async DB mock."""
+def _catalog(books: list[Book]) -> BookCatalog:
+    """A loaded catalog at version 0, so build_recommendations skips refreshing."""
+    catalog = BookCatalog()
+    catalog.build(
+        [(b.id, b.genre, b.average_rating, None, b.status) for b in books], version=0
+    )
+    return catalog
+
+
+def _make_db(borrows: list, books_result: list, trending: list | None = None) -> AsyncMock:
+    """Build a minimal async DB mock; pass trending for the cold-start path."""
     db = AsyncMock()
 
     borrow_scalars = MagicMock()
@@ -44,11 +57,15 @@ def _make_db(borrows: list, books_result: list) -> AsyncMock:
     books_execute_result = MagicMock()
     books_execute_result.scalars.return_value = books_scalars
 
-    # execute is called three times: borrows, prefs, available books
+    trending_execute_result = MagicMock()
+    trending_execute_result.tuples.return_value.all.return_value = trending or []
+
+    # execute is called three times: borrowed ids, prefs (or trending on a
+    # cold start), top-k rows
     db.execute = AsyncMock(
         side_effect=[
             borrow_execute_result,
-            prefs_execute_result,
+            prefs_execute_result if trending is None else trending_execute_result,
             books_execute_result,
         ]
     )
@@ -56,70 +73,43 @@ def _make_db(borrows: list, books_result: list) -> AsyncMock:
 
 
 
-async def test_compute_genre_weights_empty_history():
-    db = AsyncMock()
-    result = MagicMock()
-    result.scalars.return_value.all.return_value = []
-    db.execute = AsyncMock(return_value=result)
-
-    weights = await _compute_genre_weights(1, db)
-    assert weights == {}
-
-
-async def test_compute_genre_weights_normalises():
-    # 2 Fiction, 1 History → Fiction=2/3, History=1/3
-    books = [
-        _make_book(1, "Fiction"),
-        _make_book(2, "Fiction"),
-        _make_book(3, "History"),
-    ]
-    db = AsyncMock()
-    result = MagicMock()
-    result.scalars.return_value.all.return_value = books
-    db.execute = AsyncMock(return_value=result)
-
-    weights = await _compute_genre_weights(1, db)
-    assert abs(weights["Fiction"] - 2 / 3) < 1e-9
-    assert abs(weights["History"] - 1 / 3) < 1e-9
-    assert abs(sum(weights.values()) - 1.0) < 1e-9
+def _score(book: Book, weights: dict[str, float], prefs=None) -> float:
+    """The served score of one book, as BookCatalog computes it for every request."""
+    catalog = _catalog([book])
+    favourite = prefs.favourite_genres if prefs else ()
+    disliked = prefs.disliked_genres if prefs else ()
+    return float(catalog.scores(catalog.genre_vector(weights, favourite, disliked))[0])
 
 
 def test_score_applies_genre_weight():
-    books = [_make_book(1, "Fiction", rating=0.0)]
-    weights = {"Fiction": 0.7}
-    scored = _score_books_content_based(books, weights, None)
-    assert abs(scored[0][1] - 0.7) < 1e-9
+    book = _make_book(1, "Fiction", rating=0.0)
+    assert abs(_score(book, {"Fiction": 0.7}) - 0.7) < 1e-9
 
 
 def test_score_favourite_genre_boost():
-    books = [_make_book(1, "Fantasy", rating=0.0)]
-    weights = {"Fantasy": 0.0}
+    book = _make_book(1, "Fantasy", rating=0.0)
     prefs = MagicMock(spec=UserPreferences)
     prefs.favourite_genres = ["Fantasy"]
     prefs.disliked_genres = []
-    scored = _score_books_content_based(books, weights, prefs)
-    assert abs(scored[0][1] - 0.5) < 1e-9  # 0.0 weight + 0.5 boost
+    # 0.0 weight + the favourite boost
+    assert abs(_score(book, {"Fantasy": 0.0}, prefs) - FAVOURITE_BOOST) < 1e-9
 
 
 def test_score_disliked_genre_penalty():
-    books = [_make_book(1, "Horror", rating=0.0)]
-    weights = {"Horror": 0.0}
+    book = _make_book(1, "Horror", rating=0.0)
     prefs = MagicMock(spec=UserPreferences)
     prefs.favourite_genres = []
     prefs.disliked_genres = ["Horror"]
-    scored = _score_books_content_based(books, weights, prefs)
-    assert abs(scored[0][1] - (-0.5)) < 1e-9
+    assert abs(_score(book, {"Horror": 0.0}, prefs) + DISLIKED_PENALTY) < 1e-9
 
 
 def test_score_rating_blended():
-    books = [_make_book(1, "Science", rating=5.0)]
-    weights = {"Science": 0.0}
-    scored = _score_books_content_based(books, weights, None)
-    assert abs(scored[0][1] - 0.5) < 1e-9  # 5.0 * 0.1
+    book = _make_book(1, "Science", rating=5.0)
+    assert abs(_score(book, {"Science": 0.0}) - 5.0 * RATING_WEIGHT) < 1e-9
 
 
 async def test_build_recommendations_cold_start():
-    """< 2 borrows → cold start strategy, sorted by rating."""
+    """< 2 borrows and nothing trending → cold start strategy, sorted by rating."""
     user = MagicMock(spec=User)
     user.id = 1
 
@@ -128,11 +118,13 @@ async def test_build_recommendations_cold_start():
         _make_book(2, "History", rating=2.0),
         _make_book(3, "Science", rating=5.0),
     ]
-    db = _make_db(borrows=[], books_result=books)
+    db = _make_db(borrows=[], books_result=books, trending=[])
 
-    result_books, strategy = await build_recommendations(user, db, limit=10)
+    result_books, strategy = await build_recommendations(
+        user, db, limit=10, catalog_version=0, catalog=_catalog(books)
+    )
     assert strategy == "cold_start_top_rated"
-    assert result_books[0].average_rating >= result_books[-1].average_rating
+    assert [b.id for b in result_books] == [3, 1, 2]
 
 
 async def test_build_recommendations_content_based():
@@ -140,14 +132,6 @@ async def test_build_recommendations_content_based():
     user = MagicMock(spec=User)
     user.id = 1
 
-    borrow1 = MagicMock(spec=Borrow)
-    borrow1.user_id = 1
-    borrow1.book_id = 10
-
-    borrow2 = MagicMock(spec=Borrow)
-    borrow2.user_id = 1
-    borrow2.book_id = 11
-
     available_books = [
         _make_book(20, "Fiction", rating=3.0),
         _make_book(21, "History", rating=4.0),
@@ -156,7 +140,7 @@ async def test_build_recommendations_content_based():
     db = AsyncMock()
 
     borrow_scalars = MagicMock()
-    borrow_scalars.all.return_value = [borrow1, borrow2]
+    borrow_scalars.all.return_value = [10, 11]  # borrowed book ids
     borrow_result = MagicMock()
     borrow_result.scalars.return_value = borrow_scalars
 
@@ -168,32 +152,33 @@ async def test_build_recommendations_content_based():
     avail_result = MagicMock()
     avail_result.scalars.return_value = avail_scalars
 
-    # For _compute_genre_weights: books joined with borrows
-    genre_books_scalars = MagicMock()
-    genre_books_scalars.all.return_value = [
-        _make_book(10, "Fiction"),
-        _make_book(11, "Fiction"),
-    ]
-    genre_result = MagicMock()
-    genre_result.scalars.return_value = genre_books_scalars
-
-    # _upsert_genre_weights also calls execute
-    upsert_prefs_result = MagicMock()
-    upsert_prefs_result.scalar_one_or_none.return_value = None
+    # Genre affinities maintained by borrow/return/review events
+    affinity_result = MagicMock()
+    affinity_result.tuples.return_value.all.return_value = [("Fiction", 2.0)]
 
     db.execute = AsyncMock(
         side_effect=[
             borrow_result,
             prefs_result,
+            affinity_result,
             avail_result,
-            genre_result,
-            upsert_prefs_result,
         ]
     )
-    db.add = MagicMock()
-    db.commit = AsyncMock()
-    db.flush = AsyncMock()
 
-    result_books, strategy = await build_recommendations(user, db, limit=10)
+    catalog = _catalog(
+        [_make_book(10, "Fiction"), _make_book(11, "Fiction"), *available_books]
+    )
+    text_index = DescriptionIndex()
+    text_index.build([], version=0)
+    neighbours = ItemNeighbours(refresh_seconds=3600)
+    neighbours.fit(make_interactions())
+    result_books, strategy = await build_recommendations(
+        user, db, limit=10, catalog_version=0, catalog=catalog,
+        text_index=text_index, neighbours=neighbours, precomputed=False,
+    )
     assert strategy == "content_based"
-    assert len(result_books) > 0
+    # Fiction weight 1.0 outranks History's higher rating; borrowed books excluded
+    assert [b.id for b in result_books] == [20, 21]
+    # A read: nothing is added, flushed or committed
+    db.add.assert_not_called()
+    db.commit.assert_not_awaited()
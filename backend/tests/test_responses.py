@@ -0,0 +1,103 @@
+"""Fast JSON response path and response compression."""
+from datetime import datetime, timezone
+
+import orjson
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.core.compression import CompressionMiddleware, choose_encoding
+from app.core.responses import JSONBytesResponse, serialize, type_adapter
+from app.schemas.books import BorrowResponse
+
+
+async def _create_books(create_book, n: int) -> None:
+    for i in range(n):
+        await create_book(f"Book {i}", description="x" * 200)
+
+
+def test_orjson_and_pydantic_paths_agree_on_datetimes():
+    when = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    borrow = {
+        "id": 1, "book_id": 2, "user_id": 3, "status": "active",
+        "borrowed_at": when, "returned_at": None,
+    }
+    via_pydantic = orjson.loads(serialize(BorrowResponse, borrow))
+    via_orjson = orjson.loads(JSONBytesResponse(borrow).body)
+    assert via_pydantic == via_orjson
+    assert via_orjson["borrowed_at"] == "2026-01-02T03:04:05Z"
+
+
+def test_type_adapter_is_cached():
+    assert type_adapter(list[BorrowResponse]) is type_adapter(list[BorrowResponse])
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("gzip;q=0.0") is None
+    assert choose_encoding("gzip ; q=0.000, identity") is None
+    assert choose_encoding("gzip; q=0.5") == "gzip"
+    assert choose_encoding("*") is not None
+    assert choose_encoding("*, gzip;q=0, br;q=0") is None
+
+
+async def test_large_list_is_gzipped(client: AsyncClient, create_book):
+    await _create_books(create_book, 10)
+
+    resp = await client.get("/api/v1/books", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in resp.headers["vary"].lower()
+    assert len(resp.json()["items"]) == 10  # httpx decodes transparently
+
+    small = await client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+async def test_streamed_responses_are_not_compressed():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1)
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield b"data: " + b"x" * 2000 + b"\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @app.get("/plain")
+    async def plain():
+        return JSONBytesResponse({"data": "x" * 2000})
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://t") as ac:
+        streamed = await ac.get("/stream", headers={"Accept-Encoding": "gzip"})
+        plain_resp = await ac.get("/plain", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in streamed.headers
+    assert plain_resp.headers["content-encoding"] == "gzip"
+    assert int(plain_resp.headers["content-length"]) < 2000
+
+
+async def test_compressed_bodies_carry_a_weak_etag(client: AsyncClient, create_book):
+    await _create_books(create_book, 10)
+
+    plain = await client.get("/api/v1/books", headers={"Accept-Encoding": "identity"})
+    gzipped = await client.get("/api/v1/books", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+    assert "accept-encoding" in plain.headers["vary"].lower()
+    assert gzipped.headers["etag"] == f"W/{plain.headers['etag']}"
+
+    # Either form revalidates; the 304 names the variant being revalidated
+    resp = await client.get(
+        "/api/v1/books",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]},
+    )
+    assert resp.status_code == 304 and resp.headers["etag"] == gzipped.headers["etag"]
+    resp = await client.get(
+        "/api/v1/books",
+        headers={"Accept-Encoding": "identity", "If-None-Match": plain.headers["etag"]},
+    )
+    assert resp.status_code == 304 and resp.headers["etag"] == plain.headers["etag"]
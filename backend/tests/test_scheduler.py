@@ -0,0 +1,129 @@
+"""Scheduled jobs: the schedule itself and each job run end to end."""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book
+from app.models.library import Borrow, BorrowStatus, Review, UserRecommendation
+from app.models.user import User
+from app.repositories.affinity_repository import GenreAffinityRepository
+from app.services.model_store import current_generation
+from app.tasks.__main__ import main
+from app.tasks.scheduler import Job, get_job, jobs, run_schedule
+
+
+async def test_jobs_run_when_due_and_failures_do_not_stop_the_schedule():
+    now = [0.0]
+    runs: list[tuple[str, float]] = []
+
+    def job(name: str, fail: bool = False):
+        async def run() -> None:
+            runs.append((name, now[0]))
+            if fail:
+                raise RuntimeError(name)
+
+        return run
+
+    async def sleep(seconds: float) -> None:
+        now[0] += seconds
+        if now[0] > 95:
+            raise asyncio.CancelledError
+
+    schedule = [
+        Job("often", job("often", fail=True), 30.0),
+        Job("rarely", job("rarely"), 100.0),
+        Job("never", job("never"), 0.0),
+    ]
+    with pytest.raises(asyncio.CancelledError):
+        await run_schedule(schedule, clock=lambda: now[0], sleep=sleep)
+    assert runs == [
+        ("often", 0.0), ("rarely", 0.0), ("often", 30.0), ("often", 60.0), ("often", 90.0),
+    ]
+
+
+async def test_sentiment_job_scores_new_reviews(db_session: AsyncSession, background_sessions):
+    user = User(email="j@example.com", username="j", hashed_password="x")
+    book = Book(title="T", author="A")
+    db_session.add_all([user, book])
+    await db_session.flush()
+    db_session.add(Review(user_id=user.id, book_id=book.id, rating=5, body="A wonderful read"))
+    await db_session.commit()
+
+    await get_job("score_review_sentiments").run()
+    score = await db_session.scalar(
+        select(Review.sentiment_score).execution_options(populate_existing=True)
+    )
+    assert score > 0
+
+
+async def test_similar_books_job_publishes_a_generation(
+    db_session: AsyncSession, background_sessions, monkeypatch, tmp_path
+):
+    db_session.add_all(
+        Book(title=t, author="A", genre="Sea", description=d)
+        for t, d in (("A", "Whales and ships."), ("B", "Ships at sea."))
+    )
+    await db_session.commit()
+    path = str(tmp_path / "similar")
+    monkeypatch.setattr("app.services.similar_books.settings.SIMILAR_BOOKS_INDEX_PATH", path)
+
+    await get_job("build_similar_books").run()
+    assert current_generation(path) is not None
+
+
+async def test_nightly_jobs_build_the_models_then_precompute_from_them(
+    db_session: AsyncSession, background_sessions, monkeypatch, tmp_path
+):
+    books = [
+        Book(title=f"B{i}", author="A", genre=g, description=f"A tale of {g.lower()}, part {i}.")
+        for i, g in enumerate(("Sea", "Sky") * 4)
+    ]
+    users = [
+        User(email=f"r{i}@example.com", username=f"r{i}", hashed_password="x") for i in range(3)
+    ]
+    db_session.add_all([*books, *users])
+    await db_session.flush()
+    affinity = GenreAffinityRepository(db_session)
+    for i, user in enumerate(users):
+        for book in books[i : i + 3]:
+            db_session.add(Borrow(user_id=user.id, book_id=book.id, status=BorrowStatus.RETURNED))
+            await affinity.record(user.id, book.id, 1.0)
+    await db_session.commit()
+    paths = {
+        "recommendation_catalog.settings.RECOMMENDER_CATALOG_PATH": "catalog",
+        "recommendation_text_index.settings.RECOMMENDER_TEXT_INDEX_PATH": "text",
+        "recommendation_neighbours.settings.RECOMMENDER_NEIGHBOURS_PATH": "neighbours",
+        "recommendation_batch.settings.RECOMMENDER_TEXT_INDEX_PATH": "text",
+        "recommendation_batch.settings.RECOMMENDER_NEIGHBOURS_PATH": "neighbours",
+    }
+    for target, name in paths.items():
+        monkeypatch.setattr(f"app.services.{target}", str(tmp_path / name))
+    monkeypatch.setattr(
+        "app.services.recommendation_batch.settings.RECOMMENDER_PRECOMPUTE_WORKERS", 1
+    )
+
+    names = [job.name for job in jobs()]
+    order = ["build_recommender_models", "build_item_neighbours", "precompute_recommendations"]
+    assert [name for name in names if name in order] == order
+    for name in order:
+        await get_job(name).run()
+    for name in ("catalog", "text", "neighbours"):
+        assert current_generation(str(tmp_path / name)) is not None
+    stored = await db_session.scalars(select(UserRecommendation.user_id).distinct())
+    assert set(stored.all()) == {user.id for user in users}
+
+
+def test_command_line_runs_one_job(monkeypatch):
+    ran = []
+
+    async def run() -> None:
+        ran.append(True)
+
+    monkeypatch.setattr(
+        "app.tasks.__main__.get_job", lambda name: Job(name, run, 1.0)
+    )
+    assert main(["run", "score_review_sentiments"]) == 0 and ran
+    with pytest.raises(SystemExit):
+        main(["run", "no_such_job"])
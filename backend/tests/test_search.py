@@ -0,0 +1,92 @@
+"""Tests for GET /books/search (SQLite FTS5 implementation)."""
+
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.book_repository import BookRepository
+
+
+async def test_search_ranks_title_match_above_description_match(
+    client: AsyncClient, create_book
+):
+    in_desc = await create_book(
+        title="Sea Stories", author="A",
+        description="A long voyage aboard a whaling ship.",
+    )
+    in_title = await create_book(
+        title="The Whaling Voyage", author="B",
+        description="Adventures at sea.",
+    )
+    await create_book(title="Gardening", author="C")
+
+    resp = await client.get("/api/v1/books/search?q=whaling&boost_rating=false")
+    assert resp.status_code == 200
+    ids = [hit["book"]["id"] for hit in resp.json()["items"]]
+    assert ids == [in_title, in_desc]
+
+
+async def test_search_returns_highlighted_snippet(client: AsyncClient, create_book):
+    await create_book(
+        title="Orchards", author="A",
+        description="A gentle history of apple orchards in Kent.",
+    )
+    resp = await client.get("/api/v1/books/search?q=apple")
+    hit = resp.json()["items"][0]
+    assert "<mark>apple</mark>" in hit["snippet"]
+
+
+async def test_search_sees_updates_and_deletes(
+    client: AsyncClient, auth_headers: dict, create_book
+):
+    book_id = await create_book(title="Old Name", author="A")
+    await client.put(
+        f"/api/v1/books/{book_id}", headers=auth_headers, json={"title": "Lighthouse"}
+    )
+    assert len((await client.get("/api/v1/books/search?q=lighthouse")).json()["items"]) == 1
+    assert (await client.get("/api/v1/books/search?q=old")).json()["items"] == []
+
+    await client.delete(f"/api/v1/books/{book_id}", headers=auth_headers)
+    assert (await client.get("/api/v1/books/search?q=lighthouse")).json()["items"] == []
+
+
+async def test_search_cursor_pagination(client: AsyncClient, create_book):
+    for i in range(5):
+        await create_book(title=f"Dragon tale {i}", author="A")
+
+    seen: list[int] = []
+    url = "/api/v1/books/search?q=dragon&limit=2"
+    resp = await client.get(url)
+    while True:
+        data = resp.json()
+        seen.extend(hit["book"]["id"] for hit in data["items"])
+        if not data["next_cursor"]:
+            break
+        resp = await client.get(f"{url}&cursor={data['next_cursor']}")
+    assert len(seen) == 5 and len(set(seen)) == 5
+
+
+async def test_search_ignores_fts_syntax_in_query(client: AsyncClient, create_book):
+    await create_book(title="Night Train", author="A")
+    resp = await client.get('/api/v1/books/search?q=night"*)(:')
+    assert resp.status_code == 200
+    assert len(resp.json()["items"]) == 1
+
+
+async def test_search_finds_ai_summary_text(
+    client: AsyncClient, db_session: AsyncSession, create_book
+):
+    book_id = await create_book(title="Untitled", author="A")
+    await create_book(title="Lighthouse keepers", author="B")
+    repo = BookRepository(db_session)
+    await repo.save_ai_content(book_id, ai_summary="A tale of lighthouse keepers.")
+    await db_session.commit()
+
+    resp = await client.get("/api/v1/books/search?q=lighthouse&boost_rating=false")
+    ids = [hit["book"]["id"] for hit in resp.json()["items"]]
+    assert len(ids) == 2 and ids[1] == book_id  # title outranks the summary
+    assert resp.json()["items"][1]["book"]["ai_summary"] == "A tale of lighthouse keepers."
+
+    await repo.save_ai_content(book_id, ai_summary="Something else entirely.")
+    await db_session.commit()
+    resp = await client.get("/api/v1/books/search?q=keepers")
+    assert [hit["book"]["id"] for hit in resp.json()["items"]] == [ids[0]]
@@ -0,0 +1,69 @@
+"""Tests for the lexicon sentiment scorer and the batch scoring job."""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book
+from app.models.library import Review
+from app.models.user import User
+from app.services.sentiment_service import (
+    SentimentScorer,
+    score_unscored_reviews,
+)
+
+
+def test_positive_and_negative_reviews():
+    scorer = SentimentScorer()
+    scores = scorer.score_batch(
+        [
+            "An excellent, gripping story. I loved it!",
+            "Boring, predictable and a total waste of time.",
+        ]
+    )
+    assert scores[0] > 0.5
+    assert scores[1] < -0.5
+
+
+def test_negation_flips_sentiment():
+    scorer = SentimentScorer()
+    assert scorer.score("This was good") > 0
+    assert scorer.score("This was not good") < 0
+
+
+def test_neutral_and_empty_text_score_zero():
+    scorer = SentimentScorer()
+    scores = scorer.score_batch(["The book has twelve chapters.", ""])
+    assert list(scores) == [0.0, 0.0]
+    assert len(scorer.score_batch([])) == 0
+
+
+def test_scores_are_bounded():
+    scorer = SentimentScorer()
+    gushing = " ".join(["amazing brilliant masterpiece"] * 50)
+    assert -1.0 <= scorer.score(gushing) <= 1.0
+
+
+async def test_score_unscored_reviews_batches_and_updates_book(
+    db_session: AsyncSession,
+):
+    user = User(email="s@example.com", username="s", hashed_password="x")
+    book = Book(title="T", author="A")
+    db_session.add_all([user, book])
+    await db_session.flush()
+    db_session.add_all(
+        [
+            Review(user_id=user.id, book_id=book.id, rating=5, body="Wonderful and moving"),
+            Review(user_id=user.id, book_id=book.id, rating=1, body="Dull and tedious"),
+            Review(user_id=user.id, book_id=book.id, rating=4, body="Great fun", sentiment_score=0.9),
+        ]
+    )
+    await db_session.commit()
+
+    scored = await score_unscored_reviews(db_session, batch_size=1)
+    assert scored == 2
+
+    result = await db_session.execute(select(Review.sentiment_score).order_by(Review.id))
+    scores = result.scalars().all()
+    assert scores[0] > 0 and scores[1] < 0 and scores[2] == 0.9
+
+    refreshed = await db_session.get(Book, book.id, populate_existing=True)
+    assert abs(refreshed.average_sentiment - sum(scores) / 3) < 1e-6
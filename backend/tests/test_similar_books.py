@@ -0,0 +1,162 @@
+"""Similar books: IVF recall against exact search, updates, generations on disk, endpoint."""
+import os
+import random
+
+import numpy as np
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.book_repository import BookRepository
+from app.services.similar_books import SimilarBooksIndex, build_similar_books_file
+
+
+def _corpus(n: int, topics: int = 40, seed: int = 0) -> list[tuple]:
+    """(id, genre, description, summary): each book draws most words from one topic."""
+    rng = random.Random(seed)
+    vocab = [[f"t{t}word{i}" for i in range(30)] for t in range(topics)]
+    noise = [f"common{i}" for i in range(200)]
+    rows = []
+    for book_id in range(1, n + 1):
+        topic = book_id % topics
+        words = rng.choices(vocab[topic], k=12) + rng.choices(noise, k=4)
+        rows.append((book_id, f"Genre {topic % 8}", " ".join(words), None))
+    return rows
+
+
+def _recall(index: SimilarBooksIndex, queries: list[int], k: int = 10) -> float:
+    hits = 0
+    for book_id in queries:
+        query = index.vector_of(book_id)
+        exact = {b for b, _ in index.exact_search(query, k, exclude_ids=[book_id])}
+        hits += len(exact & {b for b, _ in index.similar_to(book_id, k)})
+    return hits / (k * len(queries))
+
+
+def test_ivf_recall_against_exact_search():
+    index = SimilarBooksIndex(nprobe=16)
+    index.build(_corpus(3_000))
+    assert index.nlist == 109
+    assert _recall(index, list(range(1, 3_000, 60))) >= 0.9
+
+    # Probing every list is the exact search
+    query = index.vector_of(7)
+    assert index.search(query, 10, nprobe=index.nlist) == index.exact_search(query, 10)
+    # Books of the same topic come first, best match first
+    similar = index.similar_to(7, 5)
+    assert all(b % 40 == 7 for b, _ in similar)
+    assert [s for _, s in similar] == sorted((s for _, s in similar), reverse=True)
+
+
+def test_updates_without_rebuild_and_generations_on_disk(tmp_path):
+    index = SimilarBooksIndex()
+    index.build(_corpus(3_000))
+    centroids = index._centroids
+
+    # A new book joins the tail and is found at once; a removed one is gone
+    index.upsert_many([(9_001, "Genre 3", " ".join(["t3word1 t3word2 t3word5"] * 3), None)])
+    assert index.search(index.vector_of(9_001), 1)[0][0] == 9_001
+    assert {b % 40 for b, _ in index.similar_to(9_001, 5)} == {3}
+    index.remove(43)
+    assert 43 not in {b for b, _ in index.similar_to(3, 100)}
+    assert index.similar_to(43, 5) == []
+    # An edit moves a book to its new topic; no text and no genre leaves no vector
+    index.upsert_many([(83, "Genre 5", "t5word1 t5word2 t5word3", None), (123, None, None, None)])
+    assert all(b % 40 == 5 for b, _ in index.similar_to(83, 5))
+    assert index.similar_to(123, 5) == []
+    before = index.similar_to(3, 10)
+
+    path = str(tmp_path / "similar")
+    index.save(path)
+    assert np.array_equal(index._centroids, centroids)  # merged without retraining
+    loaded = SimilarBooksIndex()
+    assert loaded.load(path)
+    assert isinstance(loaded._vectors, np.memmap)
+    assert len(loaded) == 3_000 - 2 + 1
+    assert loaded.similar_to(3, 10) == before
+
+    # Each save is a new generation; CURRENT moves and old ones are pruned
+    first = open(os.path.join(path, "CURRENT")).read()
+    loaded.remove(3)
+    loaded.save(path)
+    loaded.save(path)
+    generations = sorted(g for g in os.listdir(path) if g.startswith("gen-"))
+    assert first not in generations and len(generations) == 2
+    assert open(os.path.join(path, "CURRENT")).read() == generations[-1]
+    assert not SimilarBooksIndex(dims=64).load(path)
+
+
+async def test_workers_adopt_the_nightly_generation(
+    db_session: AsyncSession, query_log: list[str], tmp_path
+):
+    repo = BookRepository(db_session)
+    first = await repo.create(title="A", author="A", genre="Sea", description="Whales and ships.")
+    second = await repo.create(title="B", author="B", genre="Sea", description="Ships at sea.")
+    await db_session.commit()
+
+    path = str(tmp_path / "similar")
+    assert await build_similar_books_file(db_session, path) == 2
+    worker = SimilarBooksIndex(path=path)
+    query_log.clear()
+    await worker.ensure_fresh(db_session)
+    # Only books changed since the generation's watermark are read
+    assert any("books.text_updated_at >=" in q for q in query_log)
+    assert [b for b, _ in worker.similar_to(first.id, 5)] == [second.id]
+
+    third = await repo.create(title="C", author="C", genre="Sea", description="Whales.")
+    await db_session.commit()
+    await build_similar_books_file(db_session, path)
+    generation = open(os.path.join(path, "CURRENT")).read()
+    await worker.ensure_fresh(db_session)
+    assert worker._generation == generation
+    assert {b for b, _ in worker.similar_to(first.id, 5)} == {second.id, third.id}
+
+
+async def test_similar_endpoint(client: AsyncClient, auth_headers: dict, db_session: AsyncSession):
+    repo = BookRepository(db_session)
+    texts = [
+        ("Dragons", "Fantasy", "Dragons guard the mountain pass of the wizard king."),
+        ("Wizards", "Fantasy", "A wizard school hides a dragon egg in the mountain."),
+        ("Thief", "Crime", "Detectives chase a jewel thief through London."),
+        ("Heist", "Crime", "A London jewel heist and the detective who solves it."),
+        ("Blank", None, None),
+    ]
+    books = [
+        await repo.create(title=t, author="A", genre=g, description=d) for t, g, d in texts
+    ]
+    await db_session.commit()
+    dragons, wizards, thief, heist, blank = (b.id for b in books)
+
+    first = await client.get(f"/api/v1/books/{dragons}/similar?limit=2")
+    assert first.status_code == 200
+    assert first.json()["book_id"] == dragons
+    assert [b["id"] for b in first.json()["books"]][0] == wizards
+    assert len(first.json()["books"]) == 2
+    resp = await client.get(f"/api/v1/books/{heist}/similar")
+    assert resp.json()["books"][0]["id"] == thief
+    etag = first.headers["etag"]
+    again = await client.get(
+        f"/api/v1/books/{dragons}/similar?limit=2", headers={"If-None-Match": etag}
+    )
+    assert again.status_code == 304
+
+    # A borrow elsewhere leaves the list alone; a new neighbour replaces it
+    await client.post(f"/api/v1/books/{thief}/borrow", headers=auth_headers)
+    again = await client.get(
+        f"/api/v1/books/{dragons}/similar?limit=2", headers={"If-None-Match": etag}
+    )
+    assert again.status_code == 304
+    await repo.create(title="Eggs", author="A", genre="Fantasy", description="A dragon egg.")
+    await db_session.commit()
+    again = await client.get(
+        f"/api/v1/books/{dragons}/similar?limit=2", headers={"If-None-Match": etag}
+    )
+    assert again.status_code == 200
+
+    resp = await client.get(f"/api/v1/books/{blank}/similar")
+    assert resp.json()["books"] == []
+    assert (await client.get("/api/v1/books/99999/similar")).status_code == 404
+
+    await client.delete(f"/api/v1/books/{wizards}", headers=auth_headers)
+    resp = await client.get(f"/api/v1/books/{dragons}/similar?limit=2")
+    assert resp.status_code == 200
+    assert wizards not in [b["id"] for b in resp.json()["books"]]
@@ -0,0 +1,101 @@
+"""Unit tests for map-reduce long-document summarisation (fake LLM, no network)."""
+import asyncio
+
+import pytest
+
+from app.services.llm.llm_service import CHUNK_SUMMARY_SYSTEM, LLMService
+from app.services.llm.summarization import (
+    CHARS_PER_TOKEN,
+    MapReduceSummarizer,
+    SummaryCache,
+    split_into_chunks,
+)
+
+
+class FakeLLM(LLMService):
+    def __init__(self, fail_on: set[int] | None = None) -> None:
+        self.calls = 0
+        self.chunk_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._fail_on = fail_on or set()
+
+    async def complete(self, system_prompt: str, user_prompt: str, max_tokens: int = 512) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if system_prompt == CHUNK_SUMMARY_SYSTEM:
+                self.chunk_calls += 1
+                section = int(user_prompt.split("Section ")[1].split(" ")[0])
+                if section in self._fail_on:
+                    raise RuntimeError(f"section {section} failed")
+                return f"chunk-{section}"
+            return "merged"
+        finally:
+            self.in_flight -= 1
+
+
+def _long_text(paragraphs: int = 20) -> str:
+    return "\n\n".join(f"Paragraph {i}. " + "word " * 200 for i in range(paragraphs))
+
+
+def test_split_respects_token_budget():
+    chunks = split_into_chunks(_long_text(), max_tokens=300)
+    assert len(chunks) > 1
+    assert all(len(c) <= 300 * CHARS_PER_TOKEN for c in chunks)
+    # No paragraph is lost
+    assert sum(c.count("Paragraph") for c in chunks) == 20
+
+
+def test_split_hard_slices_oversized_sentence():
+    chunks = split_into_chunks("x" * 1000, max_tokens=50)
+    assert all(len(c) <= 200 for c in chunks)
+    assert "".join(chunks) == "x" * 1000
+
+
+async def test_map_reduce_limits_concurrency_and_reduces_to_one(tmp_path):
+    llm = FakeLLM()
+    summarizer = MapReduceSummarizer(
+        llm, SummaryCache(str(tmp_path)), chunk_tokens=300, fanout=3, max_concurrency=2
+    )
+    summary = await summarizer.summarize("T", "A", _long_text())
+    assert summary == "merged"
+    assert llm.max_in_flight <= 2
+
+
+async def test_concurrent_summaries_share_one_process_wide_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.llm.llm_service.settings.LLM_MAX_CONCURRENCY", 2)
+    llm = FakeLLM()
+    summarizers = [
+        MapReduceSummarizer(llm, SummaryCache(str(tmp_path / str(i))), chunk_tokens=300)
+        for i in range(3)
+    ]
+    results = await asyncio.gather(
+        *(summarizer.summarize(f"T{i}", "A", _long_text()) for i, summarizer in enumerate(summarizers))
+    )
+    assert results == ["merged"] * 3
+    assert llm.max_in_flight == 2
+    # Cache keys name the backend that answered, not whatever OLLAMA_MODEL says
+    assert summarizers[0]._model_id == "FakeLLM"
+
+
+async def test_rerun_after_partial_failure_only_redoes_missing_chunks(tmp_path):
+    text = _long_text()
+    n_chunks = len(split_into_chunks(text, 300))
+
+    failing = FakeLLM(fail_on={2})
+    summarizer = MapReduceSummarizer(
+        failing, SummaryCache(str(tmp_path)), chunk_tokens=300, fanout=3
+    )
+    with pytest.raises(RuntimeError):
+        await summarizer.summarize("T", "A", text)
+    assert failing.calls == n_chunks
+
+    retry = FakeLLM()
+    summarizer = MapReduceSummarizer(
+        retry, SummaryCache(str(tmp_path)), chunk_tokens=300, fanout=3
+    )
+    assert await summarizer.summarize("T", "A", text) == "merged"
+    assert retry.chunk_calls == 1  # only the failed section is redone
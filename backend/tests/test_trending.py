@@ -0,0 +1,134 @@
+"""Trending books: streaming decayed counts, GET /books/trending, cold start."""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.library import Borrow, Review
+from app.models.user import User
+from app.repositories.book_repository import BookRepository
+from app.repositories.affinity_repository import decay_horizon
+from app.repositories.trending_repository import (
+    BORROW_COUNT,
+    REVIEW_COUNT,
+    TrendingRepository,
+    settings,
+)
+from app.services.recommendation_catalog import BookCatalog
+from app.services.recommendation_service import build_recommendations
+
+
+async def test_counts_decay_with_age(db_session: AsyncSession):
+    repo = BookRepository(db_session)
+    old, new, quiet = [await repo.create(title=t, author="A") for t in ("Old", "New", "Quiet")]
+    trending = TrendingRepository(db_session)
+    now = datetime.now(timezone.utc)
+    # Three borrows two half-lives (14 days) ago count as 0.75 today
+    with patch("app.repositories.trending_repository.datetime") as clock:
+        clock.now.return_value = now - timedelta(days=14)
+        for _ in range(3):
+            await trending.record(old.id, BORROW_COUNT)
+    await trending.record(new.id, BORROW_COUNT)
+    await trending.record(new.id, REVIEW_COUNT)
+    await db_session.commit()
+
+    ranked = await trending.top_k(5)
+    assert [b.id for b, _ in ranked] == [new.id, old.id]
+    assert [c for _, c in ranked] == [pytest.approx(2.0), pytest.approx(0.75)]
+    assert [b.id for b, _ in await trending.top_k(5, exclude_ids=[new.id])] == [old.id]
+    assert quiet.id not in [b.id for b, _ in ranked]
+
+
+async def test_counts_stay_finite_past_the_decay_horizon(db_session: AsyncSession):
+    book = await BookRepository(db_session).create(title="T", author="A")
+    trending = TrendingRepository(db_session)
+    with patch("app.repositories.trending_repository.datetime") as clock:
+        clock.now.return_value = decay_horizon(7.0) + timedelta(days=365)
+        await trending.record(book.id, BORROW_COUNT)
+        await trending.record(book.id, REVIEW_COUNT)
+        await db_session.commit()
+        assert [c for _, c in await trending.top_k(5)] == [pytest.approx(2.0)]
+
+
+async def test_rebuild_replays_history_at_the_configured_half_life(db_session: AsyncSession):
+    repo = BookRepository(db_session)
+    old, new = [await repo.create(title=t, author="A") for t in ("Old", "New")]
+    user = User(email="r@example.com", username="r", hashed_password="x")
+    db_session.add(user)
+    await db_session.flush()
+    now = datetime.now(timezone.utc)
+    db_session.add_all(
+        [
+            Borrow(user_id=user.id, book_id=old.id, borrowed_at=now - timedelta(days=28)),
+            Review(
+                user_id=user.id,
+                book_id=old.id,
+                rating=4,
+                body="Fine.",
+                created_at=now - timedelta(days=28),
+            ),
+            Borrow(user_id=user.id, book_id=new.id, borrowed_at=now),
+        ]
+    )
+    await db_session.flush()
+
+    trending = TrendingRepository(db_session)
+    with patch.object(settings, "TRENDING_HALF_LIFE_DAYS", 14.0):
+        await trending.rebuild()
+        ranked = await trending.top_k(5)
+    # Two events two 14-day half-lives ago count as 0.5 today
+    assert [b.id for b, _ in ranked] == [new.id, old.id]
+    assert [c for _, c in ranked] == [pytest.approx(1.0), pytest.approx(0.5)]
+
+    # Rebuilding replaces the scores rather than adding to them
+    await trending.rebuild()
+    assert len(await trending.top_k(5)) == 2
+
+
+async def test_trending_endpoint_follows_borrows_and_reviews(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, query_log: list[str]
+):
+    repo = BookRepository(db_session)
+    books = [await repo.create(title=f"T{i}", author="A") for i in range(3)]
+    await db_session.commit()
+    resp = await client.get("/api/v1/books/trending")
+    assert resp.status_code == 200 and resp.json()["books"] == []
+
+    await client.post(f"/api/v1/books/{books[1].id}/borrow", headers=auth_headers)
+    with patch("app.api.v1.endpoints.books.update_review"):
+        await client.post(
+            f"/api/v1/books/{books[1].id}/reviews",
+            headers=auth_headers,
+            json={"rating": 5, "body": "Everyone is reading this one."},
+        )
+    await client.post(f"/api/v1/books/{books[2].id}/borrow", headers=auth_headers)
+
+    query_log.clear()
+    resp = await client.get("/api/v1/books/trending", params={"limit": 5})
+    body = resp.json()
+    assert [b["id"] for b in body["books"]] == [books[1].id, books[2].id]
+    assert body["half_life_days"] == 7.0
+    # Read off the score index: ordered and limited in the database
+    [top_k] = [q for q in query_log if "book_trending" in q]
+    assert "ORDER BY book_trending.score DESC" in top_k and "LIMIT" in top_k
+
+
+async def test_cold_start_serves_trending_then_top_rated(db_session: AsyncSession):
+    repo = BookRepository(db_session)
+    hot, rated, plain = [
+        await repo.create(title=t, author="A", genre="Fiction", average_rating=r)
+        for t, r in (("Hot", 1.0), ("Rated", 5.0), ("Plain", 2.0))
+    ]
+    user = User(email="new@example.com", username="new", hashed_password="x")
+    db_session.add(user)
+    await TrendingRepository(db_session).record(hot.id, BORROW_COUNT)
+    await db_session.commit()
+
+    books, strategy = await build_recommendations(user, db_session, limit=1, catalog=BookCatalog())
+    assert strategy == "cold_start_trending" and [b.id for b in books] == [hot.id]
+    # Too little activity to fill the list: topped up by rating
+    books, strategy = await build_recommendations(user, db_session, limit=3, catalog=BookCatalog())
+    assert strategy == "cold_start_trending"
+    assert [b.id for b in books] == [hot.id, rated.id, plain.id]
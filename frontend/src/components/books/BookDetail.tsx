@@ -4,6 +4,7 @@ import { useState } from "react";
 import { X, Star } from "lucide-react";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import { Button, Input, StarRating, Spinner, Textarea } from "@/components/ui";
+import { useBookEvents } from "@/hooks/useBooks";
 import { booksService } from "@/services/books.service";
 import { toast } from "sonner";
 import type { Book } from "@/types";
@@ -24,6 +25,7 @@ export function BookDetail({ book, isBorrowedByUser, onClose }: BookDetailProps)
     queryKey: ["analysis", book.id],
     queryFn: () => booksService.getAnalysis(book.id),
   });
+  useBookEvents(book.id, ["analysis", book.id]);
 
   const reviewMutation = useMutation({
     mutationFn: () => booksService.submitReview(book.id, rating, body),
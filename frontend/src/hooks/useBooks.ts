@@ -1,4 +1,6 @@
+import { useEffect } from "react";
 import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
+import { apiClient } from "@/lib/api-client";
 import { booksService, type CreateBookPayload } from "@/services/books.service";
 import { toast } from "sonner";
 
@@ -20,6 +22,22 @@ export function useBookAnalysis(bookId: number) {
   });
 }
 
+/** Refetch a book's analysis when the server pushes summary/consensus events. */
+export function useBookEvents(bookId: number, queryKey: unknown[]) {
+  const qc = useQueryClient();
+  useEffect(() => {
+    if (!bookId || typeof EventSource === "undefined") return;
+    const source = new EventSource(`${apiClient.defaults.baseURL}/books/${bookId}/events`);
+    const refresh = () => {
+      qc.invalidateQueries({ queryKey });
+      qc.invalidateQueries({ queryKey: [BOOKS_KEY] });
+    };
+    source.addEventListener("summary", refresh);
+    source.addEventListener("review_consensus", refresh);
+    return () => source.close();
+  }, [bookId, qc]);
+}
+
 export function useRecommendations() {
   return useQuery({
     queryKey: [RECOMMENDATIONS_KEY],
@@ -30,6 +30,7 @@ export interface PaginatedBooks {
   total: number;
   page: number;
   page_size: number;
+  next_cursor?: string | null;
 }
 
 export interface Borrow {